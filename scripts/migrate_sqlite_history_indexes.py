@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+SQLite Local Database Migration - History / Sync Composite Indexes
+Date: 2026-10-16
+Purpose: Thay single-column index bằng composite index cho các query nóng
+
+- get_health_records / get_latest_vitals: (device_id, timestamp), (patient_id, timestamp)
+  → SEARCH + đọc ngược index cho ORDER BY timestamp DESC LIMIT n, không sort
+- get_active_alerts: (device_id|patient_id, resolved, timestamp)
+- sync_incremental retry: (sync_status, id) trên health_records / alerts
+- get_pending_sync_items: (sync_status, priority, created_at)
+
+Index cũ (device_id), (patient_id), (sync_status) là prefix của index mới nên bị
+xóa để mỗi INSERT chỉ cập nhật ít B-tree hơn trên thẻ SD.
+
+Usage:
+    python3 scripts/migrate_sqlite_history_indexes.py [--db data/health_monitor.db] [--no-backup]
+"""
+
+import argparse
+import contextlib
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+# (name, table, columns) - phải khớp __table_args__ trong src/data/models.py
+NEW_INDEXES = [
+    ('ix_health_records_device_timestamp', 'health_records', ('device_id', 'timestamp')),
+    ('ix_health_records_patient_timestamp', 'health_records', ('patient_id', 'timestamp')),
+    ('ix_health_records_sync_status_id', 'health_records', ('sync_status', 'id')),
+    ('ix_alerts_device_resolved_timestamp', 'alerts', ('device_id', 'resolved', 'timestamp')),
+    ('ix_alerts_patient_resolved_timestamp', 'alerts', ('patient_id', 'resolved', 'timestamp')),
+    ('ix_alerts_sync_status_id', 'alerts', ('sync_status', 'id')),
+    ('ix_sync_queue_status_priority_created', 'sync_queue', ('sync_status', 'priority', 'created_at')),
+]
+
+# Single-column index đã được composite index ở trên bao phủ (prefix)
+OBSOLETE_INDEXES = [
+    'ix_health_records_device_id',
+    'ix_health_records_patient_id',
+    'ix_health_records_sync_status',
+    'ix_alerts_device_id',
+    'ix_alerts_patient_id',
+    'ix_sync_queue_sync_status',
+]
+
+# Query đại diện cho verify (EXPLAIN QUERY PLAN phải SEARCH, không SCAN)
+VERIFY_QUERIES = [
+    ("history by device",
+     "SELECT * FROM health_records WHERE device_id = ? AND timestamp >= ? ORDER BY timestamp DESC LIMIT 100",
+     ('dev', '2026-01-01')),
+    ("history by patient",
+     "SELECT * FROM health_records WHERE patient_id = ? ORDER BY timestamp DESC LIMIT 1",
+     ('patient',)),
+    ("pending records",
+     "SELECT * FROM health_records WHERE sync_status = 'pending'", ()),
+    ("active alerts by device",
+     "SELECT * FROM alerts WHERE resolved = 0 AND device_id = ? ORDER BY timestamp DESC",
+     ('dev',)),
+    ("pending alerts",
+     "SELECT * FROM alerts WHERE sync_status = 'pending'", ()),
+]
+
+
+def backup_database(db_path: str) -> str:
+    """Create backup of database before migration (sqlite3 backup API, an toàn với WAL)"""
+    backup_path = f"{db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    if not os.path.exists(db_path):
+        print(f"⚠️ Database file not found: {db_path}")
+        return None
+
+    # sqlite3 connection context manager chỉ commit/rollback, không đóng file
+    with contextlib.closing(sqlite3.connect(db_path)) as source, \
+            contextlib.closing(sqlite3.connect(backup_path)) as target:
+        source.backup(target)
+    print(f"✅ Backup created: {backup_path}")
+    return backup_path
+
+
+def existing_tables(conn: sqlite3.Connection) -> set:
+    cursor = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def existing_indexes(conn: sqlite3.Connection) -> set:
+    cursor = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate_indexes(conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    """
+    Create composite indexes, drop obsolete single-column indexes, ANALYZE
+
+    Returns:
+        Dict {'created': [...], 'dropped': [...]}
+    """
+    print("\n📋 Migrating history / sync indexes...")
+
+    tables = existing_tables(conn)
+    before = existing_indexes(conn)
+    result = {'created': [], 'dropped': []}
+
+    for name, table, columns in NEW_INDEXES:
+        if table not in tables:
+            print(f"  ⚠️ Skip {name}: table {table} not found")
+            continue
+        if name in before:
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        result['created'].append(name)
+        print(f"  ✅ Created index: {name} ON {table}({', '.join(columns)})")
+
+    for name in OBSOLETE_INDEXES:
+        if name in before:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+            result['dropped'].append(name)
+            print(f"  ✅ Dropped index: {name}")
+
+    # Thống kê cho query planner (sqlite_stat1)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+    print(f"✅ Indexes migrated ({len(result['created'])} created, {len(result['dropped'])} dropped)")
+    return result
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params=()) -> List[str]:
+    """EXPLAIN QUERY PLAN → list detail strings"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def verify_migration(conn: sqlite3.Connection) -> bool:
+    """Verify every representative query uses an index"""
+    print("\n🔍 Verifying query plans...")
+
+    ok = True
+    tables = existing_tables(conn)
+    for label, sql, params in VERIFY_QUERIES:
+        table = sql.split(' FROM ')[1].split()[0]
+        if table not in tables:
+            continue
+        plan = query_plan(conn, sql, params)
+        full_scan = any(line.startswith(f"SCAN {table}") or line.startswith(f"SCAN TABLE {table}") for line in plan)
+        status = "❌" if full_scan else "✅"
+        print(f"  {status} {label}: {' | '.join(plan)}")
+        ok = ok and not full_scan
+
+    return ok
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Add composite history/sync indexes to local SQLite database")
+    parser.add_argument('--db', default=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'health_monitor.db')),
+                        help="Path to SQLite database (default: data/health_monitor.db)")
+    parser.add_argument('--no-backup', action='store_true', help="Skip backup before migration")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Main migration function"""
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("SQLite Database Migration - History / Sync Indexes")
+    print("=" * 60)
+
+    db_path = os.path.abspath(args.db)
+    print(f"\n📁 Database: {db_path}")
+
+    # Check if database exists
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found: {db_path}")
+        print(f"ℹ️ Run the application first to create the database")
+        return 1
+
+    backup_path = None
+    if not args.no_backup:
+        backup_path = backup_database(db_path)
+        if not backup_path:
+            print("⚠️ Proceeding without backup...")
+
+    try:
+        conn = sqlite3.connect(db_path)
+        print(f"✅ Connected to database")
+
+        migrate_indexes(conn)
+        verified = verify_migration(conn)
+
+        conn.close()
+        if not verified:
+            print(f"\n⚠️ Migration completed but some queries still scan the table")
+            return 1
+
+        print(f"\n✅ Migration completed successfully!")
+        print(f"ℹ️ Backup: {backup_path if backup_path else 'No backup created'}")
+        return 0
+
+    except sqlite3.Error as e:
+        print(f"\n❌ Migration failed: {e}")
+        if backup_path:
+            print(f"ℹ️ Restore from backup: {backup_path}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
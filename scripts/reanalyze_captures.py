@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Reanalyze Captures - Phân tích lại hàng loạt capture BP / PPG đã lưu trữ
+========================================================================
+
+tests/analyze_envelope.py và tests/bp_calib_tool.py xử lý từng capture trong
+một process. Script này chạy OscillometricProcessor.process_deflate_data (BP)
+và HRCalculator.calc_hr_and_spo2 (PPG) trên cả thư mục capture bằng process
+pool, rồi ghi một bảng kết quả dạng cột (CSV hoặc Parquet) kèm thời gian
+load/analyze của từng capture.
+
+Capture formats:
+---------------
+- Trace NPZ / NPY structured (src/sensors/replay.save_trace):
+    BP:  pressures (mmHg) hoặc counts (ADC) + timestamps / sample_rate
+    PPG: ir, red + sample_rate / timestamps
+- Capture cũ từ capture_bp_data.py: pressures_<ts>.npy + timestamps_<ts>.npy
+
+NPY được memory-map (mmap_mode='r'): worker chỉ đọc trang cần dùng, không
+copy cả file qua pickle. NPZ (zip) không memory-map được nên load bình thường.
+
+Counts → mmHg dùng calibration hiện tại của HX710B (offset_counts,
+slope_mmhg_per_count) hoặc --offset/--slope để kiểm tra lại slope mới trên
+toàn bộ dữ liệu thực địa.
+
+Usage:
+------
+    python3 scripts/reanalyze_captures.py captures/ -o results.csv
+    python3 scripts/reanalyze_captures.py captures/ -o results.parquet --workers 8
+    python3 scripts/reanalyze_captures.py captures/ -o slope.csv --slope 3.2e-05 --sys-ratio 0.5
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+import argparse
+import csv
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.sensors.blood_pressure_sensor import OscillometricProcessor
+from src.sensors.max30102_sensor import HRCalculator
+from src.sensors.replay import load_trace, trace_times
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# ==================== CONSTANTS ====================
+
+TRACE_SUFFIXES = ('.npz', '.npy')
+LEGACY_PRESSURES = re.compile(r'^pressures_(?P<stamp>.+)\.npy$')
+
+KIND_BP = "bp"
+KIND_PPG = "ppg"
+
+COLUMNS = [
+    'file', 'kind', 'status', 'error',
+    'n_samples', 'duration_s', 'sample_rate',
+    'load_ms', 'analyze_ms',
+    # BP
+    'systolic', 'diastolic', 'map', 'bp_heart_rate', 'quality', 'confidence',
+    # PPG
+    'heart_rate', 'spo2', 'sqi', 'windows', 'hr_valid_windows', 'spo2_valid_windows',
+]
+
+logger = logging.getLogger("ReanalyzeCaptures")
+
+
+# ==================== CONFIG ====================
+
+def load_config(config_path: Path) -> Dict[str, Any]:
+    """Load application configuration"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def build_settings(config: Dict[str, Any], args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Settings gửi cho mỗi worker (dict thuần, pickle được)
+
+    Args:
+        config: app_config.yaml
+        args: CLI overrides (--sys-ratio, --dia-ratio, --offset, --slope; thiếu = không override)
+    """
+    sensors = config.get('sensors', {})
+    bp_config = sensors.get('blood_pressure', {})
+    ppg_config = sensors.get('max30102', {})
+
+    algorithm = dict(bp_config.get('algorithm', {}))
+    if getattr(args, 'sys_ratio', None) is not None:
+        algorithm['sys_ratio'] = args.sys_ratio
+    if getattr(args, 'dia_ratio', None) is not None:
+        algorithm['dia_ratio'] = args.dia_ratio
+
+    calibration = dict(bp_config.get('hx710b', {}).get('calibration', {}))
+    if getattr(args, 'offset', None) is not None:
+        calibration['offset_counts'] = args.offset
+    if getattr(args, 'slope', None) is not None:
+        calibration['slope_mmhg_per_count'] = args.slope
+
+    return {
+        'algorithm': algorithm,
+        'calibration': calibration,
+        'ppg_sample_rate': float(ppg_config.get('hardware_sample_rate', 100)),
+        'hr_algorithm_rate': int(ppg_config.get('hr_algorithm_rate', 50)),
+    }
+
+
+# ==================== DISCOVERY ====================
+
+def discover_captures(root: Path, pattern: str = "*") -> List[Dict[str, str]]:
+    """
+    Tìm capture trong thư mục (đệ quy)
+
+    Args:
+        root: Thư mục capture
+        pattern: Glob lọc tên file (ví dụ 'bp_*')
+
+    Returns:
+        list: Jobs {'path', 'timestamps'} sắp theo đường dẫn; timestamps chỉ có
+              với capture cũ pressures_<ts>.npy
+    """
+    jobs = []
+    for path in sorted(root.rglob(pattern)):
+        if not path.is_file() or path.suffix.lower() not in TRACE_SUFFIXES:
+            continue
+        if path.name.startswith('timestamps_') or path.name.startswith('metadata_'):
+            continue   # Đi kèm pressures_<ts>.npy
+
+        job = {'path': str(path), 'timestamps': ''}
+        legacy = LEGACY_PRESSURES.match(path.name)
+        if legacy:
+            partner = path.with_name(f"timestamps_{legacy.group('stamp')}.npy")
+            if partner.exists():
+                job['timestamps'] = str(partner)
+        jobs.append(job)
+    return jobs
+
+
+def load_capture(job: Dict[str, str]) -> Dict[str, np.ndarray]:
+    """
+    Load một capture (NPY memory-mapped)
+
+    Returns:
+        dict: Tên kênh → array
+
+    Raises:
+        ValueError: Định dạng / kênh không hỗ trợ
+    """
+    path = Path(job['path'])
+    if LEGACY_PRESSURES.match(path.name):
+        data = {'pressures': np.load(path, mmap_mode='r')}
+        if job.get('timestamps'):
+            data['timestamps'] = np.load(job['timestamps'], mmap_mode='r')
+        return data
+    return load_trace(path)
+
+
+def capture_kind(trace: Dict[str, np.ndarray]) -> Optional[str]:
+    if 'ir' in trace and 'red' in trace:
+        return KIND_PPG
+    if 'pressures' in trace or 'counts' in trace:
+        return KIND_BP
+    return None
+
+
+# ==================== ANALYSIS (WORKER) ====================
+
+_worker: Dict[str, Any] = {}
+
+
+def init_worker(settings: Dict[str, Any], log_level: int = logging.WARNING) -> None:
+    """
+    Khởi tạo mỗi worker process một lần: processor + filter design cache
+    dùng lại cho mọi capture của worker đó
+    """
+    logging.basicConfig(level=log_level, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    logging.getLogger().setLevel(log_level)
+    _worker['settings'] = settings
+    _worker['processor'] = OscillometricProcessor(settings['algorithm'], logging.getLogger("Reanalyze.BP"))
+
+
+def capture_pressures(
+    trace: Dict[str, np.ndarray],
+    calibration: Dict[str, Any],
+    default_rate: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (pressures mmHg, timestamps giây từ 0) của một capture BP
+
+    Args:
+        trace: Capture đã load
+        calibration: offset_counts/slope_mmhg_per_count/adc_inverted (trace counts)
+        default_rate: Sample rate khi capture không có timestamps/sample_rate
+    """
+    if 'pressures' in trace:
+        pressures = np.asarray(trace['pressures'], dtype=np.float64)
+    else:
+        offset = calibration.get('offset_counts', 0)
+        slope = calibration.get('slope_mmhg_per_count', 9.536743e-06)
+        counts = np.asarray(trace['counts'], dtype=np.float64)
+        if calibration.get('adc_inverted', False):
+            counts = -counts
+        pressures = (counts - offset) * slope
+    return pressures, trace_times(trace, pressures.size, default_rate)
+
+
+def analyze_bp(trace: Dict[str, np.ndarray], settings: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """OscillometricProcessor.process_deflate_data trên toàn bộ pha xả"""
+    processor: OscillometricProcessor = _worker['processor']
+    algorithm_rate = float(settings['algorithm'].get('sample_rate', 10.0))
+    pressures, timestamps = capture_pressures(trace, settings['calibration'], algorithm_rate)
+
+    row['n_samples'] = int(pressures.size)
+    row['duration_s'] = float(timestamps[-1]) if timestamps.size else 0.0
+    row['sample_rate'] = pressures.size / row['duration_s'] if row['duration_s'] > 0 else algorithm_rate
+
+    result = processor.process_deflate_data(pressures, timestamps)
+    if result is None:
+        row['status'] = "failed"
+        row['error'] = "process_deflate_data returned None"
+        return
+
+    row['systolic'] = round(result.systolic, 1)
+    row['diastolic'] = round(result.diastolic, 1)
+    row['map'] = round(result.map_value, 1)
+    row['bp_heart_rate'] = round(result.heart_rate, 1)
+    row['quality'] = result.quality
+    row['confidence'] = round(result.confidence, 3)
+
+
+def analyze_ppg(trace: Dict[str, np.ndarray], settings: Dict[str, Any], row: Dict[str, Any]) -> None:
+    """
+    HRCalculator.calc_hr_and_spo2 trên các cửa sổ liên tiếp (BUFFER_SIZE mẫu
+    sau decimate về hr_algorithm_rate, như window engine của MAX30102Sensor)
+    """
+    length = min(trace['ir'].size, trace['red'].size)
+    if 'sample_rate' in trace:
+        sample_rate = float(trace['sample_rate'])
+    elif 'timestamps' in trace and length > 1:
+        times = trace_times(trace, length, settings['ppg_sample_rate'])
+        sample_rate = (length - 1) / times[-1] if times[-1] > 0 else settings['ppg_sample_rate']
+    else:
+        sample_rate = settings['ppg_sample_rate']
+
+    target_rate = settings['hr_algorithm_rate']
+    stride = max(1, int(round(sample_rate / target_rate))) if sample_rate > target_rate else 1
+    algorithm_rate = int(round(sample_rate / stride))
+
+    # Stride view trên memmap: chỉ các mẫu được dùng mới được đọc
+    ir = trace['ir'][:length:stride]
+    red = trace['red'][:length:stride]
+
+    row['n_samples'] = int(length)
+    row['sample_rate'] = sample_rate
+    row['duration_s'] = length / sample_rate if sample_rate > 0 else 0.0
+
+    window = HRCalculator.BUFFER_SIZE
+    hr_values, spo2_values, sqi_values = [], [], []
+    windows = 0
+    for start in range(0, ir.size - window + 1, window):
+        hr, hr_valid, spo2, spo2_valid, sqi, _, _, _ = HRCalculator.calc_hr_and_spo2(
+            np.asarray(ir[start:start + window], dtype=np.float64),
+            np.asarray(red[start:start + window], dtype=np.float64),
+            algorithm_rate,
+        )
+        windows += 1
+        sqi_values.append(sqi)
+        if hr_valid:
+            hr_values.append(hr)
+        if spo2_valid:
+            spo2_values.append(spo2)
+
+    row['windows'] = windows
+    row['hr_valid_windows'] = len(hr_values)
+    row['spo2_valid_windows'] = len(spo2_values)
+    if not windows:
+        row['status'] = "failed"
+        row['error'] = f"need ≥{window} samples at {algorithm_rate} Hz"
+        return
+
+    row['sqi'] = round(float(np.mean(sqi_values)), 1)
+    if hr_values:
+        row['heart_rate'] = round(float(np.median(hr_values)), 1)
+    if spo2_values:
+        row['spo2'] = round(float(np.median(spo2_values)), 1)
+    if not hr_values and not spo2_values:
+        row['status'] = "failed"
+        row['error'] = "no valid HR/SpO2 window"
+
+
+def analyze_capture(job: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Phân tích một capture (chạy trong worker)
+
+    Returns:
+        dict: Một hàng kết quả (COLUMNS); lỗi được ghi vào 'status'/'error'
+              thay vì raise để một file hỏng không dừng cả batch
+    """
+    settings = _worker['settings']
+    row: Dict[str, Any] = dict.fromkeys(COLUMNS)
+    row['file'] = job['path']
+    row['status'] = "ok"
+
+    started = time.perf_counter()
+    try:
+        trace = load_capture(job)
+        kind = capture_kind(trace)
+        row['kind'] = kind
+        loaded = time.perf_counter()
+        row['load_ms'] = round((loaded - started) * 1000, 3)
+
+        if kind == KIND_BP:
+            analyze_bp(trace, settings, row)
+        elif kind == KIND_PPG:
+            analyze_ppg(trace, settings, row)
+        else:
+            row['status'] = "skipped"
+            row['error'] = f"unknown channels: {sorted(trace)}"
+        row['analyze_ms'] = round((time.perf_counter() - loaded) * 1000, 3)
+
+    except Exception as e:
+        row['status'] = "error"
+        row['error'] = f"{type(e).__name__}: {e}"
+        # Thời gian tới lúc lỗi (load lỗi → tính hết vào analyze_ms)
+        row['analyze_ms'] = round((time.perf_counter() - started) * 1000 - (row['load_ms'] or 0.0), 3)
+
+    return row
+
+
+# ==================== RUNNER ====================
+
+def run_batch(
+    jobs: List[Dict[str, str]],
+    settings: Dict[str, Any],
+    workers: int = 1,
+    log_level: int = logging.WARNING,
+) -> List[Dict[str, Any]]:
+    """
+    Chạy analyze_capture trên mọi job
+
+    Args:
+        jobs: Từ discover_captures()
+        settings: Từ build_settings()
+        workers: Số process (1 = chạy trong process hiện tại)
+
+    Returns:
+        list: Hàng kết quả theo thứ tự jobs
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        init_worker(settings, log_level)
+        return [analyze_capture(job) for job in jobs]
+
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(settings, log_level),
+    ) as executor:
+        return list(executor.map(analyze_capture, jobs, chunksize=chunksize))
+
+
+def write_results(rows: List[Dict[str, Any]], output: Path, columns: Optional[List[str]] = None) -> bool:
+    """
+    Ghi bảng kết quả: .parquet (pyarrow) hoặc CSV
+
+    Args:
+        rows: Các hàng (dict)
+        output: .parquet hoặc .csv
+        columns: Thứ tự cột (mặc định COLUMNS)
+
+    Returns:
+        bool: True nếu ghi thành công
+    """
+    columns = columns or COLUMNS
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    if output.suffix.lower() == '.parquet':
+        if pa is None:
+            logger.error("Parquet output requires pyarrow (pip install pyarrow); use a .csv output instead")
+            return False
+        table = pa.table({column: [row.get(column) for row in rows] for column in columns})
+        pq.write_table(table, output)
+        return True
+
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    return True
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Batch re-analysis of archived BP/PPG captures")
+    parser.add_argument('captures', type=Path, help="Capture directory (searched recursively)")
+    parser.add_argument('-o', '--output', type=Path, default=Path('reanalysis.csv'),
+                        help="Result table (.csv or .parquet)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (1 = in-process)")
+    parser.add_argument('--pattern', default="*", help="Filename glob (e.g. 'bp_*')")
+    parser.add_argument('--config', type=Path, default=project_root / 'config' / 'app_config.yaml')
+    parser.add_argument('--sys-ratio', type=float, default=None, help="Override algorithm sys_ratio")
+    parser.add_argument('--dia-ratio', type=float, default=None, help="Override algorithm dia_ratio")
+    parser.add_argument('--offset', type=float, default=None, help="Override HX710B offset_counts (counts traces)")
+    parser.add_argument('--slope', type=float, default=None, help="Override HX710B slope_mmhg_per_count")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log processor output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    log_level = logging.INFO if args.verbose else logging.WARNING
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    if not args.captures.is_dir():
+        logger.error(f"Capture directory not found: {args.captures}")
+        return 1
+
+    config = load_config(args.config) if args.config.exists() else {}
+    settings = build_settings(config, args)
+    jobs = discover_captures(args.captures, args.pattern)
+    if not jobs:
+        logger.error(f"No captures found in {args.captures}")
+        return 1
+
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"\n🔬 Re-analyzing {len(jobs)} captures with {workers} worker(s)...")
+
+    started = time.perf_counter()
+    rows = run_batch(jobs, settings, workers, log_level)
+    wall_s = time.perf_counter() - started
+
+    if not write_results(rows, args.output):
+        return 1
+
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+    cpu_s = sum((row['load_ms'] or 0.0) + (row['analyze_ms'] or 0.0) for row in rows) / 1000
+
+    print(f"✅ {args.output}: {len(rows)} rows {counts}")
+    print(f"   wall={wall_s:.2f}s, per-capture total={cpu_s:.2f}s ({cpu_s / wall_s if wall_s > 0 else 0:.1f}x)")
+    return 0 if counts.get('ok', 0) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
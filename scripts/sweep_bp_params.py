@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Sweep BP Params - Quét tham số OscillometricProcessor trên bộ capture có nhãn
+=============================================================================
+
+Calibration (tests/simple_slope_calibration.py, tests/calibrate_offset.py)
+và tham số thuật toán (bandpass_low/high, filter_order, sys_ratio/dia_ratio)
+đang chỉnh tay từng lần chạy. Script này đánh giá cả lưới (grid) hoặc random
+search các cấu hình trên bộ capture có giá trị tham chiếu (máy đo thương mại),
+song song trên mọi core, và xuất bảng sai số so với tham chiếu.
+
+Pipeline của process_deflate_data được tách theo tầng tham số, kết quả trung
+gian được cache theo prefix cấu hình:
+
+    calibration (offset/slope) → prepare_deflate (detrend)       [cache/capture]
+    filter (bandpass_low/high, filter_order) → bandpass + envelope
+        + EnvelopeAnalysis (crossings, local maxima, beats)        [1 lần/prefix]
+    ratio (sys_ratio/dia_ratio) → measure_from_envelope           [mỗi config]
+
+Mỗi task = (capture, prefix calibration+filter) → chạy mọi cặp ratio của
+prefix đó trên cùng envelope. Kết quả giống hệt process_deflate_data với
+cùng cấu hình. Tham số calibration chỉ ảnh hưởng capture dạng counts.
+
+Labels (CSV):
+------------
+    file,systolic,diastolic[,map]
+    pressures_20260110_081500.npy,121,79
+    field/bp_counts_03.npy,134,86,101
+
+`file` là tên file hoặc đường dẫn tương đối trong thư mục capture.
+
+Usage:
+------
+    # Grid: 3 × 3 × 2 = 18 cấu hình, 2 prefix filter
+    python3 scripts/sweep_bp_params.py captures/ --labels labels.csv \\
+        --param sys_ratio=0.5,0.55,0.6 --param dia_ratio=0.7,0.75,0.8 \\
+        --param bandpass_low=0.3,0.5 -o sweep.csv --details sweep_details.csv
+
+    # Random search 200 cấu hình (lo:hi = uniform)
+    python3 scripts/sweep_bp_params.py captures/ --labels labels.csv --random 200 \\
+        --param sys_ratio=0.4:0.7 --param dia_ratio=0.6:0.9 --param filter_order=2,3,4
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+import argparse
+import csv
+import itertools
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from scripts.reanalyze_captures import (
+    build_settings,
+    capture_pressures,
+    discover_captures,
+    load_capture,
+    load_config,
+    write_results,
+)
+from src.sensors.blood_pressure_sensor import OscillometricProcessor
+
+
+# ==================== CONSTANTS ====================
+
+CALIBRATION_PARAMS = ('offset_counts', 'slope_mmhg_per_count')
+FILTER_PARAMS = ('bandpass_low', 'bandpass_high', 'filter_order')
+RATIO_PARAMS = ('sys_ratio', 'dia_ratio')
+SWEEP_PARAMS = CALIBRATION_PARAMS + FILTER_PARAMS + RATIO_PARAMS
+INT_PARAMS = ('filter_order',)
+
+# AAMI/ISO 81060-2: mean error ≤ 5 mmHg, SD ≤ 8 mmHg
+AAMI_MAX_MEAN_ERROR = 5.0
+AAMI_MAX_SD = 8.0
+
+MIN_DATA_POINTS = 50          # Như process_deflate_data
+CAPTURE_CACHE_SIZE = 16       # Capture đã detrend giữ trong mỗi worker
+
+SUMMARY_COLUMNS = ['config_id', *SWEEP_PARAMS, 'captures', 'failed',
+                   'sys_me', 'sys_sd', 'sys_mae', 'dia_me', 'dia_sd', 'dia_mae', 'map_mae', 'aami_pass']
+DETAIL_COLUMNS = ['config_id', 'file', 'status', 'error',
+                  'systolic', 'diastolic', 'map', 'ref_systolic', 'ref_diastolic', 'ref_map',
+                  'sys_error', 'dia_error', 'map_error', 'filter_ms', 'measure_ms']
+
+ParamSpace = Dict[str, Union[List[float], Tuple[float, float]]]
+
+logger = logging.getLogger("SweepBPParams")
+
+
+# ==================== SEARCH SPACE ====================
+
+def parse_param(spec: str) -> Tuple[str, Union[List[float], Tuple[float, float]]]:
+    """
+    'name=v1,v2,...' (danh sách) hoặc 'name=lo:hi' (khoảng, chỉ random search)
+
+    Raises:
+        ValueError: Tên tham số / giá trị không hợp lệ
+    """
+    name, _, values = spec.partition('=')
+    name = name.strip()
+    if name not in SWEEP_PARAMS or not values:
+        raise ValueError(f"Invalid --param '{spec}' (expected one of {', '.join(SWEEP_PARAMS)})")
+
+    cast = int if name in INT_PARAMS else float
+    if ':' in values:
+        low, high = (cast(v) for v in values.split(':', 1))
+        return name, (min(low, high), max(low, high))
+    return name, [cast(v) for v in values.split(',') if v.strip()]
+
+
+def base_config(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Giá trị hiện tại (app_config) cho tham số không quét"""
+    algorithm = settings['algorithm']
+    calibration = settings['calibration']
+    return {
+        'offset_counts': calibration.get('offset_counts', 0),
+        'slope_mmhg_per_count': calibration.get('slope_mmhg_per_count', 9.536743e-06),
+        'bandpass_low': algorithm.get('bandpass_low', 0.5),
+        'bandpass_high': algorithm.get('bandpass_high', 5.0),
+        'filter_order': algorithm.get('filter_order', 4),
+        'sys_ratio': algorithm.get('sys_ratio', 0.55),
+        'dia_ratio': algorithm.get('dia_ratio', 0.80),
+    }
+
+
+def grid_configs(space: ParamSpace, base: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Tích Descartes của các danh sách giá trị
+
+    Raises:
+        ValueError: Có tham số dạng khoảng lo:hi (dùng --random)
+    """
+    ranged = [name for name, values in space.items() if isinstance(values, tuple)]
+    if ranged:
+        raise ValueError(f"Range parameters need --random: {', '.join(ranged)}")
+
+    names = list(space)
+    configs = []
+    for values in itertools.product(*(space[name] for name in names)):
+        config = dict(base)
+        config.update(zip(names, values))
+        configs.append(config)
+    return configs
+
+
+def random_configs(space: ParamSpace, base: Dict[str, Any], count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Random search: danh sách → chọn ngẫu nhiên, khoảng → uniform
+
+    Giá trị float làm tròn 6 chữ số có nghĩa (bảng dễ đọc, prefix lặp lại
+    được cache). Cấu hình trùng bị bỏ.
+    """
+    rng = np.random.default_rng(seed)
+    configs, seen = [], set()
+    for _ in range(count):
+        config = dict(base)
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                if name in INT_PARAMS:
+                    config[name] = int(rng.integers(values[0], values[1] + 1))
+                else:
+                    config[name] = float(f"{rng.uniform(*values):.6g}")
+            else:
+                config[name] = values[int(rng.integers(len(values)))]
+        key = tuple(config[name] for name in SWEEP_PARAMS)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def config_prefix(config: Dict[str, Any]) -> Tuple:
+    """Tham số trước tầng ratio: cùng prefix → dùng chung detrend + envelope"""
+    return tuple(config[name] for name in CALIBRATION_PARAMS + FILTER_PARAMS)
+
+
+# ==================== LABELS ====================
+
+def load_labels(path: Path) -> Dict[str, Dict[str, float]]:
+    """
+    Labels CSV → {file: {'systolic', 'diastolic'[, 'map']}}
+
+    Hàng thiếu SYS/DIA bị bỏ qua (log warning).
+    """
+    labels = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                label = {'systolic': float(row['systolic']), 'diastolic': float(row['diastolic'])}
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping label row without systolic/diastolic: {row}")
+                continue
+            if row.get('map'):
+                label['map'] = float(row['map'])
+            labels[row['file'].strip()] = label
+    return labels
+
+
+def match_labels(
+    jobs: List[Dict[str, str]],
+    labels: Dict[str, Dict[str, float]],
+    root: Path,
+) -> List[Tuple[Dict[str, str], Dict[str, float]]]:
+    """Ghép capture với label theo đường dẫn tương đối rồi tới tên file"""
+    matched = []
+    for job in jobs:
+        path = Path(job['path'])
+        label = labels.get(path.relative_to(root).as_posix()) or labels.get(path.name)
+        if label is not None:
+            matched.append((job, label))
+    return matched
+
+
+# ==================== EVALUATION (WORKER) ====================
+
+_worker: Dict[str, Any] = {}
+
+
+def init_worker(settings: Dict[str, Any], log_level: int = logging.ERROR) -> None:
+    """
+    Khởi tạo worker: processor log rất nhiều (fallback levels) → chỉ ERROR
+    trừ khi --verbose
+    """
+    logging.basicConfig(level=log_level, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    logging.getLogger().setLevel(log_level)
+    _worker['settings'] = settings
+    _worker['logger'] = logging.getLogger("Sweep.BP")
+    _worker['captures'] = OrderedDict()
+
+
+def prepared_capture(job: Dict[str, str], calibration_values: Tuple) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """
+    (pressures, timestamps, detrended, sample_rate) - LRU cache theo
+    (capture, offset, slope)
+    """
+    cache: OrderedDict = _worker['captures']
+    key = (job['path'], calibration_values)
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    settings = _worker['settings']
+    calibration = dict(settings['calibration'])
+    calibration.update(zip(CALIBRATION_PARAMS, calibration_values))
+    default_rate = float(settings['algorithm'].get('sample_rate', 10.0))
+
+    pressures, timestamps = capture_pressures(load_capture(job), calibration, default_rate)
+    if pressures.size < MIN_DATA_POINTS:
+        raise ValueError(f"Insufficient data points: {pressures.size} (need ≥{MIN_DATA_POINTS})")
+
+    processor = OscillometricProcessor(settings['algorithm'], _worker['logger'])
+    pressures_arr, timestamps_arr, detrended = processor.prepare_deflate(pressures, timestamps)
+    entry = (pressures_arr, timestamps_arr, detrended, processor.sample_rate)
+
+    cache[key] = entry
+    if len(cache) > CAPTURE_CACHE_SIZE:
+        cache.popitem(last=False)
+    return entry
+
+
+def _error(measured: Optional[float], reference: Optional[float]) -> Optional[float]:
+    if measured is None or reference is None:
+        return None
+    return round(float(measured) - reference, 2)
+
+
+def evaluate_prefix(task: Tuple) -> List[Dict[str, Any]]:
+    """
+    Một capture × một prefix: bandpass + envelope một lần, rồi mọi cặp ratio
+
+    Args:
+        task: (job, label, prefix, [(config_id, sys_ratio, dia_ratio), ...])
+
+    Returns:
+        list: Hàng chi tiết (DETAIL_COLUMNS) cho từng config
+    """
+    job, label, prefix, ratio_configs = task
+    settings = _worker['settings']
+    rows = []
+
+    def row_for(config_id: int) -> Dict[str, Any]:
+        row: Dict[str, Any] = dict.fromkeys(DETAIL_COLUMNS)
+        row.update(config_id=config_id, file=job['path'], status="ok",
+                   ref_systolic=label['systolic'], ref_diastolic=label['diastolic'], ref_map=label.get('map'))
+        return row
+
+    started = time.perf_counter()
+    try:
+        pressures_arr, timestamps_arr, detrended, sample_rate = prepared_capture(job, prefix[:len(CALIBRATION_PARAMS)])
+
+        algorithm = dict(settings['algorithm'])
+        algorithm.update(zip(FILTER_PARAMS, prefix[len(CALIBRATION_PARAMS):]))
+        processor = OscillometricProcessor(algorithm, _worker['logger'])
+        processor.sample_rate = sample_rate
+        oscillations = processor._bandpass_filter(detrended)
+        envelope = processor._extract_envelope(oscillations)
+        analysis = processor.analyze_envelope(oscillations, envelope, timestamps_arr)
+    except Exception as e:
+        for config_id, _, _ in ratio_configs:
+            row = row_for(config_id)
+            row.update(status="error", error=f"{type(e).__name__}: {e}")
+            rows.append(row)
+        return rows
+
+    # Thời gian tầng prefix chia đều cho các config dùng chung
+    filter_ms = (time.perf_counter() - started) * 1000 / len(ratio_configs)
+
+    for config_id, sys_ratio, dia_ratio in ratio_configs:
+        row = row_for(config_id)
+        row['filter_ms'] = round(filter_ms, 3)
+        measure_started = time.perf_counter()
+        try:
+            processor.sys_ratio = sys_ratio
+            processor.dia_ratio = dia_ratio
+            result = processor.measure_from_envelope(pressures_arr, timestamps_arr, oscillations, envelope, analysis)
+        except Exception as e:
+            result = None
+            row['error'] = f"{type(e).__name__}: {e}"
+        row['measure_ms'] = round((time.perf_counter() - measure_started) * 1000, 3)
+
+        if result is None:
+            row['status'] = "failed" if row['error'] is None else "error"
+        else:
+            row['systolic'] = round(float(result.systolic), 1)
+            row['diastolic'] = round(float(result.diastolic), 1)
+            row['map'] = round(float(result.map_value), 1)
+            row['sys_error'] = _error(row['systolic'], label['systolic'])
+            row['dia_error'] = _error(row['diastolic'], label['diastolic'])
+            row['map_error'] = _error(row['map'], label.get('map'))
+        rows.append(row)
+
+    return rows
+
+
+# ==================== RUNNER ====================
+
+def build_tasks(
+    labelled: List[Tuple[Dict[str, str], Dict[str, float]]],
+    configs: List[Dict[str, Any]],
+) -> List[Tuple]:
+    """
+    Tasks theo thứ tự capture → prefix: các task liền nhau của một chunk
+    dùng lại capture đã detrend trong cache của worker
+    """
+    prefixes: Dict[Tuple, List[Tuple[int, float, float]]] = OrderedDict()
+    for config_id, config in enumerate(configs):
+        prefixes.setdefault(config_prefix(config), []).append(
+            (config_id, config['sys_ratio'], config['dia_ratio'])
+        )
+
+    return [
+        (job, label, prefix, ratio_configs)
+        for job, label in labelled
+        for prefix, ratio_configs in prefixes.items()
+    ]
+
+
+def run_sweep(
+    labelled: List[Tuple[Dict[str, str], Dict[str, float]]],
+    configs: List[Dict[str, Any]],
+    settings: Dict[str, Any],
+    workers: int = 1,
+    log_level: int = logging.ERROR,
+) -> List[Dict[str, Any]]:
+    """
+    Đánh giá mọi config trên mọi capture có nhãn
+
+    Returns:
+        list: Hàng chi tiết (capture × config)
+    """
+    tasks = build_tasks(labelled, configs)
+    if workers <= 1 or len(tasks) <= 1:
+        init_worker(settings, log_level)
+        return [row for task in tasks for row in evaluate_prefix(task)]
+
+    per_capture = max(1, len(tasks) // max(1, len(labelled)))
+    chunksize = max(1, min(per_capture, len(tasks) // (workers * 2)))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(settings, log_level),
+    ) as executor:
+        return [row for rows in executor.map(evaluate_prefix, tasks, chunksize=chunksize) for row in rows]
+
+
+def summarize(details: List[Dict[str, Any]], configs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Bảng sai số theo config (ME, SD, MAE cho SYS/DIA, MAE cho MAP, AAMI),
+    sắp theo số capture lỗi rồi SYS MAE + DIA MAE
+    """
+    by_config: Dict[int, List[Dict[str, Any]]] = {}
+    for row in details:
+        by_config.setdefault(row['config_id'], []).append(row)
+
+    def stats(errors: List[float]) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        if not errors:
+            return None, None, None
+        arr = np.asarray(errors, dtype=np.float64)
+        return round(float(arr.mean()), 2), round(float(arr.std()), 2), round(float(np.abs(arr).mean()), 2)
+
+    summary = []
+    for config_id, config in enumerate(configs):
+        rows = by_config.get(config_id, [])
+        ok = [row for row in rows if row['status'] == "ok"]
+        sys_me, sys_sd, sys_mae = stats([row['sys_error'] for row in ok])
+        dia_me, dia_sd, dia_mae = stats([row['dia_error'] for row in ok])
+        _, _, map_mae = stats([row['map_error'] for row in ok if row['map_error'] is not None])
+
+        aami_pass = (
+            bool(ok) and len(ok) == len(rows)
+            and abs(sys_me) <= AAMI_MAX_MEAN_ERROR and sys_sd <= AAMI_MAX_SD
+            and abs(dia_me) <= AAMI_MAX_MEAN_ERROR and dia_sd <= AAMI_MAX_SD
+        )
+        entry = {'config_id': config_id, **{name: config[name] for name in SWEEP_PARAMS}}
+        entry.update(
+            captures=len(rows), failed=len(rows) - len(ok),
+            sys_me=sys_me, sys_sd=sys_sd, sys_mae=sys_mae,
+            dia_me=dia_me, dia_sd=dia_sd, dia_mae=dia_mae,
+            map_mae=map_mae, aami_pass=aami_pass,
+        )
+        summary.append(entry)
+
+    summary.sort(key=lambda row: (
+        row['failed'],
+        (row['sys_mae'] if row['sys_mae'] is not None else float('inf'))
+        + (row['dia_mae'] if row['dia_mae'] is not None else float('inf')),
+    ))
+    return summary
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Parallel BP calibration / processor parameter sweep")
+    parser.add_argument('captures', type=Path, help="Capture directory (searched recursively)")
+    parser.add_argument('--labels', type=Path, required=True, help="CSV: file,systolic,diastolic[,map]")
+    parser.add_argument('--param', action='append', default=[], metavar="NAME=V1,V2|LO:HI",
+                        help=f"Sweep parameter ({', '.join(SWEEP_PARAMS)}); repeatable")
+    parser.add_argument('--random', type=int, default=0, metavar="N", help="Random search with N configs")
+    parser.add_argument('--seed', type=int, default=0, help="Random search seed")
+    parser.add_argument('-o', '--output', type=Path, default=Path('sweep.csv'),
+                        help="Summary table (.csv or .parquet)")
+    parser.add_argument('--details', type=Path, default=None, help="Per-capture table (.csv or .parquet)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (1 = in-process)")
+    parser.add_argument('--pattern', default="*", help="Filename glob (e.g. 'bp_*')")
+    parser.add_argument('--config', type=Path, default=project_root / 'config' / 'app_config.yaml')
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log processor output")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    log_level = logging.INFO if args.verbose else logging.ERROR
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    if not args.captures.is_dir():
+        logger.error(f"Capture directory not found: {args.captures}")
+        return 1
+
+    config = load_config(args.config) if args.config.exists() else {}
+    settings = build_settings(config, args)
+    base = base_config(settings)
+
+    try:
+        space: ParamSpace = dict(parse_param(spec) for spec in args.param)
+        if args.random > 0:
+            configs = random_configs(space, base, args.random, args.seed)
+        else:
+            configs = grid_configs(space, base)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+
+    labels = load_labels(args.labels)
+    labelled = match_labels(discover_captures(args.captures, args.pattern), labels, args.captures)
+    if not labelled:
+        logger.error(f"No labelled captures in {args.captures} (labels: {len(labels)})")
+        return 1
+
+    prefixes = len({config_prefix(config) for config in configs})
+    workers = max(1, args.workers)
+    print(f"\n🔧 Sweeping {len(configs)} configs ({prefixes} filter/calibration prefixes) "
+          f"over {len(labelled)} labelled captures with {workers} worker(s)...")
+
+    started = time.perf_counter()
+    details = run_sweep(labelled, configs, settings, workers, log_level)
+    summary = summarize(details, configs)
+    wall_s = time.perf_counter() - started
+
+    if not write_results(summary, args.output, SUMMARY_COLUMNS):
+        return 1
+    if args.details and not write_results(details, args.details, DETAIL_COLUMNS):
+        return 1
+
+    print(f"✅ {args.output}: {len(details)} evaluations in {wall_s:.2f}s")
+    for row in summary[:5]:
+        params = ", ".join(f"{name}={row[name]}" for name in space) or "current config"
+        print(f"   #{row['config_id']}: SYS MAE={row['sys_mae']} DIA MAE={row['dia_mae']} "
+              f"failed={row['failed']} aami={'✓' if row['aami_pass'] else '✗'} ({params})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
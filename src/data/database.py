@@ -7,16 +7,22 @@ from typing import Dict, Any, Optional, List, Tuple
 import logging
 import sqlite3
 import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
-from sqlalchemy import create_engine, MetaData, desc, and_, or_
+from sqlalchemy import and_
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timedelta
 import os
 import json
 
+import numpy as np
+
 from .models import Base, Patient, HealthRecord, Alert, PatientThreshold, SensorCalibration, SystemLog, Device, DeviceOwnership, SyncQueue
 from .database_extensions import DatabaseManagerExtensions
+from .storage_profile import resolve_storage_profile, create_sqlite_engine, read_pragmas, WalCheckpointer, CHECKPOINT_MODES
+from .write_behind import WriteBehindWriter
+from .readers import HealthDataReader, VITAL_COLUMNS, STATISTIC_VITALS
 
 
 class DatabaseManager(DatabaseManagerExtensions):
@@ -28,6 +34,9 @@ class DatabaseManager(DatabaseManagerExtensions):
         db_path (str): Path to SQLite database file
         engine: SQLAlchemy engine
         SessionLocal: SQLAlchemy session factory
+        reader: HealthDataReader (Core-SQL read path cho history / alerts)
+        storage_profile (Dict): Effective SQLite PRAGMA profile (database.storage)
+        write_behind: WriteBehindWriter cho health record / alert (database.write_behind)
         cloud_sync_manager: Cloud sync manager instance (optional)
         logger (logging.Logger): Logger instance
     """
@@ -56,26 +65,66 @@ class DatabaseManager(DatabaseManagerExtensions):
             os.makedirs(db_dir)
             self.logger.info(f"Created database directory: {db_dir}")
         
-        # Create SQLAlchemy engine
-        db_url = f"sqlite:///{self.db_path}"
-        self.engine = create_engine(
-            db_url,
-            echo=False,  # Set True for SQL debugging
-            pool_pre_ping=True,  # Verify connections
-            connect_args={
-                'check_same_thread': False,  # Allow multi-threading
-                'timeout': 30  # Increase timeout to 30 seconds
-            }
-        )
+        # SQLite storage profile (WAL, synchronous, cache/mmap, busy_timeout)
+        self.storage_profile = resolve_storage_profile(self.config.get('storage', {}), self.logger)
+        self.wal_checkpointer = None
+        self._checkpoint_stats = {'count': 0, 'last_time': None, 'last_result': None}
+        
+        # Write-behind writer + cloud push executor (started in initialize())
+        self.write_behind = None
+        self._sync_executor = None
+        
+        # Create SQLAlchemy engine + session factory
+        self._create_engine()
         
-        # Create session factory
+        self.logger.info(f"DatabaseManager initialized: {self.db_path} "
+                         f"(storage profile: {self.storage_profile['profile']}, "
+                         f"journal: {self.storage_profile['journal_mode']})")
+    
+    def _create_engine(self):
+        """
+        Create SQLAlchemy engine và session factory với storage profile
+        (dùng chung cho __init__, backup_database, restore_database)
+        """
+        self.engine = create_sqlite_engine(self.db_path, self.storage_profile)
         self.SessionLocal = sessionmaker(
             autocommit=False,
             autoflush=False,
             bind=self.engine
         )
+        self.reader = HealthDataReader(self.engine)
+    
+    def checkpoint_wal(self, mode: str = 'PASSIVE') -> Optional[Dict[str, int]]:
+        """
+        Checkpoint WAL vào file database chính
         
-        self.logger.info(f"DatabaseManager initialized: {self.db_path}")
+        Args:
+            mode: PASSIVE (không chờ reader/writer) | FULL | RESTART | TRUNCATE
+            
+        Returns:
+            Dict {'busy', 'log_frames', 'checkpointed_frames'} hoặc None
+            (không ở WAL mode hoặc lỗi)
+        """
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            self.logger.error(f"Invalid checkpoint mode: {mode}")
+            return None
+        if self.storage_profile['journal_mode'] != 'wal':
+            return None
+        
+        try:
+            with self.engine.connect() as conn:
+                busy, log_frames, checkpointed = conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            
+            result = {'busy': int(busy), 'log_frames': int(log_frames), 'checkpointed_frames': int(checkpointed)}
+            self._checkpoint_stats['count'] += 1
+            self._checkpoint_stats['last_time'] = datetime.now().isoformat()
+            self._checkpoint_stats['last_result'] = result
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Error checkpointing WAL: {e}")
+            return None
     
     def initialize(self) -> bool:
         """
@@ -90,6 +139,18 @@ class DatabaseManager(DatabaseManagerExtensions):
             Base.metadata.create_all(bind=self.engine)
             self.logger.info("Database tables created successfully")
             
+            # create_all không thêm index mới vào bảng đã tồn tại (database cũ)
+            self._ensure_indexes()
+            
+            # Periodic WAL checkpoint (PASSIVE, không chặn reader/writer)
+            interval = self.storage_profile['checkpoint_interval_s']
+            if self.storage_profile['journal_mode'] == 'wal' and interval and not self.wal_checkpointer:
+                self.wal_checkpointer = WalCheckpointer(self.checkpoint_wal, interval)
+                self.wal_checkpointer.start()
+            
+            # Write-behind writer: group commit cho save_health_record / save_alert
+            self._start_write_behind()
+            
             # Verify tables exist (SQLAlchemy 2.0 compatible)
             from sqlalchemy import inspect
             inspector = inspect(self.engine)
@@ -105,6 +166,38 @@ class DatabaseManager(DatabaseManagerExtensions):
             self.logger.error(f"Database initialization failed: {e}", exc_info=True)
             return False
     
+    def _ensure_indexes(self):
+        """
+        Tạo các index khai báo trong models còn thiếu (ví dụ composite index
+        (device_id, timestamp) trên database tạo trước khi có index đó).
+        Index cũ bị thay thế được xóa bởi scripts/migrate_sqlite_history_indexes.py
+        """
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(bind=self.engine, checkfirst=True)
+                except SQLAlchemyError as e:
+                    self.logger.warning(f"Could not create index {index.name}: {e}")
+    
+    def _start_write_behind(self):
+        """
+        Start write-behind writer thread và executor cho cloud push
+        """
+        wb_config = self.config.get('write_behind', {})
+        if not wb_config.get('enabled', True) or self.write_behind:
+            return
+        
+        self._sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CloudPush")
+        self.write_behind = WriteBehindWriter(
+            self._commit_records,
+            on_committed=self._on_records_committed,
+            max_queue=wb_config.get('max_queue', 256),
+            max_batch=wb_config.get('max_batch', 64),
+            linger_ms=wb_config.get('linger_ms', 0),
+            enqueue_timeout_s=wb_config.get('enqueue_timeout_s', 1.0)
+        )
+        self.write_behind.start()
+    
     def _initialize_cloud_sync(self):
         """
         Initialize cloud sync manager if enabled in config
@@ -148,6 +241,14 @@ class DatabaseManager(DatabaseManagerExtensions):
         Close database connections and cloud sync
         """
         try:
+            # Commit hết write-behind queue, chờ các cloud push đang chờ
+            if self.write_behind:
+                self.write_behind.stop()
+                self.write_behind = None
+            if self._sync_executor:
+                self._sync_executor.shutdown(wait=True)
+                self._sync_executor = None
+            
             # Stop sync scheduler
             if self.sync_scheduler:
                 self.sync_scheduler.stop()
@@ -156,6 +257,11 @@ class DatabaseManager(DatabaseManagerExtensions):
             if self.cloud_sync_manager:
                 self.cloud_sync_manager.disconnect_from_cloud()
             
+            # Stop WAL checkpointer (connection cuối đóng sẽ checkpoint và xóa -wal)
+            if self.wal_checkpointer:
+                self.wal_checkpointer.stop()
+                self.wal_checkpointer = None
+            
             if self.engine:
                 self.engine.dispose()
                 self.logger.info("Database connections closed")
@@ -342,55 +448,173 @@ class DatabaseManager(DatabaseManagerExtensions):
         """
         Save health measurement record
         
+        Khi write-behind đang chạy: record được group commit trên writer thread,
+        hàm chờ ID; cloud sync chạy bất đồng bộ. Caller trên UI thread nên dùng
+        submit_health_record() để không phải chờ.
+        
         Args:
             health_data: Health measurement data
             
         Returns:
             Record ID if successful, None if error
         """
-        try:
-            # Validate data first
-            if not self._validate_health_data(health_data):
-                self.logger.warning("Invalid health data, skipping save")
-                return None
+        return self._save_sync('health_record', health_data)
+    
+    def submit_health_record(self, health_data: Dict[str, Any]) -> Future:
+        """
+        Queue health record cho write-behind writer (không chờ commit)
+        
+        Args:
+            health_data: Health measurement data (như save_health_record)
+            
+        Returns:
+            Future resolve bằng record ID (None nếu lỗi)
+        """
+        return self._submit('health_record', health_data)
+    
+    def _save_sync(self, kind: str, data: Dict[str, Any]) -> Optional[int]:
+        """Ghi qua writer (chờ ID) hoặc trực tiếp nếu writer không chạy / đang ở writer thread"""
+        # Validate data first
+        if kind == 'health_record' and not self._validate_health_data(data):
+            self.logger.warning("Invalid health data, skipping save")
+            return None
+        
+        if self.write_behind and self.write_behind.is_running and not self.write_behind.on_writer_thread():
+            return self._submit(kind, data).result()
+        
+        record_id = self._commit_records([(kind, data)])[0]
+        if record_id is not None:
+            self._push_committed(kind, [record_id])
+        return record_id
+    
+    def _submit(self, kind: str, data: Dict[str, Any]) -> Future:
+        """Validate trên thread của caller rồi đưa vào write-behind queue"""
+        if kind == 'health_record' and not self._validate_health_data(data):
+            self.logger.warning("Invalid health data, skipping save")
+            future = Future()
+            future.set_result(None)
+            return future
+        
+        if self.write_behind:
+            return self.write_behind.submit(kind, data)
+        
+        future = Future()
+        future.set_result(self._save_sync(kind, data))
+        return future
+    
+    def _build_record(self, kind: str, data: Dict[str, Any]):
+        """Tạo HealthRecord / Alert ORM object từ dict"""
+        if kind == 'health_record':
+            return HealthRecord(
+                patient_id=data['patient_id'],
+                device_id=data.get('device_id'),  # REQUIRED after migration
+                timestamp=data.get('timestamp', datetime.utcnow()),
+                heart_rate=data.get('heart_rate'),
+                spo2=data.get('spo2'),
+                temperature=data.get('temperature'),
+                systolic_bp=data.get('systolic_bp'),
+                diastolic_bp=data.get('diastolic_bp'),
+                mean_arterial_pressure=data.get('mean_arterial_pressure'),
+                sensor_data=data.get('sensor_data'),
+                data_quality=data.get('data_quality', 1.0),
+                measurement_context=data.get('measurement_context', 'rest')
+            )
+        
+        return Alert(
+            patient_id=data['patient_id'],
+            device_id=data.get('device_id'),  # REQUIRED after migration
+            health_record_id=data.get('health_record_id'),  # Link to health record
+            alert_type=data['alert_type'],
+            severity=data['severity'],
+            message=data['message'],
+            vital_sign=data.get('vital_sign'),
+            current_value=data.get('current_value'),
+            threshold_value=data.get('threshold_value'),
+            timestamp=data.get('timestamp', datetime.utcnow())
+        )
+    
+    def _commit_records(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Optional[int]]:
+        """
+        Ghi nhiều health record / alert trong một transaction (group commit)
+        
+        Nếu transaction chung lỗi (một record hỏng), ghi lại từng record riêng
+        để các record hợp lệ khác không bị mất.
+        
+        Args:
+            items: List (kind, data)
             
+        Returns:
+            List ID theo thứ tự items (None nếu record đó lỗi)
+        """
+        try:
             with self.get_session() as session:
-                record = HealthRecord(
-                    patient_id=health_data['patient_id'],
-                    device_id=health_data.get('device_id'),  # REQUIRED after migration
-                    timestamp=health_data.get('timestamp', datetime.utcnow()),
-                    heart_rate=health_data.get('heart_rate'),
-                    spo2=health_data.get('spo2'),
-                    temperature=health_data.get('temperature'),
-                    systolic_bp=health_data.get('systolic_bp'),
-                    diastolic_bp=health_data.get('diastolic_bp'),
-                    mean_arterial_pressure=health_data.get('mean_arterial_pressure'),
-                    sensor_data=health_data.get('sensor_data'),
-                    data_quality=health_data.get('data_quality', 1.0),
-                    measurement_context=health_data.get('measurement_context', 'rest')
-                )
-                
-                session.add(record)
+                records = [self._build_record(kind, data) for kind, data in items]
+                session.add_all(records)
                 session.flush()
+                ids = [record.id for record in records]
                 
-                record_id = record.id
-                
-                # Log message handle NULL patient_id (device-centric approach)
-                patient_info = health_data.get('patient_id') or 'unassigned (device-centric)'
-                self.logger.info(f"Saved health record ID={record_id} for patient {patient_info}")
+                for (kind, data), record in zip(items, records):
+                    self._log_saved(kind, data, record)
+            
+            return ids
+            
+        except Exception as e:
+            if len(items) == 1:
+                kind = items[0][0]
+                self.logger.error(f"Error saving {'alert' if kind == 'alert' else 'health record'}: {e}",
+                                  exc_info=kind != 'alert')
+                return [None]
             
-            # Trigger cloud sync AFTER transaction commits (outside context manager)
-            if self.cloud_sync_manager and self.cloud_sync_manager.sync_config.get('sync_health_records', True):
+            self.logger.warning(f"Group commit of {len(items)} records failed ({e}) - retrying one by one")
+            return [self._commit_records([item])[0] for item in items]
+    
+    def _log_saved(self, kind: str, data: Dict[str, Any], record):
+        if kind == 'alert':
+            self.logger.warning(f"Saved alert ID={record.id}: {record.severity} - {record.message}")
+        else:
+            # Log message handle NULL patient_id (device-centric approach)
+            patient_info = data.get('patient_id') or 'unassigned (device-centric)'
+            self.logger.info(f"Saved health record ID={record.id} for patient {patient_info}")
+    
+    def _on_records_committed(self, items: List[Tuple[str, Dict[str, Any]]], ids: List[Optional[int]]):
+        """Writer thread: chuyển cloud sync sang sync executor (không chờ network)"""
+        for kind in ('health_record', 'alert'):
+            kind_ids = [record_id for (item_kind, _), record_id in zip(items, ids)
+                        if item_kind == kind and record_id is not None]
+            if kind_ids:
+                self._push_committed(kind, kind_ids)
+    
+    def _push_committed(self, kind: str, ids: List[int]):
+        """Trigger cloud sync AFTER transaction commits (async khi có sync executor)"""
+        if not self.cloud_sync_manager:
+            return
+        
+        sync_key = 'sync_alerts' if kind == 'alert' else 'sync_health_records'
+        if not self.cloud_sync_manager.sync_config.get(sync_key, True):
+            return
+        
+        if self._sync_executor:
+            try:
+                self._sync_executor.submit(self._push_to_cloud, kind, ids)
+                return
+            except RuntimeError:
+                pass  # Executor đã shutdown - push trực tiếp
+        self._push_to_cloud(kind, ids)
+    
+    def _push_to_cloud(self, kind: str, ids: List[int]):
+        for record_id in ids:
+            if kind == 'alert':
+                try:
+                    self.logger.info(f"[PUSH_ALERT_CALL] About to push alert {record_id} to cloud")
+                    result = self.cloud_sync_manager.push_alert(record_id)
+                    self.logger.info(f"[PUSH_ALERT_RESULT] Alert {record_id} push result: {result}")
+                except Exception as sync_error:
+                    self.logger.error(f"[PUSH_ALERT_ERROR] Cloud sync failed for alert {record_id}: {sync_error}", exc_info=True)
+            else:
                 try:
                     self.cloud_sync_manager.push_health_record(record_id)
                 except Exception as sync_error:
                     self.logger.warning(f"Cloud sync failed for record {record_id}: {sync_error}")
-            
-            return record_id
-                
-        except Exception as e:
-            self.logger.error(f"Error saving health record: {e}", exc_info=True)
-            return None
     
     def get_health_records(self, patient_id: str = None, device_id: str = None, 
                           start_time: Optional[datetime] = None,
@@ -411,78 +635,45 @@ class DatabaseManager(DatabaseManagerExtensions):
             List of health records
         """
         try:
-            with self.get_session() as session:
-                query = session.query(HealthRecord)
-                
-                # Device-centric FIXED: Always use device_id if available (local records priority)
-                # Query: (device_id = X) OR (patient_id = Y AND device_id IS NULL) for cloud-synced records
-                if device_id:
-                    if patient_id:
-                        # Query both: device_id matches OR (patient_id matches for cloud-synced records)
-                        from sqlalchemy import or_, and_
-                        query = query.filter(
-                            or_(
-                                HealthRecord.device_id == device_id,
-                                and_(
-                                    HealthRecord.patient_id == patient_id,
-                                    HealthRecord.device_id == device_id  # Same device
-                                )
-                            )
-                        )
-                        self.logger.debug(f"Query: device_id={device_id} OR (patient_id={patient_id} AND device={device_id})")
-                    else:
-                        # Only device_id (local records)
-                        query = query.filter(HealthRecord.device_id == device_id)
-                        self.logger.debug(f"Query: device_id={device_id} only")
-                elif patient_id:
-                    # Only patient_id (cloud query without device context)
-                    query = query.filter(HealthRecord.patient_id == patient_id)
-                    self.logger.debug(f"Query: patient_id={patient_id} only")
-                # If neither, return all records (for admin use)
-                else:
-                    self.logger.debug("Query: ALL records (no filters)")
-                
-                # Apply time filters
-                if start_time:
-                    query = query.filter(HealthRecord.timestamp >= start_time)
-                    self.logger.debug(f"Filter: timestamp >= {start_time}")
-                if end_time:
-                    query = query.filter(HealthRecord.timestamp <= end_time)
-                    self.logger.debug(f"Filter: timestamp <= {end_time}")
-                
-                # Order by timestamp descending and limit
-                records = query.order_by(desc(HealthRecord.timestamp)).limit(limit).all()
-                
-                self.logger.debug(f"Query returned {len(records)} raw records from database")
-                
-                # Convert to dict list
-                result = []
-                for record in records:
-                    result.append({
-                        'id': record.id,
-                        'patient_id': record.patient_id,
-                        'timestamp': record.timestamp,  # Return datetime object, not ISO string
-                        'heart_rate': record.heart_rate,
-                        'spo2': record.spo2,
-                        'temperature': record.temperature,
-                        'systolic_bp': record.systolic_bp,
-                        'diastolic_bp': record.diastolic_bp,
-                        # Alias fields for history_screen.py compatibility
-                        'blood_pressure_systolic': record.systolic_bp,
-                        'blood_pressure_diastolic': record.diastolic_bp,
-                        'mean_arterial_pressure': record.mean_arterial_pressure,
-                        'sensor_data': record.sensor_data,
-                        'data_quality': record.data_quality,
-                        'measurement_context': record.measurement_context
-                    })
-                
-                self.logger.info(f"Returning {len(result)} health records (device_id={device_id}, patient_id={patient_id})")
-                return result
+            # Device-centric: device_id = X (SEARCH ix_health_records_device_timestamp),
+            # nếu không có thì patient_id = Y, không có cả hai → tất cả records (admin)
+            self.logger.debug(f"Query: device_id={device_id}, patient_id={patient_id}, "
+                              f"start={start_time}, end={end_time}")
+            
+            # Core select(): chỉ lấy các cột cần, row → dict (không hydrate ORM object)
+            result = self.reader.health_records(patient_id=patient_id, device_id=device_id,
+                                                start_time=start_time, end_time=end_time, limit=limit)
+            
+            self.logger.info(f"Returning {len(result)} health records (device_id={device_id}, patient_id={patient_id})")
+            return result
                 
         except Exception as e:
             self.logger.error(f"Error getting health records: {e}", exc_info=True)
             return []
     
+    def get_health_record_arrays(self, patient_id: str = None, device_id: str = None,
+                                 start_time: Optional[datetime] = None,
+                                 end_time: Optional[datetime] = None,
+                                 columns: Tuple[str, ...] = VITAL_COLUMNS,
+                                 limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Get health records dạng cột NumPy cho biểu đồ (cũ → mới)
+        
+        Args:
+            patient_id / device_id / start_time / end_time: Như get_health_records
+            columns: Cột số của health_records
+            limit: Số record mới nhất tối đa (None = tất cả)
+            
+        Returns:
+            Dict {'timestamp': datetime64[us], column: float64 (NULL = NaN)}, {} nếu lỗi
+        """
+        try:
+            return self.reader.health_record_arrays(columns, patient_id=patient_id, device_id=device_id,
+                                                    start_time=start_time, end_time=end_time, limit=limit)
+        except Exception as e:
+            self.logger.error(f"Error getting health record arrays: {e}", exc_info=True)
+            return {}
+    
     def get_latest_vitals(self, patient_id: str) -> Optional[Dict[str, Any]]:
         """
         Get latest vital signs for patient
@@ -494,24 +685,7 @@ class DatabaseManager(DatabaseManagerExtensions):
             Latest vitals data or None if not found
         """
         try:
-            with self.get_session() as session:
-                record = session.query(HealthRecord).filter_by(
-                    patient_id=patient_id
-                ).order_by(desc(HealthRecord.timestamp)).first()
-                
-                if not record:
-                    return None
-                
-                return {
-                    'timestamp': record.timestamp.isoformat(),
-                    'heart_rate': record.heart_rate,
-                    'spo2': record.spo2,
-                    'temperature': record.temperature,
-                    'systolic_bp': record.systolic_bp,
-                    'diastolic_bp': record.diastolic_bp,
-                    'mean_arterial_pressure': record.mean_arterial_pressure,
-                    'data_quality': record.data_quality
-                }
+            return self.reader.latest_vitals(patient_id)
                 
         except Exception as e:
             self.logger.error(f"Error getting latest vitals: {e}")
@@ -528,43 +702,33 @@ class DatabaseManager(DatabaseManagerExtensions):
             Alert ID if successful, None if error
         """
         self.logger.debug(f"[SAVE_ALERT_START] Saving alert: type={alert_data.get('alert_type')}, severity={alert_data.get('severity')}, patient_id={alert_data.get('patient_id')}, device_id={alert_data.get('device_id')}")
-        try:
-            with self.get_session() as session:
-                alert = Alert(
-                    patient_id=alert_data['patient_id'],
-                    device_id=alert_data.get('device_id'),  # REQUIRED after migration
-                    health_record_id=alert_data.get('health_record_id'),  # Link to health record
-                    alert_type=alert_data['alert_type'],
-                    severity=alert_data['severity'],
-                    message=alert_data['message'],
-                    vital_sign=alert_data.get('vital_sign'),
-                    current_value=alert_data.get('current_value'),
-                    threshold_value=alert_data.get('threshold_value'),
-                    timestamp=alert_data.get('timestamp', datetime.utcnow())
-                )
-                
-                session.add(alert)
-                session.flush()
-                
-                alert_id = alert.id
-                
-                self.logger.warning(f"Saved alert ID={alert_id}: {alert.severity} - {alert.message}")
+        return self._save_sync('alert', alert_data)
+    
+    def submit_alert(self, alert_data: Dict[str, Any]) -> Future:
+        """
+        Queue alert cho write-behind writer (không chờ commit)
+        
+        Args:
+            alert_data: Alert information (như save_alert)
             
-            # Trigger cloud sync AFTER transaction commits
-            self.logger.debug(f"[DEBUG] push_alert check: cloud_sync_manager={self.cloud_sync_manager is not None}, sync_config={self.cloud_sync_manager.sync_config if self.cloud_sync_manager else 'None'}")
-            if self.cloud_sync_manager and self.cloud_sync_manager.sync_config.get('sync_alerts', True):
-                try:
-                    self.logger.info(f"[PUSH_ALERT_CALL] About to push alert {alert_id} to cloud")
-                    result = self.cloud_sync_manager.push_alert(alert_id)
-                    self.logger.info(f"[PUSH_ALERT_RESULT] Alert {alert_id} push result: {result}")
-                except Exception as sync_error:
-                    self.logger.error(f"[PUSH_ALERT_ERROR] Cloud sync failed for alert {alert_id}: {sync_error}", exc_info=True)
+        Returns:
+            Future resolve bằng alert ID (None nếu lỗi)
+        """
+        return self._submit('alert', alert_data)
+    
+    def flush_writes(self, timeout: Optional[float] = None) -> bool:
+        """
+        Chờ write-behind queue commit hết
+        
+        Args:
+            timeout: Giây (None = chờ vô hạn)
             
-            return alert_id
-                
-        except Exception as e:
-            self.logger.error(f"Error saving alert: {e}")
-            return None
+        Returns:
+            bool: True nếu không còn record đang chờ
+        """
+        if not self.write_behind:
+            return True
+        return self.write_behind.flush(timeout)
     
     def get_active_alerts(self, patient_id: str = None, device_id: str = None) -> List[Dict[str, Any]]:
         """
@@ -580,39 +744,13 @@ class DatabaseManager(DatabaseManagerExtensions):
             List of active alerts
         """
         try:
-            with self.get_session() as session:
-                # Build filter conditions
-                conditions = [Alert.resolved == False]
-                
-                # Device-centric: Query by device_id if patient_id is None
-                if patient_id:
-                    conditions.append(Alert.patient_id == patient_id)
-                elif device_id:
-                    conditions.append(Alert.device_id == device_id)
-                else:
-                    # Neither patient_id nor device_id provided - return empty
-                    self.logger.debug("get_active_alerts: No patient_id or device_id provided")
-                    return []
-                
-                alerts = session.query(Alert).filter(
-                    and_(*conditions)
-                ).order_by(desc(Alert.timestamp)).all()
-                
-                result = []
-                for alert in alerts:
-                    result.append({
-                        'id': alert.id,
-                        'alert_type': alert.alert_type,
-                        'severity': alert.severity,
-                        'message': alert.message,
-                        'vital_sign': alert.vital_sign,
-                        'current_value': alert.current_value,
-                        'threshold_value': alert.threshold_value,
-                        'timestamp': alert.timestamp.isoformat(),
-                        'acknowledged': alert.acknowledged
-                    })
-                
-                return result
+            if not patient_id and not device_id:
+                # Neither patient_id nor device_id provided - return empty
+                self.logger.debug("get_active_alerts: No patient_id or device_id provided")
+                return []
+            
+            # Device-centric: Query by device_id if patient_id is None
+            return self.reader.active_alerts(patient_id=patient_id, device_id=device_id)
                 
         except Exception as e:
             self.logger.error(f"Error getting active alerts: {e}")
@@ -863,13 +1001,22 @@ class DatabaseManager(DatabaseManagerExtensions):
             # Don't log error for logging failures (avoid infinite loop)
             pass
     
-    def get_health_statistics(self, patient_id: str, time_range: str) -> Dict[str, Any]:
+    def get_health_statistics(self, patient_id: str, time_range: str, device_id: str = None,
+                              bucket: Optional[str] = None, percentiles: Tuple[float, ...] = (),
+                              include_std: bool = False) -> Dict[str, Any]:
         """
         Get health statistics for patient
         
+        Tính bằng aggregate SQL trên toàn bộ khoảng thời gian (không giới hạn
+        1000 record như get_health_records), bộ nhớ không phụ thuộc số record.
+        
         Args:
             patient_id: Patient identifier
             time_range: Time range ('24h', '7d', '30d')
+            device_id: Device identifier (optional, ưu tiên như get_health_records)
+            bucket: None | 'hour' | 'day' - thêm 'buckets' theo thời gian
+            percentiles: Ví dụ (50, 95) → 'p50', 'p95' cho mỗi vital sign
+            include_std: Thêm 'std' cho mỗi vital sign
             
         Returns:
             Dictionary containing statistics
@@ -885,33 +1032,22 @@ class DatabaseManager(DatabaseManagerExtensions):
             delta = time_map.get(time_range, timedelta(days=7))
             start_time = datetime.utcnow() - delta
             
-            # Get records
-            records = self.get_health_records(patient_id, start_time=start_time)
+            summary = self.reader.health_statistics(
+                STATISTIC_VITALS, patient_id=patient_id, device_id=device_id,
+                start_time=start_time, bucket=bucket,
+                percentiles=percentiles, include_std=include_std
+            )
             
-            if not records:
+            if not summary['record_count']:
                 return {}
             
-            # Calculate statistics
             stats = {
                 'time_range': time_range,
-                'record_count': len(records),
+                'record_count': summary.pop('record_count'),
                 'start_time': start_time.isoformat(),
                 'end_time': datetime.utcnow().isoformat()
             }
-            
-            # Calculate averages and ranges for each vital sign
-            vitals = ['heart_rate', 'spo2', 'temperature', 'systolic_bp', 'diastolic_bp']
-            
-            for vital in vitals:
-                values = [r[vital] for r in records if r[vital] is not None]
-                
-                if values:
-                    stats[vital] = {
-                        'avg': round(sum(values) / len(values), 2),
-                        'min': round(min(values), 2),
-                        'max': round(max(values), 2),
-                        'count': len(values)
-                    }
+            stats.update(summary)
             
             return stats
             
@@ -955,6 +1091,12 @@ class DatabaseManager(DatabaseManagerExtensions):
             bool: True if backup successful
         """
         try:
+            # Record đang chờ trong write-behind queue phải nằm trong backup
+            self.flush_writes()
+            
+            # Đưa toàn bộ WAL vào file chính trước khi copy
+            self.checkpoint_wal('TRUNCATE')
+            
             # Close all connections first
             self.engine.dispose()
             
@@ -962,18 +1104,7 @@ class DatabaseManager(DatabaseManagerExtensions):
             shutil.copy2(self.db_path, backup_path)
             
             # Recreate engine
-            db_url = f"sqlite:///{self.db_path}"
-            self.engine = create_engine(
-                db_url,
-                echo=False,
-                pool_pre_ping=True,
-                connect_args={'check_same_thread': False}
-            )
-            self.SessionLocal = sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=self.engine
-            )
+            self._create_engine()
             
             self.logger.info(f"Database backed up to {backup_path}")
             return True
@@ -997,25 +1128,23 @@ class DatabaseManager(DatabaseManagerExtensions):
                 self.logger.error(f"Backup file not found: {backup_path}")
                 return False
             
+            # Record đang chờ ghi vào database cũ trước khi bị thay thế
+            self.flush_writes()
+            
             # Close all connections
             self.engine.dispose()
             
+            # WAL/SHM cũ thuộc database hiện tại - phải xóa, nếu không sẽ được
+            # replay lên file restore
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(self.db_path + suffix):
+                    os.remove(self.db_path + suffix)
+            
             # Restore database file
             shutil.copy2(backup_path, self.db_path)
             
             # Recreate engine
-            db_url = f"sqlite:///{self.db_path}"
-            self.engine = create_engine(
-                db_url,
-                echo=False,
-                pool_pre_ping=True,
-                connect_args={'check_same_thread': False}
-            )
-            self.SessionLocal = sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=self.engine
-            )
+            self._create_engine()
             
             self.logger.info(f"Database restored from {backup_path}")
             return True
@@ -1047,6 +1176,19 @@ class DatabaseManager(DatabaseManagerExtensions):
                 info['tables']['calibrations'] = session.query(SensorCalibration).count()
                 info['tables']['system_logs'] = session.query(SystemLog).count()
             
+            # Storage profile: PRAGMA thực tế + kích thước WAL + checkpoint
+            with self.engine.connect() as conn:
+                storage = read_pragmas(conn)
+            wal_path = self.db_path + '-wal'
+            storage['profile'] = self.storage_profile['profile']
+            storage['wal_size_kb'] = round(os.path.getsize(wal_path) / 1024, 1) if os.path.exists(wal_path) else 0
+            storage['checkpoint_interval_s'] = self.storage_profile['checkpoint_interval_s']
+            storage['checkpoints'] = dict(self._checkpoint_stats)
+            info['storage'] = storage
+            
+            if self.write_behind:
+                info['write_behind'] = self.write_behind.get_stats()
+            
             return info
             
         except Exception as e:
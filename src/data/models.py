@@ -6,7 +6,7 @@ Synchronized with MySQL Cloud Schema v2.0.0
 
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum, BigInteger
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum, BigInteger, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.sqlite import JSON
@@ -251,11 +251,18 @@ class HealthRecord(Base):
         synced_at: When record was synced to cloud
     """
     __tablename__ = 'health_records'
+    __table_args__ = (
+        # History queries: WHERE device_id/patient_id = ? [AND timestamp range] ORDER BY timestamp DESC LIMIT n
+        Index('ix_health_records_device_timestamp', 'device_id', 'timestamp'),
+        Index('ix_health_records_patient_timestamp', 'patient_id', 'timestamp'),
+        # Cloud sync retry: WHERE sync_status = 'pending' (theo id)
+        Index('ix_health_records_sync_status_id', 'sync_status', 'id'),
+    )
     
     # Primary identification
     id = Column(Integer, primary_key=True, autoincrement=True)  # Integer for SQLite autoincrement
-    patient_id = Column(String(50), ForeignKey('patients.patient_id', ondelete='SET NULL', onupdate='CASCADE'), nullable=True, index=True)  # Device-centric: NULL until assigned
-    device_id = Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False, index=True)
+    patient_id = Column(String(50), ForeignKey('patients.patient_id', ondelete='SET NULL', onupdate='CASCADE'), nullable=True)  # Device-centric: NULL until assigned
+    device_id = Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     # Vital signs
@@ -272,7 +279,7 @@ class HealthRecord(Base):
     measurement_context = Column(String(50), default='rest')
     
     # Sync status
-    sync_status = Column(String(20), default='pending', index=True)  # pending, synced, failed
+    sync_status = Column(String(20), default='pending')  # pending, synced, failed
     synced_at = Column(DateTime)
     
     # Relationships
@@ -305,11 +312,18 @@ class Alert(Base):
         notification_method: Notification method used
     """
     __tablename__ = 'alerts'
+    __table_args__ = (
+        # Active alerts: WHERE device_id/patient_id = ? AND resolved = 0 ORDER BY timestamp DESC
+        Index('ix_alerts_device_resolved_timestamp', 'device_id', 'resolved', 'timestamp'),
+        Index('ix_alerts_patient_resolved_timestamp', 'patient_id', 'resolved', 'timestamp'),
+        # Cloud sync retry: WHERE sync_status = 'pending'
+        Index('ix_alerts_sync_status_id', 'sync_status', 'id'),
+    )
     
     # Primary identification
     id = Column(Integer, primary_key=True, autoincrement=True)  # Integer for SQLite autoincrement
-    patient_id = Column(String(50), ForeignKey('patients.patient_id', ondelete='SET NULL', onupdate='CASCADE'), nullable=True, index=True)  # Device-centric: NULL until assigned
-    device_id = Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False, index=True)
+    patient_id = Column(String(50), ForeignKey('patients.patient_id', ondelete='SET NULL', onupdate='CASCADE'), nullable=True)  # Device-centric: NULL until assigned
+    device_id = Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False)
     health_record_id = Column(BigInteger)  # Optional reference to health_records.id
     
     # Alert information
@@ -461,6 +475,10 @@ class SyncQueue(Base):
         error_message: Error message if failed
     """
     __tablename__ = 'sync_queue'
+    __table_args__ = (
+        # get_pending_sync_items: WHERE sync_status = 'pending' ORDER BY priority, created_at
+        Index('ix_sync_queue_status_priority_created', 'sync_status', 'priority', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)  # Integer for SQLite autoincrement
     device_id = Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE', onupdate='CASCADE'), nullable=False, index=True)
@@ -476,7 +494,7 @@ class SyncQueue(Base):
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     
     # Sync status
-    sync_status = Column(String(20), default='pending', index=True)  # pending, syncing, success, failed
+    sync_status = Column(String(20), default='pending')  # pending, syncing, success, failed
     sync_attempts = Column(Integer, default=0)
     last_sync_attempt = Column(DateTime)
     error_message = Column(Text)
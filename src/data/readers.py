@@ -0,0 +1,373 @@
+"""
+Health Data Readers
+Read path dùng SQLAlchemy Core select() cho history / alert / latest vitals
+
+Không tạo ORM object (identity map, attribute instrumentation) rồi copy sang dict:
+select() chỉ lấy các cột cần, row → dict/tuple trực tiếp, hoặc trả cột NumPy cho
+biểu đồ (timestamp parse vector hóa, NULL → NaN).
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+import logging
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, String, and_, cast, func, null, or_, select, type_coerce
+from sqlalchemy.engine import Engine
+
+from .models import Alert, HealthRecord
+
+
+HEALTH_TABLE = HealthRecord.__table__
+ALERT_TABLE = Alert.__table__
+
+# Cột trả về bởi get_health_records (giữ nguyên keys cũ)
+HISTORY_COLUMNS = (
+    'id', 'patient_id', 'timestamp', 'heart_rate', 'spo2', 'temperature',
+    'systolic_bp', 'diastolic_bp', 'mean_arterial_pressure', 'sensor_data',
+    'data_quality', 'measurement_context',
+)
+
+# Cột vital signs cho biểu đồ / thống kê
+VITAL_COLUMNS = ('heart_rate', 'spo2', 'temperature', 'systolic_bp', 'diastolic_bp', 'mean_arterial_pressure')
+
+# Alias cho history_screen.py
+BP_ALIASES = {'systolic_bp': 'blood_pressure_systolic', 'diastolic_bp': 'blood_pressure_diastolic'}
+
+# Vital signs cho get_health_statistics
+STATISTIC_VITALS = ('heart_rate', 'spo2', 'temperature', 'systolic_bp', 'diastolic_bp')
+
+# Bucket thời gian → strftime format (SQLite lưu timestamp dạng text UTC)
+BUCKET_FORMATS = {
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+}
+
+ALERT_COLUMNS = (
+    'id', 'alert_type', 'severity', 'message', 'vital_sign', 'current_value',
+    'threshold_value', 'timestamp', 'acknowledged',
+)
+
+
+def health_record_filters(patient_id: Optional[str] = None, device_id: Optional[str] = None,
+                          start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> list:
+    """
+    WHERE conditions cho health_records (device-centric: device_id ưu tiên)
+
+    Returns:
+        List điều kiện SQLAlchemy (rỗng = tất cả records)
+    """
+    t = HEALTH_TABLE
+    conditions = []
+    if device_id:
+        conditions.append(t.c.device_id == device_id)
+    elif patient_id:
+        conditions.append(t.c.patient_id == patient_id)
+    if start_time:
+        conditions.append(t.c.timestamp >= start_time)
+    if end_time:
+        conditions.append(t.c.timestamp <= end_time)
+    return conditions
+
+
+class HealthDataReader:
+    """
+    Core-SQL reader cho health_records / alerts
+
+    Attributes:
+        engine: SQLAlchemy engine (SQLite local database)
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.logger = logging.getLogger(__name__)
+
+    # ==================== HEALTH RECORDS ====================
+
+    def health_records_select(self, columns: Sequence[str] = HISTORY_COLUMNS,
+                              patient_id: Optional[str] = None, device_id: Optional[str] = None,
+                              start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                              limit: Optional[int] = 1000):
+        """
+        select() projection cho history query, mới nhất trước
+
+        Args:
+            columns: Tên cột health_records
+            patient_id / device_id / start_time / end_time: Filters
+            limit: Số record tối đa (None = không giới hạn)
+        """
+        t = HEALTH_TABLE
+        stmt = select(*(t.c[name] for name in columns))
+        conditions = health_record_filters(patient_id, device_id, start_time, end_time)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        stmt = stmt.order_by(t.c.timestamp.desc())
+        if limit is not None:
+            stmt = stmt.limit(int(limit))
+        return stmt
+
+    def health_records(self, patient_id: Optional[str] = None, device_id: Optional[str] = None,
+                       start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                       limit: int = 1000, columns: Sequence[str] = HISTORY_COLUMNS) -> List[Dict[str, Any]]:
+        """
+        Health records dạng dict (mới nhất trước), thêm alias blood_pressure_*
+
+        Returns:
+            List dict {column: value}
+        """
+        stmt = self.health_records_select(columns, patient_id, device_id, start_time, end_time, limit)
+        aliases = [(BP_ALIASES[name], index) for index, name in enumerate(columns) if name in BP_ALIASES]
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+
+        result = []
+        for row in rows:
+            record = dict(zip(columns, row))
+            for alias, index in aliases:
+                record[alias] = row[index]
+            result.append(record)
+        return result
+
+    def health_record_rows(self, columns: Sequence[str] = HISTORY_COLUMNS,
+                           patient_id: Optional[str] = None, device_id: Optional[str] = None,
+                           start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                           limit: Optional[int] = 1000) -> List[Tuple]:
+        """
+        Health records dạng tuple theo thứ tự columns (mới nhất trước)
+        """
+        stmt = self.health_records_select(columns, patient_id, device_id, start_time, end_time, limit)
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(stmt)]
+
+    def health_record_arrays(self, columns: Sequence[str] = VITAL_COLUMNS,
+                             patient_id: Optional[str] = None, device_id: Optional[str] = None,
+                             start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                             limit: Optional[int] = None, ascending: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Cột NumPy cho biểu đồ: 'timestamp' (datetime64[us]) + mỗi cột float64 (NULL → NaN)
+
+        Args:
+            columns: Cột số của health_records
+            ascending: True = cũ → mới (trục thời gian biểu đồ)
+
+        Returns:
+            Dict {'timestamp': ndarray, column: ndarray}
+        """
+        t = HEALTH_TABLE
+        stmt = self.health_records_select(columns, patient_id, device_id, start_time, end_time, limit)
+
+        # SQLite lưu DateTime dạng 'YYYY-MM-DD HH:MM:SS.ffffff': lấy chuỗi thô, NumPy parse cả cột
+        raw_timestamp = self.engine.dialect.name == 'sqlite'
+        timestamp_col = type_coerce(t.c.timestamp, String) if raw_timestamp else t.c.timestamp
+        stmt = stmt.add_columns(timestamp_col.label('_ts'))
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+
+        if ascending:
+            rows.reverse()
+
+        arrays: Dict[str, np.ndarray] = {
+            'timestamp': np.array([row[-1] for row in rows], dtype='datetime64[us]')
+        }
+        for index, name in enumerate(columns):
+            dtype = np.int64 if name == 'id' else np.float64
+            arrays[name] = np.array([row[index] for row in rows], dtype=dtype)
+        return arrays
+
+    def latest_vitals(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Record mới nhất của patient (timestamp ISO string như get_latest_vitals cũ)
+        """
+        columns = ('timestamp',) + VITAL_COLUMNS + ('data_quality',)
+        stmt = self.health_records_select(columns, patient_id=patient_id, limit=1)
+        with self.engine.connect() as conn:
+            row = conn.execute(stmt).first()
+
+        if row is None:
+            return None
+        record = dict(zip(columns, row))
+        record['timestamp'] = record['timestamp'].isoformat()
+        return record
+
+    # ==================== STATISTICS ====================
+
+    def health_statistics(self, vitals: Sequence[str] = STATISTIC_VITALS,
+                          patient_id: Optional[str] = None, device_id: Optional[str] = None,
+                          start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
+                          bucket: Optional[str] = None, percentiles: Sequence[float] = (),
+                          include_std: bool = False) -> Dict[str, Any]:
+        """
+        Thống kê vital signs bằng aggregate SQL (COUNT/AVG/MIN/MAX trong SQLite)
+
+        Không giới hạn số record, bộ nhớ Python không phụ thuộc số record: một
+        query aggregate (GROUP BY bucket nếu có), tổng toàn khoảng được gộp từ
+        các bucket. Percentile dùng window function, chỉ trả về các hàng quanh
+        vị trí cần nội suy.
+
+        Args:
+            vitals: Cột vital signs
+            patient_id / device_id / start_time / end_time: Filters (như health_records)
+            bucket: None | 'hour' | 'day'
+            percentiles: Ví dụ (50, 95) → 'p50', 'p95' (nội suy tuyến tính như numpy)
+            include_std: Thêm 'std' (độ lệch chuẩn population)
+
+        Returns:
+            Dict {'record_count', vital: {...}, 'buckets': [...] nếu bucket}
+        """
+        if bucket is not None and bucket not in BUCKET_FORMATS:
+            raise ValueError(f"Unknown bucket '{bucket}' (expected one of {sorted(BUCKET_FORMATS)})")
+
+        t = HEALTH_TABLE
+        bucket_col = func.strftime(BUCKET_FORMATS[bucket], t.c.timestamp) if bucket else None
+        columns = [func.count()]
+        for name in vitals:
+            value = t.c[name]
+            columns += [func.count(value), func.sum(value), func.min(value), func.max(value)]
+            if include_std:
+                columns.append(func.sum(value * value))
+
+        stmt = select(*columns)
+        conditions = health_record_filters(patient_id, device_id, start_time, end_time)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        if bucket_col is not None:
+            stmt = stmt.add_columns(bucket_col.label('bucket')).group_by(bucket_col).order_by(bucket_col)
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+
+        width = 5 if include_std else 4
+        groups = []
+        for row in rows:
+            totals = {name: row[1 + i * width:1 + (i + 1) * width] for i, name in enumerate(vitals)}
+            groups.append((row[-1] if bucket else None, row[0], totals))
+
+        # Tổng toàn khoảng = gộp các bucket (count/sum/min/max/sum² đều cộng dồn được)
+        overall = {'record_count': sum(count for _, count, _ in groups)}
+        for name in vitals:
+            merged = [totals[name] for _, _, totals in groups if totals[name][0]]
+            if merged:
+                overall[name] = self._vital_summary(
+                    sum(m[0] for m in merged), sum(m[1] for m in merged),
+                    min(m[2] for m in merged), max(m[3] for m in merged),
+                    sum(m[4] for m in merged) if include_std else None)
+
+        bucket_stats = {}
+        if bucket:
+            for key, count, totals in groups:
+                entry = {'bucket_start': datetime.fromisoformat(key).isoformat(), 'record_count': count}
+                for name in vitals:
+                    if totals[name][0]:
+                        entry[name] = self._vital_summary(*totals[name][:4],
+                                                          totals[name][4] if include_std else None)
+                bucket_stats[key] = entry
+
+        if percentiles and overall['record_count']:
+            for name in vitals:
+                whole = self._vital_percentiles(name, percentiles, conditions, None).get(None)
+                if whole:
+                    overall[name].update(whole)
+                if bucket:
+                    for key, values in self._vital_percentiles(name, percentiles, conditions, bucket_col).items():
+                        bucket_stats[key][name].update(values)
+
+        if bucket:
+            overall['buckets'] = list(bucket_stats.values())
+        return overall
+
+    @staticmethod
+    def _vital_summary(count: int, total: float, minimum: float, maximum: float,
+                       total_sq: Optional[float]) -> Dict[str, Any]:
+        """avg/min/max/count (làm tròn 2 chữ số như get_health_statistics cũ), std nếu có sum²"""
+        mean = total / count
+        summary = {
+            'avg': round(mean, 2),
+            'min': round(minimum, 2),
+            'max': round(maximum, 2),
+            'count': count,
+        }
+        if total_sq is not None:
+            summary['std'] = round(math.sqrt(max(0.0, total_sq / count - mean * mean)), 2)
+        return summary
+
+    def _vital_percentiles(self, name: str, percentiles: Sequence[float], conditions: list,
+                           bucket_col) -> Dict[Optional[str], Dict[str, float]]:
+        """
+        Percentile của một cột (theo bucket nếu có) bằng ROW_NUMBER() OVER
+
+        Mỗi percentile p cần hàng thứ floor(p/100 * (n-1)) và hàng kế tiếp;
+        SQLite sắp xếp và lọc, Python chỉ nhận tối đa 2 hàng / percentile / bucket.
+
+        Returns:
+            Dict {bucket_key (None nếu không bucket): {'p50': value, ...}}
+        """
+        t = HEALTH_TABLE
+        value = t.c[name]
+        partition = {'partition_by': bucket_col} if bucket_col is not None else {}
+        bucket_key = bucket_col.label('bucket') if bucket_col is not None else null().label('bucket')
+        ranked = select(
+            bucket_key,
+            value.label('value'),
+            func.row_number().over(order_by=value, **partition).label('rn'),
+            func.count().over(**partition).label('n'),
+        ).where(and_(value.isnot(None), *conditions)).subquery()
+
+        fractions = [min(max(float(p), 0.0), 100.0) / 100.0 for p in percentiles]
+        wanted = [ranked.c.rn.between(cast(f * (ranked.c.n - 1), Integer) + 1,
+                                      cast(f * (ranked.c.n - 1), Integer) + 2)
+                  for f in fractions]
+        stmt = select(ranked.c.bucket, ranked.c.n, ranked.c.rn, ranked.c.value) \
+            .where(or_(*wanted)).order_by(ranked.c.bucket, ranked.c.rn)
+
+        picked: Dict[Optional[str], Dict[int, float]] = {}
+        sizes: Dict[Optional[str], int] = {}
+        with self.engine.connect() as conn:
+            for key, n, rn, v in conn.execute(stmt):
+                picked.setdefault(key, {})[rn] = v
+                sizes[key] = n
+
+        result = {}
+        for key, ranks in picked.items():
+            n = sizes[key]
+            values = {}
+            for p, f in zip(percentiles, fractions):
+                position = f * (n - 1)
+                lower = int(position)
+                low = ranks[lower + 1]
+                high = ranks.get(lower + 2, low)
+                values[f"p{float(p):g}"] = round(low + (high - low) * (position - lower), 2)
+            result[key] = values
+        return result
+
+    # ==================== ALERTS ====================
+
+    def active_alerts(self, patient_id: Optional[str] = None,
+                      device_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Alert chưa resolved của patient (ưu tiên) hoặc device, mới nhất trước
+        """
+        t = ALERT_TABLE
+        conditions = [t.c.resolved == False]  # noqa: E712 - SQL expression
+        if patient_id:
+            conditions.append(t.c.patient_id == patient_id)
+        elif device_id:
+            conditions.append(t.c.device_id == device_id)
+        else:
+            return []
+
+        stmt = select(*(t.c[name] for name in ALERT_COLUMNS)).where(and_(*conditions)).order_by(t.c.timestamp.desc())
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+
+        result = []
+        for row in rows:
+            alert = dict(zip(ALERT_COLUMNS, row))
+            alert['timestamp'] = alert['timestamp'].isoformat()
+            result.append(alert)
+        return result
@@ -0,0 +1,261 @@
+"""
+SQLite Storage Profile
+PRAGMA tuning (WAL, synchronous, cache/mmap, busy_timeout) và checkpoint định kỳ
+cho DatabaseManager trên thẻ SD
+
+GUI thread, sensor callbacks, SyncScheduler và CloudSyncManager cùng ghi qua một
+engine. Với rollback journal mỗi transaction ghi khóa cả file → reader và writer
+chờ nhau. Profile 'sd_card' bật WAL (reader không bị writer chặn), synchronous=NORMAL
+(fsync ở checkpoint thay vì mỗi commit), cache/mmap lớn hơn và checkpoint PASSIVE
+định kỳ để file -wal không phình ra.
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+
+# ==================== PROFILES ====================
+
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Hành vi cũ: rollback journal, fsync mỗi commit, không checkpoint thread
+    'legacy': {
+        'journal_mode': 'delete',
+        'synchronous': 'full',
+        'cache_size_kb': 2000,
+        'mmap_size_mb': 0,
+        'busy_timeout_ms': 30000,
+        'temp_store': 'default',
+        'wal_autocheckpoint': 1000,
+        'checkpoint_interval_s': 0,
+    },
+    # Raspberry Pi + thẻ SD: WAL, ít fsync, cache 8 MB, mmap 32 MB
+    'sd_card': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size_kb': 8192,
+        'mmap_size_mb': 32,
+        'busy_timeout_ms': 30000,
+        'temp_store': 'memory',
+        'wal_autocheckpoint': 1000,
+        'checkpoint_interval_s': 300,
+    },
+}
+
+DEFAULT_PROFILE = 'sd_card'
+
+SYNCHRONOUS_LEVELS = ('off', 'normal', 'full', 'extra')
+TEMP_STORE_MODES = ('default', 'file', 'memory')
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+def resolve_storage_profile(storage_config: Optional[Dict[str, Any]],
+                            logger: Optional[logging.Logger] = None) -> Dict[str, Any]:
+    """
+    Build effective storage profile từ config `database.storage`
+
+    Args:
+        storage_config: {'profile': 'sd_card', <override keys>...} (có thể None)
+        logger: Logger cho cảnh báo
+
+    Returns:
+        Dict profile đầy đủ (có key 'profile' = tên profile gốc)
+    """
+    logger = logger or logging.getLogger(__name__)
+    storage_config = storage_config or {}
+
+    name = str(storage_config.get('profile', DEFAULT_PROFILE)).lower()
+    if name not in STORAGE_PROFILES:
+        logger.warning(f"Unknown storage profile '{name}', using '{DEFAULT_PROFILE}'")
+        name = DEFAULT_PROFILE
+
+    profile = dict(STORAGE_PROFILES[name])
+    for key in profile:
+        if key in storage_config and storage_config[key] is not None:
+            profile[key] = storage_config[key]
+
+    profile['journal_mode'] = str(profile['journal_mode']).lower()
+    profile['synchronous'] = str(profile['synchronous']).lower()
+    profile['temp_store'] = str(profile['temp_store']).lower()
+    if profile['synchronous'] not in SYNCHRONOUS_LEVELS:
+        logger.warning(f"Invalid synchronous '{profile['synchronous']}', using 'normal'")
+        profile['synchronous'] = 'normal'
+    if profile['temp_store'] not in TEMP_STORE_MODES:
+        logger.warning(f"Invalid temp_store '{profile['temp_store']}', using 'default'")
+        profile['temp_store'] = 'default'
+
+    profile['profile'] = name
+    return profile
+
+
+# ==================== PRAGMAS ====================
+
+def pragma_statements(profile: Dict[str, Any]) -> list:
+    """
+    PRAGMA statements cho một connection mới (thứ tự: busy_timeout trước
+    journal_mode để lần chuyển sang WAL đầu tiên cũng chờ được lock)
+    """
+    return [
+        f"PRAGMA busy_timeout = {int(profile['busy_timeout_ms'])}",
+        f"PRAGMA journal_mode = {profile['journal_mode']}",
+        f"PRAGMA synchronous = {profile['synchronous']}",
+        # Giá trị âm = KiB (không phụ thuộc page_size)
+        f"PRAGMA cache_size = {-int(profile['cache_size_kb'])}",
+        f"PRAGMA mmap_size = {int(profile['mmap_size_mb']) * 1024 * 1024}",
+        f"PRAGMA temp_store = {profile['temp_store']}",
+        f"PRAGMA wal_autocheckpoint = {int(profile['wal_autocheckpoint'])}",
+    ]
+
+
+def apply_pragmas(dbapi_connection, profile: Dict[str, Any]) -> None:
+    """
+    Áp dụng profile lên một sqlite3 connection (gọi từ event 'connect')
+
+    Args:
+        dbapi_connection: sqlite3.Connection
+        profile: Profile từ resolve_storage_profile()
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in pragma_statements(profile):
+            cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+def read_pragmas(connection) -> Dict[str, Any]:
+    """
+    Đọc giá trị PRAGMA thực tế của một SQLAlchemy connection
+
+    Returns:
+        Dict journal_mode/synchronous/cache_size_kb/mmap_size_mb/busy_timeout_ms/
+        temp_store/wal_autocheckpoint
+    """
+    def pragma(name: str):
+        return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+    cache_size = int(pragma('cache_size'))
+    if cache_size < 0:
+        cache_size_kb = -cache_size
+    else:
+        cache_size_kb = cache_size * int(pragma('page_size')) // 1024
+
+    synchronous = int(pragma('synchronous'))
+    temp_store = int(pragma('temp_store'))
+    return {
+        'journal_mode': str(pragma('journal_mode')).lower(),
+        'synchronous': SYNCHRONOUS_LEVELS[synchronous] if synchronous < len(SYNCHRONOUS_LEVELS) else synchronous,
+        'cache_size_kb': cache_size_kb,
+        'mmap_size_mb': round(int(pragma('mmap_size') or 0) / (1024 * 1024), 1),
+        'busy_timeout_ms': int(pragma('busy_timeout')),
+        'temp_store': TEMP_STORE_MODES[temp_store] if temp_store < len(TEMP_STORE_MODES) else temp_store,
+        'wal_autocheckpoint': int(pragma('wal_autocheckpoint')),
+    }
+
+
+def create_sqlite_engine(db_path: str, profile: Dict[str, Any]) -> Engine:
+    """
+    Tạo SQLAlchemy engine cho SQLite file với PRAGMA áp dụng mỗi lần connect
+
+    Args:
+        db_path: Đường dẫn file database
+        profile: Profile từ resolve_storage_profile()
+
+    Returns:
+        Engine
+    """
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        echo=False,  # Set True for SQL debugging
+        pool_pre_ping=True,  # Verify connections
+        connect_args={
+            'check_same_thread': False,  # Allow multi-threading
+            'timeout': profile['busy_timeout_ms'] / 1000.0
+        }
+    )
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, profile)
+
+    return engine
+
+
+# ==================== CHECKPOINT ====================
+
+class WalCheckpointer:
+    """
+    Background thread chạy checkpoint WAL định kỳ
+
+    wal_autocheckpoint chỉ chạy trong commit của writer (trên thread ghi); thread
+    này checkpoint PASSIVE lúc rảnh để file -wal nhỏ và reader đọc nhanh.
+    """
+
+    def __init__(self, checkpoint_fn: Callable[[str], Optional[Dict[str, int]]],
+                 interval_seconds: float, mode: str = 'PASSIVE'):
+        """
+        Initialize checkpointer
+
+        Args:
+            checkpoint_fn: Hàm checkpoint(mode) -> kết quả hoặc None
+            interval_seconds: Chu kỳ checkpoint (giây)
+            mode: PASSIVE | FULL | RESTART | TRUNCATE
+        """
+        self.logger = logging.getLogger(__name__)
+        self.checkpoint_fn = checkpoint_fn
+        self.interval_seconds = float(interval_seconds)
+        self.mode = mode.upper() if mode.upper() in CHECKPOINT_MODES else 'PASSIVE'
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """Start background checkpoint thread"""
+        if self._running or self.interval_seconds <= 0:
+            return
+
+        self._running = True
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._checkpoint_loop,
+            name="SQLiteWalCheckpointer",
+            daemon=True
+        )
+        self._thread.start()
+        self.logger.info(f"WAL checkpointer started (interval: {self.interval_seconds}s, mode: {self.mode})")
+
+    def stop(self):
+        """Stop background checkpoint thread"""
+        if not self._running:
+            return
+
+        self._running = False
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.logger.info("WAL checkpointer stopped")
+
+    def _checkpoint_loop(self):
+        while self._running:
+            if self._stop_event.wait(timeout=self.interval_seconds):
+                break
+            try:
+                started = time.perf_counter()
+                result = self.checkpoint_fn(self.mode)
+                if result:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    self.logger.debug(f"WAL checkpoint {self.mode}: {result} ({elapsed_ms:.1f} ms)")
+            except Exception as e:
+                self.logger.error(f"Error in WAL checkpoint loop: {e}")
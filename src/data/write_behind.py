@@ -0,0 +1,246 @@
+"""
+Write-Behind Writer
+Background thread gom health record / alert vào transaction chung (group commit)
+
+Caller (Kivy UI thread, sensor callback, AlertSystem) chỉ đẩy record vào hàng đợi
+có giới hạn và nhận Future; writer thread lấy hết các item đang chờ (tối đa
+max_batch), commit trong một transaction (một fsync) rồi resolve Future bằng ID.
+Cloud sync được chuyển tiếp qua on_committed, không chạy trên thread của caller.
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Sentinel dừng writer thread
+_STOP = object()
+
+# (kind, data) - kind: 'health_record' | 'alert'
+WriteItem = Tuple[str, Dict[str, Any]]
+
+
+class WriteBehindWriter:
+    """
+    Bounded write-behind queue với một writer thread
+
+    Future callbacks (add_done_callback) chạy trên writer thread: phải ngắn và
+    không gọi lại save_* đồng bộ (ví dụ Kivy: Clock.schedule_once).
+
+    Attributes:
+        max_queue (int): Số item tối đa trong hàng đợi
+        max_batch (int): Số item tối đa mỗi transaction
+        linger_s (float): Thời gian chờ thêm item sau item đầu tiên (0 = không chờ)
+        enqueue_timeout_s (float): Thời gian chờ khi hàng đợi đầy trước khi ghi trực tiếp
+    """
+
+    def __init__(self, commit_fn: Callable[[List[WriteItem]], List[Optional[int]]],
+                 on_committed: Optional[Callable[[List[WriteItem], List[Optional[int]]], None]] = None,
+                 max_queue: int = 256, max_batch: int = 64, linger_ms: float = 0,
+                 enqueue_timeout_s: float = 1.0):
+        """
+        Initialize write-behind writer
+
+        Args:
+            commit_fn: Ghi một batch trong một transaction, trả về ID theo thứ tự (None = lỗi)
+            on_committed: Gọi sau commit với (batch, ids) - dùng để chuyển cloud sync
+            max_queue: Kích thước hàng đợi
+            max_batch: Số item tối đa mỗi transaction
+            linger_ms: Chờ thêm item để gom batch lớn hơn
+            enqueue_timeout_s: Chờ khi hàng đợi đầy
+        """
+        self.logger = logging.getLogger(__name__)
+        self.commit_fn = commit_fn
+        self.on_committed = on_committed
+        self.max_queue = max(1, int(max_queue))
+        self.max_batch = max(1, int(max_batch))
+        self.linger_s = max(0.0, float(linger_ms) / 1000.0)
+        self.enqueue_timeout_s = float(enqueue_timeout_s)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+
+        self._stats = {
+            'submitted': 0,
+            'committed': 0,
+            'failed': 0,
+            'batches': 0,
+            'largest_batch': 0,
+            'overflow_writes': 0,
+            'last_commit_ms': 0.0,
+        }
+
+    # ==================== LIFECYCLE ====================
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def on_writer_thread(self) -> bool:
+        """True nếu đang chạy trên writer thread (save_* đồng bộ sẽ deadlock)"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self):
+        """Start writer thread"""
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._writer_loop,
+            name="DatabaseWriteBehind",
+            daemon=True
+        )
+        self._thread.start()
+        self.logger.info(f"Write-behind writer started (queue: {self.max_queue}, batch: {self.max_batch})")
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Ghi hết hàng đợi rồi dừng writer thread
+
+        Args:
+            timeout: Thời gian chờ tối đa (giây)
+        """
+        if not self._running:
+            return
+
+        self._running = False
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self.logger.error("Write-behind queue full while stopping")
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self.logger.info(f"Write-behind writer stopped ({self._stats['committed']} records committed)")
+
+    # ==================== SUBMIT ====================
+
+    def submit(self, kind: str, data: Dict[str, Any]) -> Future:
+        """
+        Đưa một record vào hàng đợi
+
+        Args:
+            kind: 'health_record' | 'alert'
+            data: Dict truyền cho commit_fn
+
+        Returns:
+            Future resolve bằng ID (None nếu ghi lỗi)
+        """
+        future: Future = Future()
+        with self._pending_cond:
+            self._pending += 1
+            self._stats['submitted'] += 1
+
+        if self._running:
+            try:
+                self._queue.put((kind, data, future), timeout=self.enqueue_timeout_s)
+                return future
+            except queue.Full:
+                self.logger.warning(f"Write-behind queue full ({self.max_queue}) - writing {kind} directly")
+                with self._pending_cond:
+                    self._stats['overflow_writes'] += 1
+
+        # Writer không chạy / hàng đợi đầy: ghi trên thread của caller
+        self._commit_batch([(kind, data, future)])
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Chờ đến khi mọi item đã submit được commit
+
+        Args:
+            timeout: Giây (None = chờ vô hạn)
+
+        Returns:
+            bool: True nếu hàng đợi đã trống
+        """
+        if self.on_writer_thread():
+            return self._pending == 0
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Thống kê writer (queue depth, batch, thời gian commit)"""
+        stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['pending'] = self._pending
+        stats['running'] = self._running
+        return stats
+
+    # ==================== WRITER THREAD ====================
+
+    def _writer_loop(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.linger_s
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            self._commit_batch(batch)
+
+        # Item vào queue sau _STOP (submit chạy đồng thời với stop()) vẫn phải commit
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._commit_batch(leftovers)
+
+    def _commit_batch(self, batch: List[Tuple[str, Dict[str, Any], Future]]):
+        items = [(kind, data) for kind, data, _ in batch]
+        started = time.perf_counter()
+        try:
+            ids = self.commit_fn(items)
+        except Exception as e:
+            self.logger.error(f"Write-behind commit failed: {e}", exc_info=True)
+            ids = [None] * len(batch)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        committed = sum(1 for record_id in ids if record_id is not None)
+        with self._pending_cond:
+            self._stats['batches'] += 1
+            self._stats['committed'] += committed
+            self._stats['failed'] += len(batch) - committed
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            self._stats['last_commit_ms'] = round(elapsed_ms, 2)
+        if len(batch) > 1:
+            self.logger.debug(f"Group commit: {len(batch)} records in {elapsed_ms:.1f} ms")
+
+        if self.on_committed:
+            try:
+                self.on_committed(items, ids)
+            except Exception as e:
+                self.logger.error(f"Write-behind on_committed failed: {e}")
+
+        for (_, _, future), record_id in zip(batch, ids):
+            future.set_result(record_id)
+
+        with self._pending_cond:
+            self._pending -= len(batch)
+            self._pending_cond.notify_all()
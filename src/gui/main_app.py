@@ -48,12 +48,14 @@ try:
     from src.sensors.mlx90614_sensor import MLX90614Sensor
     from src.sensors.blood_pressure_sensor import BloodPressureSensor
     from src.sensors.base_sensor import BaseSensor
+    from src.sensors.acquisition_scheduler import AcquisitionScheduler
 except ImportError as e:
     logging.warning(f"Could not import sensor classes: {e}")
     MAX30102Sensor = None
     MLX90614Sensor = None
     BloodPressureSensor = None
     BaseSensor = None
+    AcquisitionScheduler = None
 
 from src.utils.tts_manager import (
     DEFAULT_PIPER_CONFIG,
@@ -320,6 +322,7 @@ class HealthMonitorApp(MDApp):
 
         self.config_data = config
         self.database = database
+        self._history_reader = None  # HealthDataReader khi chạy không có DatabaseManager
         self.mqtt_client = mqtt_client
         self.alert_system = alert_system
         self.audio_config = self.config_data.get('audio', {}) or {}
@@ -347,6 +350,8 @@ class HealthMonitorApp(MDApp):
             )
         
         # Initialize sensors from config or use provided ones
+        # (sensors.scheduler.enabled → một AcquisitionScheduler chung thay cho thread mỗi sensor)
+        self.acquisition_scheduler = None
         if sensors is None:
             self.sensors = self._create_sensors_from_config()
         else:
@@ -413,11 +418,17 @@ class HealthMonitorApp(MDApp):
         try:
             sensor_configs = self.config_data.get('sensors', {})
             
+            scheduler_config = sensor_configs.get('scheduler', {}) or {}
+            if scheduler_config.get('enabled', False) and AcquisitionScheduler:
+                self.acquisition_scheduler = AcquisitionScheduler()
+                self.logger.info("Sensors share one acquisition scheduler")
+            
             # Create MAX30102 sensor if enabled
             if sensor_configs.get('max30102', {}).get('enabled', False) and MAX30102Sensor:
                 try:
                     max30102_config = sensor_configs['max30102']
                     sensor = MAX30102Sensor(max30102_config)
+                    self._attach_scheduler(sensor)
                     if sensor.initialize():
                         sensors['MAX30102'] = sensor
                         self.logger.info("MAX30102 sensor created and initialized")
@@ -431,6 +442,7 @@ class HealthMonitorApp(MDApp):
                 try:
                     mlx90614_config = sensor_configs['mlx90614']
                     sensor = MLX90614Sensor(mlx90614_config)
+                    self._attach_scheduler(sensor)
                     if sensor.initialize():
                         sensors['MLX90614'] = sensor
                         self.logger.info("MLX90614 sensor created and initialized")
@@ -462,6 +474,7 @@ class HealthMonitorApp(MDApp):
                         self.logger.info("🚀 Attempting to create BloodPressure sensor...")
                         # Truyền speak_callback vào BloodPressureSensor
                         sensor = BloodPressureSensor('BloodPressure', bp_config, speak_callback=self._speak_scenario)
+                        self._attach_scheduler(sensor)
                         self.logger.info("🔧 BloodPressure sensor object created, calling initialize()...")
                         if sensor.initialize():
                             sensors['BloodPressure'] = sensor
@@ -483,6 +496,11 @@ class HealthMonitorApp(MDApp):
         
         return sensors
 
+    def _attach_scheduler(self, sensor: Any) -> None:
+        """Gắn acquisition scheduler chung (nếu bật) trước khi sensor initialize/start"""
+        if self.acquisition_scheduler is not None and hasattr(sensor, 'set_scheduler'):
+            sensor.set_scheduler(self.acquisition_scheduler)
+
     @staticmethod
     def _normalize_sensor_keys(sensors: Dict[str, Any]) -> Dict[str, Any]:
         mapping = {
@@ -899,7 +917,7 @@ class HealthMonitorApp(MDApp):
                     self._speak_scenario(ScenarioID.HR_SIGNAL_WEAK)
             
             # Update timestamp
-            self.current_data['timestamp'] = data.get('timestamp', time.time())
+            self.current_data['timestamp'] = time.time()
             
             # Trigger immediate UI update
             Clock.schedule_once(lambda dt: self.update_displays(dt), 0)
@@ -1123,85 +1141,59 @@ class HealthMonitorApp(MDApp):
         end_time: Optional[datetime] = None,
         limit: int = 200,
     ) -> List[Dict[str, Any]]:
-        """Fetch historical measurement records from database or fallback storage."""
+        """Fetch historical measurement records from the local database (Core-SQL read path)."""
         # Device-centric: resolve patient_id from cloud database
         patient_id = self._resolve_patient_id_from_device()
         
         self.logger.debug(f"get_history_records called: patient_id={patient_id}, device_id={self.device_id}, start_time={start_time}")
 
-        if self.database and hasattr(self.database, 'get_health_records'):
-            try:
-                # Device-centric: pass device_id as PRIMARY, patient_id as secondary
-                records = self.database.get_health_records(
+        reader = self._get_history_reader()
+        if reader is None:
+            return []
+
+        try:
+            # Device-centric: device_id PRIMARY, patient_id khi device chưa có record
+            records = reader.health_records(
+                patient_id=patient_id,
+                device_id=self.device_id,
+                start_time=start_time,
+                end_time=end_time,
+                limit=limit,
+            )
+            if not records and patient_id and self.device_id:
+                self.logger.debug("No records for device %s, querying patient %s", self.device_id, patient_id)
+                records = reader.health_records(
                     patient_id=patient_id,
-                    device_id=self.device_id,
                     start_time=start_time,
                     end_time=end_time,
                     limit=limit,
                 )
-                self.logger.debug(f"DatabaseManager returned {len(records) if records else 0} records")
-                if records:
-                    return records
-                else:
-                    self.logger.warning("DatabaseManager returned 0 records, trying fallback...")
-            except Exception as exc:
-                self.logger.error("Database history retrieval failed: %s", exc, exc_info=True)
-
-        db_path = project_root / "data" / "health_monitor.db"
-        if not db_path.exists():
-            return []
-
-        # Query schema health_records (không phải vitals cũ)
-        query = "SELECT id, timestamp, heart_rate, spo2, temperature, systolic_bp, diastolic_bp FROM health_records"
-        filters: List[str] = []
-        params: List[Any] = []
-        
-        # Device-centric: filter by device_id if patient_id is None
-        if patient_id:
-            filters.append("patient_id = ?")
-            params.append(patient_id)
-        elif self.device_id:
-            filters.append("device_id = ?")
-            params.append(self.device_id)
-            
-        if start_time:
-            filters.append("timestamp >= ?")
-            params.append(start_time.isoformat())
-        if end_time:
-            filters.append("timestamp <= ?")
-            params.append(end_time.isoformat())
-        if filters:
-            query += " WHERE " + " AND ".join(filters)
-        query += " ORDER BY timestamp DESC LIMIT ?"
-        params.append(int(limit))
-
-        results: List[Dict[str, Any]] = []
-        try:
-            with closing(sqlite3.connect(db_path)) as conn:
-                conn.row_factory = sqlite3.Row
-                with closing(conn.cursor()) as cursor:
-                    cursor.execute(query, params)
-                    for row in cursor.fetchall():
-                        try:
-                            ts = datetime.fromisoformat(row["timestamp"].strip()) if row["timestamp"] else None
-                        except (ValueError, AttributeError):
-                            ts = None
-                        results.append(
-                            {
-                                'id': row['id'],
-                                'timestamp': ts,
-                                'heart_rate': row['heart_rate'],
-                                'spo2': row['spo2'],
-                                'temperature': row['temperature'],
-                                'blood_pressure_systolic': row['systolic_bp'],
-                                'blood_pressure_diastolic': row['diastolic_bp'],
-                            }
-                        )
+            self.logger.debug(f"History reader returned {len(records)} records")
+            return records
         except Exception as exc:
-            self.logger.error("Failed to read fallback history: %s", exc)
+            self.logger.error("History retrieval failed: %s", exc, exc_info=True)
             return []
 
-        return results
+    def _get_history_reader(self):
+        """HealthDataReader của DatabaseManager, hoặc reader riêng trên data/health_monitor.db"""
+        if self.database is not None and getattr(self.database, 'reader', None) is not None:
+            return self.database.reader
+
+        if self._history_reader is None:
+            db_path = project_root / "data" / "health_monitor.db"
+            if not db_path.exists():
+                return None
+            try:
+                from src.data.readers import HealthDataReader
+                from src.data.storage_profile import create_sqlite_engine, resolve_storage_profile
+
+                # Cùng PRAGMA (WAL, busy_timeout...) với DatabaseManager
+                engine = create_sqlite_engine(str(db_path), resolve_storage_profile(None, self.logger))
+                self._history_reader = HealthDataReader(engine)
+            except Exception as exc:
+                self.logger.error("Failed to open history database: %s", exc)
+                return None
+        return self._history_reader
     
     def save_measurement_to_database(self, measurement_data: Dict[str, Any]):
         """
@@ -1212,6 +1204,9 @@ class HealthMonitorApp(MDApp):
                 Required: timestamp
                 Optional: heart_rate, spo2, temperature, systolic, diastolic, 
                          signal_quality_index, spo2_cv, peak_count, measurement_elapsed
+        
+        Returns:
+            Future (write-behind, resolve bằng record_id) hoặc record_id / None
         """
         try:
             # ============================================================
@@ -1308,62 +1303,101 @@ class HealthMonitorApp(MDApp):
                     if metadata:
                         health_data['sensor_data'] = metadata  # Lưu metadata vào sensor_data JSON column
                     
+                    # Write-behind: commit + cloud sync không chạy trên UI thread,
+                    # thông báo / alert / MQTT xử lý tiếp qua Clock khi có record_id
+                    if hasattr(self.database, 'submit_health_record'):
+                        future = self.database.submit_health_record(health_data)
+                        future.add_done_callback(
+                            lambda f: Clock.schedule_once(
+                                lambda dt: self._on_measurement_saved(f.result(), measurement_data, health_data, patient_id), 0
+                            )
+                        )
+                        return future
+                    
                     # Gọi DatabaseManager.save_health_record() - CHỈ 1 ARGUMENT
                     record_id = self.database.save_health_record(health_data)
-                    
                     if record_id:
-                        self.logger.info(
-                            f"✅ Measurement saved to DatabaseManager (record_id={record_id}, patient={patient_id})"
-                        )
-                        
-                        # ============================================================
-                        # USER FEEDBACK: Show success notification
-                        # ============================================================
-                        self._show_success_notification(
-                            f"Đã lưu kết quả (ID: {record_id})",
-                            duration=2
-                        )
-                        
-                        # Kiểm tra ngưỡng và tạo alert nếu cần
-                        self._check_and_create_alert(patient_id, health_data, record_id)
-                        
-                        # ============================================================
-                        # MQTT PUBLISHING: Publish vitals to MQTT broker
-                        # ============================================================
-                        if self.mqtt_integration:
-                            # Determine measurement type
-                            measurement_type = 'heart_rate'
-                            if health_data.get('temperature'):
-                                measurement_type = 'temperature'
-                            elif health_data.get('systolic_bp'):
-                                measurement_type = 'blood_pressure'
-                            
-                            # Publish vitals
-                            self.mqtt_integration.publish_vitals_from_measurement(
-                                measurement_data=measurement_data,
-                                measurement_type=measurement_type
-                            )
-                        
-                        return record_id
-                    else:
-                        self.logger.warning("DatabaseManager.save_health_record() returned None - falling back to local DB")
+                        return self._on_measurement_saved(record_id, measurement_data, health_data, patient_id)
+                    self.logger.warning("DatabaseManager.save_health_record() returned None - falling back to local DB")
                         
                 except Exception as exc:
                     self.logger.error(f"DatabaseManager save failed: {exc}", exc_info=True)
                     self.logger.warning("Falling back to local health_monitor.db")
 
             # Fallback về SQLite cục bộ nếu DatabaseManager fail hoặc không có
-            if self._save_to_local_vitals(measurement_data):
-                self.logger.info("Measurement saved to local health_monitor.db (fallback)")
-                self._show_success_notification("Đã lưu kết quả (local)", duration=2)
-            else:
-                self.logger.error("Unable to persist measurement data to any database")
-                self._show_error_notification("Không thể lưu dữ liệu vào database")
+            self._save_measurement_fallback(measurement_data)
                 
         except Exception as e:
             self.logger.error(f"Critical error in save_measurement_to_database: {e}", exc_info=True)
             self._show_error_notification(f"Lỗi khi lưu: {str(e)}")
 
+    def _on_measurement_saved(self, record_id: Optional[int], measurement_data: Dict[str, Any],
+                              health_data: Dict[str, Any], patient_id: Optional[str]) -> Optional[int]:
+        """
+        Xử lý sau khi health record được commit: thông báo, alert, MQTT
+        
+        Args:
+            record_id: ID record (None nếu DatabaseManager lưu lỗi → fallback local DB)
+            measurement_data: Dữ liệu đo gốc
+            health_data: Dữ liệu đã gửi cho DatabaseManager
+            patient_id: Patient ID (có thể None với device-centric)
+            
+        Returns:
+            record_id nếu lưu thành công
+        """
+        try:
+            if not record_id:
+                self.logger.warning("DatabaseManager.save_health_record() returned None - falling back to local DB")
+                self._save_measurement_fallback(measurement_data)
+                return None
+            
+            self.logger.info(
+                f"✅ Measurement saved to DatabaseManager (record_id={record_id}, patient={patient_id})"
+            )
+
+            # ============================================================
+            # USER FEEDBACK: Show success notification
+            # ============================================================
+            self._show_success_notification(
+                f"Đã lưu kết quả (ID: {record_id})",
+                duration=2
+            )
+
+            # Kiểm tra ngưỡng và tạo alert nếu cần
+            self._check_and_create_alert(patient_id, health_data, record_id)
+
+            # ============================================================
+            # MQTT PUBLISHING: Publish vitals to MQTT broker
+            # ============================================================
+            if self.mqtt_integration:
+                # Determine measurement type
+                measurement_type = 'heart_rate'
+                if health_data.get('temperature'):
+                    measurement_type = 'temperature'
+                elif health_data.get('systolic_bp'):
+                    measurement_type = 'blood_pressure'
+
+                # Publish vitals
+                self.mqtt_integration.publish_vitals_from_measurement(
+                    measurement_data=measurement_data,
+                    measurement_type=measurement_type
+                )
+            
+            return record_id
+            
+        except Exception as e:
+            self.logger.error(f"Error after saving measurement {record_id}: {e}", exc_info=True)
+            return record_id
+
+    def _save_measurement_fallback(self, measurement_data: Dict[str, Any]):
+        """Lưu vào SQLite cục bộ khi DatabaseManager fail hoặc không có"""
+        if self._save_to_local_vitals(measurement_data):
+            self.logger.info("Measurement saved to local health_monitor.db (fallback)")
+            self._show_success_notification("Đã lưu kết quả (local)", duration=2)
+        else:
+            self.logger.error("Unable to persist measurement data to any database")
+            self._show_error_notification("Không thể lưu dữ liệu vào database")
+
     def _resolve_patient_id_from_device(self) -> Optional[str]:
         """
         Resolve patient_id từ device_id thông qua cloud database
@@ -1820,48 +1854,17 @@ class HealthMonitorApp(MDApp):
                             'timestamp': datetime.now()
                         }
                         
-                        alert_id = self.database.save_alert(alert_dict)
-                        self.logger.info(
-                            f"⚠️  Alert created: {alert_data['type']} (severity={alert_data['severity']}, "
-                            f"alert_id={alert_id}, patient={resolved_patient_id}, device={self.device_id})"
-                        )
-                        
-                        # ============================================================
-                        # MQTT PUBLISHING: Publish alert to MQTT broker
-                        # ============================================================
-                        if self.mqtt_integration and alert_id:
-                            # Get threshold range
-                            threshold_val = alert_data.get('threshold')
-                            if isinstance(threshold_val, str) and '/' in threshold_val:
-                                # Blood pressure format "120/80"
-                                parts = threshold_val.split('/')
-                                threshold_min = float(parts[0]) if alert_data['type'].startswith('low') else 0
-                                threshold_max = float(parts[0]) if alert_data['type'].startswith('high') else 999
-                            else:
-                                threshold_min = float(threshold_val) if alert_data['type'].startswith('low') else 0
-                                threshold_max = float(threshold_val) if alert_data['type'].startswith('high') else 999
-                            
-                            # Convert value to float
-                            value = alert_data.get('value')
-                            if isinstance(value, str) and '/' in value:
-                                # Blood pressure "120/80" -> use systolic
-                                value = float(value.split('/')[0])
-                            else:
-                                value = float(value) if value else 0
-                            
-                            self.mqtt_integration.publish_alert_from_threshold_check(
-                                alert_type=alert_data['type'],
-                                severity=alert_data['severity'],
-                                vital_sign=alert_data.get('vital_sign', 'unknown'),
-                                current_value=value,
-                                threshold_min=threshold_min,
-                                threshold_max=threshold_max,
-                                message=alert_data['message']
+                        if hasattr(self.database, 'submit_alert'):
+                            # Write-behind: không chờ commit trên UI thread, xử lý tiếp qua Clock
+                            alert_future = self.database.submit_alert(alert_dict)
+                            alert_future.add_done_callback(
+                                lambda f, data=alert_data, pid=resolved_patient_id: Clock.schedule_once(
+                                    lambda dt: self._on_threshold_alert_saved(f.result(), data, pid), 0
+                                )
                             )
-                        
-                        # Gửi TTS warning nếu severity cao
-                        if alert_data['severity'] in ('high', 'critical'):
-                            self.speak_text(alert_data['message'], force=True)
+                        else:
+                            alert_id = self.database.save_alert(alert_dict)
+                            self._on_threshold_alert_saved(alert_id, alert_data, resolved_patient_id)
                             
                 except Exception as alert_exc:
                     self.logger.error(f"Failed to create alert: {alert_exc}")
@@ -1869,6 +1872,61 @@ class HealthMonitorApp(MDApp):
         except Exception as e:
             self.logger.error(f"Error checking thresholds and creating alerts: {e}", exc_info=True)
 
+    def _on_threshold_alert_saved(self, alert_id: Optional[int], alert_data: Dict[str, Any],
+                                  resolved_patient_id: Optional[str]):
+        """
+        Xử lý sau khi alert được commit: log, MQTT publish, TTS
+        
+        Args:
+            alert_id: ID alert (None nếu lưu lỗi)
+            alert_data: Alert từ threshold check
+            resolved_patient_id: Patient ID đã resolve (có thể None)
+        """
+        try:
+            self.logger.info(
+                f"⚠️  Alert created: {alert_data['type']} (severity={alert_data['severity']}, "
+                f"alert_id={alert_id}, patient={resolved_patient_id}, device={self.device_id})"
+            )
+
+            # ============================================================
+            # MQTT PUBLISHING: Publish alert to MQTT broker
+            # ============================================================
+            if self.mqtt_integration and alert_id:
+                # Get threshold range
+                threshold_val = alert_data.get('threshold')
+                if isinstance(threshold_val, str) and '/' in threshold_val:
+                    # Blood pressure format "120/80"
+                    parts = threshold_val.split('/')
+                    threshold_min = float(parts[0]) if alert_data['type'].startswith('low') else 0
+                    threshold_max = float(parts[0]) if alert_data['type'].startswith('high') else 999
+                else:
+                    threshold_min = float(threshold_val) if alert_data['type'].startswith('low') else 0
+                    threshold_max = float(threshold_val) if alert_data['type'].startswith('high') else 999
+
+                # Convert value to float
+                value = alert_data.get('value')
+                if isinstance(value, str) and '/' in value:
+                    # Blood pressure "120/80" -> use systolic
+                    value = float(value.split('/')[0])
+                else:
+                    value = float(value) if value else 0
+
+                self.mqtt_integration.publish_alert_from_threshold_check(
+                    alert_type=alert_data['type'],
+                    severity=alert_data['severity'],
+                    vital_sign=alert_data.get('vital_sign', 'unknown'),
+                    current_value=value,
+                    threshold_min=threshold_min,
+                    threshold_max=threshold_max,
+                    message=alert_data['message']
+                )
+
+            # Gửi TTS warning nếu severity cao
+            if alert_data['severity'] in ('high', 'critical'):
+                self.speak_text(alert_data['message'], force=True)
+        except Exception as alert_exc:
+            self.logger.error(f"Failed to create alert: {alert_exc}")
+
     def _save_to_local_vitals(self, measurement_data: Dict[str, Any]) -> bool:
         db_path = project_root / "data" / "health_monitor.db"
         try:
@@ -1974,6 +2032,9 @@ class HealthMonitorApp(MDApp):
             except Exception as e:
                 self.logger.error(f"Error stopping sensor {sensor_name}: {e}")
         
+        if self.acquisition_scheduler is not None:
+            self.acquisition_scheduler.stop()
+        
         # Close database
         if self.database:
             try:
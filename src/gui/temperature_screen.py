@@ -580,6 +580,10 @@ class TemperatureScreen(Screen):
                 self.logger.error("Failed to start MLX90614 sensor on demand")
                 return
 
+            sensor = self.app_instance.sensors.get('MLX90614')
+            if sensor and hasattr(sensor, "begin_measurement_session"):
+                sensor.begin_measurement_session()
+
             self.measuring = True
             self.measurement_start_ts = time.time()
             self.body_detected_ts = None  # Reset - chờ phát hiện cơ thể
@@ -641,6 +645,9 @@ class TemperatureScreen(Screen):
         except Exception as e:
             self.logger.error(f"Error stopping measurement: {e}")
         finally:
+            sensor = self.app_instance.sensors.get('MLX90614')
+            if sensor and hasattr(sensor, "end_measurement_session"):
+                sensor.end_measurement_session()
             try:
                 self.app_instance.stop_sensor('MLX90614')
             except Exception as sensor_error:
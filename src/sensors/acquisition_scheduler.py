@@ -0,0 +1,355 @@
+"""
+Acquisition Scheduler - Một thread đọc chung cho mọi sensor
+===========================================================
+
+Mặc định mỗi BaseSensor.start() sinh một thread _reading_loop riêng (sleep
+theo sample_rate hoặc chặn trong read_raw_data). Với nhiều sensor trên cùng
+bus I²C + GPIO, các thread này tranh nhau GIL/bus và mỗi thread tự trôi
+pha. AcquisitionScheduler gom toàn bộ vào một event loop theo deadline:
+
+- Mỗi sensor là một task định kỳ (rate Hz, priority)
+- Heap (deadline, -priority, seq): task đến hạn sớm nhất chạy trước; cùng
+  đến hạn → priority cao hơn chạy trước
+- Deadline nằm trên lưới k × period (monotonic clock): các sensor cùng rate
+  hoặc rate bội nhau đến hạn cùng lúc → thứ tự quyết định bởi priority
+- Một lần chạy = BaseSensor.acquire_once() (đọc → validate → process →
+  publish). Sensor đọc không chặn khi được schedule (is_scheduled):
+  HX710B kiểm tra DOUT/stream, MAX30102 interrupt kiểm tra mức INT
+- Trễ quá một chu kỳ → overrun: bỏ các tick đã lỡ (không chạy bù dồn
+  dập), giữ nguyên pha của lưới deadline
+- Chỉ một thread truy cập bus → các giao dịch I²C của MAX30102/MLX90614
+  không bao giờ chồng nhau
+- set_rate(): đổi rate lúc đang chạy (RateGovernor giảm rate khi idle)
+
+Metrics (mỗi sensor): jitter (trễ bắt đầu so với deadline), thời gian
+chạy, số overrun và số tick bị bỏ - xem get_metrics().
+
+Config (sensors.scheduler):
+--------------------------
+    scheduler:
+      enabled: false       # true → mọi sensor dùng chung scheduler
+    max30102:
+      scheduler_priority: 10
+      scheduler_rate: 50   # Hz (tùy chọn, mặc định BaseSensor.get_schedule_rate())
+
+Usage Example:
+-------------
+>>> scheduler = AcquisitionScheduler()
+>>> sensor.set_scheduler(scheduler)
+>>> sensor.start()                     # Đăng ký task thay vì tạo thread
+>>> scheduler.get_metrics()['MAX30102']['jitter']['p95_us']
+>>> sensor.stop(); scheduler.stop()
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+
+from .timing_stats import LatencyHistogram
+
+
+# ==================== CONSTANTS ====================
+
+MIN_RATE_HZ = 0.1
+MAX_RATE_HZ = 1000.0
+IDLE_WAIT_S = 1.0  # Không có task: chờ tối đa 1 s rồi kiểm tra lại
+
+
+# ==================== TASK ====================
+
+@dataclass
+class ScheduledTask:
+    """
+    Một sensor trong scheduler
+
+    Attributes:
+        sensor: BaseSensor được schedule
+        period (float): Chu kỳ (giây)
+        priority (int): Ưu tiên (lớn hơn = chạy trước khi cùng đến hạn)
+        deadline (float): Deadline kế tiếp (time.monotonic())
+    """
+
+    sensor: Any
+    period: float
+    priority: int
+    deadline: float
+    active: bool = True
+    running: bool = False
+    generation: int = 0       # Tăng khi đổi rate → entry cũ trong heap bị bỏ qua
+    runs: int = 0
+    overruns: int = 0
+    skipped_ticks: int = 0
+    errors: int = 0
+    jitter: LatencyHistogram = field(default_factory=LatencyHistogram)
+    duration: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'rate_hz': 1.0 / self.period,
+            'priority': self.priority,
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'skipped_ticks': self.skipped_ticks,
+            'errors': self.errors,
+            'jitter': self.jitter.summary(),
+            'duration': self.duration.summary(),
+        }
+
+
+# ==================== SCHEDULER ====================
+
+class AcquisitionScheduler:
+    """
+    Event loop theo deadline multiplex nhiều sensor trên một thread
+
+    Attributes:
+        name (str): Tên thread
+        is_running (bool): Thread scheduler đang chạy
+    """
+
+    def __init__(self, name: str = "acquisition", logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            name: Tên scheduler (tên thread)
+            logger: Logger instance
+        """
+        self.name = name
+        self.logger = logger or logging.getLogger(f"AcquisitionScheduler.{name}")
+        self.is_running = False
+
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, int, ScheduledTask, int]] = []
+        self._tasks: Dict[str, ScheduledTask] = {}
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self) -> bool:
+        """
+        Start thread scheduler (gọi tự động khi add() task đầu tiên)
+
+        Returns:
+            bool: True nếu đang chạy
+        """
+        with self._cond:
+            if self.is_running:
+                return True
+            self.is_running = True
+            self._thread = threading.Thread(target=self._run, name=f"sched-{self.name}", daemon=True)
+            self._thread.start()
+
+        self.logger.info(f"Acquisition scheduler '{self.name}' started")
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Dừng thread scheduler (không stop sensor - sensor.stop() gỡ task riêng)
+
+        Args:
+            timeout: Thời gian chờ thread kết thúc (giây)
+        """
+        with self._cond:
+            if not self.is_running:
+                return
+            self.is_running = False
+            self._cond.notify_all()
+
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        self.logger.info(f"Acquisition scheduler '{self.name}' stopped")
+
+    # ==================== TASKS ====================
+
+    def add(self, sensor: Any, rate: Optional[float] = None, priority: Optional[int] = None) -> bool:
+        """
+        Đăng ký sensor (gọi từ BaseSensor.start())
+
+        Args:
+            sensor: BaseSensor đã initialize() và is_running=True
+            rate: Tần số (Hz), mặc định sensor.get_schedule_rate()
+            priority: Ưu tiên, mặc định sensor.scheduler_priority
+
+        Returns:
+            bool: True nếu thành công
+        """
+        rate = rate if rate is not None else sensor.get_schedule_rate()
+        if not rate or rate <= 0:
+            self.logger.error(f"Invalid schedule rate for {sensor.name}: {rate}")
+            return False
+        rate = min(max(float(rate), MIN_RATE_HZ), MAX_RATE_HZ)
+        priority = int(priority if priority is not None else getattr(sensor, 'scheduler_priority', 0))
+
+        self.remove(sensor)
+        period = 1.0 / rate
+        deadline = math.ceil(time.monotonic() / period) * period  # Căn theo lưới period
+        task = ScheduledTask(sensor=sensor, period=period, priority=priority, deadline=deadline)
+
+        with self._cond:
+            self._tasks[sensor.name] = task
+            self._push(task)
+            self._cond.notify_all()
+
+        self.logger.info(f"Scheduled {sensor.name} @ {rate:.1f} Hz (priority {priority})")
+        return self.start()
+
+    def set_rate(self, sensor: Any, rate: float) -> bool:
+        """
+        Đổi rate của sensor đang được schedule (giữ metrics)
+
+        Deadline kế tiếp căn lại theo lưới period mới - tăng rate có hiệu
+        lực ngay, không phải chờ hết chu kỳ cũ.
+
+        Args:
+            sensor: BaseSensor đã add()
+            rate: Tần số mới (Hz)
+
+        Returns:
+            bool: True nếu sensor đang được schedule
+        """
+        if not rate or rate <= 0:
+            self.logger.error(f"Invalid schedule rate for {sensor.name}: {rate}")
+            return False
+        rate = min(max(float(rate), MIN_RATE_HZ), MAX_RATE_HZ)
+
+        with self._cond:
+            task = self._tasks.get(sensor.name)
+            if task is None or task.sensor is not sensor:
+                return False
+            period = 1.0 / rate
+            if period == task.period:
+                return True
+            task.period = period
+            task.deadline = math.ceil(time.monotonic() / period) * period
+            task.generation += 1
+            if not task.running:
+                # Đang chạy → _run tự reschedule theo period mới
+                self._push(task)
+            self._cond.notify_all()
+
+        self.logger.debug(f"Rescheduled {sensor.name} @ {rate:.1f} Hz")
+        return True
+
+    def remove(self, sensor: Any, timeout: float = 2.0) -> bool:
+        """
+        Gỡ sensor; chờ lần chạy hiện tại (nếu có) kết thúc trước khi trả về
+        để sensor.cleanup() không đụng vào bus đang được đọc
+
+        Args:
+            sensor: BaseSensor
+            timeout: Thời gian chờ tối đa (giây)
+
+        Returns:
+            bool: True nếu sensor đã được gỡ
+        """
+        with self._cond:
+            task = self._tasks.get(sensor.name)
+            if task is None or task.sensor is not sensor:
+                return False
+            task.active = False
+            del self._tasks[sensor.name]
+
+            if threading.current_thread() is not self._thread:
+                self._cond.wait_for(lambda: not task.running, timeout)
+            self._cond.notify_all()
+        return True
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Metrics theo sensor
+
+        Returns:
+            dict: {sensor_name: {rate_hz, priority, runs, overruns,
+                   skipped_ticks, errors, jitter{...}, duration{...}}}
+                   (jitter/duration: LatencyHistogram.summary(), µs)
+        """
+        with self._cond:
+            tasks = list(self._tasks.items())
+        return {name: task.metrics() for name, task in tasks}
+
+    def reset_metrics(self) -> None:
+        """Xóa metrics của mọi task"""
+        with self._cond:
+            for task in self._tasks.values():
+                task.runs = task.overruns = task.skipped_ticks = task.errors = 0
+                task.jitter.reset()
+                task.duration.reset()
+
+    # ==================== EVENT LOOP ====================
+
+    def _push(self, task: ScheduledTask) -> None:
+        heapq.heappush(self._heap, (task.deadline, -task.priority, next(self._seq), task, task.generation))
+
+    def _next_task(self) -> Optional[ScheduledTask]:
+        """Chờ tới khi task đầu heap đến hạn (None khi scheduler dừng)"""
+        with self._cond:
+            while self.is_running:
+                # Bỏ entry của task đã gỡ / entry cũ trước khi đổi rate
+                while self._heap and (
+                    not self._heap[0][3].active or self._heap[0][4] != self._heap[0][3].generation
+                ):
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._cond.wait(IDLE_WAIT_S)
+                    continue
+
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                task = heapq.heappop(self._heap)[3]
+                task.running = True
+                return task
+        return None
+
+    def _run(self) -> None:
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+
+            sensor = task.sensor
+            started = time.monotonic()
+            task.jitter.record(max(0.0, started - task.deadline))
+
+            try:
+                sensor.acquire_once()
+            except Exception as e:
+                task.errors += 1
+                sensor._handle_error(f"Exception in scheduled read: {e}")
+
+            finished = time.monotonic()
+            task.duration.record(finished - started)
+            task.runs += 1
+
+            with self._cond:
+                task.running = False
+                if task.active and sensor.is_running:
+                    self._reschedule(task, finished)
+                elif task.active:
+                    # Sensor tự dừng (vượt max_error_count) → gỡ task
+                    task.active = False
+                    self._tasks.pop(sensor.name, None)
+                self._cond.notify_all()
+
+    def _reschedule(self, task: ScheduledTask, now: float) -> None:
+        """Deadline kế tiếp trên lưới cố định; lỡ tick → overrun, bỏ tick"""
+        next_deadline = task.deadline + task.period
+        if next_deadline <= now:
+            missed = int((now - task.deadline) / task.period)
+            task.overruns += 1
+            task.skipped_ticks += missed
+            next_deadline = task.deadline + (missed + 1) * task.period
+        task.deadline = next_deadline
+        self._push(task)
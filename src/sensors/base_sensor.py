@@ -10,15 +10,22 @@ IMPROVEMENTS:
 5. Blocking mode support for low-SPS sensors (e.g., HX710B)
 6. get_raw_value() utility method for debugging/calibration
 7. Calibration data passed to __init__ for process_data() access
+8. Optional AcquisitionScheduler: start() registers a scheduled task
+   instead of spawning a per-sensor reading thread
+9. SensorChannel: versioned lock-free snapshots + bounded subscriber queues
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Optional, Callable, Dict
+from typing import Any, Optional, Callable, Dict, Mapping
 import threading
 import time
 import logging
 from datetime import datetime
 
+from .sensor_channel import DEFAULT_QUEUE_SIZE, SensorChannel, Snapshot, Subscription
+from .readings import SensorReading
+from .rate_governor import RateGovernor
+
 
 class BaseSensor(ABC):
     """
@@ -38,13 +45,16 @@ class BaseSensor(ABC):
         read_timeout_ms (int): Timeout cho read operation (ms) - for blocking mode
         calibration (Dict): Calibration parameters (offset, slope, etc.)
         logger (logging.Logger): Logger instance
-        data_lock (threading.Lock): Lock để thread-safe access
-        latest_data (Dict): Dữ liệu mới nhất từ sensor
+        latest_data (Mapping): Dữ liệu mới nhất đã publish (read-only)
+        channel (SensorChannel): Publish/subscribe (snapshot có version, queue theo consumer)
         error_count (int): Số lần lỗi liên tiếp (NOT incremented for timeouts)
         timeout_count (int): Số lần timeout liên tiếp
         max_error_count (int): Số lỗi tối đa trước khi dừng
         data_callback (Callable): Callback function khi có data mới
         reading_thread (threading.Thread): Thread đọc dữ liệu
+        scheduler (AcquisitionScheduler): Scheduler chung (None → thread riêng)
+        scheduler_priority (int): Ưu tiên trong scheduler (lớn hơn = trước)
+        governor (RateGovernor): Giảm rate / power-down khi idle (None → tắt)
     """
     
     # ==================== INITIALIZATION & SETUP ====================
@@ -61,6 +71,10 @@ class BaseSensor(ABC):
                 - read_timeout_ms (int): Timeout cho read operation (ms) - for blocking mode
                 - max_error_count (int): Số lỗi tối đa (default: 10)
                 - calibration (Dict): Calibration params (offset, slope, etc.)
+                - scheduler_rate (float): Tần số task trong scheduler (Hz, tùy chọn)
+                - scheduler_priority (int): Ưu tiên trong scheduler (default: 0)
+                - rate_governor (Dict): enabled, idle_rate, idle_after_s,
+                  power_down_after_s (xem RateGovernor)
         """
         self.name = name
         self.config = config
@@ -76,10 +90,12 @@ class BaseSensor(ABC):
         
         self.logger = logging.getLogger(f"Sensor.{name}")
         
-        # Thread safety
-        self.data_lock = threading.Lock()
+        # Dữ liệu mới nhất (cùng object với snapshot của channel)
         self.latest_data = None
         
+        # Publish/subscribe: reader không lock, consumer có queue riêng
+        self.channel = SensorChannel(name)
+        
         # Error handling (distinguish timeout vs error)
         self.error_count = 0
         self.timeout_count = 0
@@ -91,6 +107,15 @@ class BaseSensor(ABC):
         # Reading thread
         self.reading_thread = None
         
+        # Acquisition scheduler (set_scheduler) - thay thế reading thread
+        self.scheduler = None
+        self.scheduler_rate = config.get('scheduler_rate')
+        self.scheduler_priority = config.get('scheduler_priority', 0)
+        
+        # Rate governor: giảm rate / power-down khi idle (config rate_governor)
+        governor_config = config.get('rate_governor') or {}
+        self.governor = RateGovernor(self, governor_config) if governor_config.get('enabled', False) else None
+        
         mode_str = "blocking" if self.blocking_mode else f"non-blocking @ {self.sample_rate} Hz"
         self.logger.info(f"Initialized {name} sensor ({mode_str})")
     
@@ -145,9 +170,16 @@ class BaseSensor(ABC):
         self.error_count = 0
         self.timeout_count = 0
         
-        # Start reading thread
-        self.reading_thread = threading.Thread(target=self._reading_loop, daemon=True)
-        self.reading_thread.start()
+        if self.scheduler is not None:
+            # Scheduled task thay cho thread riêng
+            if not self.scheduler.add(self):
+                self.is_running = False
+                self.cleanup()
+                return False
+        else:
+            # Start reading thread
+            self.reading_thread = threading.Thread(target=self._reading_loop, daemon=True)
+            self.reading_thread.start()
         
         self.logger.info(f"Started {self.name} sensor")
         return True
@@ -164,10 +196,18 @@ class BaseSensor(ABC):
             
         self.is_running = False
         
+        # Gỡ khỏi scheduler (chờ lần đọc đang chạy kết thúc)
+        if self.scheduler is not None:
+            self.scheduler.remove(self)
+        
         # Wait for thread to finish
         if self.reading_thread and self.reading_thread.is_alive():
             self.reading_thread.join(timeout=2.0)
         
+        # Lần start() sau bắt đầu lại ở active rate
+        if self.governor is not None:
+            self.governor.reset()
+        
         # Cleanup hardware resources (GPIO, I2C, etc.)
         try:
             self.cleanup()
@@ -225,7 +265,7 @@ class BaseSensor(ABC):
         pass
     
     @abstractmethod
-    def process_data(self, raw_data: Any) -> Optional[Dict[str, Any]]:
+    def process_data(self, raw_data: Any) -> Optional[Mapping[str, Any]]:
         """
         Xử lý dữ liệu thô thành dữ liệu có nghĩa
         
@@ -233,7 +273,8 @@ class BaseSensor(ABC):
             raw_data: Dữ liệu thô từ sensor (Dict|int|float|Tuple)
             
         Returns:
-            Dict chứa processed data hoặc None nếu lỗi
+            Dict hoặc SensorReading (record __slots__, sensor tần số cao)
+            chứa processed data, None nếu lỗi
             
         Example:
             # For HX710B ADC:
@@ -267,6 +308,32 @@ class BaseSensor(ABC):
         """
         return True  # Default: accept all readings
     
+    def is_idle(self) -> bool:
+        """
+        Override hook cho RateGovernor: sensor không có gì để đo
+        
+        Ví dụ:
+        - MAX30102: chưa phát hiện ngón tay
+        - MLX90614: không có vật thể ấm trước cảm biến
+        
+        Returns:
+            bool: True nếu có thể giảm rate (default: never idle)
+        """
+        return False
+    
+    def enter_low_power(self) -> bool:
+        """
+        Override hook: power-down phần cứng khi idle kéo dài
+        
+        Returns:
+            bool: True nếu đã power-down (default: không hỗ trợ)
+        """
+        return False
+    
+    def exit_low_power(self) -> None:
+        """Override hook: bật lại phần cứng sau enter_low_power()"""
+        pass
+    
     # ==================== DATA HANDLING ====================
     
     def get_latest_data(self) -> Optional[Dict[str, Any]]:
@@ -274,10 +341,39 @@ class BaseSensor(ABC):
         Lấy dữ liệu mới nhất đã xử lý
         
         Returns:
-            Dict chứa latest processed data
+            Dict chứa latest processed data (bản copy - caller được sửa;
+            SensorReading được chuyển qua to_dict())
+        """
+        snapshot = self.channel.latest()
+        if snapshot is None:
+            return None
+        data = snapshot.data
+        return data.to_dict() if isinstance(data, SensorReading) else dict(data)
+    
+    def get_snapshot(self, since_version: int = 0) -> Optional[Snapshot]:
+        """
+        Snapshot mới nhất nếu mới hơn since_version (không lock, không copy)
+        
+        Args:
+            since_version: Version consumer đã xử lý (0 = lấy snapshot hiện tại)
+        
+        Returns:
+            Snapshot(version, timestamp, data read-only) hoặc None nếu không có gì mới
+        """
+        return self.channel.read_if_newer(since_version)
+    
+    def subscribe(self, name: str, maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+        """
+        Đăng ký consumer (MQTT, DB, GUI, ...) với queue giới hạn riêng
+        
+        Args:
+            name: Tên consumer (stats)
+            maxsize: Kích thước queue; đầy → bỏ snapshot cũ nhất của consumer này
+        
+        Returns:
+            Subscription (get(timeout), drain(), close())
         """
-        with self.data_lock:
-            return self.latest_data.copy() if self.latest_data else None
+        return self.channel.subscribe(name, maxsize)
     
     def get_raw_value(self) -> Optional[Any]:
         """
@@ -304,8 +400,113 @@ class BaseSensor(ABC):
         """
         self.data_callback = callback
     
+    # ==================== ACQUISITION SCHEDULER ====================
+    
+    def set_scheduler(self, scheduler) -> None:
+        """
+        Dùng AcquisitionScheduler chung thay cho reading thread riêng
+        (gọi trước start())
+        
+        Args:
+            scheduler: AcquisitionScheduler hoặc None (quay về thread riêng)
+        """
+        if self.is_running:
+            self.logger.warning("Cannot change scheduler while running")
+            return
+        self.scheduler = scheduler
+    
+    @property
+    def is_scheduled(self) -> bool:
+        """True khi đang chạy trong scheduler (read_raw_data không được chặn)"""
+        return self.scheduler is not None and self.is_running
+    
+    def get_schedule_rate(self) -> float:
+        """
+        Tần số task trong scheduler (Hz)
+        
+        Default: scheduler_rate nếu có, sample_rate (non-blocking) hoặc
+        20 Hz (blocking - kiểm tra data ready). Subclass override theo
+        tốc độ dữ liệu thực của phần cứng.
+        """
+        if self.scheduler_rate:
+            return float(self.scheduler_rate)
+        return float(self.sample_rate) if not self.blocking_mode else 20.0
+    
     # ==================== READING LOOP ====================
     
+    def acquire_once(self) -> bool:
+        """
+        Một chu kỳ đọc: read → validate → process → publish
+        
+        Dùng chung cho _reading_loop và AcquisitionScheduler. Khi chạy trong
+        scheduler, sensor blocking trả None nghĩa là "chưa có data" (bình
+        thường) nên không tính là timeout. Có governor: cập nhật trạng thái
+        idle trước khi đọc và ghi CPU time của lần đọc.
+        
+        Returns:
+            bool: True nếu có data mới được publish
+        """
+        governor = self.governor
+        if governor is None:
+            return self._acquire()
+        
+        governor.update()
+        started = time.thread_time()
+        try:
+            return self._acquire()
+        finally:
+            governor.record_read(time.thread_time() - started)
+    
+    def _acquire(self) -> bool:
+        """read → validate → process → publish (xem acquire_once)"""
+        # Read raw data (blocks if blocking_mode=True and not scheduled)
+        raw_data = self.read_raw_data()
+        
+        if raw_data is None:
+            if not (self.blocking_mode and self.is_scheduled):
+                # raw_data is None could be timeout or error
+                # Subclass should log specific reason
+                self._handle_timeout("read_raw_data() returned None")
+            return False
+        
+        # Validate reading (sensor-specific hook)
+        if not self._is_valid_reading(raw_data):
+            self.logger.debug("Invalid reading, skipping")
+            return False
+        
+        # Process data
+        processed_data = self.process_data(raw_data)
+        if processed_data is None:
+            self._handle_error("Failed to process data")
+            return False
+        
+        # Add metadata: record (SensorReading) đã có timestamp monotonic;
+        # dict payload giữ timestamp ISO như trước
+        if isinstance(processed_data, SensorReading):
+            processed_data.sensor = self.name
+        else:
+            processed_data['timestamp'] = datetime.now().isoformat()
+            processed_data['sensor'] = self.name
+        
+        # Publish: snapshot có version + fan-out vào queue của các subscriber.
+        # Dict payload: channel giữ bản copy riêng (read-only) → data_callback
+        # nhận processed_data và có sửa cũng không ảnh hưởng snapshot;
+        # SensorReading vốn read-only nên dùng chung
+        published = dict(processed_data) if isinstance(processed_data, dict) else processed_data
+        self.latest_data = self.channel.publish(published).data
+        
+        # Call callback if set
+        if self.data_callback:
+            try:
+                self.data_callback(self.name, processed_data)
+            except Exception as e:
+                self.logger.error(f"Error in data callback: {e}")
+        
+        # Reset error/timeout counts on successful read
+        self.error_count = 0
+        self.timeout_count = 0
+        return True
+    
     def _reading_loop(self):
         """
         Main reading loop chạy trong thread riêng
@@ -314,50 +515,15 @@ class BaseSensor(ABC):
         - blocking_mode=False: sleep-based loop với sample_rate (Hz)
         - blocking_mode=True: continuous loop, read_raw_data() blocks until ready
         """
-        # Calculate sleep time for non-blocking mode
-        sleep_time = 1.0 / self.sample_rate if not self.blocking_mode else 0.01
-        
         while self.is_running:
+            # Tính lại mỗi vòng: sample_rate có thể đổi (set_sample_rate, RateGovernor)
+            sleep_time = 1.0 / self.sample_rate if not self.blocking_mode else 0.01
             try:
                 start_time = time.time()
                 
-                # Read raw data (blocks if blocking_mode=True)
-                raw_data = self.read_raw_data()
+                # Read → validate → process → publish
+                self.acquire_once()
                 
-                if raw_data is not None:
-                    # Validate reading (sensor-specific hook)
-                    if not self._is_valid_reading(raw_data):
-                        self.logger.debug("Invalid reading, skipping")
-                        continue
-                    
-                    # Process data
-                    processed_data = self.process_data(raw_data)
-                    if processed_data is not None:
-                        # Add metadata
-                        processed_data['timestamp'] = datetime.now().isoformat()
-                        processed_data['sensor'] = self.name
-                        
-                        # Update latest data
-                        with self.data_lock:
-                            self.latest_data = processed_data
-                        
-                        # Call callback if set
-                        if self.data_callback:
-                            try:
-                                self.data_callback(self.name, processed_data)
-                            except Exception as e:
-                                self.logger.error(f"Error in data callback: {e}")
-                        
-                        # Reset error/timeout counts on successful read
-                        self.error_count = 0
-                        self.timeout_count = 0
-                    else:
-                        self._handle_error("Failed to process data")
-                else:
-                    # raw_data is None could be timeout or error
-                    # Subclass should log specific reason
-                    self._handle_timeout("read_raw_data() returned None")
-                    
                 # Sleep for remaining time to maintain sample rate (non-blocking mode only)
                 if not self.blocking_mode:
                     elapsed = time.time() - start_time
@@ -439,6 +605,8 @@ class BaseSensor(ABC):
             'timeout_count': self.timeout_count,
             'max_error_count': self.max_error_count,
             'has_data': self.latest_data is not None,
+            'channel': self.channel.get_stats(),
+            'governor': self.governor.get_stats() if self.governor else None,
             'has_calibration': len(self.calibration) > 0,
             'config': self.config.copy()
         }
@@ -47,14 +47,14 @@ Version: 1.0.0
 import logging
 import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Dict, Any, List, Tuple, Callable
+from typing import Optional, Dict, Any, List, Tuple, Callable, Union
 
 import numpy as np
 from scipy import signal
-from scipy.signal import butter, filtfilt, hilbert, detrend
+from scipy.signal import hilbert, detrend, sosfilt, sosfiltfilt
 
 try:
     import RPi.GPIO as GPIO
@@ -63,6 +63,7 @@ except ImportError:
 
 from .base_sensor import BaseSensor
 from .hx710b_sensor import HX710BSensor
+from .filter_design import FilterDesign, get_bandpass_design
 
 
 # ==================== DATA MODELS ====================
@@ -130,6 +131,146 @@ class BloodPressureMeasurement:
         }
 
 
+@dataclass
+class EnvelopeAnalysis:
+    """
+    Đặc trưng envelope tính một lần (vectorized) cho một record pha xả
+
+    Dùng chung cho SYS/DIA (crossing, local maxima, nearest amplitude), HR
+    (inter-beat intervals), quality (noise power) và confidence (mean/std),
+    thay cho mỗi bước tự quét lại envelope / oscillations bằng vòng lặp.
+    Không phụ thuộc sys_ratio/dia_ratio → dùng lại được khi quét ratio.
+
+    Attributes:
+        envelope: Envelope đã làm mượt
+        map_idx: Index biên độ lớn nhất (MAP)
+        map_amplitude: Biên độ tại MAP
+        local_maxima: Index i với envelope[i] > cả hai lân cận (tăng dần)
+        beat_indices: Đỉnh oscillations (find_peaks, cách nhau ≥ 0.5 s)
+        beat_intervals: Inter-beat intervals (s) từ timestamps
+        mean: Trung bình envelope
+        std: Độ lệch chuẩn envelope
+        noise_power: var(envelope - savgol(envelope, 11, 2))
+    """
+    envelope: np.ndarray
+    map_idx: int
+    map_amplitude: float
+    local_maxima: np.ndarray
+    beat_indices: np.ndarray
+    beat_intervals: np.ndarray
+    mean: float
+    std: float
+    noise_power: float
+
+    @classmethod
+    def compute(
+        cls,
+        oscillations: np.ndarray,
+        envelope: np.ndarray,
+        timestamps: np.ndarray,
+        sample_rate: float
+    ) -> 'EnvelopeAnalysis':
+        """
+        Một pass NumPy trên envelope + một find_peaks trên oscillations
+
+        Args:
+            oscillations: Tín hiệu đã bandpass
+            envelope: Envelope của oscillations
+            timestamps: Timestamp (seconds)
+            sample_rate: Sample rate (Hz) - khoảng cách tối thiểu giữa beats
+        """
+        envelope = np.asarray(envelope, dtype=np.float64)
+        map_idx = int(np.argmax(envelope))
+
+        middle = envelope[1:-1]
+        local_maxima = np.flatnonzero((middle > envelope[:-2]) & (middle > envelope[2:])) + 1
+
+        beat_indices, _ = signal.find_peaks(oscillations, distance=max(1, int(sample_rate * 0.5)))
+        beat_intervals = np.diff(np.asarray(timestamps)[beat_indices])
+
+        return cls(
+            envelope=envelope,
+            map_idx=map_idx,
+            map_amplitude=float(envelope[map_idx]),
+            local_maxima=local_maxima,
+            beat_indices=beat_indices,
+            beat_intervals=beat_intervals,
+            mean=float(np.mean(envelope)),
+            std=float(np.std(envelope)),
+            noise_power=float(np.var(envelope - signal.savgol_filter(envelope, 11, 2))),
+        )
+
+    def crossings(
+        self,
+        sys_thresholds: np.ndarray,
+        dia_thresholds: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Crossing đầu tiên cho nhiều ngưỡng cùng lúc (broadcast ngưỡng × mẫu)
+
+        SYS: i đầu tiên trong [1, map_idx) với envelope[i-1] < t <= envelope[i]
+        DIA: i đầu tiên trong (map_idx, n) với envelope[i-1] > t >= envelope[i]
+
+        Args:
+            sys_thresholds: Ngưỡng SYS (k,)
+            dia_thresholds: Ngưỡng DIA (k,)
+
+        Returns:
+            (sys_idx, dia_idx): int arrays (k,), -1 nếu không có crossing
+        """
+        env = self.envelope
+        map_idx = self.map_idx
+
+        sys_t = np.asarray(sys_thresholds, dtype=np.float64)[:, None]
+        rising = (env[:max(map_idx - 1, 0)] < sys_t) & (sys_t <= env[1:max(map_idx, 1)])
+        sys_idx = self._first_hit(rising, offset=1)
+
+        dia_t = np.asarray(dia_thresholds, dtype=np.float64)[:, None]
+        falling = (env[map_idx:-1] > dia_t) & (dia_t >= env[map_idx + 1:])
+        dia_idx = self._first_hit(falling, offset=map_idx + 1)
+
+        return sys_idx, dia_idx
+
+    @staticmethod
+    def _first_hit(hits: np.ndarray, offset: int) -> np.ndarray:
+        if hits.shape[1] == 0:
+            return np.full(hits.shape[0], -1, dtype=np.intp)
+        first = np.argmax(hits, axis=1)
+        return np.where(hits[np.arange(hits.shape[0]), first], first + offset, -1)
+
+    def local_peak(self, start: int, end: int, prefer_right: bool = False) -> Optional[int]:
+        """
+        Đỉnh cục bộ trong (start, end - 1) từ local_maxima đã tính
+
+        Args:
+            start, end: Khoảng tìm
+            prefer_right: True → đỉnh gần end nhất (gần MAP)
+
+        Returns:
+            Index đỉnh; không có đỉnh → argmax của đoạn; đoạn rỗng → None
+        """
+        if end <= start:
+            return None
+
+        lo, hi = np.searchsorted(self.local_maxima, (start + 1, end - 1))
+        if hi > lo:
+            return int(self.local_maxima[hi - 1] if prefer_right else self.local_maxima[lo])
+
+        segment = self.envelope[start:end]
+        if segment.size == 0:
+            return None
+        return start + int(np.argmax(segment))
+
+    def nearest_amplitude(self, target: float, start: int, end: int) -> Optional[int]:
+        """Index trong [start, end) có biên độ gần target nhất, None nếu rỗng"""
+        if end <= start:
+            return None
+        segment = self.envelope[start:end]
+        if segment.size == 0:
+            return None
+        return start + int(np.argmin(np.abs(segment - target)))
+
+
 # ==================== SAFETY MONITOR ====================
 
 class BPSafetyMonitor:
@@ -158,8 +299,15 @@ class BPSafetyMonitor:
     LEAK_GRACE_PERIOD_S = 3.0        # Skip leak detection for first 3s of deflation
     NOISE_THRESHOLD = 0.3            # High-freq noise level
     
-    def __init__(self, logger: logging.Logger):
+    def __init__(self, logger: logging.Logger, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            logger: Logger
+            clock: Nguồn thời gian cho timeout/grace period - phải cùng gốc với
+                   timestamps đưa vào detect_leak (ADC clock, virtual khi replay)
+        """
         self.logger = logger
+        self.clock = clock
         
         # State tracking
         self._phase_start_time: Optional[float] = None
@@ -177,7 +325,7 @@ class BPSafetyMonitor:
     
     def start_phase(self, phase: BPState):
         """Bắt đầu phase mới (reset timer + pressure tracking)"""
-        self._phase_start_time = time.time()
+        self._phase_start_time = self.clock()
         # Reset leak detection state để tránh false positive từ phase trước
         self._last_pressure = None
         self._last_pressure_time = None
@@ -212,7 +360,7 @@ class BPSafetyMonitor:
         if self._phase_start_time is None:
             return True, "OK"
         
-        elapsed = time.time() - self._phase_start_time
+        elapsed = self.clock() - self._phase_start_time
         
         timeout_map = {
             BPState.INFLATING: self.INFLATE_TIMEOUT_S,
@@ -368,19 +516,8 @@ class OscillometricProcessor:
                 self.logger.warning(f"Insufficient data points: {len(pressures)} (need ≥50)")
                 return None
             
-            pressures_arr = np.array(pressures)
-            timestamps_arr = np.array(timestamps)
-            
-            # Calculate ACTUAL sample rate from data
-            if len(timestamps) > 1:
-                total_duration = timestamps_arr[-1] - timestamps_arr[0]
-                actual_sample_rate = len(timestamps) / total_duration
-                self.logger.info(f"Actual sample rate: {actual_sample_rate:.1f} SPS (config: {self.sample_rate} SPS)")
-                # Use actual sample rate for filtering
-                self.sample_rate = actual_sample_rate
-            
             # Step 1: Detrend (remove DC ramp)
-            pressure_detrended = detrend(pressures_arr, type='linear')
+            pressures_arr, timestamps_arr, pressure_detrended = self.prepare_deflate(pressures, timestamps)
             
             # Step 2: Bandpass filter (0.5-5 Hz)
             oscillations = self._bandpass_filter(pressure_detrended)
@@ -388,93 +525,167 @@ class OscillometricProcessor:
             # Step 3: Extract envelope
             envelope = self._extract_envelope(oscillations)
             
-            # Log signal quality
-            osc_peak_to_peak = np.max(oscillations) - np.min(oscillations)
-            env_peak_to_peak = np.max(envelope) - np.min(envelope)
-            self.logger.info(
-                f"Signal quality: "
-                f"Oscillations P-P={osc_peak_to_peak:.3f}, "
-                f"Envelope P-P={env_peak_to_peak:.3f}"
-            )
-            
-            # Step 4: Find MAP (max envelope amplitude)
-            map_idx = np.argmax(envelope)
-            map_pressure = pressures_arr[map_idx]
-            map_amplitude = envelope[map_idx]
-            
-            self.logger.info(
-                f"MAP detected: {map_pressure:.1f} mmHg @ idx {map_idx}/{len(pressures)} "
-                f"(amplitude: {map_amplitude:.3f})"
-            )
-            
-            # Validate signal quality
-            MIN_AMPLITUDE = 0.05  # Minimum envelope amplitude (mmHg)
-            if map_amplitude < MIN_AMPLITUDE:
-                self.logger.error(
-                    f"Oscillometric signal too weak: amplitude {map_amplitude:.3f} < {MIN_AMPLITUDE} mmHg. "
-                    f"Possible causes:\n"
-                    f"  1. Cuff not placed on arm (no pulse detected)\n"
-                    f"  2. Cuff too loose (insufficient arterial compression)\n"
-                    f"  3. Wrong cuff position (not over brachial artery)\n"
-                    f"  4. Patient movement during measurement"
-                )
-                return None
-            
-            # Step 5: Calculate SYS/DIA (ratio method)
-            systolic, diastolic = self._calculate_sys_dia(
-                pressures_arr, envelope, map_idx, map_amplitude
-            )
-            
-            if systolic is None or diastolic is None:
-                self.logger.warning("Failed to calculate SYS/DIA")
-                return None
-            
-            # Step 6: Calculate heart rate
-            heart_rate = self._calculate_heart_rate(oscillations, timestamps_arr)
-            
-            # Step 7: Validate AAMI
-            validation_flags = self._validate_aami(systolic, diastolic, map_pressure)
-            
-            if not all(validation_flags.values()):
-                self.logger.warning(f"AAMI validation failed: {validation_flags}")
-                # Continue anyway (let user decide)
-            
-            # Step 8: Assess quality
-            quality = self._assess_quality(envelope, map_amplitude)
-            confidence = self._calculate_confidence(envelope, validation_flags)
-            
-            # Create measurement result
-            pulse_pressure = systolic - diastolic
-            
-            measurement = BloodPressureMeasurement(
-                systolic=systolic,
-                diastolic=diastolic,
-                map_value=map_pressure,
-                heart_rate=heart_rate,
-                pulse_pressure=pulse_pressure,
-                timestamp=datetime.now(),
-                quality=quality,
-                confidence=confidence,
-                validation_flags=validation_flags,
-                metadata={
-                    'data_points': len(pressures),
-                    'map_amplitude': float(map_amplitude),
-                    'map_index': int(map_idx),
-                    'sample_rate': self.sample_rate
-                }
-            )
-            
-            self.logger.info(
-                f"BP measurement: SYS={systolic:.1f} DIA={diastolic:.1f} MAP={map_pressure:.1f} "
-                f"HR={heart_rate:.1f} Quality={quality}"
-            )
-            
-            return measurement
+            return self.measure_from_envelope(pressures_arr, timestamps_arr, oscillations, envelope)
             
         except Exception as e:
             self.logger.error(f"Signal processing error: {e}", exc_info=True)
             return None
     
+    def prepare_deflate(
+        self,
+        pressures: List[float],
+        timestamps: List[float]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Bước 1 của process_deflate_data: sample rate thực tế + detrend
+        
+        Tách riêng để công cụ offline (parameter sweep) cache kết quả theo
+        capture và chỉ chạy lại các bước phụ thuộc tham số đang quét.
+        
+        Args:
+            pressures: Danh sách áp suất (mmHg)
+            timestamps: Danh sách timestamp (seconds)
+        
+        Returns:
+            (pressures_arr, timestamps_arr, pressure_detrended); self.sample_rate
+            được cập nhật theo dữ liệu
+        """
+        pressures_arr = np.array(pressures)
+        timestamps_arr = np.array(timestamps)
+        
+        # Calculate ACTUAL sample rate from data
+        if len(timestamps) > 1:
+            total_duration = timestamps_arr[-1] - timestamps_arr[0]
+            actual_sample_rate = len(timestamps) / total_duration
+            self.logger.info(f"Actual sample rate: {actual_sample_rate:.1f} SPS (config: {self.sample_rate} SPS)")
+            # Use actual sample rate for filtering
+            self.sample_rate = actual_sample_rate
+        
+        return pressures_arr, timestamps_arr, detrend(pressures_arr, type='linear')
+    
+    def measure_from_envelope(
+        self,
+        pressures_arr: np.ndarray,
+        timestamps_arr: np.ndarray,
+        oscillations: np.ndarray,
+        envelope: np.ndarray,
+        analysis: Optional[EnvelopeAnalysis] = None
+    ) -> Optional[BloodPressureMeasurement]:
+        """
+        Bước 4-8 của process_deflate_data: MAP, SYS/DIA (sys_ratio/dia_ratio),
+        HR, AAMI, quality
+        
+        Args:
+            pressures_arr: Áp suất (mmHg)
+            timestamps_arr: Timestamp (seconds)
+            oscillations: Tín hiệu đã bandpass
+            envelope: Envelope của oscillations
+            analysis: EnvelopeAnalysis đã tính (None → tính ở đây); không
+                      phụ thuộc sys/dia ratio nên parameter sweep dùng lại được
+        
+        Returns:
+            BloodPressureMeasurement hoặc None nếu tín hiệu yếu / không tìm được SYS/DIA
+        """
+        # Log signal quality
+        osc_peak_to_peak = np.max(oscillations) - np.min(oscillations)
+        env_peak_to_peak = np.max(envelope) - np.min(envelope)
+        self.logger.info(
+            f"Signal quality: "
+            f"Oscillations P-P={osc_peak_to_peak:.3f}, "
+            f"Envelope P-P={env_peak_to_peak:.3f}"
+        )
+        
+        # Step 4: Envelope analysis (crossings, local maxima, beats) + MAP
+        if analysis is None:
+            analysis = self.analyze_envelope(oscillations, envelope, timestamps_arr)
+        map_idx = analysis.map_idx
+        map_pressure = pressures_arr[map_idx]
+        map_amplitude = analysis.map_amplitude
+        
+        self.logger.info(
+            f"MAP detected: {map_pressure:.1f} mmHg @ idx {map_idx}/{len(pressures_arr)} "
+            f"(amplitude: {map_amplitude:.3f})"
+        )
+        
+        # Validate signal quality
+        MIN_AMPLITUDE = 0.05  # Minimum envelope amplitude (mmHg)
+        if map_amplitude < MIN_AMPLITUDE:
+            self.logger.error(
+                f"Oscillometric signal too weak: amplitude {map_amplitude:.3f} < {MIN_AMPLITUDE} mmHg. "
+                f"Possible causes:\n"
+                f"  1. Cuff not placed on arm (no pulse detected)\n"
+                f"  2. Cuff too loose (insufficient arterial compression)\n"
+                f"  3. Wrong cuff position (not over brachial artery)\n"
+                f"  4. Patient movement during measurement"
+            )
+            return None
+        
+        # Step 5: Calculate SYS/DIA (ratio method)
+        systolic, diastolic = self._calculate_sys_dia(pressures_arr, analysis)
+        
+        if systolic is None or diastolic is None:
+            self.logger.warning("Failed to calculate SYS/DIA")
+            return None
+        
+        # Step 6: Calculate heart rate
+        heart_rate = self._calculate_heart_rate(analysis)
+        
+        # Step 7: Validate AAMI
+        validation_flags = self._validate_aami(systolic, diastolic, map_pressure)
+        
+        if not all(validation_flags.values()):
+            self.logger.warning(f"AAMI validation failed: {validation_flags}")
+            # Continue anyway (let user decide)
+        
+        # Step 8: Assess quality
+        quality = self._assess_quality(analysis)
+        confidence = self._calculate_confidence(analysis, validation_flags)
+        
+        # Create measurement result
+        pulse_pressure = systolic - diastolic
+        
+        measurement = BloodPressureMeasurement(
+            systolic=systolic,
+            diastolic=diastolic,
+            map_value=map_pressure,
+            heart_rate=heart_rate,
+            pulse_pressure=pulse_pressure,
+            timestamp=datetime.now(),
+            quality=quality,
+            confidence=confidence,
+            validation_flags=validation_flags,
+            metadata={
+                'data_points': len(pressures_arr),
+                'map_amplitude': float(map_amplitude),
+                'map_index': int(map_idx),
+                'sample_rate': self.sample_rate
+            }
+        )
+        
+        self.logger.info(
+            f"BP measurement: SYS={systolic:.1f} DIA={diastolic:.1f} MAP={map_pressure:.1f} "
+            f"HR={heart_rate:.1f} Quality={quality}"
+        )
+        
+        return measurement
+    
+    def analyze_envelope(
+        self,
+        oscillations: np.ndarray,
+        envelope: np.ndarray,
+        timestamps: np.ndarray
+    ) -> EnvelopeAnalysis:
+        """
+        Tính EnvelopeAnalysis (một pass) dùng chung cho SYS/DIA, HR, quality,
+        confidence
+        
+        Args:
+            oscillations: Tín hiệu đã bandpass
+            envelope: Envelope của oscillations
+            timestamps: Timestamp (seconds)
+        """
+        return EnvelopeAnalysis.compute(oscillations, envelope, timestamps, self.sample_rate)
+    
     def _bandpass_filter(self, signal_data: np.ndarray) -> np.ndarray:
         """
         Apply Butterworth bandpass filter
@@ -485,23 +696,29 @@ class OscillometricProcessor:
         Returns:
             Filtered signal
         """
-        nyquist = self.sample_rate / 2.0
-        low = self.bandpass_low / nyquist
-        high = self.bandpass_high / nyquist
+        design = self._filter_design(self.sample_rate)
+        filtered = sosfiltfilt(design.sos, signal_data)
         
-        # Clamp frequencies to valid range (0 < Wn < 1)
-        low = max(0.01, min(low, 0.95))
-        high = max(low + 0.05, min(high, 0.95))  # high phải > low
+        return filtered
+    
+    def _filter_design(self, sample_rate: float) -> FilterDesign:
+        """
+        Bandpass design (SOS + zi) từ shared filter-design cache
+        
+        Args:
+            sample_rate: Sample rate (Hz) - lượng tử hóa trong cache
+        
+        Returns:
+            FilterDesign (Wn đã clamp về 0 < Wn < 1)
+        """
+        design = get_bandpass_design(self.filter_order, self.bandpass_low, self.bandpass_high, sample_rate)
         
         self.logger.debug(
             f"Bandpass filter: {self.bandpass_low:.1f}-{self.bandpass_high:.1f} Hz "
-            f"(Wn: {low:.3f}-{high:.3f}, Nyquist: {nyquist:.1f} Hz)"
+            f"(Wn: {design.wn[0]:.3f}-{design.wn[1]:.3f}, fs: {design.sample_rate:.2f} Hz)"
         )
         
-        b, a = butter(self.filter_order, [low, high], btype='band')
-        filtered = filtfilt(b, a, signal_data)
-        
-        return filtered
+        return design
     
     def _extract_envelope(self, oscillations: np.ndarray) -> np.ndarray:
         """
@@ -528,9 +745,7 @@ class OscillometricProcessor:
     def _calculate_sys_dia(
         self,
         pressures: np.ndarray,
-        envelope: np.ndarray,
-        map_idx: int,
-        map_amplitude: float
+        analysis: EnvelopeAnalysis
     ) -> Tuple[Optional[float], Optional[float]]:
         """
         Calculate SYS/DIA with ROBUST multi-level fallback strategy
@@ -543,11 +758,22 @@ class OscillometricProcessor:
         LEVEL 4: Nearest-by-amplitude in correct side
         LEVEL 5: Clamp to physiological safe range
         
+        Crossings của Level 1 + 2 được tính cùng lúc trong một lần broadcast
+        (EnvelopeAnalysis.crossings), Level 3-4 dùng local maxima đã tính sẵn.
+        
         Returns:
             (systolic, diastolic) or (None, None) if all methods failed
         """
+        map_idx = analysis.map_idx
+        map_amplitude = analysis.map_amplitude
         map_pressure = pressures[map_idx]
         
+        # Ngưỡng Level 1 (delta 0) + Level 2 (±5%, ±10%)
+        deltas = (0.0, 0.05, 0.10)
+        sys_thresholds = np.array([map_amplitude * (self.sys_ratio - delta) for delta in deltas])
+        dia_thresholds = np.array([map_amplitude * (self.dia_ratio + delta) for delta in deltas])
+        sys_crossings, dia_crossings = analysis.crossings(sys_thresholds, dia_thresholds)
+        
         # ========== LEVEL 1: Standard Ratio Method ==========
         sys_threshold = map_amplitude * self.sys_ratio
         dia_threshold = map_amplitude * self.dia_ratio
@@ -556,11 +782,9 @@ class OscillometricProcessor:
             f"Level 1: Standard ratio (SYS={self.sys_ratio:.0%}, DIA={self.dia_ratio:.0%})"
         )
         
-        sys_idx, dia_idx = self._find_crossing_points(
-            envelope, map_idx, sys_threshold, dia_threshold
-        )
+        sys_idx, dia_idx = sys_crossings[0], dia_crossings[0]
         
-        if sys_idx is not None and dia_idx is not None:
+        if sys_idx >= 0 and dia_idx >= 0:
             systolic = pressures[sys_idx]
             diastolic = pressures[dia_idx]
             
@@ -571,13 +795,10 @@ class OscillometricProcessor:
         # ========== LEVEL 2: Relaxed Thresholds ==========
         self.logger.warning("Level 1 failed, trying relaxed thresholds...")
         
-        for delta in [0.05, 0.10]:
-            sys_t = map_amplitude * (self.sys_ratio - delta)
-            dia_t = map_amplitude * (self.dia_ratio + delta)
+        for level, delta in enumerate(deltas[1:], start=1):
+            sys_idx, dia_idx = sys_crossings[level], dia_crossings[level]
             
-            sys_idx, dia_idx = self._find_crossing_points(envelope, map_idx, sys_t, dia_t)
-            
-            if sys_idx is not None and dia_idx is not None:
+            if sys_idx >= 0 and dia_idx >= 0:
                 systolic = pressures[sys_idx]
                 diastolic = pressures[dia_idx]
                 
@@ -590,8 +811,8 @@ class OscillometricProcessor:
         # ========== LEVEL 3: Peak-Based Method ==========
         self.logger.warning("Level 2 failed, trying peak-based method...")
         
-        sys_idx = self._find_local_peak(envelope, 0, map_idx, prefer_right=True)
-        dia_idx = self._find_local_peak(envelope, map_idx + 1, len(envelope), prefer_right=False)
+        sys_idx = analysis.local_peak(0, map_idx, prefer_right=True)
+        dia_idx = analysis.local_peak(map_idx + 1, len(analysis.envelope), prefer_right=False)
         
         if sys_idx is not None and dia_idx is not None:
             systolic = pressures[sys_idx]
@@ -604,8 +825,8 @@ class OscillometricProcessor:
         # ========== LEVEL 4: Nearest-by-Amplitude ==========
         self.logger.warning("Level 3 failed, trying nearest-amplitude method...")
         
-        sys_idx = self._find_nearest_amplitude(envelope, sys_threshold, 0, map_idx)
-        dia_idx = self._find_nearest_amplitude(envelope, dia_threshold, map_idx + 1, len(envelope))
+        sys_idx = analysis.nearest_amplitude(sys_threshold, 0, map_idx)
+        dia_idx = analysis.nearest_amplitude(dia_threshold, map_idx + 1, len(analysis.envelope))
         
         if sys_idx is not None and dia_idx is not None:
             systolic = pressures[sys_idx]
@@ -629,109 +850,6 @@ class OscillometricProcessor:
         self.logger.error("❌ All 4 fallback levels failed - cannot determine SYS/DIA")
         return None, None
     
-    def _find_crossing_points(
-        self,
-        envelope: np.ndarray,
-        map_idx: int,
-        sys_threshold: float,
-        dia_threshold: float
-    ) -> Tuple[Optional[int], Optional[int]]:
-        """
-        Find SYS/DIA crossing points using thresholds
-        
-        Args:
-            envelope: Envelope signal
-            map_idx: MAP index
-            sys_threshold: SYS amplitude threshold
-            dia_threshold: DIA amplitude threshold
-        
-        Returns:
-            (sys_idx, dia_idx) or (None, None)
-        """
-        # SYS: Find crossing BEFORE MAP (envelope increasing)
-        sys_idx = None
-        for i in range(1, map_idx):
-            if envelope[i-1] < sys_threshold <= envelope[i]:
-                sys_idx = i
-                break
-        
-        # DIA: Find crossing AFTER MAP (envelope decreasing)
-        dia_idx = None
-        for i in range(map_idx + 1, len(envelope)):
-            if envelope[i-1] > dia_threshold >= envelope[i]:
-                dia_idx = i
-                break
-        
-        return sys_idx, dia_idx
-    
-    def _find_local_peak(
-        self,
-        envelope: np.ndarray,
-        start: int,
-        end: int,
-        prefer_right: bool = False
-    ) -> Optional[int]:
-        """
-        Find local maxima in range [start, end]
-        
-        Args:
-            envelope: Envelope signal
-            start, end: Search range
-            prefer_right: If True, prefer peak near end (near MAP)
-        
-        Returns:
-            Index of local peak or None
-        """
-        if end <= start:
-            return None
-        
-        # Use simple peak detection (value > neighbors)
-        peaks = []
-        for i in range(start + 1, end - 1):
-            if envelope[i] > envelope[i-1] and envelope[i] > envelope[i+1]:
-                peaks.append(i)
-        
-        if len(peaks) == 0:
-            # Fallback: Return global max in segment
-            segment = envelope[start:end]
-            if segment.size == 0:
-                return None
-            return start + int(np.argmax(segment))
-        
-        # Choose peak
-        if prefer_right:
-            return peaks[-1]  # Peak nearest to end
-        else:
-            return peaks[0]   # Peak nearest to start
-    
-    def _find_nearest_amplitude(
-        self,
-        envelope: np.ndarray,
-        target: float,
-        start: int,
-        end: int
-    ) -> Optional[int]:
-        """
-        Find point with amplitude nearest to target in range [start, end]
-        
-        Args:
-            envelope: Envelope signal
-            target: Target amplitude
-            start, end: Search range
-        
-        Returns:
-            Index of nearest point or None
-        """
-        if end <= start:
-            return None
-        
-        segment = envelope[start:end]
-        if segment.size == 0:
-            return None
-        
-        idx = int(np.argmin(np.abs(segment - target)))
-        return start + idx
-    
     def _validate_bp_relationship(
         self,
         sys: float,
@@ -751,65 +869,21 @@ class OscillometricProcessor:
         """
         return dia < map_val < sys
     
-    def _find_crossing(
-        self,
-        signal_data: np.ndarray,
-        threshold: float,
-        direction: str = 'down'
-    ) -> Optional[int]:
-        """
-        Find first crossing point
-        
-        Args:
-            signal_data: Input signal
-            threshold: Threshold value
-            direction: 'up' or 'down'
-        
-        Returns:
-            Index of crossing or None
-        """
-        if direction == 'down':
-            # Signal decreases below threshold
-            mask = signal_data > threshold
-            diff = np.diff(mask.astype(int))
-            crossings = np.where(diff == -1)[0]
-        else:
-            # Signal increases above threshold
-            mask = signal_data < threshold
-            diff = np.diff(mask.astype(int))
-            crossings = np.where(diff == -1)[0]
-        
-        if len(crossings) == 0:
-            return None
-        
-        return crossings[0]
-    
-    def _calculate_heart_rate(
-        self,
-        oscillations: np.ndarray,
-        timestamps: np.ndarray
-    ) -> float:
+    def _calculate_heart_rate(self, analysis: EnvelopeAnalysis) -> float:
         """
         Calculate heart rate from oscillations
         
-        Method: Peak-to-peak interval → BPM
+        Method: Peak-to-peak interval → BPM (beats/IBI từ EnvelopeAnalysis)
         
         Returns:
             Heart rate (BPM)
         """
-        # Find peaks
-        peaks, _ = signal.find_peaks(oscillations, distance=int(self.sample_rate * 0.5))
-        
-        if len(peaks) < 2:
+        if analysis.beat_indices.size < 2:
             self.logger.warning("Insufficient peaks for HR calculation")
             return 0.0
         
-        # Calculate intervals
-        peak_times = timestamps[peaks]
-        intervals = np.diff(peak_times)
-        
         # Average interval → BPM
-        avg_interval = np.median(intervals)
+        avg_interval = np.median(analysis.beat_intervals)
         heart_rate = 60.0 / avg_interval if avg_interval > 0 else 0.0
         
         # Sanity check (40-180 BPM)
@@ -848,7 +922,7 @@ class OscillometricProcessor:
         
         return flags
     
-    def _assess_quality(self, envelope: np.ndarray, map_amplitude: float) -> str:
+    def _assess_quality(self, analysis: EnvelopeAnalysis) -> str:
         """
         Đánh giá chất lượng đo
         
@@ -861,8 +935,8 @@ class OscillometricProcessor:
             'excellent', 'good', 'fair', or 'poor'
         """
         # Calculate SNR (simple estimation)
-        signal_power = map_amplitude ** 2
-        noise_power = np.var(envelope - signal.savgol_filter(envelope, 11, 2))
+        signal_power = analysis.map_amplitude ** 2
+        noise_power = analysis.noise_power
         snr = 10 * np.log10(signal_power / noise_power) if noise_power > 0 else 0.0
         
         # Quality thresholds
@@ -877,7 +951,7 @@ class OscillometricProcessor:
     
     def _calculate_confidence(
         self,
-        envelope: np.ndarray,
+        envelope: Union[np.ndarray, EnvelopeAnalysis],
         validation_flags: Dict[str, bool]
     ) -> float:
         """
@@ -887,21 +961,337 @@ class OscillometricProcessor:
         - Validation flags
         - Envelope quality
         
+        Args:
+            envelope: Envelope (streaming estimate) hoặc EnvelopeAnalysis (batch,
+                      mean/std đã tính)
+            validation_flags: Cờ AAMI
+        
         Returns:
             Confidence score (0.0-1.0)
         """
+        if isinstance(envelope, EnvelopeAnalysis):
+            mean, std = envelope.mean, envelope.std
+        else:
+            mean, std = np.mean(envelope), np.std(envelope)
+        
         # Base confidence from validation
         passed_checks = sum(validation_flags.values())
         total_checks = len(validation_flags)
         confidence = passed_checks / total_checks
         
         # Adjust by envelope quality (coefficient of variation)
-        cv = np.std(envelope) / np.mean(envelope) if np.mean(envelope) > 0 else 1.0
+        cv = std / mean if mean > 0 else 1.0
         confidence *= (1.0 - min(cv, 0.5))
         
         return max(0.0, min(1.0, confidence))
 
 
+# ==================== STREAMING SIGNAL PROCESSOR ====================
+
+@dataclass
+class OscillometricEstimate:
+    """
+    Ước lượng BP trực tiếp trong pha xả (cập nhật theo từng batch)
+    
+    Attributes:
+        systolic: SYS ước lượng (mmHg) hoặc None nếu chưa xác định
+        diastolic: DIA ước lượng (mmHg) hoặc None nếu chưa qua điểm DIA
+        map_value: MAP ước lượng (mmHg) hoặc None
+        heart_rate: Nhịp tim từ khoảng cách giữa các nhịp (BPM)
+        beat_count: Số nhịp dao động đã phát hiện
+        map_amplitude: Biên độ envelope lớn nhất (peak-to-trough, mmHg)
+        dia_confirmed: True khi cuff đã xuống dưới DIA đủ số nhịp xác nhận
+        dia_confirmed_at: Timestamp (seconds) của nhịp xác nhận DIA
+        envelope: Biên độ envelope đã làm mượt theo từng nhịp
+    """
+    systolic: Optional[float] = None
+    diastolic: Optional[float] = None
+    map_value: Optional[float] = None
+    heart_rate: float = 0.0
+    beat_count: int = 0
+    map_amplitude: float = 0.0
+    dia_confirmed: bool = False
+    dia_confirmed_at: Optional[float] = None
+    envelope: List[float] = field(default_factory=list)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for metadata/logging"""
+        return {
+            'systolic': round(self.systolic, 1) if self.systolic is not None else None,
+            'diastolic': round(self.diastolic, 1) if self.diastolic is not None else None,
+            'map': round(self.map_value, 1) if self.map_value is not None else None,
+            'heart_rate': round(self.heart_rate, 1),
+            'beat_count': self.beat_count,
+            'map_amplitude': round(self.map_amplitude, 3),
+            'dia_confirmed': self.dia_confirmed,
+            'dia_confirmed_at': self.dia_confirmed_at
+        }
+
+
+class StreamingOscillometricProcessor(OscillometricProcessor):
+    """
+    Xử lý oscillometric tăng dần theo từng batch trong pha xả
+    
+    Khác với process_deflate_data() (xử lý toàn bộ record sau khi xả xong):
+    - Bandpass IIR dạng SOS với state (sosfilt + zi) giữ giữa các batch
+    - Phát hiện nhịp (peak/trough) chỉ trên mẫu mới
+    - Envelope theo từng nhịp (peak-to-trough), làm mượt median 3 nhịp
+    - MAP/SYS/DIA cập nhật ngay khi có nhịp mới → biết kết quả
+      ngay khi cuff xuống dưới điểm DIA
+    
+    Usage Example:
+    -------------
+    >>> live = StreamingOscillometricProcessor(config, logger)
+    >>> live.start(sample_rate=10.0)
+    >>> for pressures, timestamps in batches:
+    >>>     estimate = live.update(pressures, timestamps)
+    >>>     if estimate.dia_confirmed:
+    >>>         print(estimate.systolic, estimate.diastolic)
+    """
+    
+    MIN_BEAT_AMPLITUDE = 0.1      # mmHg peak-to-trough (~0.05 mmHg envelope)
+    MIN_BEAT_INTERVAL_S = 0.33    # 180 BPM max
+    SETTLE_TIME_S = 1.0           # Bỏ qua transient của filter lúc bắt đầu
+    CONFIDENT_BEATS_SYS_DIA = 8   # Số nhịp giữa SYS và DIA cho resolution = 1.0
+    RR_TOLERANCE = 0.25           # Khoảng nhịp lệch ≤ 25% median được coi là đều
+    
+    def __init__(self, config: Dict[str, Any], logger: logging.Logger):
+        super().__init__(config, logger)
+        
+        # Số nhịp liên tiếp dưới ngưỡng DIA để xác nhận đã qua điểm DIA
+        self.dia_confirm_beats = max(1, int(config.get('dia_confirm_beats', 2)))
+        
+        self._design: Optional[FilterDesign] = None
+        self.start(self.sample_rate)
+    
+    def start(self, sample_rate: Optional[float] = None):
+        """
+        Reset state cho lần đo mới
+        
+        Args:
+            sample_rate: Sample rate danh định của ADC (Hz), None = giữ nguyên
+        """
+        if sample_rate is not None and sample_rate > 0:
+            self.sample_rate = float(sample_rate)
+        
+        self._design = self._filter_design(self.sample_rate)
+        self._zi: Optional[np.ndarray] = None
+        
+        # Continuity giữa các batch (2 mẫu cuối chưa xét hết extremum)
+        self._tail_y = np.empty(0)
+        self._tail_p = np.empty(0)
+        self._tail_t = np.empty(0)
+        
+        self._start_time: Optional[float] = None
+        self._last_trough: Optional[float] = None
+        
+        # Beat envelope (Python lists: vài chục nhịp mỗi lần đo)
+        self._beat_amps: List[float] = []
+        self._beat_pressures: List[float] = []
+        self._beat_times: List[float] = []
+        
+        self._estimate = OscillometricEstimate()
+    
+    def update(self, pressures: np.ndarray, timestamps: np.ndarray) -> OscillometricEstimate:
+        """
+        Đưa batch mẫu mới vào processor
+        
+        Args:
+            pressures: Áp suất (mmHg), theo thứ tự thời gian
+            timestamps: Timestamp conversion tương ứng (seconds)
+        
+        Returns:
+            OscillometricEstimate hiện tại
+        """
+        x = np.asarray(pressures, dtype=np.float64)
+        t = np.asarray(timestamps, dtype=np.float64)
+        
+        if x.size == 0 or self._estimate.dia_confirmed:
+            return self._estimate
+        
+        if self._zi is None:
+            # Khởi tạo state ở steady-state của mẫu đầu (tránh step transient)
+            self._zi = self._design.initial_state(x[0])
+            self._start_time = float(t[0])
+        
+        y, self._zi = sosfilt(self._design.sos, x, zi=self._zi)
+        
+        ys = np.concatenate((self._tail_y, y))
+        ps = np.concatenate((self._tail_p, x))
+        ts = np.concatenate((self._tail_t, t))
+        
+        if ys.size >= 3:
+            mid = ys[1:-1]
+            is_peak = (mid > ys[:-2]) & (mid >= ys[2:])
+            is_trough = (mid < ys[:-2]) & (mid <= ys[2:])
+            
+            new_beat = False
+            for i in np.flatnonzero(is_peak | is_trough) + 1:
+                if ts[i] - self._start_time < self.SETTLE_TIME_S:
+                    continue
+                if is_trough[i - 1]:
+                    self._last_trough = float(ys[i])
+                elif self._add_beat(float(ys[i]), float(ps[i]), float(ts[i])):
+                    new_beat = True
+            
+            if new_beat:
+                self._refresh_estimate()
+        
+        self._tail_y = ys[-2:]
+        self._tail_p = ps[-2:]
+        self._tail_t = ts[-2:]
+        
+        return self._estimate
+    
+    def get_estimate(self) -> OscillometricEstimate:
+        """Lấy ước lượng hiện tại"""
+        return self._estimate
+    
+    def estimate_confidence(self) -> float:
+        """
+        Độ tin cậy của ước lượng hiện tại (0.0-1.0, liên tục)
+        
+        _calculate_confidence của batch (CV của envelope) bão hòa ở ~0.5 cho
+        mọi envelope hình chuông nên không phân biệt được ước lượng tốt/xấu.
+        Ở đây là tích các thành phần theo beat envelope:
+        - aami: tỉ lệ cờ AAMI đạt
+        - resolution: số nhịp nằm giữa SYS và DIA / CONFIDENT_BEATS_SYS_DIA
+          (ít nhịp → nội suy thô, thường là DIA giả do nhiễu ở áp cao)
+        - regularity: tỉ lệ khoảng nhịp lệch ≤ RR_TOLERANCE so với median
+          (nhịp bị lọt / nhịp giả do cử động)
+        - smoothness: 1 - 2 × |biên độ thô - envelope đã làm mượt| / MAP amplitude
+        
+        Returns:
+            Confidence score, 0.0 nếu chưa có đủ SYS/MAP/DIA
+        """
+        estimate = self._estimate
+        if estimate.systolic is None or estimate.diastolic is None or estimate.map_value is None:
+            return 0.0
+        
+        if not self._validate_bp_relationship(estimate.systolic, estimate.diastolic, estimate.map_value):
+            return 0.0
+        
+        validation_flags = self._validate_aami(estimate.systolic, estimate.diastolic, estimate.map_value)
+        aami = sum(validation_flags.values()) / len(validation_flags)
+        
+        beat_p = np.asarray(self._beat_pressures)
+        between = int(np.count_nonzero((beat_p <= estimate.systolic) & (beat_p >= estimate.diastolic)))
+        resolution = min(1.0, between / self.CONFIDENT_BEATS_SYS_DIA)
+        
+        intervals = np.diff(self._beat_times)
+        median_interval = float(np.median(intervals)) if intervals.size else 0.0
+        if median_interval > 0:
+            regularity = float(np.mean(np.abs(intervals - median_interval) <= self.RR_TOLERANCE * median_interval))
+        else:
+            regularity = 0.0
+        
+        roughness = 0.0
+        if estimate.map_amplitude > 0:
+            residual = np.abs(np.asarray(self._beat_amps) - np.asarray(estimate.envelope))
+            roughness = float(np.mean(residual)) / estimate.map_amplitude
+        smoothness = 1.0 - min(1.0, 2.0 * roughness)
+        
+        return max(0.0, min(1.0, aami * resolution * regularity * smoothness))
+    
+    def _add_beat(self, peak: float, pressure: float, timestamp: float) -> bool:
+        """
+        Ghi nhận một nhịp dao động (peak sau trough)
+        
+        Returns:
+            bool: True nếu beat envelope thay đổi
+        """
+        if self._last_trough is None:
+            return False
+        
+        amplitude = peak - self._last_trough
+        if amplitude < self.MIN_BEAT_AMPLITUDE:
+            return False
+        
+        if self._beat_times and timestamp - self._beat_times[-1] < self.MIN_BEAT_INTERVAL_S:
+            # Quá gần nhịp trước (dicrotic notch / nhiễu) → giữ nhịp lớn hơn
+            if amplitude <= self._beat_amps[-1]:
+                return False
+            self._beat_amps[-1] = amplitude
+            self._beat_pressures[-1] = pressure
+            self._beat_times[-1] = timestamp
+            return True
+        
+        self._beat_amps.append(amplitude)
+        self._beat_pressures.append(pressure)
+        self._beat_times.append(timestamp)
+        return True
+    
+    def _refresh_estimate(self):
+        """Tính lại MAP/SYS/DIA từ beat envelope"""
+        amps = np.asarray(self._beat_amps)
+        beat_p = np.asarray(self._beat_pressures)
+        
+        # Median 3 nhịp (centered, edge padding)
+        if amps.size >= 3:
+            padded = np.pad(amps, 1, mode='edge')
+            envelope = np.median(np.lib.stride_tricks.sliding_window_view(padded, 3), axis=1)
+        else:
+            envelope = amps
+        
+        map_idx = int(np.argmax(envelope))
+        map_amplitude = float(envelope[map_idx])
+        
+        estimate = OscillometricEstimate(
+            map_value=float(beat_p[map_idx]),
+            heart_rate=self._beat_heart_rate(),
+            beat_count=int(amps.size),
+            map_amplitude=map_amplitude,
+            envelope=envelope.tolist()
+        )
+        
+        # SYS: crossing lên trước MAP
+        sys_threshold = map_amplitude * self.sys_ratio
+        for i in range(1, map_idx + 1):
+            if envelope[i - 1] < sys_threshold <= envelope[i]:
+                estimate.systolic = self._interpolate_pressure(envelope, beat_p, i, sys_threshold)
+                break
+        
+        # DIA: crossing xuống sau MAP, xác nhận bởi N nhịp liên tiếp dưới ngưỡng
+        dia_threshold = map_amplitude * self.dia_ratio
+        for i in range(map_idx + 1, envelope.size):
+            if envelope[i - 1] > dia_threshold >= envelope[i]:
+                estimate.diastolic = self._interpolate_pressure(envelope, beat_p, i, dia_threshold)
+                below = envelope[i:] <= dia_threshold
+                confirm_idx = i + self.dia_confirm_beats - 1
+                if (
+                    map_idx >= 2
+                    and confirm_idx < envelope.size
+                    and below[:self.dia_confirm_beats].all()
+                ):
+                    estimate.dia_confirmed = True
+                    estimate.dia_confirmed_at = self._beat_times[confirm_idx]
+                break
+        
+        self._estimate = estimate
+    
+    @staticmethod
+    def _interpolate_pressure(
+        envelope: np.ndarray,
+        pressures: np.ndarray,
+        idx: int,
+        threshold: float
+    ) -> float:
+        """Nội suy tuyến tính áp suất tại điểm envelope cắt ngưỡng (giữa nhịp idx-1 và idx)"""
+        span = envelope[idx] - envelope[idx - 1]
+        frac = (threshold - envelope[idx - 1]) / span if span != 0 else 1.0
+        return float(pressures[idx - 1] + frac * (pressures[idx] - pressures[idx - 1]))
+    
+    def _beat_heart_rate(self) -> float:
+        """Nhịp tim từ median khoảng cách giữa các nhịp (BPM)"""
+        if len(self._beat_times) < 2:
+            return 0.0
+        
+        interval = float(np.median(np.diff(self._beat_times)))
+        heart_rate = 60.0 / interval if interval > 0 else 0.0
+        
+        return heart_rate if 40.0 <= heart_rate <= 180.0 else 0.0
+
+
 # ==================== HARDWARE CONTROLLER ====================
 
 class BPHardwareController:
@@ -918,15 +1308,22 @@ class BPHardwareController:
     - Common ground
     """
     
-    def __init__(self, pump_gpio: int, valve_gpio: int, logger: logging.Logger):
+    def __init__(self, pump_gpio: int, valve_gpio: int, logger: logging.Logger, simulated: bool = False):
         self.pump_gpio = pump_gpio
         self.valve_gpio = valve_gpio
         self.logger = logger
         
+        # simulated=True: replay trace, không điều khiển GPIO (chỉ log)
+        self.simulated = simulated
+        
         self._is_initialized = False
     
     def initialize(self) -> bool:
         """Initialize GPIO pins"""
+        if self.simulated:
+            self.logger.info("Hardware simulated (replay) - pump/valve commands ignored")
+            return True
+        
         if not GPIO:
             self.logger.error("RPi.GPIO not available")
             return False
@@ -1016,6 +1413,7 @@ class BloodPressureSensor(BaseSensor):
     - stop_measurement(emergency): Dừng đo (optional emergency deflate)
     - get_last_measurement(): Lấy kết quả gần nhất
     - get_state(): Lấy state hiện tại
+    - get_live_estimate(): Ước lượng SYS/MAP/DIA trong lúc xả
     
     Configuration (app_config.yaml):
     -------------------------------
@@ -1053,6 +1451,7 @@ class BloodPressureSensor(BaseSensor):
     - stop_measurement(emergency): Dừng đo (optional emergency deflate)
     - get_last_measurement(): Lấy kết quả gần nhất
     - get_state(): Lấy state hiện tại
+    - get_live_estimate(): Ước lượng SYS/MAP/DIA trong lúc xả
     
     Configuration (app_config.yaml):
     -------------------------------
@@ -1066,12 +1465,18 @@ class BloodPressureSensor(BaseSensor):
         valve_gpio: 16
         hx710b:
           # HX710BSensor config...
+        deflate_mode: full          # 'full' hoặc 'early_stop'
+        early_stop_min_confidence: 0.6
+        early_stop_margin_mmhg: 5.0
         algorithm:
           sample_rate: 10.0
           sys_ratio: 0.55
           dia_ratio: 0.80
     """
     
+    # Áp kết thúc pha xả (deflate_mode='full')
+    DEFLATE_END_PRESSURE_MMHG = 30.0
+    
     def __init__(self, name: str, config: Dict[str, Any], speak_callback: Optional[Callable[[ScenarioID, Any], None]] = None):
         """
         Initialize Blood Pressure Sensor
@@ -1089,15 +1494,21 @@ class BloodPressureSensor(BaseSensor):
         # ADC sensor (HX710B)
         self.adc_sensor = HX710BSensor("BP_ADC", config['hx710b'])
         
-        # Hardware controller (pump + valve)
+        # Hardware controller (pump + valve) - simulated khi HX710B replay trace
         self.hardware = BPHardwareController(
             pump_gpio=config['pump_gpio'],
             valve_gpio=config['valve_gpio'],
-            logger=self.logger
+            logger=self.logger,
+            simulated=bool(config['hx710b'].get('replay'))
         )
         
+        # Clock của ADC: wall time với phần cứng thật, virtual time khi replay
+        # → timeout, log và sleep cùng gốc với timestamps của stream
+        self._now = self.adc_sensor.driver.now
+        self._sleep = self.adc_sensor.driver.sleep
+        
         # Safety monitor
-        self.safety = BPSafetyMonitor(self.logger)
+        self.safety = BPSafetyMonitor(self.logger, clock=self._now)
         
         # Signal processor
         self.processor = OscillometricProcessor(
@@ -1105,12 +1516,34 @@ class BloodPressureSensor(BaseSensor):
             logger=self.logger
         )
         
+        # Live (streaming) processor: ước lượng SYS/MAP/DIA trong pha xả
+        self.live_processor = StreamingOscillometricProcessor(
+            config=config.get('algorithm', {}),
+            logger=self.logger
+        )
+        
         # ========== MEASUREMENT PARAMETERS ==========
         
         self.inflate_target = config.get('inflate_target_mmhg', 190.0)
         self.deflate_rate = config.get('deflate_rate_mmhg_s', 3.0)
         self.max_pressure = config.get('max_pressure_mmhg', 250.0)
         
+        # Deflate mode: 'full' (xả tới DEFLATE_END_PRESSURE_MMHG) hoặc
+        # 'early_stop' (mở van ngay khi DIA được xác nhận đủ tin cậy)
+        self.deflate_mode = config.get('deflate_mode', 'full')
+        if self.deflate_mode not in ('full', 'early_stop'):
+            self.logger.warning(f"Invalid deflate_mode '{self.deflate_mode}', defaulting to 'full'")
+            self.deflate_mode = 'full'
+        # Ngưỡng trên StreamingOscillometricProcessor.estimate_confidence() (liên tục 0-1):
+        # deflate sạch ~0.85-0.95, DIA giả do nhiễu / nhịp không đều < 0.3
+        self.early_stop_min_confidence = config.get('early_stop_min_confidence', 0.6)
+        self.early_stop_margin = config.get('early_stop_margin_mmhg', 5.0)  # Thu thêm dưới DIA cho batch analysis
+        
+        # Early-stop statistics
+        self.last_deflate_stats: Dict[str, Any] = {}
+        self.early_stop_count = 0
+        self.total_seconds_saved = 0.0
+        
         # ========== STATE MACHINE ==========
         
         self.state = BPState.IDLE
@@ -1187,6 +1620,10 @@ class BloodPressureSensor(BaseSensor):
         with self.state_lock:
             return self.state
     
+    def get_live_estimate(self) -> OscillometricEstimate:
+        """Lấy ước lượng SYS/MAP/DIA trực tiếp (cập nhật trong pha xả)"""
+        return self.live_processor.get_estimate()
+    
     # ==================== MEASUREMENT WORKFLOW ====================
     
     def _measurement_loop(self):
@@ -1238,7 +1675,7 @@ class BloodPressureSensor(BaseSensor):
             self._cleanup_hardware()
             
             # Reset to IDLE after 2s
-            time.sleep(2.0)
+            self._sleep(2.0)
             self._set_state(BPState.IDLE)
             
         except Exception as e:
@@ -1284,13 +1721,13 @@ class BloodPressureSensor(BaseSensor):
         
         # Wait for deflation (5s)
         self.logger.info("Deflating to zero...")
-        time.sleep(5.0)
+        self._sleep(5.0)
         
         # Close valve
         self.hardware.valve_close()
         
         # Verify zero pressure
-        time.sleep(0.5)
+        self._sleep(0.5)
         pressure_data = self.adc_sensor.get_latest_data()
         
         if pressure_data is None:
@@ -1337,7 +1774,7 @@ class BloodPressureSensor(BaseSensor):
             
             if pressure_data is None:
                 self.logger.warning("ADC read failed during inflate")
-                time.sleep(0.1)
+                self._sleep(0.1)
                 continue
             
             pressure = pressure_data['pressure_mmhg']
@@ -1368,7 +1805,7 @@ class BloodPressureSensor(BaseSensor):
                 self.logger.info(f"Target reached: {pressure:.1f} mmHg")
                 break
             
-            time.sleep(0.1)
+            self._sleep(0.1)
         
         # Turn pump OFF
         self.hardware.pump_off()
@@ -1384,7 +1821,9 @@ class BloodPressureSensor(BaseSensor):
         1. Pump OFF (dừng bơm)
         2. Van GIỮ ĐÓNG (GPIO HIGH cho van NO) → rò rỉ tự nhiên qua cuff
         3. Thu thập áp + dao động liên tục (~10-40 SPS từ HX710B)
-        4. Dừng khi áp < 30 mmHg
+           qua stream lossless: mọi conversion với timestamp lúc data-ready
+        4. Dừng khi áp < 30 mmHg (deflate_mode='full')
+           hoặc ngay dưới DIA đã xác nhận đủ tin cậy (deflate_mode='early_stop')
         5. Mở van hoàn toàn (GPIO LOW) → xả nhanh còn lại
         
         Tốc độ xả:
@@ -1411,102 +1850,195 @@ class BloodPressureSensor(BaseSensor):
         self.hardware.valve_close()  # ← QUAN TRỌNG: GIỮ ĐÓNG để passive deflation
         
         # Delay 0.5s: Cho van cơ học thời gian đóng hoàn toàn
-        time.sleep(0.5)
+        self._sleep(0.5)
         self.logger.debug("Valve closed - waiting for pressure to stabilize...")
         
-        # Start recording
-        start_time = time.time()
-        last_pressure = None
+        # Start recording: lossless ADC stream (mọi conversion + timestamp thực)
+        self.adc_sensor.start_stream()
+        self.live_processor.start(1.0 / self.adc_sensor.driver.get_conversion_period())
+        start_time = self._now()
         last_log_time = start_time
+        map_announced = False
+        dia_announced = False
+        early_stop_pressure: Optional[float] = None
+        early_stop_confidence = 0.0
+        stopped_early = False
+        seconds_saved = 0.0
         
         # Deflate rate tracking
         deflate_rates = []
         
-        # ========== DATA COLLECTION LOOP ==========
-        while True:
-            # ========== READ PRESSURE ==========
-            pressure_data = self.adc_sensor.get_latest_data()
-            
-            if pressure_data is None:
-                self.logger.warning("ADC read failed during deflate")
-                time.sleep(0.1)
-                continue
-            
-            pressure = pressure_data['pressure_mmhg']
-            timestamp = time.time()
-            
-            # ========== RECORD DATA ==========
-            self.pressure_buffer.append(pressure)
-            self.timestamp_buffer.append(timestamp)
-            
-            # ========== CALCULATE DEFLATE RATE ==========
-            if last_pressure is not None and len(self.timestamp_buffer) > 1:
-                dt = timestamp - self.timestamp_buffer[-2]
-                if dt > 0.01:  # Ignore too-fast samples
-                    dp = last_pressure - pressure
-                    rate = dp / dt  # mmHg/s
-                    deflate_rates.append(rate)
-                    
-                    # Log deflate rate every 5s
-                    if timestamp - last_log_time >= 5.0:
-                        avg_rate = np.mean(deflate_rates[-50:]) if len(deflate_rates) > 0 else 0.0
-                        self.logger.debug(
-                            f"Deflate: {pressure:.1f} mmHg | "
-                            f"Rate: {avg_rate:.2f} mmHg/s | "
-                            f"Samples: {len(self.pressure_buffer)}"
+        try:
+            # ========== DATA COLLECTION LOOP ==========
+            while True:
+                # ========== DRAIN PRESSURE STREAM ==========
+                pressures, timestamps = self.adc_sensor.drain_pressures()
+                
+                if pressures.size == 0:
+                    # Safety: Timeout vẫn phải kiểm tra khi ADC không trả dữ liệu
+                    elapsed = self._now() - start_time
+                    if elapsed > 120.0:
+                        self.logger.error(f"Deflation timeout ({elapsed:.1f}s) - no ADC data")
+                        self.hardware.valve_open()
+                        self._sleep(5.0)
+                        self.hardware.valve_close()
+                        return False
+                    self._sleep(0.05)
+                    continue
+                
+                # ========== RECORD DATA ==========
+                self.pressure_buffer.extend(pressures.tolist())
+                self.timestamp_buffer.extend(timestamps.tolist())
+                
+                pressure = float(pressures[-1])
+                timestamp = float(timestamps[-1])
+                
+                # ========== LIVE OSCILLOMETRIC ESTIMATE ==========
+                estimate = self.live_processor.update(pressures, timestamps)
+                
+                if estimate.systolic is not None and estimate.map_value is not None and not map_announced:
+                    if estimate.map_value - pressure > 5.0:  # MAP đã qua (cuff dưới MAP)
+                        self.logger.info(
+                            f"Live estimate: SYS≈{estimate.systolic:.1f} MAP≈{estimate.map_value:.1f} mmHg "
+                            f"({estimate.beat_count} beats)"
                         )
-                        last_log_time = timestamp
-            
-            last_pressure = pressure
-            
-            # ========== SAFETY CHECKS ==========
-            
-            # Safety 1: Leak detection (too fast)
-            is_ok, msg = self.safety.detect_leak(pressure, timestamp)
-            if not is_ok:
-                self.logger.error(f"Safety abort: {msg}")
-                # Emergency: Mở van hoàn toàn để xả nhanh
-                self.hardware.valve_open()
-                time.sleep(3.0)
-                self.hardware.valve_close()
-                return False
-            
-            # Safety 2: Timeout (too slow)
-            elapsed = timestamp - start_time
-            if elapsed > 120.0:  # 2 minutes max
-                avg_rate = np.mean(deflate_rates) if deflate_rates else 0.0
-                self.logger.error(
-                    f"Deflation timeout ({elapsed:.1f}s). "
-                    f"Avg rate: {avg_rate:.2f} mmHg/s (expected ~2-3)"
-                )
-                # Force: Mở van để tăng tốc xả
-                self.logger.warning("Opening valve to speed up deflation...")
-                self.hardware.valve_open()
-                time.sleep(5.0)
-                self.hardware.valve_close()
-                return False
-            
-            # ========== CHECK COMPLETION ==========
-            if pressure < 30.0:
-                self.logger.info(f"Deflation complete: {pressure:.1f} mmHg")
-                break
-            
-            # Sample at ~20 Hz (limited by HX710B SPS ~10-40)
-            time.sleep(0.05)
+                        map_announced = True
+                
+                if estimate.dia_confirmed and not dia_announced:
+                    self.logger.info(
+                        f"Live estimate: DIA≈{estimate.diastolic:.1f} mmHg confirmed at {pressure:.1f} mmHg "
+                        f"(t={timestamp - start_time:.1f}s)"
+                    )
+                    dia_announced = True
+                    
+                    if self.deflate_mode == 'early_stop':
+                        early_stop_confidence = self.live_processor.estimate_confidence()
+                        cutoff = estimate.diastolic - self.early_stop_margin
+                        if early_stop_confidence < self.early_stop_min_confidence:
+                            self.logger.info(
+                                f"Early stop skipped: confidence {early_stop_confidence:.2f} < "
+                                f"{self.early_stop_min_confidence:.2f}, continuing full deflate"
+                            )
+                        elif cutoff <= self.DEFLATE_END_PRESSURE_MMHG:
+                            # DIA thấp: cutoff không cao hơn điểm kết thúc thường → không tiết kiệm gì
+                            self.logger.info(
+                                f"Early stop skipped: cutoff {cutoff:.1f} mmHg <= "
+                                f"{self.DEFLATE_END_PRESSURE_MMHG:.1f} mmHg, continuing full deflate"
+                            )
+                        else:
+                            early_stop_pressure = cutoff
+                            self.logger.info(
+                                f"Early stop armed at {early_stop_pressure:.1f} mmHg "
+                                f"(confidence={early_stop_confidence:.2f})"
+                            )
+                
+                # ========== CALCULATE DEFLATE RATE ==========
+                if len(self.timestamp_buffer) > pressures.size:
+                    # Nối mẫu cuối của batch trước để tính rate liên tục
+                    prev_idx = -pressures.size - 1
+                    batch_p = np.concatenate(([self.pressure_buffer[prev_idx]], pressures))
+                    batch_t = np.concatenate(([self.timestamp_buffer[prev_idx]], timestamps))
+                else:
+                    batch_p, batch_t = pressures, timestamps
+                
+                dt = np.diff(batch_t)
+                valid_dt = dt > 0.01  # Ignore too-fast samples
+                if valid_dt.any():
+                    rates = -np.diff(batch_p)[valid_dt] / dt[valid_dt]  # mmHg/s
+                    deflate_rates.extend(rates.tolist())
+                
+                # Log deflate rate every 5s
+                if timestamp - last_log_time >= 5.0:
+                    avg_rate = np.mean(deflate_rates[-50:]) if len(deflate_rates) > 0 else 0.0
+                    self.logger.debug(
+                        f"Deflate: {pressure:.1f} mmHg | "
+                        f"Rate: {avg_rate:.2f} mmHg/s | "
+                        f"Samples: {len(self.pressure_buffer)}"
+                    )
+                    last_log_time = timestamp
+                
+                # ========== SAFETY CHECKS ==========
+                
+                # Safety 1: Leak detection (too fast) - từng mẫu theo timestamp thực
+                for sample_p, sample_t in zip(pressures.tolist(), timestamps.tolist()):
+                    is_ok, msg = self.safety.detect_leak(sample_p, sample_t)
+                    if not is_ok:
+                        self.logger.error(f"Safety abort: {msg}")
+                        # Emergency: Mở van hoàn toàn để xả nhanh
+                        self.hardware.valve_open()
+                        self._sleep(3.0)
+                        self.hardware.valve_close()
+                        return False
+                
+                # Safety 2: Timeout (too slow)
+                elapsed = self._now() - start_time
+                if elapsed > 120.0:  # 2 minutes max
+                    avg_rate = np.mean(deflate_rates) if deflate_rates else 0.0
+                    self.logger.error(
+                        f"Deflation timeout ({elapsed:.1f}s). "
+                        f"Avg rate: {avg_rate:.2f} mmHg/s (expected ~2-3)"
+                    )
+                    # Force: Mở van để tăng tốc xả
+                    self.logger.warning("Opening valve to speed up deflation...")
+                    self.hardware.valve_open()
+                    self._sleep(5.0)
+                    self.hardware.valve_close()
+                    return False
+                
+                # ========== CHECK COMPLETION ==========
+                if early_stop_pressure is not None and pressure <= early_stop_pressure:
+                    # Thời gian tiết kiệm = phần áp còn lại tới cutoff / tốc độ xả trung bình
+                    avg_rate = (self.pressure_buffer[0] - pressure) / max(0.1, timestamp - self.timestamp_buffer[0])
+                    if avg_rate > 0:
+                        seconds_saved = max(0.0, (pressure - self.DEFLATE_END_PRESSURE_MMHG) / avg_rate)
+                    self.logger.info(
+                        f"Deflation stopped early: {pressure:.1f} mmHg "
+                        f"(saved ~{seconds_saved:.1f}s of passive deflate)"
+                    )
+                    stopped_early = True
+                    break
+                
+                if pressure < self.DEFLATE_END_PRESSURE_MMHG:
+                    self.logger.info(f"Deflation complete: {pressure:.1f} mmHg")
+                    break
+                
+                # Drain ~20 Hz (stream buffers every HX710B conversion in between)
+                self._sleep(0.05)
+        finally:
+            self.adc_sensor.stop_stream()
+            stream_stats = self.adc_sensor.get_driver_stats()
+            self.logger.info(
+                f"ADC stream: dropped={stream_stats['stream_dropped']}, "
+                f"duplicates={stream_stats['stream_duplicates']}, "
+                f"missed={stream_stats['stream_missed']}"
+            )
         
         # ========== POST-DEFLATION ==========
         
         # Ensure full deflate (mở van hoàn toàn)
         self.logger.info("Ensuring complete deflation...")
         self.hardware.valve_open()  # Xả nhanh còn lại
-        time.sleep(2.0)
+        self._sleep(2.0)
         self.hardware.valve_close()
         
         # ========== STATISTICS ==========
         
-        elapsed = time.time() - start_time
+        elapsed = self._now() - start_time
         num_samples = len(self.pressure_buffer)
         
+        if stopped_early:
+            self.early_stop_count += 1
+            self.total_seconds_saved += seconds_saved
+        
+        self.last_deflate_stats = {
+            'mode': self.deflate_mode,
+            'early_stopped': stopped_early,
+            'stop_pressure': round(self.pressure_buffer[-1], 1) if num_samples else None,
+            'confidence': round(early_stop_confidence, 3),
+            'seconds_saved': round(seconds_saved, 1),
+            'duration_s': round(elapsed, 1)
+        }
+        
         if num_samples > 1 and elapsed > 0:
             actual_sps = num_samples / elapsed
             pressure_drop = self.pressure_buffer[0] - self.pressure_buffer[-1]
@@ -1558,6 +2090,8 @@ class BloodPressureSensor(BaseSensor):
         )
         
         if result:
+            result.metadata['live_estimate'] = self.live_processor.get_estimate().to_dict()
+            result.metadata['deflate'] = dict(self.last_deflate_stats)
             self.logger.info(f"Analysis complete: {result.systolic:.1f}/{result.diastolic:.1f} mmHg")
         else:
             self.logger.error("Analysis failed")
@@ -1579,7 +2113,7 @@ class BloodPressureSensor(BaseSensor):
         self.hardware.pump_off()
         self.hardware.valve_open()
         
-        time.sleep(5.0)
+        self._sleep(5.0)
         
         self.hardware.valve_close()
     
@@ -1617,6 +2151,14 @@ class BloodPressureSensor(BaseSensor):
         self.hardware.cleanup()
         self.adc_sensor.stop()
     
+    def set_scheduler(self, scheduler) -> None:
+        """
+        Share the acquisition scheduler with the composed ADC sensor
+        (HX710B read task + BP latest-data task)
+        """
+        super().set_scheduler(scheduler)
+        self.adc_sensor.set_scheduler(scheduler)
+    
     def read_raw_data(self) -> Optional[Dict]:
         """
         Read raw data (BaseSensor interface)
@@ -1645,6 +2187,10 @@ class BloodPressureSensor(BaseSensor):
             'inflate_target': self.inflate_target,
             'deflate_rate': self.deflate_rate,
             'max_pressure': self.max_pressure,
+            'deflate_mode': self.deflate_mode,
+            'early_stop_count': self.early_stop_count,
+            'total_seconds_saved': round(self.total_seconds_saved, 1),
+            'last_deflate': self.last_deflate_stats,
             'adc_sensor': self.adc_sensor.get_sensor_info(),
             'safety_stats': self.safety.get_stats(),
             'last_measurement': self.last_measurement.to_dict() if self.last_measurement else None
@@ -0,0 +1,161 @@
+"""
+Filter Design Cache - Dùng chung thiết kế IIR cho các DSP path của sensors
+==========================================================================
+
+scipy.signal.butter tốn thời gian đáng kể trên Raspberry Pi, trong khi các
+sensor (MAX30102, HX710B/BP, ...) thiết kế lại cùng một bộ lọc ở mỗi tick
+hoặc mỗi lần đo. Module này cache thiết kế theo key:
+
+    (order, band (Hz), sample rate đã lượng tử hóa)
+
+và trả về SOS sections + steady-state zi (cho step input = 1).
+
+Design:
+-------
+- Sample rate được lượng tử hóa (mặc định 0.25 Hz) để các rate đo được
+  hơi khác nhau (ví dụ 9.87 / 9.91 SPS) dùng chung một thiết kế
+- Band edges được chuẩn hóa và clamp về 0 < Wn < 1 (low >= 0.01, high <= 0.95)
+- Arrays trả về dùng chung giữa các caller: không được sửa in-place
+  (không set read-only vì sosfilt của scipy yêu cầu buffer ghi được)
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from scipy import signal as scipy_signal
+
+
+# ==================== CONSTANTS ====================
+
+DEFAULT_FS_QUANTUM_HZ = 0.25
+CACHE_SIZE = 64
+
+
+# ==================== DATA STRUCTURES ====================
+
+@dataclass(frozen=True)
+class FilterDesign:
+    """
+    Thiết kế IIR đã cache
+
+    Attributes:
+        sos: Second-order sections (dùng chung - không sửa)
+        zi: Steady-state state cho step input 1.0 (dùng chung - không sửa), shape (n_sections, 2)
+        order: Bậc bộ lọc
+        band: (low, high) Hz như được yêu cầu
+        sample_rate: Sample rate đã lượng tử hóa dùng để thiết kế
+        wn: (low, high) đã chuẩn hóa theo Nyquist sau khi clamp
+    """
+    sos: np.ndarray
+    zi: np.ndarray
+    order: int
+    band: Tuple[float, float]
+    sample_rate: float
+    wn: Tuple[float, float]
+
+    def initial_state(self, x0: float) -> np.ndarray:
+        """
+        State khởi tạo ở steady-state của mẫu đầu tiên (tránh step transient)
+
+        Args:
+            x0: Giá trị mẫu đầu tiên
+
+        Returns:
+            np.ndarray: zi mới (có thể ghi) cho sosfilt
+        """
+        return self.zi * x0
+
+
+# ==================== PUBLIC API ====================
+
+def quantize_sample_rate(sample_rate: float, quantum: float = DEFAULT_FS_QUANTUM_HZ) -> float:
+    """
+    Làm tròn sample rate về bội số của quantum (tối thiểu 1 quantum)
+
+    Args:
+        sample_rate: Sample rate thực đo (Hz)
+        quantum: Bước lượng tử hóa (Hz)
+
+    Returns:
+        float: Sample rate dùng làm cache key
+    """
+    if quantum <= 0:
+        return float(sample_rate)
+    steps = max(1, int(round(float(sample_rate) / quantum)))
+    return round(steps * quantum, 6)
+
+
+def get_bandpass_design(
+    order: int,
+    low_hz: float,
+    high_hz: float,
+    sample_rate: float,
+    quantum: float = DEFAULT_FS_QUANTUM_HZ,
+) -> FilterDesign:
+    """
+    Butterworth bandpass (SOS + zi) từ cache
+
+    Args:
+        order: Bậc bộ lọc
+        low_hz: Tần số cắt dưới (Hz)
+        high_hz: Tần số cắt trên (Hz)
+        sample_rate: Sample rate (Hz), được lượng tử hóa trước khi tra cache
+        quantum: Bước lượng tử hóa sample rate (Hz)
+
+    Returns:
+        FilterDesign dùng chung (không sửa sos/zi)
+    """
+    fs = quantize_sample_rate(sample_rate, quantum)
+    return _design_bandpass(int(order), float(low_hz), float(high_hz), fs)
+
+
+def get_filter_cache_info() -> Dict[str, Any]:
+    """
+    Get cache statistics
+
+    Returns:
+        dict: hits, misses, size, max_size
+    """
+    info = _design_bandpass.cache_info()
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize
+    }
+
+
+def clear_filter_cache():
+    """Xóa toàn bộ thiết kế đã cache"""
+    _design_bandpass.cache_clear()
+
+
+# ==================== INTERNAL ====================
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _design_bandpass(order: int, low_hz: float, high_hz: float, sample_rate: float) -> FilterDesign:
+    """Thiết kế thực tế (chỉ chạy khi cache miss)"""
+    nyquist = sample_rate / 2.0
+    low = low_hz / nyquist
+    high = high_hz / nyquist
+
+    # Clamp frequencies to valid range (0 < Wn < 1); low ≤ 0.90 để high ≤ 0.95
+    low = max(0.01, min(low, 0.90))
+    high = max(low + 0.05, min(high, 0.95))  # high phải > low
+
+    sos = scipy_signal.butter(order, [low, high], btype='band', output='sos')
+    zi = scipy_signal.sosfilt_zi(sos)
+
+    return FilterDesign(
+        sos=sos,
+        zi=zi,
+        order=order,
+        band=(low_hz, high_hz),
+        sample_rate=sample_rate,
+        wn=(low, high),
+    )
@@ -0,0 +1,344 @@
+"""
+GPIO Backends - Lớp GPIO thay thế được cho driver bit-bang (HX710B)
+===================================================================
+
+HX710BDriver chỉ cần 4 thao tác GPIO: cấu hình 2 chân, chờ DOUT xuống LOW
+(data ready), shift-out N xung SCK đọc 24 bit, và đặt mức SCK (power-down).
+Các backend cài đặt cùng interface:
+
+- RPiGPIOBackend: RPi.GPIO (mặc định, Pi 3/4). Chờ DOUT bằng
+  GPIO.wait_for_edge (chặn trong C) thay vì sleep-poll 1 ms
+- GpiodBackend: libgpiod v2 (python3-gpiod, Pi 5 / kernel mới). Một line
+  request cho cả SCK + DOUT, chờ edge event của kernel
+- FakeHX710BBackend: HX710B giả lập trong bộ nhớ (tests, không phần cứng)
+
+Hot path shift_in() gán trước các hàm GPIO vào biến local (tránh attribute
+lookup mỗi bit) - mỗi xung chỉ còn 2 lời gọi output + 1 lời gọi input.
+
+Config (hx710b):
+---------------
+    gpio_backend: rpi        # rpi | gpiod (fake: truyền trực tiếp backend= cho driver)
+    gpio_chip: /dev/gpiochip0  # gpiod only
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Any, Dict, Optional, Sequence
+import logging
+import threading
+import time
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None
+
+try:
+    import gpiod  # libgpiod v2 bindings
+    from gpiod.line import Direction, Edge, Value
+except ImportError:
+    gpiod = None
+
+
+# ==================== CONSTANTS ====================
+
+DATA_BITS = 24
+EDGE_WAIT_SLICE_S = 0.02  # Chờ edge theo lát 20 ms, kiểm tra lại mức DOUT (phòng lỡ edge)
+
+
+# ==================== INTERFACE ====================
+
+class GPIOBackend(ABC):
+    """
+    Interface GPIO cho driver ADC bit-bang (DOUT input, SCK output)
+
+    Attributes:
+        name (str): Tên backend (log / stats)
+        gpio_dout (int): DOUT pin
+        gpio_sck (int): SCK pin
+    """
+
+    name = "base"
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(f"GPIOBackend.{self.name}")
+        self.gpio_dout = -1
+        self.gpio_sck = -1
+
+    @abstractmethod
+    def setup(self, gpio_dout: int, gpio_sck: int) -> bool:
+        """
+        Cấu hình DOUT (input) và SCK (output, LOW)
+
+        Returns:
+            bool: True nếu thành công
+        """
+
+    @abstractmethod
+    def wait_for_ready(self, timeout_s: float) -> bool:
+        """
+        Chờ DOUT = LOW (data ready)
+
+        Args:
+            timeout_s: Timeout (giây)
+
+        Returns:
+            bool: True nếu data ready, False nếu timeout
+        """
+
+    @abstractmethod
+    def shift_in(self, pulses: int) -> int:
+        """
+        Phát `pulses` xung SCK, đọc 24 bit đầu (MSB first) sau mỗi sườn xuống
+
+        Args:
+            pulses: Tổng số xung (25/26/27 - chọn mode cho lần đọc sau)
+
+        Returns:
+            int: Giá trị 24-bit chưa đổi dấu
+        """
+
+    @abstractmethod
+    def set_sck(self, high: bool) -> None:
+        """Đặt mức SCK (HIGH > 60 µs = power-down)"""
+
+    def cleanup(self) -> None:
+        """Giải phóng tài nguyên (không reset GPIO của sensor khác)"""
+        return None
+
+
+# ==================== RPi.GPIO ====================
+
+class RPiGPIOBackend(GPIOBackend):
+    """RPi.GPIO: edge wait bằng GPIO.wait_for_edge, bit-bang với hàm hoisted"""
+
+    name = "rpi"
+
+    def setup(self, gpio_dout: int, gpio_sck: int) -> bool:
+        if GPIO is None:
+            self.logger.error("RPi.GPIO not available")
+            return False
+
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+
+        # CRITICAL: SCK must be LOW initially (HIGH > 60µs = power-down)
+        GPIO.setup(gpio_sck, GPIO.OUT, initial=GPIO.LOW)
+        GPIO.setup(gpio_dout, GPIO.IN)
+
+        self.gpio_dout = gpio_dout
+        self.gpio_sck = gpio_sck
+        return True
+
+    def wait_for_ready(self, timeout_s: float) -> bool:
+        dout = self.gpio_dout
+        read = GPIO.input
+        deadline = time.monotonic() + timeout_s
+
+        while read(dout):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Chặn trong C tới falling edge; lát ngắn để không lỡ edge xảy ra
+            # giữa lần đọc mức và lúc bắt đầu chờ
+            GPIO.wait_for_edge(dout, GPIO.FALLING, timeout=max(1, int(min(remaining, EDGE_WAIT_SLICE_S) * 1000)))
+        return True
+
+    def shift_in(self, pulses: int) -> int:
+        output = GPIO.output
+        read = GPIO.input
+        sck = self.gpio_sck
+        dout = self.gpio_dout
+
+        value = 0
+        for _ in range(DATA_BITS):
+            # T3/T4 (≥ 0.2 µs) đạt được nhờ overhead tự nhiên của GPIO.output
+            output(sck, 1)
+            output(sck, 0)
+            value = (value << 1) | read(dout)
+
+        for _ in range(pulses - DATA_BITS):
+            output(sck, 1)
+            output(sck, 0)
+
+        return value
+
+    def set_sck(self, high: bool) -> None:
+        if GPIO is not None and self.gpio_sck >= 0:
+            GPIO.output(self.gpio_sck, GPIO.HIGH if high else GPIO.LOW)
+
+
+# ==================== LIBGPIOD v2 ====================
+
+class GpiodBackend(GPIOBackend):
+    """libgpiod v2: một line request (SCK + DOUT), chờ edge event của kernel"""
+
+    name = "gpiod"
+
+    def __init__(self, chip_path: str = "/dev/gpiochip0", logger: Optional[logging.Logger] = None):
+        super().__init__(logger)
+        self.chip_path = chip_path
+        self._request: Optional[Any] = None
+
+    def setup(self, gpio_dout: int, gpio_sck: int) -> bool:
+        if gpiod is None:
+            self.logger.error("gpiod (libgpiod v2) not available")
+            return False
+
+        self._request = gpiod.request_lines(
+            self.chip_path,
+            consumer="hx710b",
+            config={
+                gpio_sck: gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE),
+                gpio_dout: gpiod.LineSettings(direction=Direction.INPUT, edge_detection=Edge.FALLING),
+            },
+        )
+        self.gpio_dout = gpio_dout
+        self.gpio_sck = gpio_sck
+        return True
+
+    def wait_for_ready(self, timeout_s: float) -> bool:
+        request = self._request
+        dout = self.gpio_dout
+        deadline = time.monotonic() + timeout_s
+
+        while request.get_value(dout) == Value.ACTIVE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if request.wait_edge_events(timedelta(seconds=min(remaining, EDGE_WAIT_SLICE_S))):
+                request.read_edge_events()
+        return True
+
+    def shift_in(self, pulses: int) -> int:
+        set_value = self._request.set_value
+        get_value = self._request.get_value
+        sck = self.gpio_sck
+        dout = self.gpio_dout
+        high = Value.ACTIVE
+        low = Value.INACTIVE
+
+        value = 0
+        for _ in range(DATA_BITS):
+            set_value(sck, high)
+            set_value(sck, low)
+            value = (value << 1) | (get_value(dout) == high)
+
+        for _ in range(pulses - DATA_BITS):
+            set_value(sck, high)
+            set_value(sck, low)
+
+        # Edge events phát sinh trong lúc shift (DOUT là data line) - bỏ
+        if self._request.wait_edge_events(timedelta(0)):
+            self._request.read_edge_events()
+
+        return value
+
+    def set_sck(self, high: bool) -> None:
+        if self._request is not None:
+            self._request.set_value(self.gpio_sck, Value.ACTIVE if high else Value.INACTIVE)
+
+    def cleanup(self) -> None:
+        if self._request is not None:
+            try:
+                self._request.release()
+            except Exception as exc:  # pragma: no cover - hardware only
+                self.logger.debug(f"Line release error: {exc}")
+            self._request = None
+
+
+# ==================== FAKE (TESTS) ====================
+
+class FakeHX710BBackend(GPIOBackend):
+    """
+    HX710B giả lập: một conversion mỗi `period_s`, DOUT LOW tới khi được đọc
+
+    Conversion k sẵn sàng tại start + (k+1) × period và mang giá trị
+    values[k % len(values)]; đọc chậm thì các conversion cũ bị bỏ qua
+    (ADC chỉ giữ kết quả mới nhất) giống phần cứng.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        values: Sequence[int],
+        period_s: float = 0.1,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            values: ADC counts (signed 24-bit), phát lại vòng tròn
+            period_s: Thời gian giữa các conversion (giây)
+            logger: Logger instance
+        """
+        super().__init__(logger)
+        self.values = [int(v) for v in values] or [0]
+        self.period_s = float(period_s)
+        self.sck_high = False
+        self.pulse_counts = []     # Số xung SCK mỗi lần shift_in (kiểm tra mode)
+        self._start = 0.0
+        self._next_index = 0       # Conversion sớm nhất chưa được đọc
+        self._wake = threading.Event()
+
+    def setup(self, gpio_dout: int, gpio_sck: int) -> bool:
+        self.gpio_dout = gpio_dout
+        self.gpio_sck = gpio_sck
+        self._start = time.monotonic()
+        self._next_index = 0
+        self._wake.clear()
+        return True
+
+    def _latest_index(self) -> int:
+        """Conversion mới nhất đã hoàn tất (-1 nếu chưa có)"""
+        return int((time.monotonic() - self._start) / self.period_s) - 1
+
+    def wait_for_ready(self, timeout_s: float) -> bool:
+        if self.sck_high:
+            self._wake.wait(timeout_s)  # Power-down: không có conversion
+            return False
+        ready_at = self._start + (self._next_index + 1) * self.period_s
+        delay = ready_at - time.monotonic()
+        if delay > timeout_s:
+            self._wake.wait(timeout_s)
+            return False
+        if delay > 0:
+            self._wake.wait(delay)
+        return True
+
+    def shift_in(self, pulses: int) -> int:
+        index = max(self._next_index, self._latest_index())
+        self._next_index = index + 1
+        self.pulse_counts.append(pulses)
+        return self.values[index % len(self.values)] & 0xFFFFFF
+
+    def set_sck(self, high: bool) -> None:
+        self.sck_high = bool(high)
+
+    def cleanup(self) -> None:
+        self._wake.set()  # Đánh thức thread đang chờ
+
+
+# ==================== FACTORY ====================
+
+def create_gpio_backend(config: Dict[str, Any], logger: Optional[logging.Logger] = None) -> GPIOBackend:
+    """
+    Tạo backend theo config
+
+    Args:
+        config: Dict với gpio_backend ('rpi' | 'gpiod'), gpio_chip (gpiod)
+        logger: Logger instance
+
+    Returns:
+        GPIOBackend (mặc định RPiGPIOBackend)
+    """
+    name = str(config.get('gpio_backend', 'rpi')).lower()
+
+    if name == 'gpiod':
+        return GpiodBackend(config.get('gpio_chip', '/dev/gpiochip0'), logger=logger)
+    if name != 'rpi':
+        (logger or logging.getLogger(__name__)).warning(f"Unknown gpio_backend '{name}', using rpi")
+    return RPiGPIOBackend(logger=logger)
@@ -37,16 +37,17 @@ Date: 2025-10-24
 Version: 3.0.0 (Rewritten based on official datasheet)
 """
 
-from typing import Optional, Callable
+from typing import Optional, Callable, Tuple
 from enum import Enum
 import logging
 import time
 import threading
 
-try:
-    import RPi.GPIO as GPIO
-except ImportError:
-    GPIO = None
+import numpy as np
+
+from .gpio_backend import GPIOBackend, RPiGPIOBackend
+from .sample_buffer import TimestampedRingBuffer
+from .timing_stats import LatencyHistogram
 
 
 class HX710Mode(Enum):
@@ -84,6 +85,12 @@ class HX710BDriver:
     >>> 
     >>> driver.set_callback(on_data)
     >>> driver.start_continuous()  # Auto-read in background
+    >>> 
+    >>> # Continuous mode also feeds a lossless ring buffer
+    >>> counts, timestamps = driver.drain()  # NumPy arrays, conversion time
+    
+    GPIO access goes through a pluggable backend (see gpio_backend.py):
+    RPi.GPIO (default), libgpiod v2, or an in-memory fake for tests.
     """
     
     # Timing constants (from datasheet)
@@ -99,12 +106,19 @@ class HX710BDriver:
     ADC_MIN = -0x800000  # -8388608 (24-bit signed min)
     ADC_MAX = 0x7FFFFF   # 8388607 (24-bit signed max)
     
+    # Continuous stream constants
+    DEFAULT_BUFFER_CAPACITY = 1024   # ~25s @ 40 SPS, ~100s @ 10 SPS
+    DUPLICATE_PERIOD_RATIO = 0.5     # Conversion < 0.5 period after previous → duplicate
+    MISSED_PERIOD_RATIO = 1.5        # Gap > 1.5 period → missed conversion(s)
+    
     def __init__(
         self,
         gpio_dout: int,
         gpio_sck: int,
         mode: HX710Mode = HX710Mode.DIFFERENTIAL_10SPS,
-        timeout_ms: int = 500
+        timeout_ms: int = 500,
+        buffer_capacity: int = DEFAULT_BUFFER_CAPACITY,
+        backend: Optional[GPIOBackend] = None
     ):
         """
         Initialize HX710B driver
@@ -114,6 +128,8 @@ class HX710BDriver:
             gpio_sck: GPIO pin for SCK (serial clock, output from MCU)
             mode: Operating mode (10 SPS or 40 SPS)
             timeout_ms: Timeout for waiting data ready (ms)
+            buffer_capacity: Ring buffer size for continuous mode (samples)
+            backend: GPIO backend (default: RPiGPIOBackend)
         """
         self.gpio_dout = gpio_dout
         self.gpio_sck = gpio_sck
@@ -121,6 +137,7 @@ class HX710BDriver:
         self.timeout_ms = timeout_ms
         
         self.logger = logging.getLogger(f"HX710B[DOUT={gpio_dout},SCK={gpio_sck}]")
+        self.backend = backend or RPiGPIOBackend(logger=self.logger)
         
         # State
         self._lock = threading.Lock()
@@ -129,10 +146,23 @@ class HX710BDriver:
         self._continuous_thread: Optional[threading.Thread] = None
         self._stop_continuous = threading.Event()
         
+        # Continuous stream (preallocated, timestamped at conversion time)
+        self._ring = TimestampedRingBuffer(buffer_capacity, dtype=np.int32)
+        self._sample_cond = threading.Condition()
+        self._sample_seq = 0
+        self._last_sample_time: Optional[float] = None
+        
         # Statistics
         self._read_count = 0
         self._error_count = 0
         self._last_value: Optional[int] = None
+        self._duplicate_count = 0
+        self._missed_count = 0
+        
+        # Per-read timing: wait (data ready), shift (24+N SCK pulses), CPU (thread time)
+        self._wait_hist = LatencyHistogram()
+        self._shift_hist = LatencyHistogram()
+        self._cpu_hist = LatencyHistogram()
         
     def initialize(self) -> bool:
         """
@@ -147,19 +177,15 @@ class HX710BDriver:
         Returns:
             bool: True if successful
         """
-        if not GPIO:
-            self.logger.error("RPi.GPIO not available")
-            return False
-        
         try:
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setwarnings(False)
-            
             # Setup pins (CRITICAL: SCK must be LOW initially)
-            GPIO.setup(self.gpio_sck, GPIO.OUT, initial=GPIO.LOW)
-            GPIO.setup(self.gpio_dout, GPIO.IN)
+            if not self.backend.setup(self.gpio_dout, self.gpio_sck):
+                return False
             
-            self.logger.info(f"GPIO initialized (DOUT=GPIO{self.gpio_dout}, SCK=GPIO{self.gpio_sck})")
+            self.logger.info(
+                f"GPIO initialized (DOUT=GPIO{self.gpio_dout}, SCK=GPIO{self.gpio_sck}, "
+                f"backend={self.backend.name})"
+            )
             
             # Wait for power-up settling (from datasheet)
             settling_time = (
@@ -219,6 +245,25 @@ class HX710BDriver:
             int: Signed 24-bit value (-8388608 to 8388607)
             None: On timeout or error
         """
+        sample = self.read_with_timestamp(timeout_ms)
+        return sample[0] if sample is not None else None
+    
+    def read_with_timestamp(self, timeout_ms: Optional[int] = None) -> Optional[Tuple[int, float]]:
+        """
+        Read 24-bit value together with its conversion timestamp
+        
+        Timestamp is taken when DOUT=LOW is detected (data ready),
+        not when the caller asked for data. DOUT is awaited with the
+        backend's edge wait (no sleep polling). Wait, shift and CPU time
+        of every read are recorded (see get_read_timing()).
+        
+        Args:
+            timeout_ms: Override default timeout (ms)
+        
+        Returns:
+            (value, timestamp): Signed 24-bit value, time.time() at data ready
+            None: On timeout or error
+        """
         if not self._is_initialized:
             self.logger.error("Driver not initialized")
             return None
@@ -227,42 +272,27 @@ class HX710BDriver:
         
         with self._lock:
             try:
-                # Step 1: Wait for DOUT = LOW (data ready)
-                start_time = time.time()
-                timeout_s = timeout / 1000.0
+                cpu_start = time.thread_time()
+                wait_start = time.perf_counter()
                 
-                while GPIO.input(self.gpio_dout) == GPIO.HIGH:
-                    if time.time() - start_time > timeout_s:
+                # Step 1: Wait for DOUT = LOW (data ready) - edge wait
+                if not self.backend.wait_for_ready(timeout / 1000.0):
+                    if timeout > 0:  # timeout 0 = poll, "not ready" is not an error
                         self._error_count += 1
-                        self.logger.debug(f"Timeout waiting for data ready ({timeout}ms)")
-                        return None
-                    time.sleep(0.001)  # 1ms poll interval (like test.py)
-                
-                # Step 2: Clock out 24 bits (MSB first)
-                value = 0
+                    self.logger.debug(f"Timeout waiting for data ready ({timeout}ms)")
+                    return None
                 
-                for _ in range(24):
-                    # Generate clock pulse (datasheet Table T1-T4)
-                    # T3: SCK HIGH time (typ 1μs, min 0.2μs)
-                    # T4: SCK LOW time (typ 1μs, min 0.2μs)
-                    # NOTE: GPIO.output() on RPi has ~0.1-0.5μs natural delay, 
-                    #       sufficient to meet timing requirements. 
-                    #       time.sleep() has 10ms overhead in Python - TOO SLOW!
-                    GPIO.output(self.gpio_sck, GPIO.HIGH)
-                    GPIO.output(self.gpio_sck, GPIO.LOW)
-                    
-                    # T2: DOUT valid after SCK rising (≤ 0.1μs)
-                    # Read DOUT AFTER LOW transition (data stable)
-                    bit = GPIO.input(self.gpio_dout)
-                    value = (value << 1) | bit
+                ready_time = time.time()
+                shift_start = time.perf_counter()
                 
-                # Step 3: Additional pulses for mode selection
-                pulses_needed = self.mode.value  # 25, 26, or 27
-                additional_pulses = pulses_needed - 24
+                # Step 2-3: Clock out 24 bits (MSB first) + mode selection pulses
+                # (25, 26, or 27 total - datasheet Table T1-T4 timing)
+                value = self.backend.shift_in(self.mode.value)
                 
-                for _ in range(additional_pulses):
-                    GPIO.output(self.gpio_sck, GPIO.HIGH)
-                    GPIO.output(self.gpio_sck, GPIO.LOW)
+                shift_end = time.perf_counter()
+                self._wait_hist.record(shift_start - wait_start)
+                self._shift_hist.record(shift_end - shift_start)
+                self._cpu_hist.record(time.thread_time() - cpu_start)
                 
                 # Step 4: Convert to signed 24-bit (2's complement)
                 if value & 0x800000:  # MSB = 1 (negative)
@@ -272,7 +302,7 @@ class HX710BDriver:
                 self._read_count += 1
                 self._last_value = value
                 
-                return value
+                return value, ready_time
                 
             except Exception as e:
                 self._error_count += 1
@@ -299,8 +329,8 @@ class HX710BDriver:
         - Analog current: 0.3 μA (typ)
         - Digital current: 0.2 μA (typ)
         """
-        if GPIO and self._is_initialized:
-            GPIO.output(self.gpio_sck, GPIO.HIGH)
+        if self._is_initialized:
+            self.backend.set_sck(True)
             time.sleep(self.T_POWERDOWN_US / 1_000_000 * 2)  # 2× safety margin
             self.logger.info("Entered power-down mode")
     
@@ -310,8 +340,8 @@ class HX710BDriver:
         
         Note: Settings from before power-down are restored.
         """
-        if GPIO and self._is_initialized:
-            GPIO.output(self.gpio_sck, GPIO.LOW)
+        if self._is_initialized:
+            self.backend.set_sck(False)
             
             # Wait for settling time
             settling_time = (
@@ -336,12 +366,15 @@ class HX710BDriver:
         Start continuous reading in background thread
         
         Reads at maximum rate supported by mode (10 or 40 SPS).
-        Callback is called for each successful read.
+        Every conversion is pushed into the ring buffer (see drain())
+        with its data-ready timestamp. Callback is called for each
+        successful read.
         """
         if self._continuous_thread and self._continuous_thread.is_alive():
             self.logger.warning("Continuous mode already running")
             return
         
+        self._last_sample_time = None
         self._stop_continuous.clear()
         self._continuous_thread = threading.Thread(
             target=self._continuous_read_loop,
@@ -358,13 +391,51 @@ class HX710BDriver:
             self._continuous_thread.join(timeout=2.0)
             self.logger.info("Stopped continuous reading mode")
     
+    def is_continuous_running(self) -> bool:
+        """Check if the continuous reading thread is active"""
+        return self._continuous_thread is not None and self._continuous_thread.is_alive()
+    
+    def get_conversion_period(self) -> float:
+        """Nominal time between conversions (seconds) for current mode"""
+        return 0.1 if self.mode == HX710Mode.DIFFERENTIAL_10SPS else 0.025
+    
+    def now(self) -> float:
+        """Current time on the conversion-timestamp clock (time.time())"""
+        return time.time()
+    
+    def sleep(self, seconds: float):
+        """Sleep on the conversion-timestamp clock (wall time)"""
+        time.sleep(seconds)
+    
     def _continuous_read_loop(self):
         """Background thread for continuous reading"""
+        period = self.get_conversion_period()
+        
         while not self._stop_continuous.is_set():
-            timestamp = time.time()
-            value = self.read()
+            sample = self.read_with_timestamp()
+            
+            if sample is None:
+                continue
+            
+            value, timestamp = sample
+            
+            # Classify against previous conversion (same data-ready window / gaps)
+            if self._last_sample_time is not None:
+                gap = timestamp - self._last_sample_time
+                if gap < period * self.DUPLICATE_PERIOD_RATIO:
+                    self._duplicate_count += 1
+                    continue
+                if gap > period * self.MISSED_PERIOD_RATIO:
+                    self._missed_count += int(round(gap / period)) - 1
+            self._last_sample_time = timestamp
+            
+            self._ring.push(value, timestamp)
             
-            if value is not None and self._callback:
+            with self._sample_cond:
+                self._sample_seq += 1
+                self._sample_cond.notify_all()
+            
+            if self._callback:
                 try:
                     self._callback(value, timestamp)
                 except Exception as e:
@@ -373,32 +444,106 @@ class HX710BDriver:
             # NO SLEEP - Let ADC data-ready signal control timing (like test.py)
             # HX710B runs at 10/40 SPS naturally
     
+    def wait_for_sample(self, timeout_ms: Optional[int] = None, since_seq: Optional[int] = None) -> Optional[int]:
+        """
+        Wait for the next conversion produced by continuous mode
+        
+        Lets other consumers (e.g. HX710BSensor reading loop) follow the
+        stream without issuing their own GPIO reads.
+        
+        Args:
+            timeout_ms: Override default timeout (ms); 0 = do not wait
+            since_seq: Last sequence seen by the caller (get_sample_seq());
+                returns immediately if newer conversions already arrived
+        
+        Returns:
+            int: Latest ADC value, or None on timeout
+        """
+        timeout = timeout_ms if timeout_ms is not None else self.timeout_ms
+        
+        with self._sample_cond:
+            seq = self._sample_seq if since_seq is None else since_seq
+            if not self._sample_cond.wait_for(lambda: self._sample_seq != seq, timeout / 1000.0):
+                return None
+            return self._last_value
+    
+    def get_sample_seq(self) -> int:
+        """Sequence number of the latest continuous-mode conversion"""
+        with self._sample_cond:
+            return self._sample_seq
+    
+    def drain(self, max_samples: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Drain buffered conversions from continuous mode
+        
+        Args:
+            max_samples: Maximum samples to return (None = all)
+        
+        Returns:
+            (counts, timestamps): int32 and float64 arrays, oldest first
+        """
+        return self._ring.drain(max_samples)
+    
+    def clear_buffer(self):
+        """Discard buffered conversions (e.g. before a new recording)"""
+        self._ring.clear()
+    
+    def get_read_timing(self) -> dict:
+        """
+        Per-read timing histograms
+        
+        Returns:
+            dict: {'wait'|'shift'|'cpu': {'summary': {...}, 'buckets': [(upper_us, count), ...]}}
+        """
+        return {
+            name: {'summary': hist.summary(), 'buckets': hist.buckets()}
+            for name, hist in (('wait', self._wait_hist), ('shift', self._shift_hist), ('cpu', self._cpu_hist))
+        }
+    
+    def reset_read_timing(self):
+        """Clear timing histograms (e.g. before a benchmark run)"""
+        self._wait_hist.reset()
+        self._shift_hist.reset()
+        self._cpu_hist.reset()
+    
     def get_stats(self) -> dict:
         """
         Get driver statistics
         
         Returns:
-            dict: Statistics (read_count, error_count, error_rate, last_value)
+            dict: Statistics (read_count, error_count, error_rate, last_value,
+                  stream_buffered, stream_dropped, stream_duplicates, stream_missed,
+                  gpio_backend, shift_p95_us, cpu_p95_us)
         """
         total = self._read_count + self._error_count
         error_rate = self._error_count / total if total > 0 else 0.0
+        ring_stats = self._ring.get_stats()
         
         return {
             'read_count': self._read_count,
             'error_count': self._error_count,
             'error_rate': error_rate,
             'last_value': self._last_value,
-            'mode': self.mode.name
+            'mode': self.mode.name,
+            'stream_capacity': ring_stats['capacity'],
+            'stream_buffered': ring_stats['buffered'],
+            'stream_dropped': ring_stats['dropped'],
+            'stream_duplicates': self._duplicate_count,
+            'stream_missed': self._missed_count,
+            'gpio_backend': self.backend.name,
+            'shift_p95_us': self._shift_hist.percentile(95),
+            'cpu_p95_us': self._cpu_hist.percentile(95)
         }
     
     def cleanup(self):
         """Cleanup GPIO resources"""
         self.stop_continuous()
         
-        if self._is_initialized and GPIO:
+        if self._is_initialized:
             try:
-                GPIO.output(self.gpio_sck, GPIO.LOW)
+                self.backend.set_sck(False)
                 # Don't call GPIO.cleanup() - other sensors may use GPIO
+                self.backend.cleanup()
                 self._is_initialized = False
                 self.logger.info("Driver cleaned up")
             except Exception as e:
@@ -66,11 +66,16 @@ Date: 2025-10-24
 Version: 1.0.0
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import logging
 
+import numpy as np
+
 from .base_sensor import BaseSensor
 from .hx710b_driver import HX710BDriver, HX710Mode
+from .gpio_backend import create_gpio_backend
+from .replay import ReplayHX710BDriver
+from .readings import PressureReading
 
 
 class HX710BSensor(BaseSensor):
@@ -113,6 +118,8 @@ class HX710BSensor(BaseSensor):
                 - gpio_sck (int): SCK pin number (BCM)
                 - mode (str): '10sps' or '40sps' (default: '10sps')
                 - read_timeout_ms (int): Read timeout in ms (default: 1000)
+                - gpio_backend (str): 'rpi' (default) or 'gpiod'
+                - gpio_chip (str): gpiochip path for gpiod (default: /dev/gpiochip0)
                 - calibration (Dict):
                     - offset_counts (int): Zero offset to subtract
                     - slope_mmhg_per_count (float): Conversion factor
@@ -143,19 +150,33 @@ class HX710BSensor(BaseSensor):
             self.mode = HX710Mode.DIFFERENTIAL_10SPS
         
         # Create low-level driver (composition pattern)
-        self.driver = HX710BDriver(
-            gpio_dout=config['gpio_dout'],
-            gpio_sck=config['gpio_sck'],
-            mode=self.mode,
-            timeout_ms=self.read_timeout_ms
-        )
+        # replay: {path, speed, loop} → phát lại trace thay cho GPIO thật
+        self.replay_config = config.get('replay')
+        if self.replay_config:
+            self.driver = ReplayHX710BDriver.from_config(
+                self.replay_config,
+                mode=self.mode,
+                calibration=self.calibration,
+                timeout_ms=self.read_timeout_ms
+            )
+        else:
+            self.driver = HX710BDriver(
+                gpio_dout=config['gpio_dout'],
+                gpio_sck=config['gpio_sck'],
+                mode=self.mode,
+                timeout_ms=self.read_timeout_ms,
+                backend=create_gpio_backend(config, self.logger)
+            )
         
         # Extract calibration flags
         self.adc_inverted = self.calibration.get('adc_inverted', False)
         
+        # Last continuous-stream sample consumed by read_raw_data()
+        self._stream_seq: Optional[int] = None
+        
         self.logger.info(
             f"HX710BSensor initialized: "
-            f"DOUT=GPIO{config['gpio_dout']}, SCK=GPIO{config['gpio_sck']}, "
+            f"DOUT=GPIO{self.driver.gpio_dout}, SCK=GPIO{self.driver.gpio_sck}, "
             f"mode={self.mode.name}, timeout={self.read_timeout_ms}ms, "
             f"inverted={self.adc_inverted}"
         )
@@ -234,10 +255,20 @@ class HX710BSensor(BaseSensor):
         Note:
             - Blocking behavior matches blocking_mode=True in BaseSensor
             - Timeout logged by driver (not counted as error by BaseSensor)
+            - Under AcquisitionScheduler (is_scheduled) the read never blocks:
+              returns None immediately when no new conversion is ready
         """
         try:
-            # Call driver's blocking read
-            counts = self.driver.read(timeout_ms=self.read_timeout_ms)
+            # Scheduler task must not block the shared acquisition thread
+            timeout_ms = 0 if self.is_scheduled else self.read_timeout_ms
+            
+            # Continuous stream owns the GPIO lines → follow it instead of reading
+            if self.driver.is_continuous_running():
+                counts = self.driver.wait_for_sample(timeout_ms=timeout_ms, since_seq=self._stream_seq)
+                self._stream_seq = self.driver.get_sample_seq()
+            else:
+                # Call driver's blocking read (timeout 0 = poll DOUT once)
+                counts = self.driver.read(timeout_ms=timeout_ms)
             
             if counts is None:
                 # Timeout already logged by driver
@@ -253,14 +284,14 @@ class HX710BSensor(BaseSensor):
             self.logger.error(f"Error reading raw data: {e}")
             return None
     
-    def process_data(self, raw_data: int) -> Optional[Dict[str, Any]]:
+    def process_data(self, raw_data: int) -> Optional[PressureReading]:
         """
         Process raw ADC counts to calibrated pressure
         
         Calibration Steps:
         1. Subtract offset_counts (zero calibration)
         2. Multiply by slope_mmhg_per_count (sensitivity)
-        3. Return Dict with calibrated + raw values
+        3. Return PressureReading with calibrated + raw values
         
         Formula:
             pressure_mmhg = (raw_counts - offset) × slope
@@ -269,7 +300,7 @@ class HX710BSensor(BaseSensor):
             raw_data: Raw ADC counts (int) from read_raw_data()
         
         Returns:
-            Dict with keys:
+            PressureReading (slotted, read-only Mapping) with keys:
                 - pressure_mmhg (float): Calibrated pressure in mmHg
                 - counts (int): Original raw counts (for debugging)
                 - counts_zeroed (int): Counts after offset removal
@@ -298,12 +329,12 @@ class HX710BSensor(BaseSensor):
             # Step 2: Apply sensitivity calibration
             pressure_mmhg = counts_zeroed * slope_mmhg_per_count
             
-            return {
-                'pressure_mmhg': pressure_mmhg,
-                'counts': raw_data,
-                'counts_zeroed': counts_zeroed,
-                'valid': True  # Saturation already checked in _is_valid_reading
-            }
+            return PressureReading(
+                pressure_mmhg=pressure_mmhg,
+                counts=raw_data,
+                counts_zeroed=counts_zeroed,
+                valid=True,  # Saturation already checked in _is_valid_reading
+            )
             
         except Exception as e:
             self.logger.error(f"Error processing data: {e}")
@@ -346,6 +377,69 @@ class HX710BSensor(BaseSensor):
         
         return True
     
+    def get_schedule_rate(self) -> float:
+        """
+        AcquisitionScheduler rate: check DOUT twice per conversion period
+        (10 SPS → 20 Hz, 40 SPS → 80 Hz; scaled by replay speed)
+        """
+        if self.scheduler_rate:
+            return float(self.scheduler_rate)
+        
+        rate = 2.0 * (40.0 if self.mode == HX710Mode.DIFFERENTIAL_40SPS else 10.0)
+        clock = getattr(self.driver, 'clock', None)
+        if clock is not None:
+            rate = rate * clock.speed if clock.speed > 0 else 1000.0
+        return rate
+    
+    # ==================== STREAMING (LOSSLESS) ====================
+    
+    def start_stream(self):
+        """
+        Start lossless push-based stream (driver continuous mode)
+        
+        Every conversion is buffered with its data-ready timestamp.
+        The BaseSensor reading loop keeps updating latest_data by
+        following the stream (no concurrent GPIO reads).
+        """
+        self.driver.clear_buffer()
+        self._stream_seq = None
+        self.driver.start_continuous()
+    
+    def stop_stream(self):
+        """Stop the push-based stream"""
+        self.driver.stop_continuous()
+    
+    def drain_pressures(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Drain buffered conversions as calibrated pressures
+        
+        Saturated conversions are discarded (same rule as _is_valid_reading).
+        
+        Returns:
+            (pressures_mmhg, timestamps): float64 arrays, oldest first
+        """
+        counts, timestamps = self.driver.drain()
+        
+        if counts.size == 0:
+            return np.empty(0, dtype=np.float64), timestamps
+        
+        valid = (counts != self.driver.ADC_MIN) & (counts != self.driver.ADC_MAX)
+        if not valid.all():
+            self.logger.warning(f"ADC saturated: {int((~valid).sum())} conversions dropped from stream")
+            counts = counts[valid]
+            timestamps = timestamps[valid]
+        
+        counts = counts.astype(np.float64)
+        if self.adc_inverted:
+            counts = -counts
+        
+        offset_counts = self.calibration.get('offset_counts', 0)
+        slope_mmhg_per_count = self.calibration.get('slope_mmhg_per_count', 9.536743e-06)
+        
+        pressures = (counts - offset_counts) * slope_mmhg_per_count
+        
+        return pressures, timestamps
+    
     # ==================== UTILITY METHODS ====================
     
     def get_driver_stats(self) -> Dict[str, Any]:
@@ -359,6 +453,7 @@ class HX710BSensor(BaseSensor):
                 - error_rate: Percentage of failed reads
                 - last_value: Most recent ADC value
                 - mode: Operating mode (DIFFERENTIAL_10SPS or DIFFERENTIAL_40SPS)
+                - stream_buffered/dropped/duplicates/missed: Continuous stream counters
         
         Usage:
             Monitor driver health, debug issues
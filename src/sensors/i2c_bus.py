@@ -0,0 +1,350 @@
+"""
+I²C Bus Manager - Arbiter dùng chung cho các sensor trên cùng bus
+==================================================================
+
+MAX30102 và MLX90614 cùng nằm trên /dev/i2c-1. Trước đây mỗi sensor tự mở
+SMBus riêng và đọc từ thread riêng; MLX90614 chèn sleep 10 ms trước mỗi lần
+đọc và retry 50 ms để "tránh nghẽn bus" khi giao dịch của hai sensor chồng
+nhau. I2CBusManager thay thế bằng arbiter theo bus:
+
+- Một file descriptor SMBus cho mỗi bus, dùng chung qua handle của từng
+  sensor (open_i2c_bus) - refcount, đóng khi handle cuối cùng close()
+- Mọi giao dịch được serialize bằng một lock (RLock) của bus
+- transaction(): giữ bus cho một "slot" nhiều giao dịch liên tiếp (đọc
+  con trỏ FIFO + dữ liệu, ambient + object của MLX90614) - không sensor
+  khác chen vào giữa
+- Lỗi OSError (NACK, bus lỗi tức thời) được retry ngay trong slot (chỉ
+  cho giao dịch idempotent - MAX30102 mở handle với retries=0), không
+  sleep
+- Thống kê: utilisation (thời gian giữ bus / wall time), error rate, số
+  retry, histogram chờ lock và thời gian giữ slot (LatencyHistogram)
+
+Handle có cùng interface SMBus (read_byte_data, read_word_data,
+read_i2c_block_data, write_i2c_block_data, i2c_rdwr, ...) nên driver cũ
+dùng trực tiếp mà không cần sửa call site.
+
+Usage Example:
+-------------
+>>> bus = open_i2c_bus(1, owner="MLX90614")
+>>> ambient, obj = bus.read_words(0x5A, (0x06, 0x07))   # Một slot
+>>> with bus.transaction():
+...     ptrs = bus.read_i2c_block_data(0x57, 0x04, 3)
+...     data = bus.read_i2c_block_data(0x57, 0x07, 30)
+>>> get_i2c_bus_stats()[1]['utilisation']
+>>> bus.close()
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import logging
+import threading
+import time
+
+from .timing_stats import LatencyHistogram
+
+try:
+    from smbus2 import SMBus
+except ImportError:  # pragma: no cover - hardware optional
+    try:
+        from smbus import SMBus  # type: ignore[no-redef]
+    except ImportError:
+        SMBus = None
+
+
+# ==================== CONSTANTS ====================
+
+DEFAULT_RETRIES = 2
+
+# Các method SMBus được arbiter bọc (mỗi lời gọi = một giao dịch trên bus)
+TRANSACTION_METHODS = frozenset({
+    'read_byte', 'write_byte',
+    'read_byte_data', 'write_byte_data',
+    'read_word_data', 'write_word_data',
+    'read_i2c_block_data', 'write_i2c_block_data',
+    'i2c_rdwr',
+})
+
+
+# ==================== BUS MANAGER ====================
+
+class I2CBusManager:
+    """
+    Arbiter cho một bus I²C: serialize giao dịch, thống kê utilisation/lỗi
+
+    Attributes:
+        channel (int): Bus number (/dev/i2c-N)
+        raw_bus: SMBus thật (hoặc object tương thích, ví dụ trong tests)
+    """
+
+    def __init__(self, channel: int, raw_bus: Any, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            channel: Bus number
+            raw_bus: SMBus-compatible object đã mở
+            logger: Logger instance
+        """
+        self.channel = channel
+        self.raw_bus = raw_bus
+        self.logger = logger or logging.getLogger(f"I2CBus.{channel}")
+
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._owners: Dict[str, int] = {}
+        self.reset_stats()
+
+    # ---------- arbitration ----------
+
+    @contextmanager
+    def slot(self, owner: str) -> Iterator[None]:
+        """
+        Giữ bus cho một chuỗi giao dịch (re-entrant)
+
+        Args:
+            owner: Tên sensor (thống kê)
+        """
+        wait_start = time.perf_counter()
+        with self._lock:
+            outermost = self._depth == 0
+            if outermost:
+                hold_start = time.perf_counter()
+                self._wait_hist.record(hold_start - wait_start)
+                self._slots += 1
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if outermost:
+                    held = time.perf_counter() - hold_start
+                    self._busy_s += held
+                    self._hold_hist.record(held)
+                    self._owner_stats(owner)['busy_s'] += held
+
+    def call(self, owner: str, method: str, args: tuple, retries: int) -> Any:
+        """
+        Một giao dịch SMBus trong slot của owner, retry ngay khi OSError
+
+        Args:
+            owner: Tên sensor
+            method: Tên method SMBus
+            args: Tham số
+            retries: Số lần thử lại tối đa
+
+        Returns:
+            Kết quả của method SMBus
+
+        Raises:
+            OSError: Khi vẫn lỗi sau `retries` lần thử lại
+        """
+        with self.slot(owner):
+            func = getattr(self.raw_bus, method)
+            stats = self._owner_stats(owner)
+            for attempt in range(retries + 1):
+                self._transactions += 1
+                stats['transactions'] += 1
+                try:
+                    return func(*args)
+                except OSError:
+                    self._errors += 1
+                    stats['errors'] += 1
+                    if attempt >= retries:
+                        raise
+                    self._retries += 1
+
+    # ---------- owners ----------
+
+    def attach(self, owner: str) -> None:
+        with self._lock:
+            self._owners[owner] = self._owners.get(owner, 0) + 1
+
+    def detach(self, owner: str) -> int:
+        """
+        Returns:
+            int: Số handle còn mở trên bus
+        """
+        with self._lock:
+            count = self._owners.get(owner, 0) - 1
+            if count > 0:
+                self._owners[owner] = count
+            else:
+                self._owners.pop(owner, None)
+            return sum(self._owners.values())
+
+    def close(self) -> None:
+        try:
+            if hasattr(self.raw_bus, 'close'):
+                self.raw_bus.close()
+        except Exception as exc:
+            self.logger.debug(f"Error closing I2C bus {self.channel}: {exc}")
+
+    # ---------- statistics ----------
+
+    def _owner_stats(self, owner: str) -> Dict[str, Any]:
+        stats = self._per_owner.get(owner)
+        if stats is None:
+            stats = self._per_owner[owner] = {'transactions': 0, 'errors': 0, 'busy_s': 0.0}
+        return stats
+
+    def reset_stats(self) -> None:
+        """Xóa thống kê (bắt đầu cửa sổ đo utilisation mới)"""
+        with self._lock:
+            self._stats_start = time.perf_counter()
+            self._busy_s = 0.0
+            self._slots = 0
+            self._transactions = 0
+            self._errors = 0
+            self._retries = 0
+            self._per_owner: Dict[str, Dict[str, Any]] = {}
+            self._wait_hist = LatencyHistogram()
+            self._hold_hist = LatencyHistogram()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: channel, owners, slots, transactions, errors, retries,
+                  error_rate, utilisation (0-1), lock_wait/slot_hold
+                  (LatencyHistogram.summary(), µs), per_owner
+        """
+        with self._lock:
+            elapsed = time.perf_counter() - self._stats_start
+            return {
+                'channel': self.channel,
+                'owners': sorted(self._owners),
+                'slots': self._slots,
+                'transactions': self._transactions,
+                'errors': self._errors,
+                'retries': self._retries,
+                'error_rate': self._errors / self._transactions if self._transactions else 0.0,
+                'utilisation': self._busy_s / elapsed if elapsed > 0 else 0.0,
+                'lock_wait': self._wait_hist.summary(),
+                'slot_hold': self._hold_hist.summary(),
+                'per_owner': {
+                    owner: {
+                        'transactions': stats['transactions'],
+                        'errors': stats['errors'],
+                        'busy_ms': stats['busy_s'] * 1000.0,
+                    }
+                    for owner, stats in self._per_owner.items()
+                },
+            }
+
+
+# ==================== SENSOR HANDLE ====================
+
+class I2CBusHandle:
+    """
+    Handle SMBus-compatible của một sensor trên bus dùng chung
+
+    Chỉ các method giao dịch mà bus thật hỗ trợ mới xuất hiện trên handle
+    (hasattr(handle, 'i2c_rdwr') phản ánh đúng khả năng của bus).
+    """
+
+    def __init__(self, manager: I2CBusManager, owner: str, retries: int = DEFAULT_RETRIES):
+        self.manager = manager
+        self.owner = owner
+        self.retries = max(0, int(retries))
+        self._closed = False
+        manager.attach(owner)
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in TRANSACTION_METHODS or not hasattr(self.manager.raw_bus, name):
+            raise AttributeError(name)
+
+        manager, owner, retries = self.manager, self.owner, self.retries
+
+        def transaction(*args):
+            return manager.call(owner, name, args, retries)
+
+        setattr(self, name, transaction)  # Cache: lần sau không qua __getattr__
+        return transaction
+
+    def transaction(self):
+        """Context manager giữ bus cho nhiều giao dịch liên tiếp (một slot)"""
+        return self.manager.slot(self.owner)
+
+    def read_words(self, address: int, registers: Sequence[int]) -> List[int]:
+        """
+        Đọc nhiều word register của một device trong cùng một slot
+
+        Args:
+            address: I²C address
+            registers: Các register (ví dụ MLX90614 Ta=0x06, Tobj1=0x07)
+
+        Returns:
+            list: Giá trị 16-bit theo thứ tự registers
+        """
+        with self.transaction():
+            return [self.read_word_data(address, register) for register in registers]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.manager.get_stats()
+
+    def close(self) -> None:
+        """Trả handle; bus thật đóng khi handle cuối cùng được trả"""
+        if self._closed:
+            return
+        self._closed = True
+        release_i2c_bus(self.manager, self.owner)
+
+
+# ==================== REGISTRY ====================
+
+_registry_lock = threading.Lock()
+_managers: Dict[int, I2CBusManager] = {}
+
+
+def open_i2c_bus(
+    channel: int,
+    owner: str,
+    retries: int = DEFAULT_RETRIES,
+    raw_bus: Optional[Any] = None,
+) -> I2CBusHandle:
+    """
+    Handle tới bus dùng chung (mở SMBus lần đầu)
+
+    Args:
+        channel: Bus number
+        owner: Tên sensor (thống kê)
+        retries: Số lần retry ngay khi OSError
+        raw_bus: SMBus-compatible object thay cho /dev/i2c-N (tests, chỉ dùng
+            khi bus chưa được mở)
+
+    Returns:
+        I2CBusHandle
+
+    Raises:
+        RuntimeError: Không có smbus2/smbus hoặc không mở được bus
+    """
+    with _registry_lock:
+        manager = _managers.get(channel)
+        if manager is None:
+            if raw_bus is None:
+                if SMBus is None:
+                    raise RuntimeError("smbus2/smbus không khả dụng")
+                try:
+                    raw_bus = SMBus(channel)
+                except Exception as exc:
+                    raise RuntimeError(f"Không thể mở I2C bus {channel}: {exc}") from exc
+            manager = _managers[channel] = I2CBusManager(channel, raw_bus)
+        return I2CBusHandle(manager, owner, retries)
+
+
+def release_i2c_bus(manager: I2CBusManager, owner: str) -> None:
+    """Trả một handle; đóng bus khi không còn owner nào"""
+    with _registry_lock:
+        if manager.detach(owner) == 0 and _managers.get(manager.channel) is manager:
+            del _managers[manager.channel]
+            manager.close()
+
+
+def get_i2c_bus_stats() -> Dict[int, Dict[str, Any]]:
+    """
+    Returns:
+        dict: {channel: I2CBusManager.get_stats()} cho các bus đang mở
+    """
+    with _registry_lock:
+        managers = list(_managers.values())
+    return {manager.channel: manager.get_stats() for manager in managers}
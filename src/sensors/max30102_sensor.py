@@ -2,16 +2,36 @@
 from __future__ import annotations
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass, field
+import ctypes
 import logging
+import threading
 import time
 from collections import deque
+from contextlib import nullcontext
 import numpy as np
 from scipy import signal as scipy_signal  # For bandpass filter
 from .base_sensor import BaseSensor
+from .sample_buffer import ContiguousRingBuffer
+from .filter_design import get_bandpass_design
+from .replay import ReplayInterruptLine, ReplaySMBus
+from .i2c_bus import open_i2c_bus
+from .readings import PPGReading
+from .running_stats import SlidingWindowStats
 try:
-    import smbus  # type: ignore[attr-defined]
+    # smbus2 ưu tiên: hỗ trợ i2c_rdwr (đọc FIFO 32 mẫu / transaction)
+    import smbus2 as smbus  # type: ignore[no-redef]
+    from smbus2 import i2c_msg
 except ImportError:  # pragma: no cover - hardware optional
-    smbus = None
+    i2c_msg = None
+    try:
+        import smbus  # type: ignore[attr-defined]
+    except ImportError:
+        smbus = None
+
+try:
+    import RPi.GPIO as GPIO  # INT pin (interrupt acquisition)
+except ImportError:  # pragma: no cover - hardware optional
+    GPIO = None
 
 
 @dataclass
@@ -87,6 +107,10 @@ REG_PROX_INT_THRESH = 0x30
 REG_REV_ID = 0xFE
 REG_PART_ID = 0xFF
 
+# Interrupt Enable/Status 1 bits
+INTR_A_FULL = 0x80    # FIFO almost full
+INTR_PPG_RDY = 0x40   # New FIFO sample
+
 
 class MAX30102Hardware:
     """Low-level MAX30102 hardware helper inspired by the reference driver."""
@@ -127,20 +151,47 @@ class MAX30102Hardware:
 
     DEFAULT_ALMOST_FULL = 0x0F
 
+    FIFO_DEPTH = 32           # MAX30102 FIFO: 32 mẫu
+    BYTES_PER_SAMPLE = 6      # RED (3 bytes) + IR (3 bytes)
+    SMBUS_BATCH_SAMPLES = 5   # 30 bytes - giới hạn SMBus block read 32 bytes
+    SATURATED_VALUE = 0x03FFFF
+
+    _bus_slot = nullcontext   # Ghi đè bằng bus.transaction khi bus là handle của bus manager
+
     # ==================== INITIALIZATION ====================
     
-    def __init__(self, channel: int = 1, address: int = 0x57, logger: Optional[logging.Logger] = None) -> None:
-        if smbus is None:
+    def __init__(
+        self,
+        channel: int = 1,
+        address: int = 0x57,
+        logger: Optional[logging.Logger] = None,
+        bus: Optional[Any] = None,
+    ) -> None:
+        """
+        Args:
+            channel: I²C bus number
+            address: I²C address
+            logger: Logger instance
+            bus: SMBus-compatible object thay cho bus thật (ví dụ ReplaySMBus);
+                mặc định handle tới bus manager dùng chung (open_i2c_bus)
+        """
+        if bus is None and smbus is None:
             raise RuntimeError("smbus không khả dụng - không thể giao tiếp MAX30102")
 
         self.address = address
         self.channel = channel
         self.logger = logger or logging.getLogger(__name__)
 
-        try:
-            self.bus = smbus.SMBus(self.channel)
-        except Exception as exc:  # pragma: no cover - hardware only
-            raise RuntimeError(f"Không thể mở I2C bus {self.channel}: {exc}") from exc
+        if bus is not None:
+            self.bus = bus
+        else:
+            # Bus dùng chung với MLX90614: giao dịch serialize qua arbiter.
+            # retries=0: burst đọc FIFO_DATA không idempotent (transfer dở dang đã
+            # dời FIFO read pointer) - retry sẽ mất/lệch mẫu mà không báo lỗi;
+            # _read_and_decode tự xử lý lỗi, lần đọc sau lấy lại trạng thái FIFO
+            self.bus = open_i2c_bus(self.channel, owner="MAX30102", retries=0)
+        # FIFO pointer + data trong một slot (bus manager); bus khác: no-op
+        self._bus_slot = getattr(self.bus, "transaction", nullcontext)
 
         self.sample_rate = 100
         self.sample_average = 4
@@ -148,6 +199,15 @@ class MAX30102Hardware:
         self.adc_range = 4096
         self.led_mode = 0x03
 
+        # Preallocated decode buffers (batch FIFO path)
+        self._red_out = np.empty(self.FIFO_DEPTH, dtype=np.uint32)
+        self._ir_out = np.empty(self.FIFO_DEPTH, dtype=np.uint32)
+        self._use_rdwr = i2c_msg is not None and hasattr(self.bus, "i2c_rdwr")
+        self._fifo_addr_msg = i2c_msg.write(self.address, [REG_FIFO_DATA]) if self._use_rdwr else None
+
+        self.almost_full = self.DEFAULT_ALMOST_FULL
+        self.overflow_count = 0   # Tổng số mẫu mất do FIFO tràn (OVF_COUNTER, drain_fifo path)
+
         self.reset()
         time.sleep(0.05)
         self._clear_interrupts()
@@ -184,6 +244,21 @@ class MAX30102Hardware:
         except Exception as exc:  # pragma: no cover - defensive
             self.logger.debug("Không thể shutdown MAX30102: %s", exc)
 
+    def set_led_amplitudes(self, led1_pa: int, led2_pa: int) -> None:
+        """Đổi dòng LED RED (LED1) / IR (LED2), 0.2 mA mỗi bước, không dừng FIFO"""
+        try:
+            self._write_reg(REG_LED1_PA, max(0, min(0xFF, led1_pa)))
+            self._write_reg(REG_LED2_PA, max(0, min(0xFF, led2_pa)))
+        except Exception as exc:  # pragma: no cover - defensive
+            self.logger.debug("Không thể đặt dòng LED MAX30102: %s", exc)
+
+    def wakeup(self) -> None:
+        """Thoát shutdown (SHDN=0), giữ LED mode và cấu hình FIFO/SpO2"""
+        try:
+            self._write_reg(REG_MODE_CONFIG, self.led_mode)
+        except Exception as exc:  # pragma: no cover - defensive
+            self.logger.debug("Không thể wakeup MAX30102: %s", exc)
+
     def setup(
         self,
         *,
@@ -196,6 +271,7 @@ class MAX30102Hardware:
         pulse_width: int = 411,
         almost_full: int = DEFAULT_ALMOST_FULL,
         roll_over: bool = False,
+        interrupts: int = INTR_A_FULL | INTR_PPG_RDY,
     ) -> None:
         self.sample_rate = self._closest_supported(sample_rate, self.SAMPLE_RATE_BITS)
         self.sample_average = self._closest_supported(sample_average, self.SAMPLE_AVERAGE_BITS)
@@ -213,7 +289,8 @@ class MAX30102Hardware:
         )
 
         self._clear_interrupts()
-        self._write_reg(REG_INTR_ENABLE_1, 0xC0)
+        self.almost_full = min(15, max(0, almost_full))
+        self._write_reg(REG_INTR_ENABLE_1, interrupts & 0xE0)
         self._write_reg(REG_INTR_ENABLE_2, 0x00)
         self._write_reg(REG_FIFO_WR_PTR, 0x00)
         self._write_reg(REG_OVF_COUNTER, 0x00)
@@ -273,10 +350,9 @@ class MAX30102Hardware:
 
     def read_samples(self, max_samples: int) -> List[Tuple[int, int]]:
         """
-        Read samples from FIFO with optimized batch reading.
+        Read samples from FIFO as a list of (RED, IR) tuples.
         
-        Batch reads up to 5 samples (30 bytes) per I²C transaction to reduce latency
-        while staying within SMBus 32-byte limit.
+        Compatibility wrapper around read_sample_arrays().
         
         Args:
             max_samples: Maximum number of samples to read
@@ -284,54 +360,126 @@ class MAX30102Hardware:
         Returns:
             List of (RED, IR) tuples
         """
-        samples: List[Tuple[int, int]] = []
-        if max_samples <= 0:
-            return samples
+        red, ir = self.read_sample_arrays(max_samples)
+        return list(zip(red.tolist(), ir.tolist()))
 
-        available = self.get_data_present()
+    def read_sample_arrays(self, max_samples: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read samples from FIFO with batch transactions and vectorized decode.
+        
+        - smbus2 available: one i2c_rdwr transaction for up to 32 samples (192 bytes)
+        - Otherwise: SMBus block reads of 5 samples (30 bytes, 32-byte limit)
         
-        # Batch read strategy: 5 samples = 30 bytes (safe for SMBus 32-byte limit)
-        BATCH_SIZE = 5
+        Bytes are decoded with np.frombuffer into preallocated uint32 arrays,
+        saturated samples (0x3FFFF on either channel) are masked out.
         
-        while available > 0 and len(samples) < max_samples:
-            # Determine batch size for this iteration
-            n_to_read = min(BATCH_SIZE, available, max_samples - len(samples))
+        Args:
+            max_samples: Maximum number of samples to read
             
-            if n_to_read == 1:
-                # Single sample fallback
-                sample = self.read_fifo_sample()
-                if sample is None:
-                    break
-                samples.append(sample)
-                available -= 1
-            else:
-                # Batch read: 6 bytes per sample
-                try:
-                    n_bytes = 6 * n_to_read
-                    data = self.bus.read_i2c_block_data(self.address, REG_FIFO_DATA, n_bytes)
-                    
-                    # Parse samples from batch data
-                    for i in range(0, len(data), 6):
-                        if i + 5 < len(data):
-                            red = (data[i] << 16 | data[i+1] << 8 | data[i+2]) & 0x03FFFF
-                            ir = (data[i+3] << 16 | data[i+4] << 8 | data[i+5]) & 0x03FFFF
-                            
-                            # Validate: skip saturated samples
-                            if red != 0x03FFFF and ir != 0x03FFFF:
-                                samples.append((red, ir))
-                    
-                    available -= n_to_read
-                    
-                except Exception as exc:
-                    # Fallback to single-read if batch fails
-                    self.logger.warning(f"Batch read failed, fallback to single: {exc}")
-                    sample = self.read_fifo_sample()
-                    if sample is None:
-                        break
-                    samples.append(sample)
-                    available -= 1
+        Returns:
+            (red, ir): uint32 arrays - views into internal buffers, valid until
+            the next read (copy if kept)
+        """
+        if max_samples <= 0:
+            return self._red_out[:0], self._ir_out[:0]
+
+        with self._bus_slot():
+            available = min(self.get_data_present(), max_samples, self.FIFO_DEPTH)
+            return self._read_and_decode(available)
+
+    def interrupt_threshold(self) -> int:
+        """Số mẫu chưa đọc khi A_FULL interrupt kích hoạt (32 - FIFO_A_FULL)"""
+        return self.FIFO_DEPTH - self.almost_full
+
+    def read_fifo_state(self) -> Tuple[int, int]:
+        """
+        Đọc FIFO_WR_PTR, OVF_COUNTER, FIFO_RD_PTR (0x04-0x06) trong một block read
+        
+        Returns:
+            (available, overflow): Số mẫu chờ đọc, số mẫu đã mất do tràn
+        """
+        try:
+            write_ptr, overflow, read_ptr = self.bus.read_i2c_block_data(self.address, REG_FIFO_WR_PTR, 3)[:3]
+        except Exception as exc:
+            self.logger.debug("Không thể đọc trạng thái FIFO: %s", exc)
+            return 0, 0
+
+        overflow &= 0x1F
+        available = (write_ptr - read_ptr) % self.FIFO_DEPTH
+        if available == 0 and overflow > 0:
+            available = self.FIFO_DEPTH  # Đầy: WR_PTR == RD_PTR sau khi tràn
+        return available, overflow
+
+    def drain_fifo(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Đọc toàn bộ FIFO trong một burst (interrupt path)
+        
+        2 transactions trong một bus slot: trạng thái FIFO (block read
+        3 bytes) + dữ liệu. Đọc FIFO_DATA cũng xóa A_FULL → INT pin nhả.
+        
+        Returns:
+            (red, ir): uint32 views như read_sample_arrays()
+        """
+        with self._bus_slot():
+            available, overflow = self.read_fifo_state()
+            red, ir = self._read_and_decode(available)
+        if overflow:
+            self.overflow_count += overflow
+            self.logger.warning("MAX30102 FIFO overflow: %d samples lost", overflow)
+        return red, ir
+
+    def _read_and_decode(self, available: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Đọc available mẫu (batch) và decode vectorized"""
+        empty = self._red_out[:0], self._ir_out[:0]
+        available = min(available, self.FIFO_DEPTH)
+        if available <= 0:
+            return empty
+
+        try:
+            raw = self._read_fifo_bytes(available)
+        except Exception as exc:
+            self.logger.warning("FIFO batch read failed: %s", exc)
+            return empty
+
+        n_samples = len(raw) // self.BYTES_PER_SAMPLE
+        if n_samples == 0:
+            return empty
+
+        data = np.frombuffer(raw, dtype=np.uint8, count=n_samples * self.BYTES_PER_SAMPLE)
+        data = data.reshape(n_samples, 2, 3).astype(np.uint32)
 
-        return samples
+        # values[:, 0] = RED, values[:, 1] = IR (18-bit, MSB first)
+        values = ((data[:, :, 0] << 16) | (data[:, :, 1] << 8) | data[:, :, 2]) & self.SATURATED_VALUE
+
+        # Validate: skip saturated samples (có thể corrupt)
+        valid = (values != self.SATURATED_VALUE).all(axis=1)
+        count = int(np.count_nonzero(valid))
+
+        if count == n_samples:
+            self._red_out[:count] = values[:, 0]
+            self._ir_out[:count] = values[:, 1]
+        else:
+            self._red_out[:count] = values[valid, 0]
+            self._ir_out[:count] = values[valid, 1]
+
+        return self._red_out[:count], self._ir_out[:count]
+
+    def _read_fifo_bytes(self, n_samples: int) -> bytes:
+        """Read n_samples × 6 bytes from FIFO_DATA (single i2c_rdwr or chunked SMBus reads)."""
+        if self._use_rdwr:
+            read_msg = i2c_msg.read(self.address, n_samples * self.BYTES_PER_SAMPLE)
+            self.bus.i2c_rdwr(self._fifo_addr_msg, read_msg)
+            return ctypes.string_at(read_msg.buf, read_msg.len)
+
+        chunks = []
+        remaining = n_samples
+        while remaining > 0:
+            batch = min(self.SMBUS_BATCH_SAMPLES, remaining)
+            chunks.append(bytes(self.bus.read_i2c_block_data(
+                self.address, REG_FIFO_DATA, batch * self.BYTES_PER_SAMPLE
+            )))
+            remaining -= batch
+        return b"".join(chunks)
 
     # ==================== CLEANUP ====================
     
@@ -343,10 +491,95 @@ class MAX30102Hardware:
             pass
 
 
+class GPIOInterruptLine:
+    """
+    MAX30102 INT pin (open-drain, active LOW) qua RPi.GPIO edge detection
+    
+    wait() trả về ngay nếu INT đang LOW (edge đã xảy ra trước khi chờ),
+    ngược lại chờ falling edge (callback của RPi.GPIO) tới timeout.
+    """
+
+    def __init__(self, pin: int, logger: Optional[logging.Logger] = None) -> None:
+        """
+        Args:
+            pin: GPIO pin (BCM) nối với INT của MAX30102
+            logger: Logger instance
+        """
+        self.pin = pin
+        self.logger = logger or logging.getLogger(__name__)
+        self._event = threading.Event()
+        self._opened = False
+
+    def open(self) -> bool:
+        if GPIO is None:
+            self.logger.error("RPi.GPIO not available - không thể dùng INT pin")
+            return False
+        try:
+            GPIO.setmode(GPIO.BCM)
+            GPIO.setwarnings(False)
+            GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            GPIO.add_event_detect(self.pin, GPIO.FALLING, callback=self._on_edge)
+            self._opened = True
+            return True
+        except Exception as exc:  # pragma: no cover - hardware only
+            self.logger.error("Không thể cấu hình INT pin GPIO%d: %s", self.pin, exc)
+            return False
+
+    def _on_edge(self, channel: int) -> None:
+        self._event.set()
+
+    def is_asserted(self) -> bool:
+        return bool(self._opened and GPIO.input(self.pin) == GPIO.LOW)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Chờ INT assert
+        
+        Args:
+            timeout: Timeout (giây)
+            
+        Returns:
+            bool: True nếu INT đang assert, False nếu timeout
+        """
+        self._event.clear()
+        if self.is_asserted():
+            return True
+        return self._event.wait(timeout)
+
+    def close(self) -> None:
+        if self._opened:
+            try:
+                GPIO.remove_event_detect(self.pin)
+            except Exception:  # pragma: no cover - defensive
+                pass
+            self._opened = False
+        self._event.set()  # Đánh thức thread đang chờ
+
+
 class MeasurementWindow:
-    """Manage a rolling buffer of IR/RED samples with progress tracking."""
+    """
+    Manage a rolling buffer of IR/RED samples with progress tracking.
+    
+    Backed by a preallocated ContiguousRingBuffer: recent_array()/resample()
+    return read-only views (valid until the next add_samples call).
+    
+    recent_ir/recent_red: SlidingWindowStats của `recent_seconds` gần nhất
+    (finger detection), cập nhật trong add_samples - O(mẫu mới).
+    Order statistics của toàn cửa sổ (running_percentiles) cũng được duy trì
+    incremental: mỗi mẫu một lần insert + một lần evict trong list đã sort.
+    """
+
+    IR_CHANNEL = 0
+    RED_CHANNEL = 1
+    RECENT_SECONDS = 1.2
 
-    def __init__(self, sample_rate: int, window_seconds: float, min_seconds: float) -> None:
+    def __init__(
+        self,
+        sample_rate: int,
+        window_seconds: float,
+        min_seconds: float,
+        recent_seconds: float = RECENT_SECONDS,
+    ) -> None:
         self.sample_rate = max(1, int(sample_rate))
         self.window_seconds = max(1.0, float(window_seconds))
         self.min_seconds = max(1.0, min(self.window_seconds, float(min_seconds)))
@@ -354,42 +587,87 @@ class MeasurementWindow:
         self.max_samples = max(1, int(round(self.sample_rate * self.window_seconds)))
         self.min_samples = max(1, int(round(self.sample_rate * self.min_seconds)))
 
-        self.ir: deque[int] = deque(maxlen=self.max_samples)
-        self.red: deque[int] = deque(maxlen=self.max_samples)
+        self._ring = ContiguousRingBuffer(self.max_samples, channels=2, dtype=np.float64)
+
+        # Cùng số mẫu với recent_array(recent_seconds)
+        recent_samples = min(self.max_samples, max(1, int(round(self.sample_rate * max(0.1, recent_seconds)))))
+        self.recent_ir = SlidingWindowStats(recent_samples, order_stats=True)
+        self.recent_red = SlidingWindowStats(recent_samples)
+
+        # Toàn cửa sổ (estimate_quality p5/p95): cùng N mẫu với ring
+        self._window_stats = {
+            self.IR_CHANNEL: SlidingWindowStats(self.max_samples, order_stats=True),
+            self.RED_CHANNEL: SlidingWindowStats(self.max_samples, order_stats=True),
+        }
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    @property
+    def ir(self) -> np.ndarray:
+        """Read-only view of all buffered IR samples (oldest first)."""
+        return self._ring.view(channel=self.IR_CHANNEL)
+
+    @property
+    def red(self) -> np.ndarray:
+        """Read-only view of all buffered RED samples (oldest first)."""
+        return self._ring.view(channel=self.RED_CHANNEL)
+
+    def _channel_index(self, channel: str) -> int:
+        return self.IR_CHANNEL if channel == "ir" else self.RED_CHANNEL
 
     # ==================== BUFFER MANAGEMENT ====================
     
     def reset(self) -> None:
-        self.ir.clear()
-        self.red.clear()
+        self._ring.clear()
+        for stats in self._window_stats.values():
+            stats.reset()
+        self.recent_ir.reset()
+        self.recent_red.reset()
 
     def add_samples(self, ir_samples: Iterable[int], red_samples: Iterable[int]) -> None:
-        for ir_val, red_val in zip(ir_samples, red_samples):
-            self.ir.append(int(ir_val))
-            self.red.append(int(red_val))
+        if not isinstance(ir_samples, np.ndarray):
+            ir_samples = np.fromiter(ir_samples, dtype=np.float64)
+        if not isinstance(red_samples, np.ndarray):
+            red_samples = np.fromiter(red_samples, dtype=np.float64)
+        self._ring.extend(ir_samples, red_samples)
+        n = min(len(ir_samples), len(red_samples))   # Như ContiguousRingBuffer.extend
+        self.recent_ir.push(ir_samples[:n])
+        self.recent_red.push(red_samples[:n])
+        self._window_stats[self.IR_CHANNEL].push(ir_samples[:n])
+        self._window_stats[self.RED_CHANNEL].push(red_samples[:n])
 
     # ==================== DATA ACCESS ====================
     
     def fill_ratio(self) -> float:
         if not self.max_samples:
             return 0.0
-        return min(1.0, len(self.ir) / float(self.max_samples))
+        return min(1.0, len(self._ring) / float(self.max_samples))
 
     def has_enough_data(self) -> bool:
-        return len(self.ir) >= self.min_samples
+        return len(self._ring) >= self.min_samples
 
     def duration_seconds(self) -> float:
         if self.sample_rate <= 0:
             return 0.0
-        return len(self.ir) / float(self.sample_rate)
+        return len(self._ring) / float(self.sample_rate)
 
     def recent_array(self, seconds: float, channel: str = "ir") -> np.ndarray:
-        buffer = self.ir if channel == "ir" else self.red
         sample_count = max(1, int(round(self.sample_rate * max(0.1, seconds))))
-        if not buffer:
-            return np.empty(0)
-        data = list(buffer)[-sample_count:]
-        return np.array(data, dtype=np.float64)
+        return self._ring.view(sample_count, channel=self._channel_index(channel))
+
+    def running_percentiles(self, channel: str = "ir") -> Tuple[float, float]:
+        """
+        (p5, p95) của toàn bộ cửa sổ, dùng index gần đúng như sorted()[int(q*n)].
+        
+        Incremental: list đã sort được cập nhật trong add_samples (bisect
+        insert mẫu mới, remove mẫu bị đẩy ra) → ở đây chỉ tra index O(1).
+        """
+        stats = self._window_stats[self._channel_index(channel)]
+        n = stats.count
+        if n == 0:
+            return 0.0, 0.0
+        return stats.order_statistic(int(0.05 * n)), stats.order_statistic(int(0.95 * n))
 
     # ==================== QUALITY ESTIMATION ====================
     
@@ -397,24 +675,13 @@ class MeasurementWindow:
         """
         Ước lượng chất lượng tín hiệu dựa trên biên độ AC (peak-to-peak).
         
-        Optimized: Sử dụng approximation thay vì percentile để giảm overhead.
+        Optimized: p5/p95 từ running_percentiles() (order statistics incremental).
         """
-        buffer = self.ir if channel == "ir" else self.red
-        if len(buffer) < 10:
+        n = len(self._ring)
+        if n < 10:
             return 0.0
         
-        # OPTIMIZATION: Dùng sorted approximation thay vì np.percentile
-        # Chỉ sort một lần và lấy indices thay vì 2 calls percentile
-        # Giảm thời gian từ O(2n log n) → O(n log n)
-        arr_sorted = sorted(buffer)
-        n = len(arr_sorted)
-        
-        # Approximate percentiles using indices (faster than np.percentile)
-        idx_p95 = min(n - 1, int(0.95 * n))
-        idx_p5 = max(0, int(0.05 * n))
-        
-        p95 = float(arr_sorted[idx_p95])
-        p5 = float(arr_sorted[idx_p5])
+        p5, p95 = self.running_percentiles(channel)
         amplitude = max(0.0, p95 - p5)
         
         # Chất lượng dựa trên biên độ tuyệt đối (không phụ thuộc DC)
@@ -433,7 +700,7 @@ class MeasurementWindow:
             quality = max(0.0, amplitude / 4.0)  # Scale 0-20% cho tín hiệu yếu
         
         # Penalty nhẹ nếu buffer chưa đầy (chỉ giảm tối đa 30%)
-        fill_ratio = len(buffer) / float(self.max_samples)
+        fill_ratio = n / float(self.max_samples)
         if fill_ratio < 0.5:
             quality *= max(0.7, fill_ratio * 2.0)
         
@@ -442,21 +709,19 @@ class MeasurementWindow:
     # ==================== RESAMPLING ====================
     
     def resample(self, target_rate: int, sample_count: int) -> Tuple[np.ndarray, np.ndarray]:
-        if target_rate <= 0 or sample_count <= 0 or not self.ir:
+        if target_rate <= 0 or sample_count <= 0 or not len(self._ring):
             return np.empty(0), np.empty(0)
 
-        ir_arr = np.array(self.ir, dtype=np.float64)
-        red_arr = np.array(self.red, dtype=np.float64)
-
         if self.sample_rate <= target_rate:
-            if ir_arr.size > sample_count:
-                ir_arr = ir_arr[-sample_count:]
-                red_arr = red_arr[-sample_count:]
-            return ir_arr, red_arr
+            return (
+                self._ring.view(sample_count, channel=self.IR_CHANNEL),
+                self._ring.view(sample_count, channel=self.RED_CHANNEL),
+            )
 
+        # Stride view (không copy) - giữ phase bắt đầu từ mẫu cũ nhất như trước
         stride = max(1, int(round(self.sample_rate / float(target_rate))))
-        ir_ds = ir_arr[::stride]
-        red_ds = red_arr[::stride]
+        ir_ds = self._ring.strided_view(stride, channel=self.IR_CHANNEL)
+        red_ds = self._ring.strided_view(stride, channel=self.RED_CHANNEL)
 
         if ir_ds.size > sample_count:
             ir_ds = ir_ds[-sample_count:]
@@ -639,15 +904,12 @@ class HRCalculator:
         # ============================================================
         ir_for_peaks = ir_raw.copy()  # For peak detection
         try:
-            nyquist = sample_rate / 2.0
-            low_cutoff = 0.5 / nyquist   # 0.5 Hz = 30 BPM (lower bound)
-            high_cutoff = 3.0 / nyquist  # 3 Hz = 180 BPM (upper bound - physiological max)
-            
-            # Butterworth bandpass filter order 2 (gentle roll-off, no ringing)
-            b, a = scipy_signal.butter(2, [low_cutoff, high_cutoff], btype='band')
+            # Butterworth bandpass order 2 (gentle roll-off, no ringing), 0.5-3 Hz = 30-180 BPM
+            # Thiết kế lấy từ shared cache (không gọi butter mỗi tick)
+            design = get_bandpass_design(2, 0.5, 3.0, sample_rate)
             
             # Apply zero-phase filter (forward-backward to avoid phase shift)
-            ir_filtered = scipy_signal.filtfilt(b, a, ir_raw)
+            ir_filtered = scipy_signal.sosfiltfilt(design.sos, ir_raw)
             
             # Add back DC offset to keep values positive for peak detection
             ir_dc_offset = float(np.mean(ir_raw))
@@ -683,6 +945,76 @@ class HRCalculator:
         min_dist = max(6, int(sample_rate * 0.37))
         ir_valley_locs, n_peaks = cls.find_peaks(x, x.shape[0], n_th, min_dist, cls.MAX_NUM_PEAKS)
         
+        # HR từ inter-beat intervals (median, IBI consistency, physiological range)
+        intervals = [ir_valley_locs[i] - ir_valley_locs[i - 1] for i in range(1, n_peaks)]
+        hr, hr_valid = cls.heart_rate_from_intervals(intervals, sample_rate)
+
+        spo2 = -999.0
+        spo2_valid = False
+
+        exact_ir_valley_locs_count = n_peaks
+        if exact_ir_valley_locs_count == 0:
+            # Return with proper 8-value tuple
+            return hr, hr_valid, spo2, spo2_valid, 0.0, 0.0, 0, []
+
+        ratio: List[float] = []  # Changed to float for better precision
+        
+        # DC baseline = VALLEY (diastole): nội suy tuyến tính giữa 2 valleys của mỗi cycle
+        for k in range(exact_ir_valley_locs_count - 1):
+            valley_start = ir_valley_locs[k]
+            valley_end = ir_valley_locs[k + 1]
+            
+            # Minimum 4 samples per cycle to calculate AC/DC reliably
+            if valley_end - valley_start <= 3:
+                continue
+            
+            # CRITICAL: Use RAW data for SpO2 (not filtered)
+            r_value = cls.cycle_r_value(
+                ir_raw_int[valley_start:valley_end + 1],
+                red[valley_start:valley_end + 1],
+                k,
+            )
+            if r_value is not None:
+                ratio.append(r_value)
+
+        if not ratio:
+            logger.warning("[SpO2 FAIL] Không có R-value hợp lệ sau %d cycles (peaks=%d)", 
+                          exact_ir_valley_locs_count - 1, n_peaks)
+            # Return with proper 8-value tuple to match signature
+            return hr, hr_valid, spo2, spo2_valid, 0.0, 0.0, n_peaks, []
+
+        spo2, spo2_valid, coefficient_of_variation = cls.spo2_from_ratios(ratio, ir_data)
+
+        # ============================================================
+        # Calculate Signal Quality Index (SQI)
+        # ============================================================
+        try:
+            sqi = cls.calc_signal_quality_index(ir_raw_int, red, ir_valley_locs, sample_rate)
+        except Exception as e:
+            logger.debug("[SQI] Calculation failed: %s", e)
+            sqi = 50.0  # Default moderate quality
+        
+        # Get coefficient of variation for metadata
+        cv = coefficient_of_variation
+
+        return hr, hr_valid, spo2, spo2_valid, sqi, cv, n_peaks, ratio
+
+    # ==================== SHARED BEAT / SpO₂ RULES ====================
+    # Dùng chung cho calc_hr_and_spo2 (full window) và StreamingHRCalculator
+
+    @staticmethod
+    def heart_rate_from_intervals(intervals: List[float], sample_rate: float) -> Tuple[float, bool]:
+        """
+        Tính HR từ inter-beat intervals (đơn vị: samples).
+        
+        Args:
+            intervals: IBI theo thứ tự thời gian
+            sample_rate: Sampling rate in Hz
+            
+        Returns:
+            (hr, hr_valid)
+        """
+        logger = logging.getLogger(__name__)
         hr = -999.0
         hr_valid = False
 
@@ -690,28 +1022,21 @@ class HRCalculator:
         # PHASE 4: STRICTER HR VALIDATION
         # Yêu cầu tối thiểu 3 peaks để có 2 intervals → median interval
         # ============================================================
-        if n_peaks >= 3:
-            # Calculate all inter-beat intervals (IBI)
-            intervals = []
-            for i in range(1, n_peaks):
-                interval = ir_valley_locs[i] - ir_valley_locs[i - 1]
-                intervals.append(interval)
-            
+        if len(intervals) >= 2:
             # Use MEDIAN interval (more robust to outliers than mean)
             median_interval = float(np.median(intervals))
             
             # Check IBI consistency: reject if std > 35% of median (very irregular)
-            if len(intervals) >= 2:
-                std_interval = float(np.std(intervals))
-                ibi_cv = std_interval / median_interval if median_interval > 0 else 1.0
-                
-                if ibi_cv > 0.35:
-                    # Highly irregular - fallback to using only middle intervals
-                    # (first and last intervals often affected by window edge)
-                    if len(intervals) >= 3:
-                        middle_intervals = sorted(intervals)[1:-1]  # Remove min/max
-                        median_interval = float(np.median(middle_intervals))
-                        logger.debug("[HR] High IBI variance (CV=%.1f%%), using trimmed median", ibi_cv * 100)
+            std_interval = float(np.std(intervals))
+            ibi_cv = std_interval / median_interval if median_interval > 0 else 1.0
+            
+            if ibi_cv > 0.35:
+                # Highly irregular - fallback to using only middle intervals
+                # (first and last intervals often affected by window edge)
+                if len(intervals) >= 3:
+                    middle_intervals = sorted(intervals)[1:-1]  # Remove min/max
+                    median_interval = float(np.median(middle_intervals))
+                    logger.debug("[HR] High IBI variance (CV=%.1f%%), using trimmed median", ibi_cv * 100)
             
             if median_interval > 0:
                 hr = float(sample_rate * 60 / median_interval)
@@ -722,9 +1047,9 @@ class HRCalculator:
                 else:
                     logger.debug("[HR] Calculated HR=%.1f outside physiological range", hr)
                     hr_valid = False
-        elif n_peaks == 2:
+        elif len(intervals) == 1:
             # Với chỉ 2 peaks, HR kém tin cậy - chỉ tính nếu interval hợp lý
-            interval = ir_valley_locs[1] - ir_valley_locs[0]
+            interval = intervals[0]
             if interval > 0:
                 hr = float(sample_rate * 60 / interval)
                 # Stricter range cho 2-peak case: 50-120 BPM (normal resting)
@@ -734,185 +1059,128 @@ class HRCalculator:
                 else:
                     logger.debug("[HR] 2-peak HR=%.1f outside safe range 50-120", hr)
 
-        spo2 = -999.0
-        spo2_valid = False
+        return hr, hr_valid
 
-        exact_ir_valley_locs_count = n_peaks
-        if exact_ir_valley_locs_count == 0:
-            # Return with proper 8-value tuple
-            return hr, hr_valid, spo2, spo2_valid, 0.0, 0.0, 0, []
-
-        ratio: List[float] = []  # Changed to float for better precision
+    @staticmethod
+    def cycle_r_value(ir_cycle: np.ndarray, red_cycle: np.ndarray, k: int = 0) -> Optional[float]:
+        """
+        R-value của một cycle valley → valley (RAW data, có DC).
+        
+        DC baseline tại peak = nội suy tuyến tính giữa 2 valleys (diastole),
+        không dùng mean (mean quá cao gần peak).
         
+        Args:
+            ir_cycle: RAW IR từ valley_start tới valley_end (bao gồm cả 2 valley)
+            red_cycle: RAW RED cùng khoảng
+            k: Chỉ số cycle (chỉ để log)
+            
+        Returns:
+            R-value trong khoảng 0.4-1.8, hoặc None nếu cycle bị loại
+        """
+        logger = logging.getLogger(__name__)
+        length = len(ir_cycle) - 1
+        if length <= 0:
+            return None
+
+        # Find IR / RED peak in this cycle (independent)
+        ir_peak_idx = int(np.argmax(ir_cycle[:length]))
+        red_peak_idx = int(np.argmax(red_cycle[:length]))
+        ir_peak_value = float(ir_cycle[ir_peak_idx])
+        red_peak_value = float(red_cycle[red_peak_idx])
+
         # ============================================================
+        # PHASE 2: Use moving baseline for accurate DC estimation
         # ============================================================
-        # PHASE 2: Advanced Baseline Estimation for SpO₂
-        # CRITICAL: DC baseline = VALLEY (diastole), NOT mean
-        # 
-        # Lỗi trước: percentile filter → baseline quá cao gần peak
-        # Giải pháp: Dùng VALLEY locations để lấy DC baseline
+        ir_start, ir_end = float(ir_cycle[0]), float(ir_cycle[length])
+        red_start, red_end = float(red_cycle[0]), float(red_cycle[length])
+        ir_dc_at_peak = ir_start + (ir_end - ir_start) * ir_peak_idx / length
+        red_dc_at_peak = red_start + (red_end - red_start) * red_peak_idx / length
+
         # ============================================================
-        try:
-            # Baseline = giá trị tại valleys (diastole)
-            # Interpolate giữa các valleys để có baseline liên tục
-            ir_baseline_trend = np.interp(
-                np.arange(len(ir_raw_int)),  # x: all indices
-                ir_valley_locs[:exact_ir_valley_locs_count],  # x_valley: valley indices
-                ir_raw_int[ir_valley_locs[:exact_ir_valley_locs_count]]  # y_valley: IR values at valleys
+        # DATASHEET COMPLIANCE: Ambient Light Saturation Check
+        # Datasheet (p.5): "ALC can cancel up to 200µA of ambient current"
+        # 18-bit ADC max = 262143 counts, saturation = DC > 240000
+        # Indicates: excessive ambient light OR LED current too high
+        # ============================================================
+        if ir_dc_at_peak > 240000 or red_dc_at_peak > 240000:
+            logger.warning(
+                "[SpO2 Cycle %d] ADC saturation detected - ambient light or LED too bright (IR_DC=%.0f, RED_DC=%.0f)",
+                k, ir_dc_at_peak, red_dc_at_peak
             )
-            
-            red_baseline_trend = np.interp(
-                np.arange(len(red)),
-                ir_valley_locs[:exact_ir_valley_locs_count],  # Same valleys for RED
-                red[ir_valley_locs[:exact_ir_valley_locs_count]]
+            return None
+
+        # ============================================================
+        # DATASHEET COMPLIANCE: Low DC Signal Check
+        # Datasheet (p.4): ADC full scale range 2-16µA, with noise ~1-2µA
+        # DC < 1000 counts = noise level, skip
+        # ============================================================
+        if ir_dc_at_peak < 1000 or red_dc_at_peak < 1000:
+            logger.debug(
+                "[SpO2 Cycle %d] DC signal too weak (IR_DC=%.0f, RED_DC=%.0f) - check sensor contact",
+                k, ir_dc_at_peak, red_dc_at_peak
             )
-            
-        except Exception as e:
-            # Fallback: use minimum value as baseline
-            logger.warning("[Baseline] Interpolation failed, using min: %s", e)
-            ir_baseline_trend = np.full(len(ir_raw_int), float(np.min(ir_raw_int)))
-            red_baseline_trend = np.full(len(red), float(np.min(red)))
+            return None
 
-        for k in range(exact_ir_valley_locs_count - 1):
-            valley_start = ir_valley_locs[k]
-            valley_end = ir_valley_locs[k + 1]
-            
-            # Minimum 4 samples per cycle to calculate AC/DC reliably
-            if valley_end - valley_start <= 3:
-                continue
-            
-            # CRITICAL: Use RAW data for SpO2 (not filtered)
-            # Filtered data has no DC component → negative baseline → invalid
-            
-            # Find IR peak in this cycle (using RAW data)
-            ir_segment = ir_raw_int[valley_start:valley_end]
-            ir_peak_idx = valley_start + int(np.argmax(ir_segment))
-            ir_peak_value = ir_raw_int[ir_peak_idx]
-            
-            # Find RED peak in this cycle (independent from IR)
-            red_segment = red[valley_start:valley_end]
-            red_peak_idx = valley_start + int(np.argmax(red_segment))
-            red_peak_value = red[red_peak_idx]
-            
-            # ============================================================
-            # PHASE 2: Use moving baseline for accurate DC estimation
-            # ============================================================
-            ir_dc_at_peak = float(ir_baseline_trend[ir_peak_idx])
-            red_dc_at_peak = float(red_baseline_trend[red_peak_idx])
-            
-            # ============================================================
-            # DATASHEET COMPLIANCE: Ambient Light Saturation Check
-            # Datasheet (p.5): "ALC can cancel up to 200µA of ambient current"
-            # 18-bit ADC max = 262143 counts, saturation = DC > 240000
-            # Indicates: excessive ambient light OR LED current too high
-            # ============================================================
-            if ir_dc_at_peak > 240000 or red_dc_at_peak > 240000:
-                logger.warning(
-                    "[SpO2 Cycle %d] ADC saturation detected - ambient light or LED too bright (IR_DC=%.0f, RED_DC=%.0f)",
-                    k, ir_dc_at_peak, red_dc_at_peak
-                )
-                continue  # Skip this cycle
-            
-            # ============================================================
-            # DATASHEET COMPLIANCE: Low DC Signal Check
-            # Datasheet (p.4): ADC full scale range 2-16µA, with noise ~1-2µA
-            # DC < 1000 counts = noise level, skip
-            # ============================================================
-            if ir_dc_at_peak < 1000 or red_dc_at_peak < 1000:
-                logger.debug(
-                    "[SpO2 Cycle %d] DC signal too weak (IR_DC=%.0f, RED_DC=%.0f) - check sensor contact",
-                    k, ir_dc_at_peak, red_dc_at_peak
-                )
-                continue  # Skip this cycle
-            
-            # ============================================================
-            # DATASHEET COMPLIANCE: Ambient Light Saturation Check
-            # Datasheet (p.5): "ALC can cancel up to 200µA of ambient current"
-            # 18-bit ADC max = 262143 counts, saturation = DC > 240000
-            # Indicates: excessive ambient light OR LED current too high
-            # ============================================================
-            if ir_dc_at_peak > 240000 or red_dc_at_peak > 240000:
-                logger.warning(
-                    "[SpO2 Cycle %d] ADC saturation detected - ambient light or LED too bright (IR_DC=%.0f, RED_DC=%.0f)",
-                    k, ir_dc_at_peak, red_dc_at_peak
-                )
-                continue  # Skip this cycle
-            
-            # ============================================================
-            # DATASHEET COMPLIANCE: Low DC Signal Check
-            # Datasheet (p.4): ADC full scale range 2-16µA, with noise ~1-2µA
-            # DC < 1000 counts = noise level, skip
-            # ============================================================
-            if ir_dc_at_peak < 1000 or red_dc_at_peak < 1000:
-                logger.debug(
-                    "[SpO2 Cycle %d] DC signal too weak (IR_DC=%.0f, RED_DC=%.0f) - check sensor contact",
-                    k, ir_dc_at_peak, red_dc_at_peak
-                )
-                continue  # Skip this cycle
-            
-            # Calculate AC amplitude (Peak - DC baseline)
-            ir_ac = float(ir_peak_value) - ir_dc_at_peak
-            red_ac = float(red_peak_value) - red_dc_at_peak
-            
-            # ============================================================
-            # CRITICAL FIX: Validate AC must be POSITIVE
-            # Negative AC = baseline estimation error → reject immediately
-            # ============================================================
-            if ir_ac < 0 or red_ac < 0:
-                logger.debug("[SpO2 Reject] Cycle %d: AC âm (IR_AC=%.1f, RED_AC=%.1f) - baseline error", k, ir_ac, red_ac)
-                continue
-            
-            # Require minimum AC amplitude (at least 10 counts)
-            if ir_ac < 10 or red_ac < 10:
-                logger.debug("[SpO2 Reject] Cycle %d: AC quá yếu (IR_AC=%.1f, RED_AC=%.1f)", k, ir_ac, red_ac)
-                continue
-            
-            if ir_dc_at_peak <= 0 or red_dc_at_peak <= 0:
-                logger.debug("[SpO2 Reject] Cycle %d: DC không hợp lệ (IR_DC=%.1f, RED_DC=%.1f)", k, ir_dc_at_peak, red_dc_at_peak)
-                continue
-            
-            # ============================================================
-            # PERFUSION INDEX (PI) VALIDATION
-            # PI = (AC / DC) × 100% measures signal strength
-            # Datasheet: PI > 0.3% required for valid measurement
-            # Typical range: 0.3% - 20%
-            # ============================================================
-            pi_ir = (ir_ac / ir_dc_at_peak) * 100.0
-            pi_red = (red_ac / red_dc_at_peak) * 100.0
-            
-            # Reject if perfusion too low (weak signal)
-            if pi_ir < 0.3 or pi_red < 0.3:
-                logger.debug("[SpO2 Reject] Cycle %d: PI quá thấp (PI_IR=%.2f%%, PI_RED=%.2f%%)", k, pi_ir, pi_red)
-                continue
-            
-            # Debug: Log first cycle with PI metrics
+        # Calculate AC amplitude (Peak - DC baseline)
+        ir_ac = ir_peak_value - ir_dc_at_peak
+        red_ac = red_peak_value - red_dc_at_peak
+
+        # CRITICAL FIX: Negative AC = baseline estimation error → reject immediately
+        if ir_ac < 0 or red_ac < 0:
+            logger.debug("[SpO2 Reject] Cycle %d: AC âm (IR_AC=%.1f, RED_AC=%.1f) - baseline error", k, ir_ac, red_ac)
+            return None
+
+        # Require minimum AC amplitude (at least 10 counts)
+        if ir_ac < 10 or red_ac < 10:
+            logger.debug("[SpO2 Reject] Cycle %d: AC quá yếu (IR_AC=%.1f, RED_AC=%.1f)", k, ir_ac, red_ac)
+            return None
+
+        # ============================================================
+        # PERFUSION INDEX (PI) VALIDATION
+        # PI = (AC / DC) × 100% measures signal strength
+        # Datasheet: PI > 0.3% required for valid measurement
+        # ============================================================
+        pi_ir = (ir_ac / ir_dc_at_peak) * 100.0
+        pi_red = (red_ac / red_dc_at_peak) * 100.0
+
+        if pi_ir < 0.3 or pi_red < 0.3:
+            logger.debug("[SpO2 Reject] Cycle %d: PI quá thấp (PI_IR=%.2f%%, PI_RED=%.2f%%)", k, pi_ir, pi_red)
+            return None
+
+        if k == 0:
+            logger.debug("[SpO2 Cycle 0] IR: AC=%.1f, DC=%.1f, PI=%.2f%% | RED: AC=%.1f, DC=%.1f, PI=%.2f%%",
+                        ir_ac, ir_dc_at_peak, pi_ir, red_ac, red_dc_at_peak, pi_red)
+
+        # R-value = (AC_red/DC_red) / (AC_ir/DC_ir) - standard pulse oximetry ratio
+        ac_dc_red = red_ac / red_dc_at_peak
+        ac_dc_ir = ir_ac / ir_dc_at_peak
+        r_value = ac_dc_red / ac_dc_ir
+
+        # Physiological R-value range: 0.4 to 1.8
+        # R > 1.8 thường là motion artifact hoặc poor contact
+        if 0.4 <= r_value <= 1.8:
             if k == 0:
-                logger.debug("[SpO2 Cycle 0] IR: AC=%.1f, DC=%.1f, PI=%.2f%% | RED: AC=%.1f, DC=%.1f, PI=%.2f%%",
-                            ir_ac, ir_dc_at_peak, pi_ir, red_ac, red_dc_at_peak, pi_red)
-            
-            # Calculate R-value = (AC_red/DC_red) / (AC_ir/DC_ir)
-            # This is the standard pulse oximetry ratio
-            ac_dc_red = red_ac / red_dc_at_peak
-            ac_dc_ir = ir_ac / ir_dc_at_peak
-            
-            if ac_dc_ir > 0:
-                r_value = ac_dc_red / ac_dc_ir
-                
-                # Physiological R-value range: 0.4 to 1.8
-                # Values outside indicate measurement error or artifact
-                # R > 1.8 thường là motion artifact hoặc poor contact
-                if 0.4 <= r_value <= 1.8:
-                    ratio.append(r_value)
-                    if k == 0:
-                        logger.debug("[SpO2 Cycle 0] R-value=%.3f ACCEPTED", r_value)
-                else:
-                    logger.debug("[SpO2 Reject] Cycle %d: R=%.3f ngoài range 0.4-1.8", k, r_value)
+                logger.debug("[SpO2 Cycle 0] R-value=%.3f ACCEPTED", r_value)
+            return float(r_value)
 
-        if not ratio:
-            logger.warning("[SpO2 FAIL] Không có R-value hợp lệ sau %d cycles (peaks=%d)", 
-                          exact_ir_valley_locs_count - 1, n_peaks)
-            # Return with proper 8-value tuple to match signature
-            return hr, hr_valid, spo2, spo2_valid, 0.0, 0.0, n_peaks, []
+        logger.debug("[SpO2 Reject] Cycle %d: R=%.3f ngoài range 0.4-1.8", k, r_value)
+        return None
+
+    @classmethod
+    def spo2_from_ratios(cls, ratio: List[float], ir_data: Optional[np.ndarray] = None) -> Tuple[float, bool, float]:
+        """
+        SpO₂ từ danh sách R-values (median + two-point calibration).
+        
+        Args:
+            ratio: R-values hợp lệ (không rỗng)
+            ir_data: IR data (cho temperature compensation placeholder)
+            
+        Returns:
+            (spo2, spo2_valid, coefficient_of_variation)
+        """
+        logger = logging.getLogger(__name__)
+        spo2 = -999.0
+        spo2_valid = False
 
         # Use median R-value for robustness against outliers
         ratio_median = float(np.median(ratio))
@@ -1001,19 +1269,7 @@ class HRCalculator:
             spo2 = -999.0
             spo2_valid = False
 
-        # ============================================================
-        # Calculate Signal Quality Index (SQI)
-        # ============================================================
-        try:
-            sqi = cls.calc_signal_quality_index(ir_raw_int, red, ir_valley_locs, sample_rate)
-        except Exception as e:
-            logger.debug("[SQI] Calculation failed: %s", e)
-            sqi = 50.0  # Default moderate quality
-        
-        # Get coefficient of variation for metadata
-        cv = coefficient_of_variation if 'coefficient_of_variation' in locals() else 0.0
-
-        return hr, hr_valid, spo2, spo2_valid, sqi, cv, n_peaks, ratio
+        return spo2, spo2_valid, coefficient_of_variation
 
     @staticmethod
     def _read_temperature_static(ir_data: np.ndarray) -> Optional[float]:
@@ -1255,6 +1511,241 @@ class HRCalculator:
         return sorted_indices[:n_peaks], n_peaks
 
 
+class StreamingHRCalculator:
+    """
+    Incremental HR/SpO₂ engine - chi phí mỗi update tỉ lệ với số mẫu MỚI.
+    
+    Thay vì chạy lại butter + filtfilt + peak search trên toàn cửa sổ mỗi tick:
+    - Bandpass 0.5-3 Hz causal (sosfilt) giữ filter state giữa các lần update
+    - Valley detection chỉ trên mẫu mới (giữ 2 mẫu cuối để bắt valley ở biên batch)
+    - Mỗi beat: IBI + R-value (AC/DC trên RAW data) lưu trong rolling deques
+    - result() chỉ tổng hợp các deque nhỏ (median IBI / median R)
+    
+    Các rule HR/SpO₂ dùng chung với HRCalculator (heart_rate_from_intervals,
+    cycle_r_value, spo2_from_ratios) để hai đường tính cho cùng kết quả logic.
+    """
+
+    BAND_HZ = (0.5, 3.0)          # 30-180 BPM
+    FILTER_ORDER = 2
+    MIN_VALLEY_DEPTH = 30.0       # counts - tương đương n_th tối thiểu của HRCalculator
+    MIN_BEAT_INTERVAL_S = 0.37    # Loại dicrotic notch (~162 BPM max)
+    MAX_BEAT_INTERVAL_S = 2.0     # > 2s (30 BPM) coi như mất beat
+    VALLEY_REFINE_S = 0.08        # Cửa sổ tìm valley trên RAW sau khi bù group delay
+
+    def __init__(
+        self,
+        input_rate: float,
+        algorithm_rate: int = 50,
+        window_seconds: float = 5.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        """
+        Args:
+            input_rate: Sample rate của dữ liệu đưa vào update() (Hz)
+            algorithm_rate: Sample rate xử lý (decimate bằng stride nếu input cao hơn)
+            window_seconds: Beats cũ hơn khoảng này bị loại khỏi kết quả
+            logger: Logger instance
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.algorithm_rate = max(1, int(algorithm_rate))
+        self.window_seconds = max(2.0, float(window_seconds))
+        self.start(input_rate)
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self, input_rate: float) -> None:
+        """Thiết kế filter cho sample rate mới và reset toàn bộ state."""
+        self.input_rate = max(1.0, float(input_rate))
+        self.stride = max(1, int(round(self.input_rate / self.algorithm_rate)))
+        self.sample_rate = self.input_rate / self.stride
+
+        self._design = get_bandpass_design(self.FILTER_ORDER, self.BAND_HZ[0], self.BAND_HZ[1], self.sample_rate)
+
+        # Causal filter trễ pha → bù group delay khi map valley về RAW data
+        b, a = scipy_signal.sos2tf(self._design.sos)
+        _, delay = scipy_signal.group_delay((b, a), w=[1.2], fs=self.sample_rate)
+        self._group_delay = max(0, int(round(float(delay[0]))))
+
+        self._min_dist = max(6, int(self.sample_rate * self.MIN_BEAT_INTERVAL_S))
+        self._max_dist = int(self.sample_rate * self.MAX_BEAT_INTERVAL_S)
+        self._refine = max(1, int(round(self.sample_rate * self.VALLEY_REFINE_S)))
+        self._window_samples = int(self.sample_rate * self.window_seconds)
+
+        # Batch lớn được xử lý theo chunk để valley chờ xác nhận không bị đẩy khỏi history
+        self._chunk = max(1, int(self.sample_rate))
+
+        # RAW IR/RED + filtered IR: valley chờ + 1 chunk + max(cycle dài nhất, SQI window)
+        pending = self._min_dist + self._group_delay + self._refine + self._chunk
+        history = pending + max(self._max_dist + self._refine, HRCalculator.BUFFER_SIZE) + 2
+        self._history = ContiguousRingBuffer(history, channels=3, dtype=np.float64)
+
+        self.reset()
+
+    def reset(self) -> None:
+        """Bỏ filter state và các beats (ví dụ khi đặt ngón tay lại)."""
+        self._zi: Optional[np.ndarray] = None
+        self._input_count = 0
+        self._count = 0               # Số mẫu (sau decimate) đã xử lý
+        self._tail = np.empty(0)      # 2 mẫu filtered cuối của batch trước
+        self._pending: Optional[Tuple[int, float]] = None  # (index, depth) valley chờ xác nhận
+        self._last_valley: Optional[int] = None
+        self._history.clear()
+
+        self._valleys: deque[int] = deque(maxlen=HRCalculator.MAX_NUM_PEAKS)
+        self._intervals: deque[Tuple[int, int]] = deque(maxlen=HRCalculator.MAX_NUM_PEAKS)
+        self._ratios: deque[Tuple[int, float]] = deque(maxlen=HRCalculator.MAX_NUM_PEAKS)
+        self._sqi = 0.0
+
+    # ==================== STREAMING UPDATE ====================
+
+    def update(self, ir_samples: Any, red_samples: Any) -> int:
+        """
+        Xử lý batch mẫu mới.
+        
+        Args:
+            ir_samples: IR mới (array/sequence)
+            red_samples: RED mới, cùng độ dài
+            
+        Returns:
+            int: Số beats mới được xác nhận trong batch
+        """
+        ir_in = np.asarray(ir_samples, dtype=np.float64)
+        red_in = np.asarray(red_samples, dtype=np.float64)
+        n_in = min(ir_in.size, red_in.size)
+        if n_in == 0:
+            return 0
+
+        # Decimate liên tục qua các batch (giữ phase theo tổng số mẫu đầu vào)
+        offset = (-self._input_count) % self.stride
+        self._input_count += n_in
+        ir_raw = np.clip(ir_in[offset:n_in:self.stride], 0, 250000)
+        red_raw = np.clip(red_in[offset:n_in:self.stride], 0, 250000)
+        beats = 0
+        for start in range(0, ir_raw.size, self._chunk):
+            beats += self._process_chunk(ir_raw[start:start + self._chunk], red_raw[start:start + self._chunk])
+        return beats
+
+    def _process_chunk(self, ir_raw: np.ndarray, red_raw: np.ndarray) -> int:
+        """Filter + valley detection cho một chunk (sau decimate)."""
+        if self._zi is None:
+            self._zi = self._design.initial_state(ir_raw[0])
+        filtered, self._zi = scipy_signal.sosfilt(self._design.sos, ir_raw, zi=self._zi)
+
+        base = self._count
+        self._history.extend(ir_raw, red_raw, filtered)
+        self._count += ir_raw.size
+
+        # Local minima trên filtered (bao gồm biên batch nhờ tail)
+        seg = np.concatenate((self._tail, filtered))
+        seg_start = base - self._tail.size
+        self._tail = seg[-2:]
+
+        beats = 0
+        if seg.size >= 3:
+            mid = seg[1:-1]
+            minima = np.flatnonzero((mid < seg[:-2]) & (mid <= seg[2:]) & (mid < -self.MIN_VALLEY_DEPTH))
+            for idx in minima:
+                beats += self._offer_valley(seg_start + 1 + int(idx), float(-mid[idx]))
+
+        # Valley đang chờ: chắc chắn khi đã qua min_dist mà không có valley sâu hơn
+        if self._pending is not None and self._count - 1 - self._pending[0] >= self._min_dist:
+            beats += self._commit_valley(self._pending[0])
+            self._pending = None
+
+        return beats
+
+    def _offer_valley(self, index: int, depth: float) -> int:
+        """Refractory: trong min_dist chỉ giữ valley sâu nhất (giống find_peaks)."""
+        if self._pending is None:
+            self._pending = (index, depth)
+            return 0
+        if index - self._pending[0] < self._min_dist:
+            if depth > self._pending[1]:
+                self._pending = (index, depth)
+            return 0
+        committed = self._commit_valley(self._pending[0])
+        self._pending = (index, depth)
+        return committed
+
+    def _commit_valley(self, filtered_index: int) -> int:
+        """Map valley về RAW (bù group delay + argmin cục bộ), cập nhật IBI/R-value."""
+        oldest = self._count - len(self._history)
+        center = filtered_index - self._group_delay
+        lo = max(oldest, center - self._refine)
+        hi = min(self._count, center + self._refine + 1)
+        if lo >= hi:
+            return 0
+
+        ir_hist = self._history.view(channel=0)
+        valley = lo + int(np.argmin(ir_hist[lo - oldest:hi - oldest]))
+
+        previous = self._last_valley
+        if previous is not None and valley - previous < self._min_dist:
+            return 0
+        self._last_valley = valley
+
+        if previous is None or valley - previous > self._max_dist:
+            # Beat đầu tiên hoặc mất tín hiệu quá lâu → bắt đầu chuỗi mới
+            self._valleys.clear()
+            self._valleys.append(valley)
+            return 0
+
+        self._valleys.append(valley)
+        self._intervals.append((valley, valley - previous))
+
+        # R-value cho cycle previous → valley (RAW data)
+        if valley - previous > 3 and previous >= oldest:
+            red_hist = self._history.view(channel=1)
+            r_value = HRCalculator.cycle_r_value(
+                ir_hist[previous - oldest:valley - oldest + 1],
+                red_hist[previous - oldest:valley - oldest + 1],
+                len(self._intervals) - 1,
+            )
+            if r_value is not None:
+                self._ratios.append((valley, r_value))
+
+        self._update_sqi(valley, oldest)
+        return 1
+
+    def _update_sqi(self, valley: int, oldest: int) -> None:
+        """SQI trên BUFFER_SIZE mẫu RAW kết thúc tại valley mới - chỉ tính lại khi có beat mới."""
+        end = valley + 1
+        start = max(oldest, end - HRCalculator.BUFFER_SIZE)
+        ir_recent = self._history.view(channel=0)[start - oldest:end - oldest]
+        red_recent = self._history.view(channel=1)[start - oldest:end - oldest]
+        locs = [v - start for v in self._valleys if v >= start]
+        try:
+            self._sqi = HRCalculator.calc_signal_quality_index(ir_recent, red_recent, locs, self.sample_rate)
+        except Exception as exc:
+            self.logger.debug("[SQI] Calculation failed: %s", exc)
+            self._sqi = 50.0
+
+    # ==================== RESULTS ====================
+
+    def result(self) -> Tuple[float, bool, float, bool, float, float, int, List[float]]:
+        """
+        Tổng hợp beats trong window_seconds gần nhất.
+        
+        Returns:
+            Cùng định dạng với HRCalculator.calc_hr_and_spo2:
+            (hr, hr_valid, spo2, spo2_valid, sqi, cv, peak_count, r_values)
+        """
+        cutoff = self._count - self._window_samples
+        peak_count = sum(1 for v in self._valleys if v >= cutoff)
+        if peak_count == 0:
+            return -999.0, False, -999.0, False, 0.0, 0.0, 0, []
+
+        intervals = [ibi for v, ibi in self._intervals if v - ibi >= cutoff]
+        hr, hr_valid = HRCalculator.heart_rate_from_intervals(intervals, self.sample_rate)
+
+        ratio = [r for v, r in self._ratios if v >= cutoff]
+        if not ratio:
+            return hr, hr_valid, -999.0, False, 0.0, 0.0, peak_count, []
+
+        spo2, spo2_valid, cv = HRCalculator.spo2_from_ratios(ratio)
+        return hr, hr_valid, spo2, spo2_valid, float(self._sqi), cv, peak_count, ratio
+
+
 class MAX30102Sensor(BaseSensor):
     """High-level MAX30102 sensor wrapper with fixed measurement window."""
 
@@ -1264,8 +1755,31 @@ class MAX30102Sensor(BaseSensor):
     # ==================== INITIALIZATION & SETUP ====================
     
     def __init__(self, config: Dict[str, Any]):
+        # Acquisition: 'poll' (BaseSensor sleep loop + đọc FIFO pointer mỗi tick)
+        #              'interrupt' (chờ INT pin A_FULL rồi drain FIFO một burst)
+        acquisition = str(config.get("acquisition", "poll")).lower()
+        if acquisition == "interrupt":
+            # Copy: không ghi blocking_mode/read_timeout_ms vào app config dùng chung
+            config = dict(config)
+            config['blocking_mode'] = True
+            config.setdefault('read_timeout_ms', 500)
+
         super().__init__("MAX30102", config)
 
+        self.acquisition_mode = acquisition
+        self.int_gpio: Optional[int] = config.get("int_gpio")
+        # Số mẫu chờ đọc khi INT kích hoạt (17-32): còn 32 - N mẫu dự phòng trước khi tràn
+        interrupt_samples = int(config.get("fifo_interrupt_samples", 17))
+        interrupt_samples = max(MAX30102Hardware.FIFO_DEPTH - 15, min(MAX30102Hardware.FIFO_DEPTH, interrupt_samples))
+        if acquisition == "interrupt":
+            self._fifo_almost_full = MAX30102Hardware.FIFO_DEPTH - interrupt_samples
+            self._interrupt_enable = INTR_A_FULL
+        else:
+            self._fifo_almost_full = MAX30102Hardware.DEFAULT_ALMOST_FULL
+            self._interrupt_enable = INTR_A_FULL | INTR_PPG_RDY
+        self._int_line: Optional[Any] = None   # GPIOInterruptLine | ReplayInterruptLine
+        self._acq_stats = {'wakeups': 0, 'interrupt_timeouts': 0, 'samples': 0}
+
         self.i2c_bus = int(config.get("i2c_bus", 1))
         self.i2c_address = int(config.get("i2c_address", 0x57))
         self.sample_average = int(config.get("sample_average", 4))
@@ -1278,6 +1792,11 @@ class MAX30102Sensor(BaseSensor):
         self.adc_range = int(config.get("adc_range", 4096))
         self.led_mode = int(config.get("led_mode", 0x03))
         self.ir_threshold = int(config.get("ir_threshold", 50000))
+        # Low power (RateGovernor POWER_DOWN): LED dòng thấp thay vì shutdown để vẫn
+        # phát hiện ngón tay; ngưỡng IR scale theo tỉ lệ dòng LED
+        self.low_power_led_pa = int(config.get("low_power_led_pa", 0x08))
+        self._low_power = False
+        self._proximity_ir = 0.0
 
         measurement_window = float(config.get("measurement_window_seconds", self.DEFAULT_MEASUREMENT_WINDOW))
         measurement_window = max(self.DEFAULT_MEASUREMENT_WINDOW, measurement_window)
@@ -1291,12 +1810,26 @@ class MAX30102Sensor(BaseSensor):
         self.validity_timeout = float(config.get("validity_timeout", 3.0))
         # Tăng từ 25 lên 50 Hz để tăng độ phân giải, loại bỏ sóng dội (Dicrotic Notch)
         # 50Hz là đủ chuẩn y tế cho PPG, giảm tải CPU hơn 100Hz
-        self.hr_algorithm_rate = 50
+        self.hr_algorithm_rate = max(1, int(config.get("hr_algorithm_rate", 50)))
+        # 'window': HRCalculator trên toàn cửa sổ (mặc định, ngưỡng valley thích nghi)
+        # 'streaming': StreamingHRCalculator (incremental, opt-in) - MIN_VALLEY_DEPTH cố định
+        # nên HR/SpO2 có thể lệch nhẹ so với window engine
+        self.hr_engine_mode = str(config.get("hr_engine", "window")).lower()
+        self.hr_beat_window_seconds = float(config.get("hr_beat_window_seconds", 5.0))
         default_samples = self.hardware_sample_rate // 4 or 4
         self.max_samples_per_read = max(1, int(config.get("max_samples_per_read", default_samples)))
 
+        # Replay trace thay cho I²C thật: {path, speed, loop}
+        self.replay_config: Optional[Dict[str, Any]] = config.get("replay")
+
         self.hardware: Optional[MAX30102Hardware] = None
         self.window = MeasurementWindow(self.hardware_sample_rate, self.measurement_window_seconds, self.min_measurement_seconds)
+        self.hr_engine = StreamingHRCalculator(
+            self.window.sample_rate,
+            self.hr_algorithm_rate,
+            window_seconds=self.hr_beat_window_seconds,
+            logger=self.logger,
+        )
 
         # State objects (refactored)
         self.measurement = MeasurementState()
@@ -1330,6 +1863,8 @@ class MAX30102Sensor(BaseSensor):
                     led2_pa=self.pulse_amplitude_ir,
                     sample_average=self.sample_average,
                     adc_range=self.adc_range,
+                    almost_full=self._fifo_almost_full,
+                    interrupts=self._interrupt_enable,
                 )
                 self.hardware_sample_rate = self.hardware.sample_rate
                 self.window = MeasurementWindow(
@@ -1337,18 +1872,31 @@ class MAX30102Sensor(BaseSensor):
                     self.measurement_window_seconds,
                     self.min_measurement_seconds,
                 )
+                self.hr_engine.start(self.window.sample_rate)
+                if self.acquisition_mode == "interrupt":
+                    self._open_interrupt_line()
                 self.logger.debug("MAX30102 đã được đánh thức và cấu hình lại sau khi khởi động lại")
                 return True
             except Exception as exc:  # pragma: no cover - hardware only
                 self.logger.error("Không thể cấu hình lại MAX30102: %s", exc)
                 return False
 
-        if smbus is None:
+        replay_bus: Optional[ReplaySMBus] = None
+        if self.replay_config:
+            try:
+                replay_bus = ReplaySMBus.from_config(self.replay_config, logger=self.logger)
+            except Exception as exc:
+                self.logger.error("Không thể load replay trace MAX30102: %s", exc)
+                return False
+            self._configure_replay(replay_bus)
+        elif smbus is None:
             self.logger.error("Không thể khởi tạo MAX30102 do thiếu smbus")
             return False
 
         try:
-            self.hardware = MAX30102Hardware(channel=self.i2c_bus, address=self.i2c_address, logger=self.logger)
+            self.hardware = MAX30102Hardware(
+                channel=self.i2c_bus, address=self.i2c_address, logger=self.logger, bus=replay_bus
+            )
             self.hardware.setup(
                 sample_rate=self.hardware_sample_rate,
                 led_mode=self.led_mode,
@@ -1356,6 +1904,8 @@ class MAX30102Sensor(BaseSensor):
                 led2_pa=self.pulse_amplitude_ir,
                 sample_average=self.sample_average,
                 adc_range=self.adc_range,
+                almost_full=self._fifo_almost_full,
+                interrupts=self._interrupt_enable,
             )
             # Tính effective sample rate SAU khi hardware.setup() (có thể bị điều chỉnh)
             self.hardware_sample_rate = self.hardware.sample_rate
@@ -1366,6 +1916,9 @@ class MAX30102Sensor(BaseSensor):
                 self.measurement_window_seconds,
                 self.min_measurement_seconds,
             )
+            self.hr_engine.start(self.window.sample_rate)
+            if self.acquisition_mode == "interrupt":
+                self._open_interrupt_line()
             self.logger.info(
                 "MAX30102 khởi tạo (bus=%d, addr=0x%02X, HW_rate=%d SPS, avg=%d, effective=%.1f SPS, poll=%.1f Hz, max_read=%d)",
                 self.i2c_bus,
@@ -1382,14 +1935,110 @@ class MAX30102Sensor(BaseSensor):
             self.hardware = None
             return False
 
+    def _configure_replay(self, replay_bus: ReplaySMBus) -> None:
+        """
+        Chỉnh rate theo trace: trace lưu mẫu đã average → sample_average = 1,
+        poll đủ nhanh để FIFO (31 mẫu) không tràn khi replay tăng tốc.
+        """
+        self.hardware_sample_rate = int(round(replay_bus.sample_rate))
+        self.sample_average = 1
+
+        speed = replay_bus.clock.speed
+        per_read = min(self.max_samples_per_read, ReplaySMBus.FIFO_DEPTH - 1)
+        if speed <= 0:
+            poll_rate = 1000.0
+        else:
+            poll_rate = replay_bus.sample_rate * speed * 1.5 / per_read
+        self.sample_rate = max(float(self.sample_rate), poll_rate)
+
+        self.logger.info(
+            "MAX30102 replay: %d samples @ %.1f SPS, speed=%s, poll=%.1f Hz",
+            replay_bus.length, replay_bus.sample_rate, speed, self.sample_rate,
+        )
+
+    def _open_interrupt_line(self) -> None:
+        """
+        Mở INT line cho interrupt acquisition (GPIO thật hoặc replay).
+        Không mở được → quay về poll mode (BaseSensor sleep loop).
+        """
+        if self._int_line is not None:
+            return
+
+        if isinstance(self.hardware.bus, ReplaySMBus):
+            line: Any = ReplayInterruptLine(self.hardware.bus, self.hardware.interrupt_threshold())
+        elif self.int_gpio is not None:
+            line = GPIOInterruptLine(int(self.int_gpio), logger=self.logger)
+        else:
+            line = None
+            self.logger.warning("acquisition=interrupt nhưng thiếu int_gpio")
+
+        if line is not None and line.open():
+            self._int_line = line
+            self.logger.info(
+                "MAX30102 interrupt acquisition: A_FULL @ %d samples, timeout=%dms",
+                self.hardware.interrupt_threshold(), self.read_timeout_ms,
+            )
+            return
+
+        self.logger.warning("Không dùng được INT pin - chuyển sang poll mode @ %.1f Hz", self.sample_rate)
+        self.acquisition_mode = "poll"
+        self.blocking_mode = False
+        self._fifo_almost_full = MAX30102Hardware.DEFAULT_ALMOST_FULL
+        self._interrupt_enable = INTR_A_FULL | INTR_PPG_RDY
+        self.hardware.setup(
+            sample_rate=self.hardware_sample_rate,
+            led_mode=self.led_mode,
+            led1_pa=self.pulse_amplitude_red,
+            led2_pa=self.pulse_amplitude_ir,
+            sample_average=self.sample_average,
+            adc_range=self.adc_range,
+            almost_full=self._fifo_almost_full,
+            interrupts=self._interrupt_enable,
+        )
+
     def cleanup(self):
         """
-        Cleanup hardware resources (I2C bus)
+        Cleanup hardware resources (I2C bus, INT line)
         NOTE: MAX30102 uses I2C bus managed by hardware layer
         """
+        if self._int_line is not None:
+            self._int_line.close()
+            self._int_line = None
         # I2C bus cleanup handled by hardware layer if needed
         self.logger.debug("MAX30102 cleanup completed")
 
+    def get_acquisition_stats(self) -> Dict[str, Any]:
+        """
+        Thống kê acquisition (so sánh poll vs interrupt)
+        
+        Returns:
+            dict: mode, wakeups, samples, samples_per_wakeup, interrupt_timeouts, fifo_overflow
+        """
+        stats = dict(self._acq_stats)
+        stats['mode'] = self.acquisition_mode
+        stats['samples_per_wakeup'] = stats['samples'] / stats['wakeups'] if stats['wakeups'] else 0.0
+        stats['fifo_overflow'] = self.hardware.overflow_count if self.hardware else 0
+        return stats
+
+    def get_schedule_rate(self) -> float:
+        """
+        Tần số task trong AcquisitionScheduler (Hz)
+        
+        - poll: sample_rate (như BaseSensor loop)
+        - interrupt: kiểm tra mức INT 2 lần trong thời gian FIFO đầy tới ngưỡng
+          A_FULL → còn 32 - N mẫu dự phòng trước khi tràn
+        """
+        if self.scheduler_rate:
+            return float(self.scheduler_rate)
+        if self._int_line is None or not self.hardware:
+            return float(self.sample_rate)
+
+        fifo_rate = self.hardware_sample_rate / max(1, self.sample_average)
+        if isinstance(self.hardware.bus, ReplaySMBus):
+            speed = self.hardware.bus.clock.speed
+            fifo_rate = fifo_rate * speed if speed > 0 else 1000.0
+        return max(5.0, 2.0 * fifo_rate / self.hardware.interrupt_threshold())
+
     # ==================== DATA READING & PROCESSING ====================
     
     def read_raw_data(self) -> Optional[Dict[str, Any]]:
@@ -1397,15 +2046,20 @@ class MAX30102Sensor(BaseSensor):
             return {"read_size": 0}
 
         try:
-            samples = self.hardware.read_samples(self.max_samples_per_read)
-            if not samples:
-                return {"read_size": 0}
+            if self._int_line is not None:
+                red_samples, ir_samples = self._read_on_interrupt()
+                if red_samples is None:
+                    return None
+            else:
+                red_samples, ir_samples = self.hardware.read_sample_arrays(self.max_samples_per_read)
 
-            red_samples = [sample[0] for sample in samples]
-            ir_samples = [sample[1] for sample in samples]
+            self._acq_stats['wakeups'] += 1
+            self._acq_stats['samples'] += int(red_samples.size)
+            if red_samples.size == 0:
+                return {"read_size": 0}
 
             return {
-                "read_size": len(samples),
+                "read_size": int(red_samples.size),
                 "red": red_samples,
                 "ir": ir_samples,
             }
@@ -1413,12 +2067,40 @@ class MAX30102Sensor(BaseSensor):
             self.logger.error("Lỗi đọc dữ liệu MAX30102: %s", exc)
             return None
 
-    def process_data(self, raw_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _read_on_interrupt(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Chờ INT (A_FULL) rồi drain FIFO một burst (blocking_mode)
+        
+        Trong AcquisitionScheduler: không chờ - chỉ kiểm tra mức INT (không
+        có giao dịch I²C khi FIFO chưa tới ngưỡng).
+        
+        Returns:
+            (red, ir) hoặc (None, None) khi timeout và FIFO trống
+        """
+        if self.is_scheduled:
+            if not self._int_line.is_asserted():
+                return None, None
+            return self.hardware.drain_fifo()
+
+        if not self._int_line.wait(self.read_timeout_ms / 1000.0):
+            # Timeout: có thể lỡ edge → drain một lần cho chắc
+            self._acq_stats['interrupt_timeouts'] += 1
+            red_samples, ir_samples = self.hardware.drain_fifo()
+            if red_samples.size == 0:
+                return None, None
+            return red_samples, ir_samples
+        return self.hardware.drain_fifo()
+
+    def process_data(self, raw_data: Dict[str, Any]) -> Optional[PPGReading]:
         if raw_data is None:
             return None
 
-        red_samples = raw_data.get("red", []) or []
-        ir_samples = raw_data.get("ir", []) or []
+        red_samples = raw_data.get("red")
+        ir_samples = raw_data.get("ir")
+        if red_samples is None:
+            red_samples = []
+        if ir_samples is None:
+            ir_samples = []
         sample_count = int(raw_data.get("read_size", min(len(red_samples), len(ir_samples))))
 
         if sample_count <= 0:
@@ -1428,18 +2110,29 @@ class MAX30102Sensor(BaseSensor):
         # ============================================================
         # LƯU RAW IR DATA VÀO VISUAL BUFFER CHO GUI WAVEFORM
         # ============================================================
-        if ir_samples:
-            self._visual_buffer.extend(ir_samples)
+        if len(ir_samples):
+            self._visual_buffer.extend(
+                ir_samples.tolist() if isinstance(ir_samples, np.ndarray) else ir_samples
+            )
             # Giới hạn size để tránh tràn nhớ nếu GUI không đọc kịp
             if len(self._visual_buffer) > 2000:
                 self._visual_buffer = self._visual_buffer[-2000:]
         
         self.window.add_samples(ir_samples, red_samples)
+        if self._low_power:
+            self._proximity_ir = float(np.mean(ir_samples))
         self.measurement.readings_count += sample_count
         self.measurement.window_fill = self.window.fill_ratio()
         self.measurement.signal_quality_ir = self.window.estimate_quality("ir")
         self.measurement.signal_quality_red = self.window.estimate_quality("red")
+
+        finger_was_detected = bool(self.finger.detected)
         self.finger.detected = self._detect_finger()
+        if self.hr_engine_mode == "streaming":
+            if self.finger.detected and not finger_was_detected:
+                # Ngón tay vừa đặt: bỏ beats/filter state từ tín hiệu không có ngón tay
+                self.hr_engine.reset()
+            self.hr_engine.update(ir_samples, red_samples)
         self.session.elapsed = self._session_elapsed()
 
         hr_value, hr_valid, spo2_value, spo2_valid = self._compute_biometrics()
@@ -1549,6 +2242,7 @@ class MAX30102Sensor(BaseSensor):
     
     def begin_measurement_session(self) -> None:
         self.window.reset()
+        self.hr_engine.reset()
         self.hr_history.clear()
         self.spo2_history.clear()
         
@@ -1571,8 +2265,44 @@ class MAX30102Sensor(BaseSensor):
         self._last_hr_value = 0.0
         self._hr_jump_count = 0
 
+        # Governor: ramp lên full rate ngay khi bắt đầu đo
+        if self.governor is not None:
+            self.governor.wake()
+
     def end_measurement_session(self) -> None:
         self.session.active = False
+
+    # ==================== RATE GOVERNOR HOOKS ====================
+
+    def is_idle(self) -> bool:
+        """
+        Idle khi chưa có ngón tay (finger detection vẫn chạy ở idle rate);
+        low power: idle tới khi IR (LED dòng thấp) vượt ngưỡng proximity
+        """
+        if self._low_power:
+            return self._proximity_ir < self.proximity_threshold()
+        return not self.finger.detected
+
+    def proximity_threshold(self) -> float:
+        """ir_threshold scale theo dòng LED IR low power / dòng IR khi đo"""
+        return self.ir_threshold * self.low_power_led_pa / max(1, self.pulse_amplitude_ir)
+
+    def enter_low_power(self) -> bool:
+        """
+        Giảm dòng LED xuống low_power_led_pa khi idle kéo dài (không shutdown:
+        chip vẫn lấy mẫu để phát hiện ngón tay) - chỉ khi không có session
+        """
+        if self.session.active or not self.hardware:
+            return False
+        self._proximity_ir = 0.0
+        self._low_power = True
+        self.hardware.set_led_amplitudes(self.low_power_led_pa, self.low_power_led_pa)
+        return True
+
+    def exit_low_power(self) -> None:
+        self._low_power = False
+        if self.hardware:
+            self.hardware.set_led_amplitudes(self.pulse_amplitude_red, self.pulse_amplitude_ir)
     
     def pop_visual_samples(self) -> List[int]:
         """
@@ -1608,19 +2338,23 @@ class MAX30102Sensor(BaseSensor):
                               fill, current_samples, self.window.min_samples)
             return -999.0, False, -999.0, False
 
-        ir_ds, red_ds = self.window.resample(self.hr_algorithm_rate, HRCalculator.BUFFER_SIZE + 10)
-        self.logger.debug("[Biometrics] Resample OK: IR=%d, RED=%d (raw_samples=%d)", 
-                          ir_ds.size, red_ds.size, len(self.window.ir))
-        
-        if ir_ds.size < HRCalculator.BUFFER_SIZE or red_ds.size < HRCalculator.BUFFER_SIZE:
-            self.logger.debug("[Biometrics] Resampled không đủ: IR=%d, RED=%d (cần %d)", 
-                              ir_ds.size, red_ds.size, HRCalculator.BUFFER_SIZE)
-            return -999.0, False, -999.0, False
-
-        # Call calc_hr_and_spo2 with new signature returning metadata
-        hr_value, hr_valid, spo2_value, spo2_valid, sqi, cv, peak_count, r_values = HRCalculator.calc_hr_and_spo2(
-            ir_ds, red_ds, self.hr_algorithm_rate
-        )
+        if self.hr_engine_mode == "streaming":
+            # Incremental engine: chỉ tổng hợp beats đã xác nhận (không tính lại cả cửa sổ)
+            hr_value, hr_valid, spo2_value, spo2_valid, sqi, cv, peak_count, r_values = self.hr_engine.result()
+        else:
+            ir_ds, red_ds = self.window.resample(self.hr_algorithm_rate, HRCalculator.BUFFER_SIZE + 10)
+            self.logger.debug("[Biometrics] Resample OK: IR=%d, RED=%d (raw_samples=%d)", 
+                              ir_ds.size, red_ds.size, len(self.window.ir))
+            
+            if ir_ds.size < HRCalculator.BUFFER_SIZE or red_ds.size < HRCalculator.BUFFER_SIZE:
+                self.logger.debug("[Biometrics] Resampled không đủ: IR=%d, RED=%d (cần %d)", 
+                                  ir_ds.size, red_ds.size, HRCalculator.BUFFER_SIZE)
+                return -999.0, False, -999.0, False
+
+            # Call calc_hr_and_spo2 with new signature returning metadata
+            hr_value, hr_valid, spo2_value, spo2_valid, sqi, cv, peak_count, r_values = HRCalculator.calc_hr_and_spo2(
+                ir_ds, red_ds, self.hr_algorithm_rate
+            )
         
         # Store metadata in measurement state (no more global variables)
         self.measurement.signal_quality_index = float(sqi)
@@ -1642,19 +2376,22 @@ class MAX30102Sensor(BaseSensor):
         - Advanced scoring (amplitude, quality, DC increase)
         - Simple fallback từ heartrate_monitor.py (mean thresholds)
         - Hysteresis để tránh flicker
+        
+        Thống kê 1.2s gần nhất lấy từ window.recent_ir/recent_red (cập nhật
+        trong add_samples) - không copy/sort cửa sổ mỗi tick.
         """
-        recent_ir = self.window.recent_array(seconds=1.2, channel="ir")
-        recent_red = self.window.recent_array(seconds=1.2, channel="red")
+        recent_ir = self.window.recent_ir
+        recent_red = self.window.recent_red
         previous_state = bool(self.finger.detected)
 
         min_samples = max(8, int(self.window.sample_rate * 0.5))
-        if recent_ir.size < min_samples or recent_red.size < min_samples:
+        if recent_ir.count < min_samples or recent_red.count < min_samples:
             # Không đủ dữ liệu - khởi tạo baseline THẤP nếu có ít nhất 3 samples
-            if recent_ir.size >= 3 and not self.finger.baseline_ready:
+            if recent_ir.count >= 3 and not self.finger.baseline_ready:
                 # Dùng percentile 10% thay vì median để baseline thấp hơn
-                self.finger.baseline = float(np.percentile(recent_ir, 10))
+                self.finger.baseline = recent_ir.quantile(0.10)
                 self.finger.baseline_ready = True
-                self.logger.debug("[Baseline khởi tạo] %.0f (từ %d samples)", self.finger.baseline, recent_ir.size)
+                self.logger.debug("[Baseline khởi tạo] %.0f (từ %d samples)", self.finger.baseline, recent_ir.count)
             
             self.finger.present_frames = 0
             self.finger.absent_frames = min(
@@ -1676,8 +2413,8 @@ class MAX30102Sensor(BaseSensor):
         # SIMPLE FALLBACK CHECK (từ heartrate_monitor.py)
         # Quick rejection nếu tín hiệu quá yếu (< 50000)
         # ============================================================
-        mean_ir = float(np.mean(recent_ir))
-        mean_red = float(np.mean(recent_red))
+        mean_ir = recent_ir.mean
+        mean_red = recent_red.mean
         
         # Nếu cả IR và RED đều < 50000 → chắc chắn không có ngón tay
         if mean_ir < 50000 and mean_red < 50000:
@@ -1701,18 +2438,18 @@ class MAX30102Sensor(BaseSensor):
         # ============================================================
         # ADVANCED SCORING (chỉ chạy nếu pass fallback check)
         # ============================================================
-        median_ir = float(np.median(recent_ir))
-        p95 = float(np.percentile(recent_ir, 95))
-        p5 = float(np.percentile(recent_ir, 5))
+        median_ir = recent_ir.median()
+        p95 = recent_ir.quantile(0.95)
+        p5 = recent_ir.quantile(0.05)
         amplitude = max(0.0, p95 - p5)
         quality = max(0.0, float(self.measurement.signal_quality_ir))
         
         # Cập nhật baseline CHỈ KHI KHÔNG có ngón tay 
         if not self.finger.baseline_ready:
             # Lần đầu: khởi tạo baseline ở percentile thấp để dc_increase > 0
-            self.finger.baseline = float(np.percentile(recent_ir, 10))
+            self.finger.baseline = recent_ir.quantile(0.10)
             self.finger.baseline_ready = True
-            self.logger.debug("[Baseline khởi tạo chính] %.0f (từ %d samples)", self.finger.baseline, recent_ir.size)
+            self.logger.debug("[Baseline khởi tạo chính] %.0f (từ %d samples)", self.finger.baseline, recent_ir.count)
         elif not previous_state:
             # CHỈ cập nhật baseline khi KHÔNG có ngón tay
             # Dùng EMA chậm để tránh nhiễu
@@ -1820,31 +2557,33 @@ class MAX30102Sensor(BaseSensor):
         if self.measurement.spo2_valid and (now - self.last_valid_spo2_ts) > self.validity_timeout:
             self.measurement.spo2_valid = False
 
-    def _build_payload(self, read_size: int) -> Dict[str, Any]:
-        """Build sensor data payload với metadata đầy đủ."""
-        return {
-            "read_size": read_size,
-            "heart_rate": float(self.measurement.heart_rate),
-            "spo2": float(self.measurement.spo2),
-            "hr_valid": bool(self.measurement.hr_valid),
-            "spo2_valid": bool(self.measurement.spo2_valid),
-            "finger_detected": bool(self.finger.detected),
-            "signal_quality_ir": float(self.measurement.signal_quality_ir),
-            "signal_quality_red": float(self.measurement.signal_quality_red),
-            "signal_quality_index": float(self.measurement.signal_quality_index),  # SQI 0-100
-            "status": self.measurement.status,
-            "window_fill": float(self.measurement.window_fill),
-            "measurement_ready": bool(self.measurement.ready),
-            "measurement_elapsed": float(self.session.elapsed),
-            "session_active": bool(self.session.active),
-            "finger_detection_score": float(self.finger.detection_score),
-            "finger_signal_amplitude": float(self.finger.signal_amplitude),
-            "finger_signal_ratio": float(self.finger.signal_ratio),
-            "finger_signal_quality": float(self.finger.signal_quality),
+    def _build_payload(self, read_size: int) -> PPGReading:
+        """Build reading record (slotted, timestamp monotonic) với metadata đầy đủ."""
+        measurement = self.measurement
+        finger = self.finger
+        return PPGReading(
+            read_size=read_size,
+            heart_rate=float(measurement.heart_rate),
+            spo2=float(measurement.spo2),
+            hr_valid=bool(measurement.hr_valid),
+            spo2_valid=bool(measurement.spo2_valid),
+            finger_detected=bool(finger.detected),
+            signal_quality_ir=float(measurement.signal_quality_ir),
+            signal_quality_red=float(measurement.signal_quality_red),
+            signal_quality_index=float(measurement.signal_quality_index),  # SQI 0-100
+            status=measurement.status,
+            window_fill=float(measurement.window_fill),
+            measurement_ready=bool(measurement.ready),
+            measurement_elapsed=float(self.session.elapsed),
+            session_active=bool(self.session.active),
+            finger_detection_score=float(finger.detection_score),
+            finger_signal_amplitude=float(finger.signal_amplitude),
+            finger_signal_ratio=float(finger.signal_ratio),
+            finger_signal_quality=float(finger.signal_quality),
             # Additional metadata for logging/research
-            "spo2_cv": float(self.measurement.spo2_cv),  # Coefficient of variation
-            "peak_count": int(self.measurement.peak_count),  # Number of peaks detected
-        }
+            spo2_cv=float(measurement.spo2_cv),  # Coefficient of variation
+            peak_count=int(measurement.peak_count),  # Number of peaks detected
+        )
 
     def _update_status_no_samples(self) -> None:
         if not self.finger.detected:
@@ -1886,6 +2625,7 @@ class MAX30102Sensor(BaseSensor):
 
     def reset_buffers(self) -> None:
         self.window.reset()
+        self.hr_engine.reset()
         self.hr_history.clear()
         self.spo2_history.clear()
         
@@ -1,18 +1,15 @@
 """
 MLX90614 Temperature Sensor Driver (GY-906)
 Driver cho cảm biến nhiệt độ hồng ngoại MLX90614 (GY-906)
+
+I²C qua bus manager dùng chung (i2c_bus.open_i2c_bus): ambient + object
+đọc trong một slot, giao dịch được serialize với MAX30102 trên cùng bus.
 """
 
 from typing import Dict, Any, Optional
 import logging
-import time
 from .base_sensor import BaseSensor
-
-try:
-    from smbus2 import SMBus
-except ImportError:
-    print("Chưa cài đặt thư viện smbus2! Hãy chạy: pip install smbus2")
-    SMBus = None
+from .i2c_bus import DEFAULT_RETRIES, open_i2c_bus
 
 
 class MLX90614Sensor(BaseSensor):   
@@ -24,7 +21,7 @@ class MLX90614Sensor(BaseSensor):
         i2c_address (int): I2C address của MLX90614 (mặc định 0x5A)
         ambient_temp_reg (int): Register cho ambient temperature
         object_temp_reg (int): Register cho object temperature
-        bus (SMBus): I2C bus instance
+        bus (I2CBusHandle): Handle tới I2C bus dùng chung
         ambient_temperature (float): Nhiệt độ môi trường (°C)
         object_temperature (float): Nhiệt độ đối tượng (°C)
         temperature_offset (float): Offset hiệu chỉnh nhiệt độ
@@ -44,6 +41,7 @@ class MLX90614Sensor(BaseSensor):
         # I2C configuration
         self.i2c_bus = config.get('i2c_bus', 1)
         self.i2c_address = config.get('i2c_address', 0x5A)
+        self.i2c_retries = config.get('i2c_retries', DEFAULT_RETRIES)  # Retry ngay trong slot (không sleep)
         
         # MLX90614 registers
         self.ambient_temp_reg = 0x06  # Ta (ambient temperature)
@@ -59,6 +57,10 @@ class MLX90614Sensor(BaseSensor):
         self.use_object_temp = config.get('use_object_temp', True)  # True để đo nhiệt độ cơ thể
         self.smooth_factor = config.get('smooth_factor', 0.1)  # Smoothing factor
         self.last_temp = None
+        
+        # RateGovernor: object temp dưới ngưỡng → không có ai trước cảm biến
+        self.presence_threshold_c = config.get('presence_threshold_c', 30.0)
+        self.session_active = False
     
     def initialize(self) -> bool:
         """
@@ -67,12 +69,8 @@ class MLX90614Sensor(BaseSensor):
         Returns:
             bool: True if initialization successful
         """
-        if SMBus is None:
-            self.logger.error("smbus2 library not available")
-            return False
-            
         try:
-            self.bus = SMBus(self.i2c_bus)
+            self.bus = open_i2c_bus(self.i2c_bus, owner=self.name, retries=self.i2c_retries)
             
             # Test communication by reading ambient temperature
             test_data = self.bus.read_word_data(self.i2c_address, self.ambient_temp_reg)
@@ -103,6 +101,7 @@ class MLX90614Sensor(BaseSensor):
         try:
             if self.bus:
                 self.bus.close()
+                self.bus = None
                 self.logger.debug("Closed I2C bus")
         except Exception as e:
             self.logger.error(f"Error closing I2C bus: {e}")
@@ -120,38 +119,12 @@ class MLX90614Sensor(BaseSensor):
             return None
             
         try:
-            # Add small delay to prevent I2C bus congestion
-            time.sleep(0.01)
-            
-            # Read ambient temperature with retry
-            ambient_data = None
-            for attempt in range(3):
-                try:
-                    ambient_data = self.bus.read_word_data(self.i2c_address, self.ambient_temp_reg)
-                    break
-                except OSError:
-                    if attempt < 2:
-                        time.sleep(0.05)  # 50ms retry delay
-                    else:
-                        raise
+            # Ambient + object trong một slot của bus manager (retry không sleep)
+            ambient_data, object_data = self.bus.read_words(
+                self.i2c_address, (self.ambient_temp_reg, self.object_temp_reg)
+            )
             
             ambient_temp = (ambient_data * 0.02) - 273.15
-            
-            # Small delay between reads
-            time.sleep(0.01)
-            
-            # Read object temperature with retry
-            object_data = None
-            for attempt in range(3):
-                try:
-                    object_data = self.bus.read_word_data(self.i2c_address, self.object_temp_reg)
-                    break
-                except OSError:
-                    if attempt < 2:
-                        time.sleep(0.05)  # 50ms retry delay
-                    else:
-                        raise
-            
             object_temp = (object_data * 0.02) - 273.15
             
             return {
@@ -304,6 +277,21 @@ class MLX90614Sensor(BaseSensor):
             self.logger.error(f"Calibration failed: {e}")
         return False
     
+    # ==================== RATE GOVERNOR HOOKS ====================
+    
+    def is_idle(self) -> bool:
+        """Idle khi không có session và nhiệt độ đối tượng dưới ngưỡng có người (trán/cổ tay)"""
+        return not self.session_active and self.object_temperature < self.presence_threshold_c
+    
+    def begin_measurement_session(self) -> None:
+        """Bắt đầu đo: governor về active rate ngay, không chờ phát hiện cơ thể"""
+        self.session_active = True
+        if self.governor is not None:
+            self.governor.wake()
+    
+    def end_measurement_session(self) -> None:
+        self.session_active = False
+    
     # ==================== CLEANUP ====================
     
     def stop(self) -> bool:
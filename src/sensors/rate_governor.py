@@ -0,0 +1,238 @@
+"""
+Rate Governor - Giảm tần số đọc / power-down sensor khi idle
+=============================================================
+
+Sample rate của sensor cố định theo config: MAX30102 vẫn đọc + chạy finger
+detection đầy tốc độ khi chưa có ngón tay, MLX90614 vẫn đọc khi không có gì
+trước cảm biến. RateGovernor gắn vào một BaseSensor (config `rate_governor`)
+và điều chỉnh theo trạng thái đo:
+
+- ACTIVE: sample_rate cấu hình (hoặc rate scheduler của sensor)
+- IDLE: sensor.is_idle() liên tục idle_after_s giây → idle_rate Hz
+- POWER_DOWN: idle thêm tới power_down_after_s → sensor.enter_low_power()
+  (MAX30102: LED dòng thấp, vẫn phát hiện ngón tay; sensor không hỗ trợ
+  trả False → giữ IDLE)
+- is_idle() hết (ví dụ phát hiện ngón tay) hoặc wake() (bắt đầu session)
+  → ACTIVE ngay lập tức
+
+update() được gọi đầu mỗi BaseSensor.acquire_once() nên không cần thread
+riêng; chạy được cả với thread _reading_loop lẫn AcquisitionScheduler.
+
+Thống kê: thời gian mỗi trạng thái, duty cycle (tỉ lệ ACTIVE), CPU time
+mỗi lần đọc (time.thread_time) và CPU time ước tính tiết kiệm được so với
+đọc full rate suốt thời gian idle.
+
+Config (sensors.<sensor>.rate_governor):
+---------------------------------------
+    rate_governor:
+      enabled: true
+      idle_rate: 4.0             # Hz khi idle
+      idle_after_s: 3.0          # Hysteresis trước khi giảm rate
+      power_down_after_s: 60.0   # null = không power-down
+
+Usage Example:
+-------------
+>>> sensor = MAX30102Sensor({..., 'rate_governor': {'enabled': True}})
+>>> sensor.start()
+>>> sensor.governor.get_stats()['duty_cycle']
+>>> sensor.begin_measurement_session()     # wake() → ACTIVE
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from typing import Any, Dict, Optional
+import logging
+import threading
+import time
+
+
+# ==================== CONSTANTS ====================
+
+STATE_ACTIVE = "active"
+STATE_IDLE = "idle"
+STATE_POWER_DOWN = "power_down"
+
+DEFAULT_IDLE_RATE = 1.0
+DEFAULT_IDLE_AFTER_S = 3.0
+
+
+# ==================== GOVERNOR ====================
+
+class RateGovernor:
+    """
+    Governor của một sensor: ACTIVE ↔ IDLE ↔ POWER_DOWN
+
+    Attributes:
+        sensor: BaseSensor được điều khiển
+        state (str): STATE_ACTIVE / STATE_IDLE / STATE_POWER_DOWN
+        idle_rate (float): Tần số đọc khi idle (Hz)
+        idle_after_s (float): Thời gian idle liên tục trước khi giảm rate
+        power_down_after_s (float|None): Thời gian idle trước khi power-down
+    """
+
+    def __init__(self, sensor: Any, config: Dict[str, Any], logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            sensor: BaseSensor (is_idle/enter_low_power/exit_low_power hooks)
+            config: Dict `rate_governor` của sensor
+            logger: Logger instance
+        """
+        self.sensor = sensor
+        self.logger = logger or logging.getLogger(f"RateGovernor.{sensor.name}")
+
+        self.idle_rate = float(config.get('idle_rate', DEFAULT_IDLE_RATE))
+        self.idle_after_s = float(config.get('idle_after_s', DEFAULT_IDLE_AFTER_S))
+        power_down_after_s = config.get('power_down_after_s')
+        self.power_down_after_s = float(power_down_after_s) if power_down_after_s is not None else None
+
+        self._lock = threading.Lock()
+        self.state = STATE_ACTIVE
+        self.active_rate = sensor.sample_rate
+        self._idle_since: Optional[float] = None
+        self.reset_stats()
+
+    # ---------- control ----------
+
+    def update(self, now: Optional[float] = None) -> str:
+        """
+        Đánh giá trạng thái (gọi từ thread đọc trước mỗi lần acquire)
+
+        Returns:
+            str: Trạng thái sau khi cập nhật
+        """
+        now = time.monotonic() if now is None else now
+        idle = self.sensor.is_idle()
+
+        with self._lock:
+            if not idle:
+                self._idle_since = None
+                if self.state != STATE_ACTIVE:
+                    self._transition(STATE_ACTIVE, now)
+                return self.state
+
+            if self._idle_since is None:
+                self._idle_since = now
+            idle_for = now - self._idle_since
+
+            if self.state == STATE_ACTIVE and idle_for >= self.idle_after_s:
+                self._transition(STATE_IDLE, now)
+            if (
+                self.state == STATE_IDLE
+                and self.power_down_after_s is not None
+                and idle_for >= self.power_down_after_s
+            ):
+                self._transition(STATE_POWER_DOWN, now)
+            return self.state
+
+    def wake(self) -> None:
+        """Về ACTIVE ngay (ví dụ bắt đầu measurement session), reset hysteresis"""
+        with self._lock:
+            self._idle_since = None
+            if self.state != STATE_ACTIVE:
+                self._transition(STATE_ACTIVE, time.monotonic())
+
+    def reset(self) -> None:
+        """
+        Trả sample_rate về active rate mà không đụng phần cứng
+        (BaseSensor.stop(): cleanup() tự xử lý power)
+        """
+        with self._lock:
+            self._accumulate(time.monotonic())
+            if self.state != STATE_ACTIVE and not self.sensor.blocking_mode:
+                self.sensor.sample_rate = self.active_rate
+            self.state = STATE_ACTIVE
+            self._idle_since = None
+
+    def record_read(self, cpu_s: float) -> None:
+        """CPU time (time.thread_time) của một lần acquire_once"""
+        self._reads[self.state] += 1
+        self._cpu_s[self.state] += cpu_s
+
+    # ---------- transitions ----------
+
+    def _transition(self, target: str, now: float) -> None:
+        """Chuyển trạng thái (gọi khi giữ _lock)"""
+        sensor = self.sensor
+        previous = self.state
+
+        if target == STATE_POWER_DOWN:
+            if not sensor.enter_low_power():
+                # Sensor không hỗ trợ / không được phép lúc này → giữ IDLE
+                return
+        elif previous == STATE_POWER_DOWN:
+            sensor.exit_low_power()
+
+        if target == STATE_ACTIVE:
+            self._set_rate(self.active_rate, throttled=False)
+        elif previous == STATE_ACTIVE:
+            self.active_rate = sensor.sample_rate   # Giữ rate hiện tại để khôi phục
+            self._set_rate(self.idle_rate, throttled=True)
+
+        self._accumulate(now)
+        self.state = target
+        self._transitions += 1
+        self.logger.info(f"{sensor.name}: {previous} → {target}")
+
+    def _set_rate(self, rate: float, throttled: bool) -> None:
+        sensor = self.sensor
+        if not sensor.blocking_mode:
+            sensor.set_sample_rate(rate)
+        if sensor.is_scheduled:
+            # Rate task trong scheduler (MAX30102 interrupt: rate theo FIFO khi active)
+            sensor.scheduler.set_rate(sensor, rate if throttled else sensor.get_schedule_rate())
+
+    # ---------- statistics ----------
+
+    def _accumulate(self, now: float) -> None:
+        self._time_s[self.state] += now - self._state_since
+        self._state_since = now
+
+    def reset_stats(self) -> None:
+        """Xóa thống kê (bắt đầu cửa sổ đo duty cycle mới)"""
+        states = (STATE_ACTIVE, STATE_IDLE, STATE_POWER_DOWN)
+        self._state_since = time.monotonic()
+        self._time_s = dict.fromkeys(states, 0.0)
+        self._reads = dict.fromkeys(states, 0)
+        self._cpu_s = dict.fromkeys(states, 0.0)
+        self._transitions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: state, transitions, time_s/reads/cpu_s theo trạng thái,
+                  duty_cycle (tỉ lệ thời gian ACTIVE), cpu_per_read_us (ACTIVE),
+                  cpu_saved_s (ước tính: đọc full rate suốt thời gian không
+                  ACTIVE trừ CPU thực tế đã dùng khi idle/power-down)
+        """
+        with self._lock:
+            now = time.monotonic()
+            time_s = dict(self._time_s)
+            time_s[self.state] += now - self._state_since
+            reads = dict(self._reads)
+            cpu_s = dict(self._cpu_s)
+            state = self.state
+            transitions = self._transitions
+
+        total_s = sum(time_s.values())
+        active_s = time_s[STATE_ACTIVE]
+        active_reads = reads[STATE_ACTIVE]
+        cpu_per_read = cpu_s[STATE_ACTIVE] / active_reads if active_reads else 0.0
+        active_read_rate = active_reads / active_s if active_s > 0 else 0.0
+
+        inactive_s = total_s - active_s
+        inactive_cpu = cpu_s[STATE_IDLE] + cpu_s[STATE_POWER_DOWN]
+        cpu_saved = max(0.0, inactive_s * active_read_rate * cpu_per_read - inactive_cpu)
+
+        return {
+            'state': state,
+            'transitions': transitions,
+            'idle_rate': self.idle_rate,
+            'active_rate': self.active_rate,
+            'time_s': time_s,
+            'reads': reads,
+            'cpu_s': cpu_s,
+            'duty_cycle': active_s / total_s if total_s > 0 else 1.0,
+            'cpu_per_read_us': cpu_per_read * 1e6,
+            'cpu_saved_s': cpu_saved,
+        }
@@ -0,0 +1,190 @@
+"""
+Sensor Readings - Record gọn (__slots__) cho dữ liệu mỗi tick
+==============================================================
+
+MAX30102Sensor._build_payload và HX710BSensor.process_data trước đây tạo một
+dict mới cho mỗi lần đọc (20+ key), rồi BaseSensor gắn thêm
+datetime.now().isoformat() (một string ~26 ký tự) và tên sensor. Ở 10-50
+publish/s, phần lớn allocation của pipeline là dict + string timestamp mà
+GUI/MQTT chỉ đọc vài field.
+
+SensorReading là record có __slots__:
+
+- Không có __dict__ per-instance; field là slot cố định
+- timestamp là time.monotonic() (float) - không format string trên hot path
+- Implement Mapping (read-only): consumer cũ dùng data['heart_rate'],
+  data.get('spo2', 0), dict(data) không cần sửa
+- to_dict() chuyển sang dict với timestamp ISO (wall clock) - chỉ gọi ở
+  biên GUI/MQTT/DB
+
+Subclass khai báo _fields (thứ tự key) và __slots__ giống nhau.
+
+Usage Example:
+-------------
+>>> reading = PressureReading(152.3, 8123456, 8111000, True)
+>>> reading['pressure_mmhg'], reading.get('valid')
+(152.3, True)
+>>> reading.to_dict()['timestamp']      # '2026-10-16T09:30:12.123456'
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, Tuple
+import time
+
+
+# ==================== BASE RECORD ====================
+
+class SensorReading(Mapping):
+    """
+    Record một lần đọc sensor (read-only Mapping trên các slot)
+
+    Attributes:
+        sensor (str): Tên sensor (BaseSensor gán khi publish)
+        timestamp (float): time.monotonic() lúc tạo record
+    """
+
+    __slots__ = ('sensor', 'timestamp')
+
+    _fields: Tuple[str, ...] = ()
+    _keys: Tuple[str, ...] = ('timestamp', 'sensor')
+    _key_set: frozenset = frozenset(_keys)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._keys = tuple(cls._fields) + ('timestamp', 'sensor')
+        cls._key_set = frozenset(cls._keys)
+
+    # ---------- Mapping ----------
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._key_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._key_set
+
+    # ---------- edge conversion ----------
+
+    def wall_time(self) -> float:
+        """Epoch seconds tương ứng với timestamp monotonic"""
+        return self.timestamp + (time.time() - time.monotonic())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Dict thường cho GUI/MQTT/DB (timestamp ISO như payload cũ)
+
+        Returns:
+            dict: Mọi field + 'timestamp' (ISO string) + 'sensor'
+        """
+        data = {name: getattr(self, name) for name in self._fields}
+        data['timestamp'] = datetime.fromtimestamp(self.wall_time()).isoformat()
+        data['sensor'] = self.sensor
+        return data
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields}, sensor={self.sensor!r}, timestamp={self.timestamp:.3f})"
+
+
+# ==================== MAX30102 ====================
+
+class PPGReading(SensorReading):
+    """Một tick MAX30102 (HR/SpO2 + trạng thái finger/measurement)"""
+
+    _fields = (
+        'read_size',
+        'heart_rate',
+        'spo2',
+        'hr_valid',
+        'spo2_valid',
+        'finger_detected',
+        'signal_quality_ir',
+        'signal_quality_red',
+        'signal_quality_index',
+        'status',
+        'window_fill',
+        'measurement_ready',
+        'measurement_elapsed',
+        'session_active',
+        'finger_detection_score',
+        'finger_signal_amplitude',
+        'finger_signal_ratio',
+        'finger_signal_quality',
+        'spo2_cv',
+        'peak_count',
+    )
+    __slots__ = _fields
+
+    def __init__(
+        self,
+        read_size: int,
+        heart_rate: float,
+        spo2: float,
+        hr_valid: bool,
+        spo2_valid: bool,
+        finger_detected: bool,
+        signal_quality_ir: float,
+        signal_quality_red: float,
+        signal_quality_index: float,
+        status: str,
+        window_fill: float,
+        measurement_ready: bool,
+        measurement_elapsed: float,
+        session_active: bool,
+        finger_detection_score: float,
+        finger_signal_amplitude: float,
+        finger_signal_ratio: float,
+        finger_signal_quality: float,
+        spo2_cv: float,
+        peak_count: int,
+    ):
+        self.read_size = read_size
+        self.heart_rate = heart_rate
+        self.spo2 = spo2
+        self.hr_valid = hr_valid
+        self.spo2_valid = spo2_valid
+        self.finger_detected = finger_detected
+        self.signal_quality_ir = signal_quality_ir
+        self.signal_quality_red = signal_quality_red
+        self.signal_quality_index = signal_quality_index
+        self.status = status
+        self.window_fill = window_fill
+        self.measurement_ready = measurement_ready
+        self.measurement_elapsed = measurement_elapsed
+        self.session_active = session_active
+        self.finger_detection_score = finger_detection_score
+        self.finger_signal_amplitude = finger_signal_amplitude
+        self.finger_signal_ratio = finger_signal_ratio
+        self.finger_signal_quality = finger_signal_quality
+        self.spo2_cv = spo2_cv
+        self.peak_count = peak_count
+        self.timestamp = time.monotonic()
+        self.sensor = ""
+
+
+# ==================== HX710B ====================
+
+class PressureReading(SensorReading):
+    """Một conversion HX710B đã hiệu chuẩn"""
+
+    _fields = ('pressure_mmhg', 'counts', 'counts_zeroed', 'valid')
+    __slots__ = _fields
+
+    def __init__(self, pressure_mmhg: float, counts: int, counts_zeroed: int, valid: bool = True):
+        self.pressure_mmhg = pressure_mmhg
+        self.counts = counts
+        self.counts_zeroed = counts_zeroed
+        self.valid = valid
+        self.timestamp = time.monotonic()
+        self.sensor = ""
@@ -0,0 +1,605 @@
+"""
+Sensor Replay - Phát lại trace đã ghi thay cho I²C/GPIO thật
+============================================================
+
+Cho phép chạy toàn bộ pipeline BaseSensor._reading_loop → process_data →
+callback của MAX30102Sensor, HX710BSensor và BloodPressureSensor trên máy
+Linux bất kỳ (không cần Raspberry Pi), ở tốc độ thực hoặc tăng tốc.
+
+Trace formats:
+-------------
+- NPZ (np.savez): mỗi kênh một array
+- NPY structured array: load bằng memory map (mmap_mode='r'), không copy
+
+Trace keys:
+    MAX30102: red, ir (+ sample_rate hoặc timestamps)
+    HX710B:   counts hoặc pressures (mmHg), + timestamps (hoặc sample_rate)
+
+Backends:
+--------
+- ReplaySMBus: giả lập thanh ghi FIFO MAX30102 → MAX30102Hardware chạy
+  nguyên đường đọc FIFO + decode vectorized như phần cứng thật
+- ReplayInterruptLine: INT pin giả lập (A_FULL) cho interrupt acquisition
+- ReplayHX710BDriver: HX710BDriver phát lại conversions theo timestamp
+  (continuous stream, ring buffer, stats giữ nguyên)
+
+Config (app_config.yaml):
+------------------------
+    sensors:
+      max30102:
+        replay: {path: traces/ppg.npz, speed: 10.0, loop: false}
+      blood_pressure:
+        hx710b:
+          replay: {path: traces/bp_cuff.npz, speed: 1.0}
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+import logging
+import threading
+import time
+
+import numpy as np
+
+from .hx710b_driver import HX710BDriver, HX710Mode
+
+
+# ==================== TRACE I/O ====================
+
+def load_trace(path: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """
+    Load trace từ NPZ hoặc NPY structured (memory-mapped)
+
+    Args:
+        path: Đường dẫn .npz hoặc .npy
+
+    Returns:
+        dict: Tên kênh → array (NPY: memmap views, không copy)
+
+    Raises:
+        ValueError: Định dạng không hỗ trợ
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix == '.npz':
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+
+    if suffix == '.npy':
+        data = np.load(path, mmap_mode='r')
+        if data.dtype.names is None:
+            raise ValueError(f"NPY trace must be a structured array with named fields: {path}")
+        return {name: data[name] for name in data.dtype.names}
+
+    raise ValueError(f"Unsupported trace format '{suffix}' (expected .npz or .npy)")
+
+
+def save_trace(path: Union[str, Path], **channels: Any) -> Path:
+    """
+    Lưu trace (NPZ hoặc NPY structured để memory-map khi replay)
+
+    Args:
+        path: Đường dẫn .npz hoặc .npy
+        **channels: Tên kênh → array (NPY: các kênh cùng độ dài;
+                    scalar như sample_rate chỉ hỗ trợ với NPZ)
+
+    Returns:
+        Path: Đường dẫn đã ghi
+    """
+    path = Path(path)
+    arrays = {key: np.asarray(value) for key, value in channels.items()}
+
+    if path.suffix.lower() == '.npy':
+        length = min(arr.size for arr in arrays.values())
+        record = np.empty(length, dtype=[(key, arr.dtype) for key, arr in arrays.items()])
+        for key, arr in arrays.items():
+            record[key] = arr.ravel()[:length]
+        np.save(path, record)
+    else:
+        np.savez(path, **arrays)
+
+    return path
+
+
+def trace_times(trace: Dict[str, np.ndarray], length: int, default_rate: float) -> np.ndarray:
+    """
+    Thời điểm tương đối (giây, bắt đầu từ 0) của từng mẫu trong trace
+
+    Args:
+        trace: Trace dict
+        length: Số mẫu
+        default_rate: Sample rate dùng khi trace không có timestamps/sample_rate
+
+    Returns:
+        np.ndarray: float64, đơn điệu tăng
+    """
+    if 'timestamps' in trace:
+        ts = np.asarray(trace['timestamps'][:length], dtype=np.float64)
+        return ts - ts[0] if ts.size else ts
+
+    rate = float(trace['sample_rate']) if 'sample_rate' in trace else float(default_rate)
+    return np.arange(length, dtype=np.float64) / max(rate, 1e-6)
+
+
+# ==================== CLOCK ====================
+
+class ReplayClock:
+    """
+    Ánh xạ wall time → trace time với hệ số tốc độ
+
+    speed = 1.0: thời gian thực, speed = 10.0: nhanh gấp 10,
+    speed <= 0: không giới hạn (mọi mẫu sẵn sàng ngay)
+    """
+
+    def __init__(self, speed: float = 1.0):
+        self.speed = float(speed)
+        self._start_wall: Optional[float] = None
+
+    @property
+    def unthrottled(self) -> bool:
+        return self.speed <= 0
+
+    def start(self):
+        """Bắt đầu (hoặc bắt đầu lại) replay từ trace time 0"""
+        self._start_wall = time.time()
+
+    def elapsed(self) -> float:
+        """Trace time đã trôi qua (giây)"""
+        if self._start_wall is None:
+            return 0.0
+        if self.unthrottled:
+            return float('inf')
+        return (time.time() - self._start_wall) * self.speed
+
+    def wall_delay(self, trace_time: float) -> float:
+        """Số giây wall-clock còn phải chờ tới trace_time"""
+        if self.unthrottled or self._start_wall is None:
+            return 0.0
+        return max(0.0, (trace_time - self.elapsed()) / self.speed)
+
+
+# ==================== MAX30102 (I²C REGISTER EMULATION) ====================
+
+class ReplaySMBus:
+    """
+    SMBus giả lập MAX30102: FIFO được "ghi" theo thời gian replay
+
+    Chỉ giả lập các thanh ghi MAX30102Hardware dùng: FIFO_WR_PTR/RD_PTR,
+    FIFO_DATA (6 bytes/mẫu, RED rồi IR, 18-bit big-endian), interrupt status.
+    Ghi thanh ghi được chấp nhận và bỏ qua.
+
+    Giống chip thật, FIFO chỉ giữ FIFO_DEPTH - 1 mẫu chờ đọc; mẫu cũ hơn bị
+    ghi đè (đếm trong overflow_count) nếu consumer đọc không kịp.
+    """
+
+    REG_FIFO_WR_PTR = 0x04
+    REG_FIFO_RD_PTR = 0x06
+    REG_FIFO_DATA = 0x07
+    FIFO_DEPTH = 32
+
+    def __init__(
+        self,
+        red: np.ndarray,
+        ir: np.ndarray,
+        sample_rate: float,
+        speed: float = 1.0,
+        loop: bool = False,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            red: RED samples (18-bit counts)
+            ir: IR samples (18-bit counts)
+            sample_rate: Sample rate của trace (Hz)
+            speed: Hệ số tốc độ replay (<= 0: không giới hạn)
+            loop: Phát lại từ đầu khi hết trace
+            logger: Logger instance
+        """
+        self.logger = logger or logging.getLogger(__name__)
+
+        length = min(len(red), len(ir))
+        self._red = red[:length]
+        self._ir = ir[:length]
+        self.length = length
+        self.sample_rate = float(sample_rate)
+        self.loop = loop
+        self.clock = ReplayClock(speed)
+
+        self._consumed = 0        # Tổng số mẫu đã đọc (kể cả qua các vòng loop)
+        self.overflow_count = 0
+        self._ovf_register = 0    # OVF_COUNTER: mẫu mất từ lần đọc FIFO_DATA trước (max 31)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], logger: Optional[logging.Logger] = None) -> "ReplaySMBus":
+        """
+        Tạo từ replay config: {path, speed, loop, sample_rate}
+
+        Args:
+            config: Replay config dict
+            logger: Logger instance
+
+        Returns:
+            ReplaySMBus
+        """
+        trace = load_trace(config['path'])
+        length = min(len(trace['red']), len(trace['ir']))
+        times = trace_times(trace, length, config.get('sample_rate', 100.0))
+        rate = (length - 1) / times[-1] if length > 1 and times[-1] > 0 else float(config.get('sample_rate', 100.0))
+
+        return cls(
+            red=trace['red'],
+            ir=trace['ir'],
+            sample_rate=rate,
+            speed=config.get('speed', 1.0),
+            loop=config.get('loop', False),
+            logger=logger,
+        )
+
+    # ---------- replay state ----------
+
+    def _due(self) -> int:
+        """Tổng số mẫu đã 'được chip ghi' tới thời điểm hiện tại"""
+        if self.clock.unthrottled:
+            due = self._consumed + self.FIFO_DEPTH - 1
+        else:
+            due = int(self.clock.elapsed() * self.sample_rate)
+        if not self.loop:
+            due = min(due, self.length)
+        return due
+
+    def _pending(self) -> int:
+        """Số mẫu chờ đọc (áp dụng overflow như FIFO thật)"""
+        due = self._due()
+        pending = due - self._consumed
+        if pending > self.FIFO_DEPTH - 1:
+            dropped = pending - (self.FIFO_DEPTH - 1)
+            self._consumed += dropped
+            self.overflow_count += dropped
+            self._ovf_register = min(0x1F, self._ovf_register + dropped)
+            pending = self.FIFO_DEPTH - 1
+        return max(0, pending)
+
+    def _ensure_started(self):
+        """Clock bắt đầu ở lần truy cập bus đầu tiên"""
+        if self.clock._start_wall is None:
+            self.clock.start()
+
+    def is_finished(self) -> bool:
+        """True khi đã đọc hết trace (không loop)"""
+        return not self.loop and self._consumed >= self.length
+
+    def pending_samples(self) -> int:
+        """Số mẫu đang chờ trong FIFO giả lập"""
+        with self._lock:
+            self._ensure_started()
+            return self._pending()
+
+    def seconds_until_pending(self, count: int) -> Optional[float]:
+        """
+        Wall time (giây) tới khi FIFO có ít nhất count mẫu chờ đọc
+
+        Cuối trace (không loop): ngưỡng giảm còn số mẫu còn lại.
+
+        Returns:
+            float, hoặc None nếu đã hết trace
+        """
+        with self._lock:
+            self._ensure_started()
+            target = self._consumed + max(1, count)
+            if not self.loop:
+                if self._consumed >= self.length:
+                    return None
+                target = min(target, self.length)
+            return self.clock.wall_delay(target / self.sample_rate)
+
+    # ---------- SMBus API ----------
+
+    def read_byte_data(self, address: int, register: int) -> int:
+        with self._lock:
+            self._ensure_started()
+            if register == self.REG_FIFO_RD_PTR:
+                return self._consumed % self.FIFO_DEPTH
+            if register == self.REG_FIFO_WR_PTR:
+                return (self._consumed + self._pending()) % self.FIFO_DEPTH
+            return 0
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> list:
+        with self._lock:
+            self._ensure_started()
+            if register == self.REG_FIFO_WR_PTR and length >= 3:
+                # FIFO_WR_PTR, OVF_COUNTER, FIFO_RD_PTR liên tiếp
+                pending = self._pending()
+                return [
+                    (self._consumed + pending) % self.FIFO_DEPTH,
+                    self._ovf_register,
+                    self._consumed % self.FIFO_DEPTH,
+                ] + [0] * (length - 3)
+
+            if register != self.REG_FIFO_DATA:
+                return [0] * length
+
+            self._ovf_register = 0
+            n = min(length // 6, self._pending())
+            if n <= 0:
+                return []
+
+            idx = (np.arange(self._consumed, self._consumed + n) % self.length) if self.length else np.empty(0, int)
+            self._consumed += n
+
+            values = np.empty((n, 2), dtype=np.uint32)
+            values[:, 0] = np.asarray(self._red[idx], dtype=np.uint32) & 0x3FFFF
+            values[:, 1] = np.asarray(self._ir[idx], dtype=np.uint32) & 0x3FFFF
+
+            raw = np.empty((n, 2, 3), dtype=np.uint8)
+            raw[:, :, 0] = values >> 16
+            raw[:, :, 1] = (values >> 8) & 0xFF
+            raw[:, :, 2] = values & 0xFF
+            return raw.ravel().tolist()
+
+    def write_i2c_block_data(self, address: int, register: int, data: list):
+        """Ghi cấu hình: bỏ qua (replay không phụ thuộc LED/ADC config)"""
+        return None
+
+    def close(self):
+        return None
+
+
+class ReplayInterruptLine:
+    """
+    INT pin giả lập cho ReplaySMBus: assert khi FIFO đạt ngưỡng A_FULL
+
+    Cùng interface với GPIOInterruptLine (open/wait/is_asserted/close),
+    wait() ngủ đúng tới thời điểm replay mà chip thật sẽ kéo INT xuống.
+    """
+
+    def __init__(self, bus: ReplaySMBus, threshold: int):
+        """
+        Args:
+            bus: ReplaySMBus đang phát trace
+            threshold: Số mẫu chờ đọc khi interrupt kích hoạt
+        """
+        self.bus = bus
+        self.threshold = max(1, int(threshold))
+        self.wakeups = 0
+        self._closed = threading.Event()
+
+    def open(self) -> bool:
+        self._closed.clear()
+        return True
+
+    def is_asserted(self) -> bool:
+        pending = self.bus.pending_samples()
+        remaining = self.bus.length - self.bus._consumed
+        return pending >= self.threshold or (not self.bus.loop and 0 < remaining <= pending)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Chờ tới khi FIFO giả lập đạt ngưỡng
+
+        Args:
+            timeout: Timeout (giây, wall time)
+
+        Returns:
+            bool: True nếu INT assert, False nếu timeout / hết trace
+        """
+        delay = self.bus.seconds_until_pending(self.threshold)
+        if delay is None or delay > timeout:
+            self._closed.wait(timeout)
+            return False
+        if delay > 0 and self._closed.wait(delay):
+            return False
+        self.wakeups += 1
+        return True
+
+    def close(self):
+        self._closed.set()
+
+
+# ==================== HX710B ====================
+
+class ReplayHX710BDriver(HX710BDriver):
+    """
+    HX710BDriver phát lại conversions đã ghi
+
+    read_with_timestamp() chờ tới thời điểm conversion tiếp theo (theo
+    ReplayClock) rồi trả về (counts, timestamp). Timestamp là "virtual time":
+    wall time lúc bắt đầu + trace time, nên tốc độ xả (mmHg/s), HR... tính
+    từ timestamps vẫn đúng khi replay tăng tốc.
+    """
+
+    def __init__(
+        self,
+        counts: np.ndarray,
+        times: np.ndarray,
+        mode: HX710Mode = HX710Mode.DIFFERENTIAL_10SPS,
+        speed: float = 1.0,
+        loop: bool = False,
+        timeout_ms: int = 500,
+    ):
+        """
+        Args:
+            counts: ADC counts (signed 24-bit)
+            times: Trace time của từng conversion (giây, từ 0)
+            mode: HX710B mode (chỉ ảnh hưởng conversion period/stats)
+            speed: Hệ số tốc độ replay (<= 0: không giới hạn)
+            loop: Phát lại từ đầu khi hết trace
+            timeout_ms: Default read timeout (ms, wall time)
+        """
+        super().__init__(gpio_dout=-1, gpio_sck=-1, mode=mode, timeout_ms=timeout_ms)
+        self.logger = logging.getLogger("HX710BReplay")
+
+        length = min(len(counts), len(times))
+        self._counts = counts[:length]
+        self._times = np.asarray(times[:length], dtype=np.float64)
+        self._duration = float(self._times[-1]) + self.get_conversion_period() if length else 0.0
+        self.loop = loop
+        self.clock = ReplayClock(speed)
+
+        self._index = 0
+        self._virtual_start = 0.0
+        self._virtual_slept = 0.0  # speed <= 0: sleep() chỉ tăng virtual time
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Dict[str, Any],
+        mode: HX710Mode,
+        calibration: Optional[Dict[str, Any]] = None,
+        timeout_ms: int = 500,
+    ) -> "ReplayHX710BDriver":
+        """
+        Tạo từ replay config: {path, speed, loop}
+
+        Trace có 'pressures' (mmHg, ví dụ từ tests/capture_bp_data.py) được
+        đổi ngược sang counts bằng calibration của sensor.
+
+        Args:
+            config: Replay config dict
+            mode: HX710B mode
+            calibration: Calibration dict của HX710BSensor
+            timeout_ms: Default read timeout (ms)
+
+        Returns:
+            ReplayHX710BDriver
+        """
+        trace = load_trace(config['path'])
+        default_rate = 10.0 if mode == HX710Mode.DIFFERENTIAL_10SPS else 40.0
+
+        if 'counts' in trace:
+            counts = trace['counts']
+        else:
+            counts = pressures_to_counts(trace['pressures'], calibration or {})
+
+        times = trace_times(trace, len(counts), config.get('sample_rate', default_rate))
+
+        return cls(
+            counts=counts,
+            times=times,
+            mode=mode,
+            speed=config.get('speed', 1.0),
+            loop=config.get('loop', False),
+            timeout_ms=timeout_ms,
+        )
+
+    # ---------- lifecycle ----------
+
+    def initialize(self) -> bool:
+        """Không có GPIO: chỉ bắt đầu clock"""
+        self._index = 0
+        self._virtual_start = time.time()
+        self._virtual_slept = 0.0
+        self.clock.start()
+        self._is_initialized = True
+        self.logger.info(
+            f"HX710B replay started ({len(self._counts)} conversions, "
+            f"{self._duration:.1f}s, speed={self.clock.speed})"
+        )
+        return True
+
+    def power_down(self):
+        return None
+
+    def power_up(self):
+        return None
+
+    def cleanup(self):
+        self.stop_continuous()
+        self._is_initialized = False
+
+    def is_finished(self) -> bool:
+        """True khi đã phát hết trace (không loop)"""
+        return not self.loop and self._index >= len(self._counts)
+
+    # ---------- clock ----------
+
+    def now(self) -> float:
+        """
+        Virtual time, cùng gốc với timestamps của read_with_timestamp()
+
+        speed <= 0: trace time của conversion vừa trả + tổng sleep() đã gọi
+        """
+        if not self._is_initialized:
+            return time.time()
+        if self.clock.unthrottled:
+            last = float(self._times[self._index - 1]) if self._index else 0.0
+            return self._virtual_start + last + self._virtual_slept
+        return self._virtual_start + self.clock.elapsed()
+
+    def sleep(self, seconds: float):
+        """Ngủ theo virtual time (wall time = seconds / speed)"""
+        if self.clock.unthrottled:
+            self._virtual_slept += seconds
+            time.sleep(0)
+        else:
+            time.sleep(seconds / self.clock.speed)
+
+    # ---------- data ----------
+
+    def read_with_timestamp(self, timeout_ms: Optional[int] = None) -> Optional[Tuple[int, float]]:
+        """
+        Conversion tiếp theo của trace (chờ theo ReplayClock)
+
+        Args:
+            timeout_ms: Timeout (ms, wall time)
+
+        Returns:
+            (counts, virtual_timestamp) hoặc None (timeout / hết trace)
+        """
+        if not self._is_initialized:
+            self.logger.error("Driver not initialized")
+            return None
+
+        timeout = (timeout_ms if timeout_ms is not None else self.timeout_ms) / 1000.0
+
+        with self._lock:
+            if self._index >= len(self._counts) and self.loop and len(self._counts):
+                # Vòng mới: dịch trace time thêm một độ dài trace
+                self._index = 0
+                self._times = self._times + self._duration
+
+            if self._index >= len(self._counts):
+                time.sleep(min(timeout, 0.01))
+                return None
+
+            trace_time = float(self._times[self._index])
+            delay = self.clock.wall_delay(trace_time)
+            if delay > timeout:
+                if timeout > 0:
+                    time.sleep(timeout)
+                    self._error_count += 1
+                return None
+            if delay > 0:
+                time.sleep(delay)
+
+            value = int(self._counts[self._index])
+            self._index += 1
+            self._read_count += 1
+            self._last_value = value
+
+            return value, self._virtual_start + trace_time
+
+
+def pressures_to_counts(pressures: np.ndarray, calibration: Dict[str, Any]) -> np.ndarray:
+    """
+    Đổi áp suất (mmHg) về ADC counts - nghịch đảo của HX710BSensor.drain_pressures
+
+    Args:
+        pressures: Áp suất (mmHg)
+        calibration: offset_counts, slope_mmhg_per_count, adc_inverted
+
+    Returns:
+        np.ndarray: int32 counts
+    """
+    offset_counts = calibration.get('offset_counts', 0)
+    slope_mmhg_per_count = calibration.get('slope_mmhg_per_count', 9.536743e-06)
+
+    counts = np.asarray(pressures, dtype=np.float64) / slope_mmhg_per_count + offset_counts
+    if calibration.get('adc_inverted', False):
+        counts = -counts
+
+    return np.round(counts).astype(np.int32)
@@ -0,0 +1,177 @@
+"""
+Running Statistics - Thống kê cửa sổ trượt cập nhật theo mẫu mới
+=================================================================
+
+MAX30102Sensor._detect_finger mỗi tick lấy 1.2 s IR/RED gần nhất rồi tính
+lại mean (2 kênh), median và percentile 5/10/95 (np.percentile sort/copy
+toàn cửa sổ). SlidingWindowStats duy trì các giá trị này khi mẫu đi vào:
+
+- sum / sum of squares: cộng chunk mới, trừ chunk bị đẩy ra (vectorized,
+  O(mẫu mới)); đồng bộ lại chính xác mỗi vòng ring để không trôi số
+- Order statistics chính xác: list đã sort, mỗi mẫu một lần bisect insert
+  + một lần bisect remove → quantile là tra index O(1), cùng kết quả với
+  np.percentile (linear interpolation) / np.median
+- Ring float64 preallocated giữ N mẫu cuối để biết giá trị bị đẩy ra
+
+P² (Jain & Chlamtac) không dùng được ở đây vì không hỗ trợ xóa mẫu cũ khỏi
+cửa sổ trượt; với N ~ 100-500 mẫu, list sort chính xác rẻ hơn.
+
+Usage Example:
+-------------
+>>> stats = SlidingWindowStats(120, order_stats=True)
+>>> stats.push(ir_chunk)                 # Mỗi tick, O(len(ir_chunk))
+>>> stats.mean, stats.quantile(0.95), stats.median()
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from bisect import bisect_left, insort
+from typing import List
+import math
+
+import numpy as np
+
+
+class SlidingWindowStats:
+    """
+    Mean/variance và quantile của N mẫu gần nhất
+
+    Attributes:
+        size (int): Kích thước cửa sổ (mẫu)
+        count (int): Số mẫu hiện có trong cửa sổ (≤ size)
+        order_stats (bool): Duy trì list sort (quantile/median)
+    """
+
+    def __init__(self, size: int, order_stats: bool = False):
+        """
+        Args:
+            size: Số mẫu của cửa sổ trượt (>= 1)
+            order_stats: True → hỗ trợ quantile()/median()
+        """
+        self.size = max(1, int(size))
+        self.order_stats = bool(order_stats)
+
+        self._ring = np.zeros(self.size, dtype=np.float64)
+        self._sorted: List[float] = []
+        self.reset()
+
+    def reset(self) -> None:
+        self._head = 0          # Vị trí ghi kế tiếp (= mẫu cũ nhất khi đầy)
+        self.count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._sorted.clear()
+
+    def __len__(self) -> int:
+        return self.count
+
+    # ---------- update ----------
+
+    def push(self, samples: np.ndarray) -> None:
+        """
+        Thêm mẫu mới (cũ nhất trước); mẫu vượt quá size bị đẩy ra
+
+        Args:
+            samples: Mảng 1-D (mọi dtype số)
+        """
+        m = len(samples)
+        if m == 0:
+            return
+        if m >= self.size:
+            # Chunk phủ toàn cửa sổ: dựng lại từ size mẫu cuối
+            self.reset()
+            samples = samples[m - self.size:]
+            m = self.size
+
+        offset = 0
+        while offset < m:
+            n = min(m - offset, self.size - self._head)
+            self._push_segment(samples[offset:offset + n])
+            offset += n
+
+    def _push_segment(self, values: np.ndarray) -> None:
+        """Ghi một đoạn không vòng qua cuối ring"""
+        start = self._head
+        stop = start + len(values)
+        slot = self._ring[start:stop]
+
+        # Các vị trí đã có mẫu (cửa sổ đầy) → mẫu bị đẩy ra
+        evict = max(0, min(len(values), self.count + len(values) - self.size))
+        if evict:
+            old = slot[:evict]
+            self._sum -= float(old.sum())
+            self._sumsq -= float(np.dot(old, old))
+            if self.order_stats:
+                ordered = self._sorted
+                for value in old.tolist():
+                    del ordered[bisect_left(ordered, value)]
+
+        slot[:] = values                 # Cast sang float64 (uint32 không tràn khi bình phương)
+        self._sum += float(slot.sum())
+        self._sumsq += float(np.dot(slot, slot))
+        if self.order_stats:
+            ordered = self._sorted
+            for value in slot.tolist():
+                insort(ordered, value)
+
+        self.count = min(self.size, self.count + len(values))
+        self._head = stop % self.size
+        if self._head == 0 and self.count == self.size:
+            # Hết một vòng: tính lại chính xác (tránh trôi số do cộng/trừ float)
+            self._sum = float(self._ring.sum())
+            self._sumsq = float(np.dot(self._ring, self._ring))
+
+    # ---------- statistics ----------
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.count if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        """Population variance (như np.var)"""
+        if not self.count:
+            return 0.0
+        mean = self._sum / self.count
+        return max(0.0, self._sumsq / self.count - mean * mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def quantile(self, q: float) -> float:
+        """
+        Quantile q (0-1), linear interpolation như np.percentile(data, 100*q)
+
+        Raises:
+            RuntimeError: Khi order_stats=False
+        """
+        if not self.order_stats:
+            raise RuntimeError("SlidingWindowStats created without order_stats")
+        ordered = self._sorted
+        n = len(ordered)
+        if n == 0:
+            return 0.0
+        position = min(max(q, 0.0), 1.0) * (n - 1)
+        lower = int(position)
+        upper = min(lower + 1, n - 1)
+        fraction = position - lower
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def order_statistic(self, k: int) -> float:
+        """
+        Giá trị nhỏ thứ k (0-based, kẹp vào [0, count-1]) - như sorted(window)[k]
+
+        Raises:
+            RuntimeError: Khi order_stats=False
+        """
+        if not self.order_stats:
+            raise RuntimeError("SlidingWindowStats created without order_stats")
+        ordered = self._sorted
+        if not ordered:
+            return 0.0
+        return ordered[min(max(int(k), 0), len(ordered) - 1)]
@@ -0,0 +1,268 @@
+"""
+Sample Buffers - Preallocated NumPy ring buffers cho sensor streams
+===================================================================
+
+Buffer dùng chung cho các sensor đọc liên tục (HX710B, MAX30102).
+
+Design:
+-------
+- Preallocated: Không cấp phát bộ nhớ trong hot path (push/drain)
+- TimestampedRingBuffer: Single producer / single consumer (thread ADC push,
+  thread đo drain), lossless tới capacity, bulk drain theo thứ tự thời gian
+- ContiguousRingBuffer: Rolling window nhiều kênh, luôn trả về view liên tục
+  (mirrored storage) - không copy khi đọc N mẫu gần nhất
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import threading
+
+import numpy as np
+
+
+class TimestampedRingBuffer:
+    """
+    Ring buffer cố định dung lượng lưu cặp (value, timestamp)
+
+    Usage Example:
+    -------------
+    >>> ring = TimestampedRingBuffer(capacity=1024, dtype=np.int32)
+    >>> ring.push(123456, 1700000000.025)
+    >>> values, timestamps = ring.drain()
+
+    Attributes:
+        capacity (int): Số mẫu tối đa giữ trong buffer
+        pushed (int): Tổng số mẫu đã push
+        drained (int): Tổng số mẫu đã drain
+        dropped (int): Số mẫu bị ghi đè trước khi được drain (overflow)
+    """
+
+    def __init__(self, capacity: int, dtype: Any = np.int32):
+        """
+        Initialize ring buffer
+
+        Args:
+            capacity: Số mẫu tối đa (>= 1)
+            dtype: NumPy dtype cho values (timestamps luôn float64)
+        """
+        self.capacity = max(1, int(capacity))
+
+        self._values = np.zeros(self.capacity, dtype=dtype)
+        self._timestamps = np.zeros(self.capacity, dtype=np.float64)
+
+        # Monotonic counters: vị trí thực = counter % capacity
+        self._write_index = 0
+        self._read_index = 0
+
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.pushed = 0
+        self.drained = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        """Số mẫu đang chờ drain"""
+        with self._lock:
+            return self._write_index - self._read_index
+
+    def push(self, value: Any, timestamp: float) -> bool:
+        """
+        Thêm một mẫu vào buffer (producer side)
+
+        Args:
+            value: Giá trị mẫu
+            timestamp: Thời điểm chuyển đổi (seconds)
+
+        Returns:
+            bool: False nếu buffer đầy và mẫu cũ nhất bị ghi đè
+        """
+        with self._lock:
+            pos = self._write_index % self.capacity
+            self._values[pos] = value
+            self._timestamps[pos] = timestamp
+            self._write_index += 1
+            self.pushed += 1
+
+            if self._write_index - self._read_index > self.capacity:
+                # Consumer không drain kịp → bỏ mẫu cũ nhất
+                self._read_index = self._write_index - self.capacity
+                self.dropped += 1
+                return False
+
+            return True
+
+    def drain(self, max_items: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Lấy toàn bộ mẫu đang chờ (consumer side)
+
+        Args:
+            max_items: Giới hạn số mẫu lấy ra (None = tất cả)
+
+        Returns:
+            (values, timestamps): Arrays mới theo thứ tự thời gian (oldest first)
+        """
+        with self._lock:
+            count = self._write_index - self._read_index
+            if max_items is not None:
+                count = min(count, max(0, int(max_items)))
+
+            if count <= 0:
+                return (
+                    np.empty(0, dtype=self._values.dtype),
+                    np.empty(0, dtype=np.float64),
+                )
+
+            start = self._read_index % self.capacity
+            end = start + count
+
+            if end <= self.capacity:
+                values = self._values[start:end].copy()
+                timestamps = self._timestamps[start:end].copy()
+            else:
+                # Wrap-around: ghép 2 đoạn
+                tail = end - self.capacity
+                values = np.concatenate((self._values[start:], self._values[:tail]))
+                timestamps = np.concatenate((self._timestamps[start:], self._timestamps[:tail]))
+
+            self._read_index += count
+            self.drained += count
+
+            return values, timestamps
+
+    def clear(self):
+        """Bỏ toàn bộ mẫu đang chờ (giữ nguyên statistics)"""
+        with self._lock:
+            self._read_index = self._write_index
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get buffer statistics
+
+        Returns:
+            dict: capacity, buffered, pushed, drained, dropped
+        """
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'buffered': self._write_index - self._read_index,
+                'pushed': self.pushed,
+                'drained': self.drained,
+                'dropped': self.dropped
+            }
+
+
+class ContiguousRingBuffer:
+    """
+    Rolling window cố định dung lượng, đọc bằng view liên tục (zero-copy)
+
+    Mỗi mẫu được ghi 2 lần (slot i và i + capacity) nên `capacity` mẫu gần nhất
+    luôn nằm liên tục trong storage → view(n) là slice O(1), không cần concatenate.
+
+    Không có lock: dùng trong một thread (ví dụ MAX30102 reading loop).
+    Views trả về là read-only và bị ghi đè bởi extend() tiếp theo - copy nếu cần giữ.
+
+    Usage Example:
+    -------------
+    >>> ring = ContiguousRingBuffer(capacity=800, channels=2)
+    >>> ring.extend(ir_array, red_array)
+    >>> ir_last_second = ring.view(100, channel=0)
+
+    Attributes:
+        capacity (int): Số mẫu tối đa mỗi kênh
+        channels (int): Số kênh
+        version (int): Tổng số mẫu đã ghi (dùng làm cache key)
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype: Any = np.float64):
+        """
+        Initialize ring buffer
+
+        Args:
+            capacity: Số mẫu tối đa mỗi kênh (>= 1)
+            channels: Số kênh ghi đồng thời
+            dtype: NumPy dtype cho storage
+        """
+        self.capacity = max(1, int(capacity))
+        self.channels = max(1, int(channels))
+
+        self._data = np.zeros((self.channels, 2 * self.capacity), dtype=dtype)
+        self._head = 0      # Slot ghi tiếp theo (0..capacity-1)
+        self._count = 0     # Số mẫu hợp lệ (<= capacity)
+        self.version = 0
+
+    def __len__(self) -> int:
+        """Số mẫu hiện có"""
+        return self._count
+
+    def clear(self):
+        """Xóa toàn bộ mẫu (không cấp phát lại storage)"""
+        self._head = 0
+        self._count = 0
+        self.version += 1
+
+    def extend(self, *channel_values: Any) -> None:
+        """
+        Thêm một batch mẫu cho tất cả kênh
+
+        Args:
+            *channel_values: Mỗi kênh một array/sequence cùng độ dài
+        """
+        if len(channel_values) != self.channels:
+            raise ValueError(f"Expected {self.channels} channels, got {len(channel_values)}")
+
+        n = min(len(values) for values in channel_values)
+        if n <= 0:
+            return
+
+        cap = self.capacity
+        skip = max(0, n - cap)   # Batch lớn hơn capacity: chỉ giữ phần cuối
+        count = n - skip
+        start = (self._head + skip) % cap
+        first = min(count, cap - start)
+
+        for ch, values in enumerate(channel_values):
+            src = np.asarray(values)[skip:n]
+            row = self._data[ch]
+            row[start:start + first] = src[:first]
+            row[start + cap:start + cap + first] = src[:first]
+            if first < count:
+                rest = count - first
+                row[:rest] = src[first:]
+                row[cap:cap + rest] = src[first:]
+
+        self._head = (start + count) % cap
+        self._count = min(cap, self._count + n)
+        self.version += n
+
+    def view(self, count: Optional[int] = None, channel: int = 0) -> np.ndarray:
+        """
+        View liên tục của `count` mẫu gần nhất (oldest first)
+
+        Args:
+            count: Số mẫu (None = toàn bộ)
+            channel: Chỉ số kênh
+
+        Returns:
+            np.ndarray: Read-only view (không copy)
+        """
+        n = self._count if count is None else max(0, min(int(count), self._count))
+        end = self._head + self.capacity
+        out = self._data[channel, end - n:end]
+        out.flags.writeable = False
+        return out
+
+    def strided_view(self, stride: int, channel: int = 0) -> np.ndarray:
+        """
+        Downsample view: mỗi `stride` mẫu lấy một, bắt đầu từ mẫu cũ nhất (không copy)
+
+        Args:
+            stride: Bước nhảy (>= 1)
+            channel: Chỉ số kênh
+
+        Returns:
+            np.ndarray: Read-only strided view
+        """
+        return self.view(channel=channel)[::max(1, int(stride))]
@@ -0,0 +1,243 @@
+"""
+Sensor Channel - Publish/subscribe dữ liệu đã xử lý của sensor
+===============================================================
+
+BaseSensor trước đây publish bằng cách lấy data_lock, thay latest_data và
+gọi một data_callback duy nhất; GUI poll get_latest_data() (copy dict mỗi
+lần) ở 20 Hz. SensorChannel tách publish khỏi consumer:
+
+- Snapshot có version: publish() gán một tuple bất biến (version, ts, data)
+  vào một attribute - gán reference là atomic nên reader không cần lock.
+  read_if_newer(version) trả None khi không có gì mới (GUI bỏ qua frame)
+- data là MappingProxyType (dict) hoặc SensorReading (record __slots__,
+  vốn read-only) - mọi consumer dùng chung một object, không copy
+- Nhiều subscriber, mỗi subscriber một queue giới hạn (deque maxlen):
+  consumer chậm chỉ mất mẫu cũ nhất của chính nó (drop-oldest), không chặn
+  thread đọc sensor và không ảnh hưởng subscriber khác
+- Back-pressure stats: delivered/consumed/dropped/depth/max_depth
+
+Single writer (thread đọc sensor / scheduler); nhiều reader.
+
+Usage Example:
+-------------
+>>> sub = sensor.subscribe("mqtt", maxsize=32)
+>>> snapshot = sub.get(timeout=1.0)        # Snapshot(version, timestamp, data)
+>>> last = 0
+>>> snapshot = sensor.get_snapshot(last)   # None nếu chưa có data mới
+>>> sub.close()
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from collections import deque
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+import threading
+import time
+
+
+# ==================== CONSTANTS ====================
+
+DEFAULT_QUEUE_SIZE = 64
+
+
+# ==================== SNAPSHOT ====================
+
+class Snapshot(NamedTuple):
+    """Một lần publish (bất biến)"""
+    version: int
+    timestamp: float           # time.monotonic() lúc publish
+    data: Mapping[str, Any]    # Read-only view (không copy)
+
+
+# ==================== SUBSCRIPTION ====================
+
+class Subscription:
+    """
+    Queue giới hạn của một consumer (drop-oldest khi đầy)
+
+    Attributes:
+        name (str): Tên consumer (stats)
+        maxsize (int): Số snapshot tối đa trong queue
+    """
+
+    def __init__(self, channel: "SensorChannel", name: str, maxsize: int):
+        self.channel = channel
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self._queue: deque = deque(maxlen=self.maxsize)
+        self._ready = threading.Event()
+        self.delivered = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def _offer(self, snapshot: Snapshot) -> None:
+        """Gọi từ publisher: append không chặn, đầy → bỏ mẫu cũ nhất"""
+        queue = self._queue
+        if len(queue) == self.maxsize:
+            self.dropped += 1
+        queue.append(snapshot)
+        self.delivered += 1
+        depth = len(queue)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self._ready.set()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Snapshot]:
+        """
+        Lấy snapshot cũ nhất trong queue
+
+        Args:
+            timeout: Thời gian chờ (giây), None = chờ mãi, 0 = không chờ
+
+        Returns:
+            Snapshot hoặc None khi hết timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                snapshot = self._queue.popleft()
+                self.consumed += 1
+                return snapshot
+            except IndexError:
+                pass
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            if not self._ready.wait(remaining):
+                return None
+            self._ready.clear()
+
+    def drain(self) -> List[Snapshot]:
+        """Lấy toàn bộ snapshot đang chờ (không chặn), cũ nhất trước"""
+        items = []
+        queue = self._queue
+        while True:
+            try:
+                items.append(queue.popleft())
+            except IndexError:
+                break
+        self.consumed += len(items)
+        return items
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'maxsize': self.maxsize,
+            'depth': len(self._queue),
+            'max_depth': self.max_depth,
+            'delivered': self.delivered,
+            'consumed': self.consumed,
+            'dropped': self.dropped,
+        }
+
+    def close(self) -> None:
+        """Hủy đăng ký"""
+        self.channel.unsubscribe(self)
+        self._ready.set()  # Đánh thức consumer đang chờ
+
+
+# ==================== CHANNEL ====================
+
+class SensorChannel:
+    """
+    Kênh publish/subscribe của một sensor
+
+    Attributes:
+        name (str): Tên sensor
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._snapshot: Optional[Snapshot] = None
+        self._version = 0
+        self._subscribers: tuple = ()           # Copy-on-write: publisher duyệt không lock
+        self._sub_lock = threading.Lock()
+        self.published = 0
+
+    # ---------- publisher ----------
+
+    def publish(self, data: Mapping[str, Any]) -> Snapshot:
+        """
+        Publish dữ liệu mới (chỉ gọi từ một thread - thread đọc sensor)
+
+        Args:
+            data: Dict hoặc SensorReading đã xử lý; publisher không được sửa
+                sau khi publish (BaseSensor publish bản copy của dict)
+
+        Returns:
+            Snapshot vừa publish
+        """
+        if isinstance(data, dict):
+            data = MappingProxyType(data)
+        self._version += 1
+        snapshot = Snapshot(self._version, time.monotonic(), data)
+        self._snapshot = snapshot  # Gán reference: atomic với reader
+        self.published += 1
+
+        for subscription in self._subscribers:
+            subscription._offer(snapshot)
+        return snapshot
+
+    # ---------- readers ----------
+
+    @property
+    def version(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else 0
+
+    def latest(self) -> Optional[Snapshot]:
+        """Snapshot mới nhất (None nếu chưa publish) - không lock, không copy"""
+        return self._snapshot
+
+    def read_if_newer(self, version: int) -> Optional[Snapshot]:
+        """
+        Args:
+            version: Version reader đã xử lý lần trước (0 = chưa có)
+
+        Returns:
+            Snapshot mới nhất nếu version lớn hơn, ngược lại None
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version <= version:
+            return None
+        return snapshot
+
+    # ---------- subscribers ----------
+
+    def subscribe(self, name: str, maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+        """
+        Đăng ký consumer với queue riêng
+
+        Args:
+            name: Tên consumer (stats)
+            maxsize: Kích thước queue (drop-oldest khi đầy)
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(self, name, maxsize)
+        with self._sub_lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._sub_lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: version, published, subscribers {name: Subscription.get_stats()}
+        """
+        subscribers = self._subscribers
+        return {
+            'version': self.version,
+            'published': self.published,
+            'subscribers': {s.name: s.get_stats() for s in subscribers},
+        }
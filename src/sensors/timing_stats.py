@@ -0,0 +1,131 @@
+"""
+Timing Stats - Histogram latency cố định bins cho hot path của sensors
+======================================================================
+
+Ghi latency từng lần đọc (HX710B bit-bang, vòng đọc sensor, ...) vào
+histogram bins log-spaced (µs) để so sánh trước/sau tối ưu mà không giữ
+toàn bộ mẫu.
+
+Design:
+-------
+- Bins cố định, record() chỉ là bisect + tăng counter (không cấp phát)
+- Percentile ước lượng theo cận trên của bin (bảo thủ, không vượt max)
+- Single writer (thread đọc sensor); summary() đọc từ thread khác chấp nhận
+  sai lệch một mẫu
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+# ==================== CONSTANTS ====================
+
+# Cận trên các bin (µs): 1 µs → 1 s, bin cuối chứa mọi giá trị lớn hơn
+DEFAULT_EDGES_US: Tuple[float, ...] = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500,
+    1_000, 2_000, 5_000, 10_000, 20_000, 50_000,
+    100_000, 200_000, 500_000, 1_000_000,
+)
+
+
+# ==================== HISTOGRAM ====================
+
+class LatencyHistogram:
+    """
+    Histogram latency (µs) với bins cố định
+
+    Usage Example:
+    -------------
+    >>> hist = LatencyHistogram()
+    >>> hist.record(0.00042)          # giây
+    >>> hist.record(0.0031)
+    >>> hist.summary()['p50_us']      # cận trên bin 200-500 µs
+    500.0
+
+    Attributes:
+        count (int): Số mẫu đã ghi
+        total_us (float): Tổng latency (µs)
+        max_us (float): Latency lớn nhất (µs)
+    """
+
+    def __init__(self, edges_us: Sequence[float] = DEFAULT_EDGES_US):
+        """
+        Args:
+            edges_us: Cận trên các bin (µs), tăng dần
+        """
+        self._edges = tuple(float(edge) for edge in edges_us)
+        self._counts: List[int] = [0] * (len(self._edges) + 1)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Ghi một mẫu latency
+
+        Args:
+            seconds: Latency (giây)
+        """
+        value_us = seconds * 1_000_000.0
+        self._counts[bisect_left(self._edges, value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, q: float) -> float:
+        """
+        Percentile ước lượng (cận trên của bin chứa mẫu thứ q%)
+
+        Args:
+            q: Percentile (0-100)
+
+        Returns:
+            float: Latency (µs), 0.0 nếu chưa có mẫu
+        """
+        if self.count == 0:
+            return 0.0
+
+        target = max(1, int(round(self.count * q / 100.0)))
+        cumulative = 0
+        for index, bucket in enumerate(self._counts):
+            cumulative += bucket
+            if cumulative >= target:
+                if index < len(self._edges):
+                    return min(self._edges[index], self.max_us)
+                return self.max_us
+        return self.max_us
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        Các bin khác 0
+
+        Returns:
+            list: (cận trên µs, số mẫu); bin cuối có cận trên = inf
+        """
+        edges = self._edges + (float('inf'),)
+        return [(edge, count) for edge, count in zip(edges, self._counts) if count]
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: count, mean_us, p50_us, p95_us, p99_us, max_us
+        """
+        return {
+            'count': self.count,
+            'mean_us': self.total_us / self.count if self.count else 0.0,
+            'p50_us': self.percentile(50),
+            'p95_us': self.percentile(95),
+            'p99_us': self.percentile(99),
+            'max_us': self.max_us,
+        }
+
+    def reset(self) -> None:
+        """Xóa toàn bộ mẫu"""
+        self._counts = [0] * (len(self._edges) + 1)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test Acquisition Scheduler (một thread cho mọi sensor)
+=======================================================
+
+AcquisitionScheduler multiplex nhiều BaseSensor: rate/priority theo sensor,
+metrics jitter/overrun, và chạy MAX30102 (interrupt) + HX710B trên trace
+replay mà không tạo thread đọc riêng.
+
+Usage:
+    python3 tests/test_acquisition_scheduler.py
+"""
+
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.acquisition_scheduler import AcquisitionScheduler
+from src.sensors.base_sensor import BaseSensor
+from src.sensors.hx710b_sensor import HX710BSensor
+from src.sensors.max30102_sensor import MAX30102Sensor
+from src.sensors.replay import save_trace
+
+
+class FakeSensor(BaseSensor):
+    """Sensor giả: ghi lại thread + thứ tự đọc, read tốn `work_s` giây"""
+
+    def __init__(self, name, rate, priority=0, work_s=0.0, log=None):
+        super().__init__(name, {'sample_rate': rate, 'scheduler_priority': priority})
+        self.work_s = work_s
+        self.log = log if log is not None else []
+        self.threads = set()
+
+    def initialize(self):
+        return True
+
+    def cleanup(self):
+        pass
+
+    def read_raw_data(self):
+        self.threads.add(threading.current_thread().name)
+        self.log.append(self.name)
+        if self.work_s:
+            time.sleep(self.work_s)
+        return len(self.log)
+
+    def process_data(self, raw_data):
+        return {'value': raw_data}
+
+
+def test_rates_and_single_thread():
+    """Test 1: Mỗi sensor chạy đúng rate, tất cả trên thread scheduler"""
+    print("\n" + "="*60)
+    print("TEST 1: Per-sensor rates on one thread")
+    print("="*60)
+
+    scheduler = AcquisitionScheduler("test")
+    fast = FakeSensor("fast", rate=100)
+    slow = FakeSensor("slow", rate=10)
+    for sensor in (fast, slow):
+        sensor.set_scheduler(scheduler)
+        assert sensor.start()
+
+    time.sleep(1.0)
+    metrics = scheduler.get_metrics()
+    for sensor in (fast, slow):
+        sensor.stop()
+    scheduler.stop()
+
+    print(f"✓ fast: {metrics['fast']['runs']} runs, jitter p95={metrics['fast']['jitter']['p95_us']:.0f} µs")
+    print(f"✓ slow: {metrics['slow']['runs']} runs")
+
+    assert fast.reading_thread is None and slow.reading_thread is None
+    assert fast.threads == slow.threads == {"sched-test"}
+    assert 80 <= metrics['fast']['runs'] <= 105
+    assert 8 <= metrics['slow']['runs'] <= 12
+    assert metrics['fast']['jitter']['count'] == metrics['fast']['runs']
+    assert fast.get_latest_data() is not None
+    assert scheduler.get_metrics() == {}  # stop() gỡ task
+
+
+def test_priority_and_overrun():
+    """Test 2: Cùng deadline → priority cao chạy trước; task chậm → overrun"""
+    print("\n" + "="*60)
+    print("TEST 2: Priority ordering + overrun accounting")
+    print("="*60)
+
+    log = []
+    scheduler = AcquisitionScheduler("prio")
+    low = FakeSensor("low", rate=20, priority=1, log=log)
+    high = FakeSensor("high", rate=20, priority=10, log=log)
+    slow = FakeSensor("slow", rate=50, priority=0, work_s=0.045)
+
+    # Cùng rate → cùng lưới deadline, mỗi tick "high" chạy trước "low"
+    for sensor in (low, high):
+        sensor.set_scheduler(scheduler)
+        assert sensor.start()
+
+    slow.set_scheduler(scheduler)
+    assert slow.start()
+    time.sleep(0.6)
+
+    metrics = scheduler.get_metrics()
+    for sensor in (low, high, slow):
+        sensor.stop()
+    scheduler.stop()
+
+    print(f"✓ Order: {log[-6:]}")
+    print(f"✓ slow: overruns={metrics['slow']['overruns']}, skipped={metrics['slow']['skipped_ticks']}")
+
+    tail = log[log.index("high"):]  # Tick đầu có thể chỉ có "low" (đăng ký trước)
+    tail = tail[:len(tail) // 2 * 2]
+    assert tail and tail == ["high", "low"] * (len(tail) // 2)
+    assert metrics['slow']['overruns'] > 0
+    assert metrics['slow']['skipped_ticks'] >= metrics['slow']['overruns']
+    assert metrics['slow']['duration']['p50_us'] >= 40_000
+    # Task nhanh vẫn được phục vụ giữa các lần chạy của task chậm
+    assert metrics['high']['runs'] >= 6 and metrics['low']['runs'] >= 6
+
+
+def test_replay_sensors_on_scheduler():
+    """Test 3: MAX30102 (interrupt, 400 SPS) + HX710B (40 SPS) trên một scheduler"""
+    print("\n" + "="*60)
+    print("TEST 3: MAX30102 + HX710B replay on one scheduler")
+    print("="*60)
+
+    count = 600  # 1.5 s @ 400 SPS
+    ir = (100000 + np.arange(count)).astype(np.uint32)
+    red = (80000 + np.arange(count)).astype(np.uint32)
+    t = np.arange(0, 1.5, 1 / 40.0)
+    calibration = {'offset_counts': 0, 'slope_mmhg_per_count': 1e-3}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ppg_path = save_trace(Path(tmp) / "ppg.npz", red=red, ir=ir, sample_rate=400.0)
+        cuff_path = save_trace(Path(tmp) / "cuff.npz", pressures=150.0 - 3.0 * t, timestamps=t)
+
+        ppg = MAX30102Sensor({
+            'acquisition': 'interrupt',
+            'fifo_interrupt_samples': 17,
+            'replay': {'path': str(ppg_path), 'speed': 1.0},
+        })
+        adc = HX710BSensor("BP_ADC", {
+            'mode': '40sps',
+            'calibration': calibration,
+            'replay': {'path': str(cuff_path), 'speed': 1.0},
+        })
+
+        published = []
+        adc.set_data_callback(lambda name, data: published.append(data['pressure_mmhg']))
+
+        scheduler = AcquisitionScheduler("replay")
+        for sensor in (ppg, adc):
+            sensor.set_scheduler(scheduler)
+            assert sensor.start()
+
+        started = time.time()
+        while not ppg.hardware.bus.is_finished() and time.time() - started < 4.0:
+            time.sleep(0.02)
+        time.sleep(0.1)
+
+        metrics = scheduler.get_metrics()
+        for sensor in (ppg, adc):
+            sensor.stop()
+        scheduler.stop()
+
+    stats = ppg.get_acquisition_stats()
+    print(f"✓ MAX30102: {stats}")
+    print(f"✓ HX710B: {len(published)} conversions, timeouts={adc.timeout_count}")
+    print(f"✓ Rates: MAX30102 {metrics['MAX30102']['rate_hz']:.1f} Hz, BP_ADC {metrics['BP_ADC']['rate_hz']:.1f} Hz")
+
+    assert ppg.reading_thread is None and adc.reading_thread is None
+    assert stats['fifo_overflow'] == 0 and ppg.hardware.bus.overflow_count == 0
+    assert stats['samples'] == count
+    assert stats['samples_per_wakeup'] >= 15.0            # Chỉ drain khi INT assert
+    assert len(published) >= 50                           # ~60 conversions @ 40 SPS
+    assert adc.timeout_count == 0                         # "Chưa ready" không phải timeout
+    assert adc.driver.get_stats()['error_count'] == 0
+    assert abs(published[0] - 150.0) < 1.0
+
+
+if __name__ == "__main__":
+    test_rates_and_single_thread()
+    test_priority_and_overrun()
+    test_replay_sensors_on_scheduler()
+    print("\n✅ All acquisition scheduler tests passed")
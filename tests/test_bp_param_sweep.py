@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test BP Parameter Sweep (grid / random search trên capture có nhãn)
+====================================================================
+
+scripts/sweep_bp_params.py: kết quả mỗi config giống process_deflate_data,
+bandpass + envelope chỉ chạy một lần mỗi (capture, prefix), process pool
+cho cùng bảng sai số với chạy tuần tự, random search trong khoảng cho trước.
+
+Usage:
+    python3 tests/test_bp_param_sweep.py
+"""
+
+import csv
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.reanalyze_captures import discover_captures
+from scripts import sweep_bp_params as sweep
+from src.sensors.blood_pressure_sensor import OscillometricProcessor
+from src.sensors.replay import save_trace
+
+
+SETTINGS = {
+    'algorithm': {'sample_rate': 10.0, 'bandpass_low': 0.5, 'bandpass_high': 5.0,
+                  'filter_order': 4, 'sys_ratio': 0.55, 'dia_ratio': 0.8},
+    'calibration': {'offset_counts': 0, 'slope_mmhg_per_count': 1.0},
+    'ppg_sample_rate': 100.0,
+    'hr_algorithm_rate': 50,
+}
+REFERENCE = {'sys_ratio': 0.5, 'dia_ratio': 0.75, 'bandpass_low': 0.3}
+SPACE = {'sys_ratio': [0.45, 0.5, 0.55], 'dia_ratio': [0.75, 0.8], 'bandpass_low': [0.3, 0.5]}
+
+
+def cuff_signal(center: float, seed: int):
+    """Pha xả 165 → 30 mmHg @ 10 SPS, envelope đỉnh tại center mmHg"""
+    t = np.arange(0.0, 45.0, 0.1)
+    ramp = 165.0 - 3.0 * t
+    envelope = np.exp(-((ramp - center) / 22.0) ** 2)
+    noise = np.random.default_rng(seed).normal(0, 0.03, t.size)
+    return ramp + envelope * np.sin(2 * np.pi * 1.2 * t) + noise, t
+
+
+def make_labelled_set(root: Path) -> Path:
+    """4 capture + labels = kết quả process_deflate_data ở cấu hình REFERENCE"""
+    processor = OscillometricProcessor({**SETTINGS['algorithm'], **REFERENCE}, logging.getLogger("Reference"))
+    labels = root / "labels.csv"
+    with open(labels, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file', 'systolic', 'diastolic', 'map'])
+        for index, center in enumerate((88.0, 95.0, 101.0, 108.0)):
+            pressures, times = cuff_signal(center, index)
+            save_trace(root / f"bp_{index}.npz", pressures=pressures, timestamps=times)
+            result = processor.process_deflate_data(pressures, times)
+            reference = (result.systolic, result.diastolic, result.map_value)
+            writer.writerow([f"bp_{index}.npz", *(round(float(v), 1) for v in reference)])
+        writer.writerow(['missing.npz', 120, 80, ''])
+    save_trace(root / "unlabelled.npz", pressures=cuff_signal(95.0, 9)[0])
+    return labels
+
+
+def test_grid_matches_reference_with_prefix_cache():
+    """Test 1: Grid 3×2×2; config tham chiếu sai số 0; filter 1 lần/(capture, prefix)"""
+    print("\n" + "="*60)
+    print("TEST 1: Grid sweep + prefix cache")
+    print("="*60)
+
+    calls = {'prepare': 0, 'filter': 0}
+    prepare, bandpass = OscillometricProcessor.prepare_deflate, OscillometricProcessor._bandpass_filter
+
+    def counting_prepare(self, *args):
+        calls['prepare'] += 1
+        return prepare(self, *args)
+
+    def counting_bandpass(self, *args):
+        calls['filter'] += 1
+        return bandpass(self, *args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        labels = sweep.load_labels(make_labelled_set(root))
+        labelled = sweep.match_labels(discover_captures(root), labels, root)
+        configs = sweep.grid_configs(SPACE, sweep.base_config(SETTINGS))
+
+        OscillometricProcessor.prepare_deflate = counting_prepare
+        OscillometricProcessor._bandpass_filter = counting_bandpass
+        try:
+            details = sweep.run_sweep(labelled, configs, SETTINGS, workers=1)
+        finally:
+            OscillometricProcessor.prepare_deflate = prepare
+            OscillometricProcessor._bandpass_filter = bandpass
+
+    summary = sweep.summarize(details, configs)
+    best = summary[0]
+    print(f"✓ {len(configs)} configs × {len(labelled)} captures = {len(details)} rows, calls={calls}")
+    print(f"✓ best #{best['config_id']}: sys_ratio={best['sys_ratio']} dia_ratio={best['dia_ratio']} "
+          f"low={best['bandpass_low']} SYS MAE={best['sys_mae']} DIA MAE={best['dia_mae']}")
+
+    assert len(configs) == 12 and len(labelled) == 4 and len(details) == 48
+    assert calls == {'prepare': 4, 'filter': 8}       # 4 capture × 2 prefix bandpass_low
+    assert all(row['status'] == "ok" for row in details)
+    assert {name: best[name] for name in REFERENCE} == REFERENCE
+    assert best['sys_mae'] == 0.0 and best['dia_mae'] == 0.0 and best['map_mae'] == 0.0
+    assert best['aami_pass'] and best['captures'] == 4 and best['failed'] == 0
+    assert summary[-1]['sys_mae'] + summary[-1]['dia_mae'] > 0
+
+
+def test_cli_parallel_and_random_search():
+    """Test 2: CLI 2 workers = tuần tự; random search trong khoảng, seed cố định"""
+    print("\n" + "="*60)
+    print("TEST 2: CLI process pool + random search")
+    print("="*60)
+
+    space = dict(sweep.parse_param(spec) for spec in ("sys_ratio=0.4:0.7", "filter_order=2,3,4"))
+    configs = sweep.random_configs(space, sweep.base_config(SETTINGS), 20, seed=3)
+    assert configs == sweep.random_configs(space, sweep.base_config(SETTINGS), 20, seed=3)
+    assert all(0.4 <= c['sys_ratio'] <= 0.7 and c['filter_order'] in (2, 3, 4) for c in configs)
+    try:
+        sweep.grid_configs(space, sweep.base_config(SETTINGS))
+        grid_rejected = False
+    except ValueError:
+        grid_rejected = True
+    assert grid_rejected
+    print(f"✓ random: {len(configs)} configs, {len({sweep.config_prefix(c) for c in configs})} prefixes")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "captures"
+        root.mkdir()
+        labels = make_labelled_set(root)
+        output, details = Path(tmp) / "sweep.csv", Path(tmp) / "details.csv"
+
+        args = [str(root), '--labels', str(labels), '-o', str(output), '--details', str(details),
+                '--param', 'sys_ratio=0.45,0.5,0.55', '--param', 'dia_ratio=0.75,0.8',
+                '--param', 'bandpass_low=0.3,0.5', '--workers', '2']
+        assert sweep.main(args) == 0
+
+        with open(output, newline='', encoding='utf-8') as f:
+            parallel = list(csv.DictReader(f))
+        with open(details, newline='', encoding='utf-8') as f:
+            detail_rows = list(csv.DictReader(f))
+
+        labelled = sweep.match_labels(discover_captures(root), sweep.load_labels(labels), root)
+        sequential_configs = sweep.grid_configs(SPACE, sweep.base_config(SETTINGS))
+        sequential = sweep.summarize(sweep.run_sweep(labelled, sequential_configs, SETTINGS, workers=1),
+                                     sequential_configs)
+
+    print(f"✓ summary rows={len(parallel)}, detail rows={len(detail_rows)}, best={parallel[0]['config_id']}")
+    assert list(parallel[0]) == sweep.SUMMARY_COLUMNS and len(detail_rows) == 48
+    assert [row['config_id'] for row in parallel] == [str(row['config_id']) for row in sequential]
+    for row, expected in zip(parallel, sequential):
+        assert float(row['sys_mae']) == expected['sys_mae'] and float(row['dia_mae']) == expected['dia_mae']
+
+
+if __name__ == "__main__":
+    test_grid_matches_reference_with_prefix_cache()
+    test_cli_parallel_and_random_search()
+    print("\n✅ All BP parameter sweep tests passed")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test SQLite Storage Profile (WAL, PRAGMA, checkpoint)
+======================================================
+
+DatabaseManager áp dụng database.storage lên mỗi connection: WAL + synchronous
+NORMAL + cache/mmap/busy_timeout, báo cáo qua get_database_info(), reader giữ
+snapshot không chặn commit của writer, checkpoint định kỳ và backup/restore
+đúng khi dữ liệu còn nằm trong file -wal.
+
+Usage:
+    python3 tests/test_database_storage.py
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.database import DatabaseManager
+from src.data.storage_profile import resolve_storage_profile
+
+
+def make_db(root: Path, name: str, **storage) -> DatabaseManager:
+    db = DatabaseManager({'database': {'path': str(root / name), 'storage': storage}})
+    assert db.initialize()
+    return db
+
+
+def save_records(db: DatabaseManager, count: int, device_id: str = 'dev-storage') -> None:
+    for i in range(count):
+        assert db.save_health_record({'patient_id': None, 'device_id': device_id,
+                                      'heart_rate': 60 + i % 40, 'spo2': 97.0}) is not None
+
+
+def test_profile_applied_and_reported():
+    """Test 1: Profile sd_card/legacy + override → PRAGMA thực tế trong get_database_info()"""
+    print("\n" + "="*60)
+    print("TEST 1: Storage profile PRAGMAs")
+    print("="*60)
+
+    profile = resolve_storage_profile({'profile': 'unknown', 'cache_size_kb': 4096, 'synchronous': 'bogus'})
+    assert profile['profile'] == 'sd_card' and profile['cache_size_kb'] == 4096
+    assert profile['synchronous'] == 'normal'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp), "wal.db", mmap_size_mb=16, busy_timeout_ms=1500, checkpoint_interval_s=0)
+        save_records(db, 5)
+        storage = db.get_database_info()['storage']
+        print(f"✓ sd_card: {storage}")
+        assert storage['profile'] == 'sd_card' and storage['journal_mode'] == 'wal'
+        assert storage['synchronous'] == 'normal' and storage['temp_store'] == 'memory'
+        assert storage['cache_size_kb'] == 8192 and storage['mmap_size_mb'] == 16.0
+        assert storage['busy_timeout_ms'] == 1500 and storage['wal_size_kb'] > 0
+        assert db.wal_checkpointer is None
+        db.close()
+        assert not (Path(tmp) / "wal.db-wal").exists()     # connection cuối checkpoint + xóa WAL
+
+        legacy = make_db(Path(tmp), "legacy.db", profile='legacy')
+        storage = legacy.get_database_info()['storage']
+        print(f"✓ legacy: journal={storage['journal_mode']} synchronous={storage['synchronous']}")
+        assert storage['journal_mode'] == 'delete' and storage['synchronous'] == 'full'
+        assert legacy.checkpoint_wal() is None and legacy.wal_checkpointer is None
+        legacy.close()
+
+
+def commit_while_reader_open(db: DatabaseManager) -> bool:
+    """Reader giữ read transaction (snapshot) trong khi writer commit"""
+    reader = db.engine.raw_connection()
+    try:
+        cursor = reader.cursor()
+        cursor.execute("BEGIN")
+        before = cursor.execute("SELECT COUNT(*) FROM health_records").fetchone()[0]
+        result = {}
+
+        def writer():
+            result['id'] = db.save_health_record({'patient_id': None, 'device_id': 'writer', 'heart_rate': 72})
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        thread.join(timeout=10)
+
+        # Reader vẫn thấy snapshot cũ trong transaction của nó
+        assert cursor.execute("SELECT COUNT(*) FROM health_records").fetchone()[0] == before
+        cursor.execute("ROLLBACK")
+        return result.get('id') is not None
+    finally:
+        reader.close()
+
+
+def test_reader_does_not_block_writer():
+    """Test 2: WAL - writer commit khi reader đang mở transaction; legacy bị lock"""
+    print("\n" + "="*60)
+    print("TEST 2: Reader/writer concurrency")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wal = make_db(Path(tmp), "wal.db", busy_timeout_ms=300, checkpoint_interval_s=0)
+        legacy = make_db(Path(tmp), "legacy.db", profile='legacy', busy_timeout_ms=300)
+        save_records(wal, 3)
+        save_records(legacy, 3)
+
+        started = time.perf_counter()
+        wal_ok = commit_while_reader_open(wal)
+        wal_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        legacy_ok = commit_while_reader_open(legacy)
+        legacy_ms = (time.perf_counter() - started) * 1000
+
+        print(f"✓ WAL commit with open reader: ok={wal_ok} ({wal_ms:.0f} ms)")
+        print(f"✓ legacy commit with open reader: ok={legacy_ok} ({legacy_ms:.0f} ms, busy_timeout 300 ms)")
+        assert wal_ok and not legacy_ok
+        assert wal.get_health_records(device_id='writer')
+        wal.close()
+        legacy.close()
+
+
+def test_checkpoint_backup_restore():
+    """Test 3: Checkpoint thread + checkpoint_wal(); backup/restore với dữ liệu trong -wal"""
+    print("\n" + "="*60)
+    print("TEST 3: Checkpoint + backup/restore in WAL mode")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        db = make_db(root, "health.db", checkpoint_interval_s=0.2)
+        assert db.wal_checkpointer is not None and db.wal_checkpointer.is_running
+        save_records(db, 20)
+
+        deadline = time.time() + 5
+        while db.get_database_info()['storage']['checkpoints']['count'] == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        checkpoints = db.get_database_info()['storage']['checkpoints']
+        print(f"✓ background checkpoints: {checkpoints}")
+        assert checkpoints['count'] > 0 and checkpoints['last_result']['busy'] == 0
+
+        save_records(db, 10, device_id='before-backup')
+        backup = root / "backup.db"
+        assert db.backup_database(str(backup))
+        save_records(db, 7, device_id='after-backup')
+        assert len(db.get_health_records(device_id='after-backup')) == 7
+        assert (root / "health.db-wal").exists()
+
+        assert db.restore_database(str(backup))
+        restored = db.get_database_info()
+        print(f"✓ restored: {restored['tables']['health_records']} records, "
+              f"journal={restored['storage']['journal_mode']}")
+        assert restored['tables']['health_records'] == 30
+        assert restored['storage']['journal_mode'] == 'wal'
+        assert len(db.get_health_records(device_id='before-backup')) == 10
+        assert db.get_health_records(device_id='after-backup') == []
+
+        db.close()
+        assert not db.wal_checkpointer
+
+
+if __name__ == "__main__":
+    test_profile_applied_and_reported()
+    test_reader_does_not_block_writer()
+    test_checkpoint_backup_restore()
+    print("\n✅ All database storage tests passed")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test Envelope Analysis (crossing / local maxima / IBI vectorized)
+==================================================================
+
+EnvelopeAnalysis thay các vòng lặp Python của OscillometricProcessor
+(_find_crossing_points, _find_local_peak, _find_nearest_amplitude, peak pass
+riêng của _calculate_heart_rate): phải cho cùng index với cách quét cũ trên
+envelope ngẫu nhiên, và một analysis dùng chung cho nhiều cặp ratio.
+
+Usage:
+    python3 tests/test_envelope_analysis.py
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.blood_pressure_sensor import EnvelopeAnalysis, OscillometricProcessor
+
+
+# ==================== REFERENCE (vòng lặp cũ) ====================
+
+def loop_crossing_points(envelope, map_idx, sys_threshold, dia_threshold):
+    sys_idx = None
+    for i in range(1, map_idx):
+        if envelope[i-1] < sys_threshold <= envelope[i]:
+            sys_idx = i
+            break
+    dia_idx = None
+    for i in range(map_idx + 1, len(envelope)):
+        if envelope[i-1] > dia_threshold >= envelope[i]:
+            dia_idx = i
+            break
+    return sys_idx, dia_idx
+
+
+def loop_local_peak(envelope, start, end, prefer_right=False):
+    if end <= start:
+        return None
+    peaks = [i for i in range(start + 1, end - 1) if envelope[i] > envelope[i-1] and envelope[i] > envelope[i+1]]
+    if not peaks:
+        segment = envelope[start:end]
+        return None if segment.size == 0 else start + int(np.argmax(segment))
+    return peaks[-1] if prefer_right else peaks[0]
+
+
+def cuff_record(rng, rate=10.0, bimodal=False):
+    t = np.arange(0.0, 45.0, 1.0 / rate)
+    ramp = 165.0 - 3.0 * t
+    envelope = np.exp(-((ramp - rng.uniform(80, 115)) / rng.uniform(10, 30)) ** 2)
+    if bimodal:
+        envelope = envelope + 0.6 * np.exp(-((ramp - 140) / 6) ** 2)
+    noise = rng.normal(0, rng.uniform(0.02, 0.3), t.size)
+    return ramp + envelope * np.sin(2 * np.pi * 1.2 * t) + noise, t
+
+
+def test_matches_loop_reference():
+    """Test 1: crossings / local_peak / nearest_amplitude == vòng lặp cũ"""
+    print("\n" + "="*60)
+    print("TEST 1: EnvelopeAnalysis vs loop reference")
+    print("="*60)
+
+    rng = np.random.default_rng(11)
+    checks = 0
+    for case in range(200):
+        n = int(rng.integers(12, 400))          # savgol_filter(envelope, 11, 2) cần ≥ 11 mẫu
+        envelope = np.abs(rng.normal(0, 1, n)).cumsum() % 3.0 if case % 2 else rng.random(n)
+        oscillations = rng.normal(0, 1, n)
+        analysis = EnvelopeAnalysis.compute(oscillations, envelope, np.arange(n) / 10.0, 10.0)
+        map_idx = analysis.map_idx
+        assert map_idx == int(np.argmax(envelope))
+
+        ratios = rng.uniform(0.2, 0.95, size=(4, 2))
+        sys_idx, dia_idx = analysis.crossings(ratios[:, 0] * analysis.map_amplitude,
+                                              ratios[:, 1] * analysis.map_amplitude)
+        for k, (sys_ratio, dia_ratio) in enumerate(ratios):
+            expected = loop_crossing_points(envelope, map_idx,
+                                            analysis.map_amplitude * sys_ratio, analysis.map_amplitude * dia_ratio)
+            got = tuple(None if idx < 0 else int(idx) for idx in (sys_idx[k], dia_idx[k]))
+            assert got == expected, (case, k, got, expected)
+
+        for start, end, right in ((0, map_idx, True), (map_idx + 1, n, False), (0, n, False)):
+            assert analysis.local_peak(start, end, right) == loop_local_peak(envelope, start, end, right)
+            if end > start:
+                target = analysis.map_amplitude * 0.6
+                assert analysis.nearest_amplitude(target, start, end) == start + int(np.argmin(np.abs(envelope[start:end] - target)))
+        checks += 1
+
+    print(f"✓ {checks} random envelopes match loop reference")
+
+
+def test_shared_analysis_and_heart_rate():
+    """Test 2: process_deflate_data == measure_from_envelope với analysis dùng chung"""
+    print("\n" + "="*60)
+    print("TEST 2: Shared analysis across ratio pairs + HR from IBI")
+    print("="*60)
+
+    logger = logging.getLogger("EnvelopeAnalysisTest")
+    logger.setLevel(logging.ERROR)
+    rng = np.random.default_rng(5)
+
+    for case in range(12):
+        pressures, times = cuff_record(rng, rate=(10.0, 40.0)[case % 2], bimodal=case % 3 == 0)
+        processor = OscillometricProcessor({'sample_rate': 10.0}, logger)
+        pressures_arr, times_arr, detrended = processor.prepare_deflate(pressures, times)
+        oscillations = processor._bandpass_filter(detrended)
+        envelope = processor._extract_envelope(oscillations)
+        analysis = processor.analyze_envelope(oscillations, envelope, times_arr)
+
+        # Một find_peaks trên oscillations, HR từ IBI
+        peaks, _ = signal.find_peaks(oscillations, distance=int(processor.sample_rate * 0.5))
+        assert np.array_equal(analysis.beat_indices, peaks)
+        assert np.allclose(analysis.beat_intervals, np.diff(times_arr[peaks]))
+
+        for sys_ratio, dia_ratio in ((0.45, 0.7), (0.55, 0.8), (0.65, 0.9)):
+            processor.sys_ratio, processor.dia_ratio = sys_ratio, dia_ratio
+            shared = processor.measure_from_envelope(pressures_arr, times_arr, oscillations, envelope, analysis)
+            fresh = OscillometricProcessor(
+                {'sample_rate': 10.0, 'sys_ratio': sys_ratio, 'dia_ratio': dia_ratio}, logger
+            ).process_deflate_data(pressures, times)
+            assert (shared is None) == (fresh is None)
+            if shared is not None:
+                assert (shared.systolic, shared.diastolic, shared.heart_rate, shared.quality, shared.confidence) == \
+                       (fresh.systolic, fresh.diastolic, fresh.heart_rate, fresh.quality, fresh.confidence)
+
+    print(f"✓ last: SYS={shared.systolic:.1f} DIA={shared.diastolic:.1f} HR={shared.heart_rate:.1f} "
+          f"beats={analysis.beat_indices.size} maxima={analysis.local_maxima.size}")
+
+    # Thời gian SYS/DIA (Level 1-4) trên analysis vs vòng lặp cũ
+    pressures, times = cuff_record(rng, rate=40.0, bimodal=True)
+    processor = OscillometricProcessor({'sample_rate': 40.0}, logger)
+    _, times_arr, detrended = processor.prepare_deflate(pressures, times)
+    oscillations = processor._bandpass_filter(detrended)
+    envelope = processor._extract_envelope(oscillations)
+    analysis = processor.analyze_envelope(oscillations, envelope, times_arr)
+    map_idx = analysis.map_idx
+
+    started = time.perf_counter()
+    for _ in range(50):
+        loop_crossing_points(envelope, map_idx, 0.55 * envelope[map_idx], 0.8 * envelope[map_idx])
+        loop_local_peak(envelope, 0, map_idx, True)
+        loop_local_peak(envelope, map_idx + 1, envelope.size)
+    loop_ms = (time.perf_counter() - started) * 1000 / 50
+
+    started = time.perf_counter()
+    for _ in range(50):
+        analysis.crossings(np.array([0.55, 0.5, 0.45]) * analysis.map_amplitude,
+                           np.array([0.8, 0.85, 0.9]) * analysis.map_amplitude)
+        analysis.local_peak(0, map_idx, True)
+        analysis.local_peak(map_idx + 1, envelope.size)
+    vector_ms = (time.perf_counter() - started) * 1000 / 50
+    print(f"✓ envelope search ({envelope.size} samples): loop={loop_ms:.3f} ms, vectorized={vector_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    test_matches_loop_reference()
+    test_shared_analysis_and_heart_rate()
+    print("\n✅ All envelope analysis tests passed")
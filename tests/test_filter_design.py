@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test Filter Design Cache
+=========================
+
+Kiểm tra shared filter-design cache (SOS + zi) dùng bởi MAX30102 và BP,
+và BP bandpass sosfiltfilt (cache) so với filtfilt(b, a) cũ trên replay trace.
+
+Usage:
+    python3 tests/test_filter_design.py
+"""
+
+import sys
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from scipy import signal as scipy_signal
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.blood_pressure_sensor import OscillometricProcessor
+from src.sensors.filter_design import (
+    clear_filter_cache,
+    get_bandpass_design,
+    get_filter_cache_info,
+    quantize_sample_rate,
+)
+from src.sensors.replay import load_trace, save_trace
+
+logger = logging.getLogger("FilterDesignTest")
+
+
+class LegacyOscillometricProcessor(OscillometricProcessor):
+    """BP processor với bandpass cũ: butter(b, a) + filtfilt, không lượng tử hóa fs"""
+
+    def _bandpass_filter(self, signal_data: np.ndarray) -> np.ndarray:
+        nyquist = self.sample_rate / 2.0
+        low = max(0.01, min(self.bandpass_low / nyquist, 0.95))
+        high = max(low + 0.05, min(self.bandpass_high / nyquist, 0.95))
+        b, a = scipy_signal.butter(self.filter_order, [low, high], btype='band')
+        return scipy_signal.filtfilt(b, a, signal_data)
+
+
+def deflate_trace(sample_rate: float, map_mmhg: float, width: float, seed: int):
+    """Pha xả 165 → 30 mmHg @ 3 mmHg/s, timestamp có jitter, HR 72 BPM"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(0.0, 45.0, 1.0 / sample_rate) + rng.uniform(0, 0.2 / sample_rate, int(np.ceil(45.0 * sample_rate)))
+    ramp = 165.0 - 3.0 * t
+    envelope = np.exp(-((ramp - map_mmhg) / width) ** 2)
+    return ramp + envelope * np.sin(2 * np.pi * 1.2 * t) + rng.normal(0, 0.03, t.size), t
+
+
+def test_cache_hits_with_quantized_rate():
+    """Test 1: Rate đo hơi khác nhau dùng chung một thiết kế"""
+    print("\n" + "="*60)
+    print("TEST 1: Cache hits + sample rate quantization")
+    print("="*60)
+
+    clear_filter_cache()
+    first = get_bandpass_design(4, 0.5, 5.0, 9.91)
+    second = get_bandpass_design(4, 0.5, 5.0, 10.04)
+    info = get_filter_cache_info()
+    print(f"✓ fs={first.sample_rate}, cache={info}")
+
+    assert quantize_sample_rate(9.91) == 10.0
+    assert first is second
+    assert info['misses'] == 1 and info['hits'] == 1
+
+
+def test_design_matches_scipy():
+    """Test 2: SOS/zi giống butter + sosfilt_zi trực tiếp"""
+    print("\n" + "="*60)
+    print("TEST 2: Design matches scipy")
+    print("="*60)
+
+    design = get_bandpass_design(2, 0.5, 3.0, 50.0)
+    sos = scipy_signal.butter(2, [0.5 / 25.0, 3.0 / 25.0], btype='band', output='sos')
+
+    assert np.allclose(design.sos, sos)
+    assert np.allclose(design.zi, scipy_signal.sosfilt_zi(sos))
+
+    # Steady-state init: DC input → output ~0 ngay từ mẫu đầu
+    x = np.full(50, 100000.0)
+    y, _ = scipy_signal.sosfilt(design.sos, x, zi=design.initial_state(x[0]))
+    print(f"✓ Max |y| for DC input: {np.max(np.abs(y)):.2e}")
+    assert np.max(np.abs(y)) < 1e-6
+
+
+def test_bp_sosfiltfilt_matches_filtfilt():
+    """Test 3: SYS/DIA với sosfiltfilt (cache) ≈ filtfilt(b, a) cũ trên replay trace"""
+    print("\n" + "="*60)
+    print("TEST 3: BP sosfiltfilt vs legacy filtfilt(b, a)")
+    print("="*60)
+
+    cases = [(10.0, 95.0, 22.0, 0), (10.0, 85.0, 26.0, 1), (40.0, 100.0, 25.0, 2), (40.0, 90.0, 20.0, 3)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for sample_rate, map_mmhg, width, seed in cases:
+            path = Path(tmp) / f"deflate_{seed}.npz"
+            pressures, times = deflate_trace(sample_rate, map_mmhg, width, seed)
+            save_trace(path, pressures=pressures, timestamps=times)
+            trace = load_trace(path)
+
+            config = {'sample_rate': sample_rate}
+            new = OscillometricProcessor(config, logger).process_deflate_data(
+                trace['pressures'].tolist(), trace['timestamps'].tolist())
+            old = LegacyOscillometricProcessor(config, logger).process_deflate_data(
+                trace['pressures'].tolist(), trace['timestamps'].tolist())
+
+            print(f"✓ {sample_rate:.0f} SPS MAP={map_mmhg:.0f}: "
+                  f"sos {new.systolic:.1f}/{new.diastolic:.1f} vs filtfilt {old.systolic:.1f}/{old.diastolic:.1f} mmHg")
+            assert abs(new.systolic - old.systolic) <= 1.0
+            assert abs(new.diastolic - old.diastolic) <= 1.0
+            assert abs(new.map_value - old.map_value) <= 1.0
+
+
+if __name__ == "__main__":
+    test_cache_hits_with_quantized_rate()
+    test_design_matches_scipy()
+    test_bp_sosfiltfilt_matches_filtfilt()
+    print("\n✅ All filter design tests passed")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test Core-SQL Read Path (HealthDataReader)
+==========================================
+
+get_health_records / get_latest_vitals / get_active_alerts dùng SQLAlchemy
+Core select() (không hydrate ORM object) phải trả đúng dict như ORM path cũ;
+get_health_record_arrays trả cột NumPy cho biểu đồ; in thời gian so với ORM.
+
+Usage:
+    python3 tests/test_health_readers.py
+"""
+
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import desc
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.database import DatabaseManager
+from src.data.models import HealthRecord
+from src.data.readers import HISTORY_COLUMNS, HealthDataReader
+
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def make_db(root: Path) -> DatabaseManager:
+    db = DatabaseManager({'database': {'path': str(root / "health.db"),
+                                       'storage': {'checkpoint_interval_s': 0},
+                                       'write_behind': {'enabled': False}}})
+    assert db.initialize()
+    return db
+
+
+def populate(db: DatabaseManager, count: int):
+    """count record trên 2 device; mỗi record thứ 3 thiếu BP, thứ 5 thiếu temperature"""
+    rows = [{
+        'patient_id': 'P1' if i % 2 else None,
+        'device_id': f"dev-{i % 2}",
+        'timestamp': NOW - timedelta(seconds=30 * (count - i)),
+        'heart_rate': 60.0 + i % 40,
+        'spo2': 95.0 + i % 5,
+        'temperature': None if i % 5 == 0 else 36.5,
+        'systolic_bp': None if i % 3 == 0 else 110.0 + i % 20,
+        'diastolic_bp': None if i % 3 == 0 else 70.0 + i % 10,
+        'sensor_data': {'i': i},
+        'data_quality': 0.9,
+        'measurement_context': 'rest',
+    } for i in range(count)]
+    with db.get_session() as session:
+        session.bulk_insert_mappings(HealthRecord, rows)
+
+
+def orm_history(db: DatabaseManager, device_id: str, limit: int):
+    """ORM path trước đây (tham chiếu)"""
+    with db.get_session() as session:
+        records = session.query(HealthRecord).filter(HealthRecord.device_id == device_id) \
+            .order_by(desc(HealthRecord.timestamp)).limit(limit).all()
+        result = []
+        for record in records:
+            row = {name: getattr(record, name) for name in HISTORY_COLUMNS}
+            row['blood_pressure_systolic'] = record.systolic_bp
+            row['blood_pressure_diastolic'] = record.diastolic_bp
+            result.append(row)
+        return result
+
+
+def test_core_reads_match_orm():
+    """Test 1: Dict / tuple / latest vitals / alerts khớp ORM path"""
+    print("\n" + "="*60)
+    print("TEST 1: Core select() results == ORM results")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp))
+        populate(db, 600)
+        for i in range(3):
+            db.save_alert({'patient_id': 'P1', 'device_id': 'dev-1', 'alert_type': 'high_heart_rate',
+                           'severity': 'high', 'message': f"HR {i}", 'vital_sign': 'heart_rate',
+                           'current_value': 130.0 + i, 'threshold_value': 120.0})
+
+        core = db.get_health_records(device_id='dev-1', patient_id='P1', limit=200)
+        assert core == orm_history(db, 'dev-1', 200)
+        assert len(core) == 200 and isinstance(core[0]['timestamp'], datetime)
+        assert core[0]['sensor_data'] == {'i': 599}
+        print(f"✓ {len(core)} history dicts identical to ORM (JSON + datetime types preserved)")
+
+        window = db.get_health_records(patient_id='P1', start_time=NOW - timedelta(minutes=10),
+                                       end_time=NOW - timedelta(minutes=5))
+        assert window and all(NOW - timedelta(minutes=10) <= r['timestamp'] <= NOW - timedelta(minutes=5)
+                              for r in window)
+
+        rows = db.reader.health_record_rows(('id', 'heart_rate'), device_id='dev-0', limit=5)
+        assert [row[0] for row in rows] == [r['id'] for r in db.get_health_records(device_id='dev-0', limit=5)]
+        assert all(isinstance(row, tuple) and len(row) == 2 for row in rows)
+
+        latest = db.get_latest_vitals('P1')
+        assert latest['timestamp'] == core[0]['timestamp'].isoformat()
+        assert latest['heart_rate'] == core[0]['heart_rate'] and 'data_quality' in latest
+        assert db.get_latest_vitals('nobody') is None
+
+        alerts = db.get_active_alerts(patient_id='P1')
+        assert [a['message'] for a in alerts] == ['HR 2', 'HR 1', 'HR 0']
+        assert isinstance(alerts[0]['timestamp'], str) and alerts[0]['acknowledged'] is False
+        assert db.get_active_alerts(device_id='dev-1') == alerts and db.get_active_alerts() == []
+        print(f"✓ latest vitals {latest['timestamp']}, {len(alerts)} active alerts")
+        db.close()
+
+
+def test_numpy_columns_for_charts():
+    """Test 2: Cột NumPy cũ → mới, NULL → NaN, timestamp datetime64"""
+    print("\n" + "="*60)
+    print("TEST 2: NumPy column output")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp))
+        populate(db, 300)
+
+        arrays = db.get_health_record_arrays(device_id='dev-0', columns=('id', 'heart_rate', 'systolic_bp'))
+        assert arrays['timestamp'].dtype == np.dtype('datetime64[us]') and len(arrays['timestamp']) == 150
+        assert np.all(np.diff(arrays['timestamp']) > np.timedelta64(0, 'us'))
+        assert arrays['id'].dtype == np.int64 and arrays['heart_rate'].dtype == np.float64
+
+        reference = list(reversed(db.get_health_records(device_id='dev-0')))
+        assert arrays['timestamp'].tolist() == [r['timestamp'] for r in reference]
+        assert np.isnan(arrays['systolic_bp']).sum() == sum(r['systolic_bp'] is None for r in reference) > 0
+        print(f"✓ {len(arrays['id'])} rows: timestamp {arrays['timestamp'][0]} → {arrays['timestamp'][-1]}, "
+              f"{int(np.isnan(arrays['systolic_bp']).sum())} BP NaN")
+
+        recent = db.get_health_record_arrays(device_id='dev-0', limit=10)
+        assert len(recent['heart_rate']) == 10 and recent['timestamp'][-1] == arrays['timestamp'][-1]
+        empty = db.get_health_record_arrays(device_id='unknown')
+        assert len(empty['timestamp']) == 0 and len(empty['spo2']) == 0
+        db.close()
+
+
+def test_core_read_is_faster_than_orm():
+    """Test 3: Core read path nhanh hơn ORM hydration (in thời gian)"""
+    print("\n" + "="*60)
+    print("TEST 3: Read path timing")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp))
+        populate(db, 4000)
+
+        def best_ms(fn, repeats=5):
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - started) * 1000)
+            return min(timings)
+
+        reader = HealthDataReader(db.engine)
+        orm_ms = best_ms(lambda: orm_history(db, 'dev-1', 1000))
+        core_ms = best_ms(lambda: reader.health_records(device_id='dev-1', limit=1000))
+        array_ms = best_ms(lambda: reader.health_record_arrays(device_id='dev-1', limit=1000))
+        print(f"✓ 1000 records: ORM {orm_ms:.1f} ms, Core dict {core_ms:.1f} ms "
+              f"({orm_ms / core_ms:.1f}x), NumPy columns {array_ms:.1f} ms")
+        assert core_ms < orm_ms
+        db.close()
+
+
+if __name__ == "__main__":
+    test_core_reads_match_orm()
+    test_numpy_columns_for_charts()
+    test_core_read_is_faster_than_orm()
+    print("\n✅ All health reader tests passed")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test SQL Aggregate Health Statistics
+====================================
+
+get_health_statistics tính avg/min/max/count (std, percentile tùy chọn) bằng
+aggregate SQL trên toàn khoảng thời gian - không còn bị giới hạn 1000 record
+của get_health_records - và trả thêm bucket theo giờ / ngày. So với NumPy.
+
+Usage:
+    python3 tests/test_health_statistics.py
+"""
+
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.database import DatabaseManager
+from src.data.models import HealthRecord
+from src.data.readers import STATISTIC_VITALS
+
+
+NOW = datetime.utcnow()
+RECORDS = 5000
+
+
+def make_db(root: Path) -> DatabaseManager:
+    db = DatabaseManager({'database': {'path': str(root / "health.db"),
+                                       'storage': {'checkpoint_interval_s': 0},
+                                       'write_behind': {'enabled': False}}})
+    assert db.initialize()
+    return db
+
+
+def populate(db: DatabaseManager):
+    """5000 record của P1 trong ~6 ngày (mỗi 100 s), BP thiếu mỗi record thứ 4; 200 record P2"""
+    rng = np.random.default_rng(7)
+    rows = []
+    for i in range(RECORDS):
+        rows.append({
+            'patient_id': 'P1', 'device_id': 'dev-1',
+            'timestamp': NOW - timedelta(seconds=100 * (RECORDS - i)),
+            'heart_rate': float(rng.normal(75, 8)),
+            'spo2': float(rng.integers(92, 100)),
+            'temperature': float(rng.normal(36.7, 0.3)),
+            'systolic_bp': None if i % 4 == 0 else float(rng.normal(120, 10)),
+            'diastolic_bp': None if i % 4 == 0 else float(rng.normal(80, 6)),
+        })
+    rows += [{'patient_id': 'P2', 'device_id': 'dev-2', 'timestamp': NOW - timedelta(minutes=i), 'heart_rate': 200.0}
+             for i in range(200)]
+    with db.get_session() as session:
+        session.bulk_insert_mappings(HealthRecord, rows)
+    return rows
+
+
+def reference(rows, start: datetime, patient_id: str = 'P1'):
+    """NumPy: {vital: ndarray} của các record trong khoảng"""
+    selected = [r for r in rows if r['patient_id'] == patient_id and r['timestamp'] >= start]
+    return selected, {v: np.array([r[v] for r in selected if r.get(v) is not None]) for v in STATISTIC_VITALS}
+
+
+def test_statistics_cover_whole_range():
+    """Test 1: 7 ngày > 1000 record: count/avg/min/max/std/percentile khớp NumPy, một query"""
+    print("\n" + "="*60)
+    print("TEST 1: Aggregate statistics over the whole range")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp))
+        rows = populate(db)
+
+        statements = []
+        capture = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", capture)
+        stats = db.get_health_statistics('P1', '7d')
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+        selected, values = reference(rows, datetime.fromisoformat(stats['start_time']))
+        print(f"✓ record_count={stats['record_count']} (history cap is 1000), {len(statements)} SQL statement")
+        assert len(statements) == 1 and 'GROUP BY' not in statements[0]
+        assert stats['record_count'] == len(selected) == RECORDS
+        for vital in STATISTIC_VITALS:
+            assert stats[vital]['count'] == len(values[vital])
+            assert stats[vital]['avg'] == round(float(values[vital].mean()), 2)
+            assert stats[vital]['min'] == round(float(values[vital].min()), 2)
+            assert stats[vital]['max'] == round(float(values[vital].max()), 2)
+            assert 'std' not in stats[vital] and 'p50' not in stats[vital]
+        print(f"✓ heart_rate {stats['heart_rate']}")
+
+        full = db.get_health_statistics('P1', '7d', percentiles=(5, 50, 95), include_std=True)
+        for vital in STATISTIC_VITALS:
+            assert abs(full[vital]['std'] - float(values[vital].std())) <= 0.011
+            for p in (5, 50, 95):
+                assert abs(full[vital][f"p{p}"] - float(np.percentile(values[vital], p))) <= 0.011
+        print(f"✓ systolic_bp {full['systolic_bp']}")
+
+        assert db.get_health_statistics('P2', '24h')['heart_rate'] == {'avg': 200.0, 'min': 200.0,
+                                                                       'max': 200.0, 'count': 200}
+        assert db.get_health_statistics('nobody', '30d') == {}
+        db.close()
+
+
+def test_time_buckets():
+    """Test 2: Bucket theo giờ / ngày khớp NumPy, tổng bucket = tổng khoảng"""
+    print("\n" + "="*60)
+    print("TEST 2: Hourly / daily buckets")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp))
+        rows = populate(db)
+
+        daily = db.get_health_statistics('P1', '7d', bucket='day', percentiles=(50,), include_std=True)
+        selected, _ = reference(rows, datetime.fromisoformat(daily['start_time']))
+        days = sorted({r['timestamp'].date() for r in selected})
+        assert [b['bucket_start'] for b in daily['buckets']] == [f"{d.isoformat()}T00:00:00" for d in days]
+        assert sum(b['record_count'] for b in daily['buckets']) == daily['record_count']
+        for entry in daily['buckets']:
+            day = datetime.fromisoformat(entry['bucket_start']).date()
+            hr = np.array([r['heart_rate'] for r in selected if r['timestamp'].date() == day])
+            assert entry['record_count'] == len(hr)
+            assert entry['heart_rate']['avg'] == round(float(hr.mean()), 2)
+            assert abs(entry['heart_rate']['p50'] - float(np.median(hr))) <= 0.011
+            assert abs(entry['heart_rate']['std'] - float(hr.std())) <= 0.011
+        print(f"✓ {len(daily['buckets'])} daily buckets, first: {daily['buckets'][0]['bucket_start']} "
+              f"n={daily['buckets'][0]['record_count']}")
+
+        hourly = db.get_health_statistics('P1', '24h', bucket='hour')
+        assert len(hourly['buckets']) in (24, 25)
+        assert sum(b['record_count'] for b in hourly['buckets']) == hourly['record_count']
+        assert all(b['bucket_start'].endswith(':00:00') for b in hourly['buckets'])
+        print(f"✓ {len(hourly['buckets'])} hourly buckets, {hourly['record_count']} records")
+
+        assert db.get_health_statistics('P1', '7d', bucket='week') == {}        # bucket không hợp lệ → log, {}
+        db.close()
+
+
+if __name__ == "__main__":
+    test_statistics_cover_whole_range()
+    test_time_buckets()
+    print("\n✅ All health statistics tests passed")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test Composite Indexes + Query Plans (history / sync)
+=====================================================
+
+Ghi lại SQL thật do DatabaseManager (get_health_records, get_latest_vitals,
+get_active_alerts, get_pending_sync_items, cleanup_old_records) và
+CloudSyncManager.sync_incremental phát ra trên bảng 120k record, rồi
+EXPLAIN QUERY PLAN từng câu: không được SCAN health_records / alerts /
+sync_queue, history không được sort bằng temp B-tree.
+scripts/migrate_sqlite_history_indexes.py nâng database có schema cũ.
+
+Usage:
+    python3 tests/test_history_indexes.py
+"""
+
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts import migrate_sqlite_history_indexes as migration
+from src.communication.cloud_sync_manager import CloudSyncManager
+from src.data.database import DatabaseManager
+from src.data.models import Base
+
+
+HOT_TABLES = ('health_records', 'alerts', 'sync_queue')
+NOW = datetime.utcnow()
+RECORDS = 120_000
+
+
+def populate(db_path: Path):
+    """120k health record (3 device, 2 patient, ~30 ngày), 3k alert, 200 sync_queue"""
+    fmt = '%Y-%m-%d %H:%M:%S.%f'
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO health_records (patient_id, device_id, timestamp, heart_rate, spo2, data_quality, "
+        "measurement_context, sync_status, synced_at) VALUES (?, ?, ?, ?, ?, 1.0, 'rest', ?, ?)",
+        ((('P1', 'P2', None)[i % 3], f"dev-{i % 3}", (NOW - timedelta(seconds=20 * (RECORDS - i))).strftime(fmt),
+          60 + i % 50, 95 + i % 5, 'pending' if i % 2000 == 0 else 'synced',
+          None if i % 2000 == 0 else NOW.strftime(fmt))
+         for i in range(RECORDS)))
+    conn.executemany(
+        "INSERT INTO alerts (patient_id, device_id, alert_type, severity, message, timestamp, acknowledged, "
+        "resolved, notification_sent, sync_status) VALUES (?, ?, 'high_heart_rate', 'high', 'HR', ?, 0, ?, 0, ?)",
+        ((('P1', 'P2', None)[i % 3], f"dev-{i % 3}", (NOW - timedelta(minutes=i)).strftime(fmt),
+          int(i > 30), 'pending' if i % 500 == 0 else 'synced') for i in range(3000)))
+    conn.executemany(
+        "INSERT INTO sync_queue (device_id, table_name, operation, record_id, priority, created_at, sync_status, "
+        "sync_attempts) VALUES ('dev-0', 'health_records', 'INSERT', ?, ?, ?, ?, 0)",
+        ((str(i), i % 10, NOW.strftime(fmt), 'pending' if i % 4 else 'success') for i in range(200)))
+    conn.commit()
+    conn.close()
+
+
+def legacy_database(db_path: Path):
+    """Schema trước migration: chỉ có single-column index"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(db_path)
+    for name, _, _ in migration.NEW_INDEXES:
+        conn.execute(f"DROP INDEX {name}")
+    for name in migration.OBSOLETE_INDEXES:
+        table = next(t for t in HOT_TABLES if name.startswith(f"ix_{t}_"))
+        conn.execute(f"CREATE INDEX {name} ON {table} ({name[len(f'ix_{table}_'):]})")
+    conn.commit()
+    conn.close()
+
+
+def capture_hot_queries(db: DatabaseManager):
+    """Chạy các query nóng, trả về [(statement, parameters)] chạm HOT_TABLES"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        head = statement.lstrip().split(None, 1)[0].upper()
+        if head in ('SELECT', 'DELETE', 'UPDATE') and any(t in statement for t in HOT_TABLES):
+            captured.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        db.get_health_records(device_id='dev-1', limit=100)
+        db.get_health_records(device_id='dev-1', patient_id='P2',
+                              start_time=NOW - timedelta(days=7), end_time=NOW)
+        db.get_health_records(patient_id='P1', start_time=NOW - timedelta(days=1), limit=50)
+        db.get_latest_vitals('P1')
+        db.get_health_statistics('P2', '24h')
+        db.get_active_alerts(device_id='dev-2')
+        db.get_active_alerts(patient_id='P1')
+        db.get_pending_sync_items(limit=20)
+        db.cleanup_old_records(days_to_keep=3650)
+
+        cloud = CloudSyncManager(db, {'sync': {}, 'device': {'device_id': 'dev-0'}})
+        cloud.check_cloud_connection = lambda: True
+        cloud.push_health_record = lambda record_id: False
+        cloud.push_alert = lambda alert_id: False
+        cloud.sync_incremental(NOW - timedelta(minutes=10))
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def explain(db: DatabaseManager, statement: str, parameters):
+    raw = db.engine.raw_connection()
+    try:
+        rows = raw.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return [row[3] for row in rows]
+    finally:
+        raw.close()
+
+
+def assert_indexed(db: DatabaseManager, label: str) -> int:
+    captured = capture_hot_queries(db)
+    assert len(captured) >= 12, len(captured)
+    for statement, parameters in captured:
+        plan = explain(db, statement, parameters)
+        flat = ' '.join(statement.split())
+        scans = [line for line in plan
+                 if any(line.startswith(f"SCAN {t}") or line.startswith(f"SCAN TABLE {t}") for t in HOT_TABLES)]
+        assert not scans, f"{label}: full scan {scans}\n  {flat}"
+        if 'FROM health_records' in flat and 'ORDER BY health_records.timestamp DESC' in flat:
+            assert not any('TEMP B-TREE' in line for line in plan), f"{label}: sort {plan}\n  {flat}"
+    print(f"✓ {label}: {len(captured)} hot queries, all SEARCH via index / primary key")
+    return len(captured)
+
+
+def test_migration_upgrades_legacy_schema():
+    """Test 1: Database cũ → migration tạo composite index, xóa index prefix, plan không sort"""
+    print("\n" + "="*60)
+    print("TEST 1: Migration on legacy schema")
+    print("="*60)
+
+    history = migration.VERIFY_QUERIES[0][1]
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "legacy.db"
+        legacy_database(db_path)
+        populate(db_path)
+
+        with sqlite3.connect(db_path) as conn:
+            before = migration.query_plan(conn, history, ('dev-1', '2026-01-01'))
+        print(f"✓ legacy plan: {' | '.join(before)}")
+
+        assert migration.main(['--db', str(db_path), '--no-backup']) == 0
+        with sqlite3.connect(db_path) as conn:
+            indexes = migration.existing_indexes(conn)
+            after = migration.query_plan(conn, history, ('dev-1', '2026-01-01'))
+        print(f"✓ migrated plan: {' | '.join(after)}")
+        assert {name for name, _, _ in migration.NEW_INDEXES} <= indexes
+        assert not indexes & set(migration.OBSOLETE_INDEXES)
+        assert any('ix_health_records_device_timestamp' in line for line in after)
+        assert not any('TEMP B-TREE' in line for line in after)
+
+        # Migration chạy lại: không đổi gì
+        with sqlite3.connect(db_path) as conn:
+            assert migration.migrate_indexes(conn) == {'created': [], 'dropped': []}
+
+        db = DatabaseManager({'database': {'path': str(db_path), 'storage': {'checkpoint_interval_s': 0}}})
+        assert db.initialize()
+        assert_indexed(db, "migrated legacy database (ANALYZE)")
+        db.close()
+
+
+def test_hot_queries_use_indexes_at_scale():
+    """Test 2: Database mới (create_all, chưa ANALYZE) 120k record: mọi query nóng dùng index"""
+    print("\n" + "="*60)
+    print("TEST 2: Hot query plans at 120k rows")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "health.db"
+        db = DatabaseManager({'database': {'path': str(db_path), 'storage': {'checkpoint_interval_s': 0}}})
+        assert db.initialize()
+        populate(db_path)
+        assert_indexed(db, "fresh database")
+
+        # O(log n): 100 record mới nhất của một device không phụ thuộc kích thước bảng
+        started = time.perf_counter()
+        for _ in range(20):
+            records = db.get_health_records(device_id='dev-1', limit=100)
+        history_ms = (time.perf_counter() - started) * 1000 / 20
+        print(f"✓ get_health_records(device, limit=100) on {RECORDS} rows: {history_ms:.1f} ms")
+        assert len(records) == 100
+        assert all(a['timestamp'] >= b['timestamp'] for a, b in zip(records, records[1:]))
+        db.close()
+
+
+if __name__ == "__main__":
+    test_migration_upgrades_legacy_schema()
+    test_hot_queries_use_indexes_at_scale()
+    print("\n✅ All history index tests passed")
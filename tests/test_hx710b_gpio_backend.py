@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test HX710B GPIO Backend Layer + Read Timing
+=============================================
+
+HX710BDriver chạy trên FakeHX710BBackend (ADC giả lập trong bộ nhớ):
+giải mã 24-bit có dấu, số xung SCK theo mode, continuous stream,
+power-down và histogram timing mỗi lần đọc.
+
+Usage:
+    python3 tests/test_hx710b_gpio_backend.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.hx710b_driver import HX710BDriver, HX710Mode
+from src.sensors.gpio_backend import FakeHX710BBackend, create_gpio_backend
+from src.sensors.timing_stats import LatencyHistogram
+
+
+VALUES = [1056334, -250000, 0x7FFF00, -0x7FFF00, 42]
+
+
+def make_driver(mode=HX710Mode.DIFFERENTIAL_40SPS):
+    period = 0.025 if mode == HX710Mode.DIFFERENTIAL_40SPS else 0.1
+    backend = FakeHX710BBackend(VALUES, period_s=period)
+    driver = HX710BDriver(gpio_dout=6, gpio_sck=5, mode=mode, timeout_ms=200, backend=backend)
+    assert driver.initialize()
+    return driver, backend
+
+
+def test_read_decodes_signed_values():
+    """Test 1: Đọc đúng giá trị có dấu, 27 xung SCK ở 40 SPS"""
+    print("\n" + "="*60)
+    print("TEST 1: Signed decode + mode pulses (fake backend)")
+    print("="*60)
+
+    driver, backend = make_driver()
+    driver.reset_read_timing()
+    backend.pulse_counts.clear()
+
+    values = [driver.read() for _ in range(10)]
+    print(f"✓ Values: {values[:5]}")
+
+    # Đọc liên tiếp → các conversion liên tiếp trong VALUES
+    start = VALUES.index(values[0])
+    assert values == [VALUES[(start + i) % len(VALUES)] for i in range(10)]
+    assert set(backend.pulse_counts) == {27}
+
+    driver.cleanup()
+
+
+def test_read_timing_histogram():
+    """Test 2: Timing histogram: chờ edge không tốn CPU"""
+    print("\n" + "="*60)
+    print("TEST 2: Read timing histogram")
+    print("="*60)
+
+    driver, _ = make_driver()
+    driver.reset_read_timing()
+
+    for _ in range(20):
+        assert driver.read() is not None
+
+    timing = driver.get_read_timing()
+    stats = driver.get_stats()
+    print(f"✓ wait={timing['wait']['summary']}")
+    print(f"✓ cpu={timing['cpu']['summary']}")
+
+    assert timing['wait']['summary']['count'] == 20
+    assert timing['wait']['summary']['p50_us'] > 5_000      # Chờ conversion (~25 ms)
+    assert timing['cpu']['summary']['p95_us'] < 5_000       # Không spin/sleep-poll
+    assert stats['gpio_backend'] == 'fake'
+    assert sum(count for _, count in timing['shift']['buckets']) == 20
+
+    driver.cleanup()
+
+
+def test_continuous_and_power_down():
+    """Test 3: Continuous stream không mất mẫu; power-down → timeout"""
+    print("\n" + "="*60)
+    print("TEST 3: Continuous stream + power-down")
+    print("="*60)
+
+    driver, backend = make_driver()
+    driver.clear_buffer()
+    driver.start_continuous()
+    time.sleep(0.3)
+    driver.stop_continuous()
+
+    counts, timestamps = driver.drain()
+    stats = driver.get_stats()
+    print(f"✓ {counts.size} conversions, missed={stats['stream_missed']}, dup={stats['stream_duplicates']}")
+
+    assert counts.size >= 8
+    assert stats['stream_missed'] == 0 and stats['stream_duplicates'] == 0
+
+    driver.power_down()
+    assert backend.sck_high
+    assert driver.read(timeout_ms=50) is None
+
+    driver.cleanup()
+    assert not backend.sck_high
+
+
+def test_histogram_and_factory():
+    """Test 4: LatencyHistogram percentiles, backend factory"""
+    print("\n" + "="*60)
+    print("TEST 4: LatencyHistogram + create_gpio_backend")
+    print("="*60)
+
+    hist = LatencyHistogram()
+    for us in [3] * 90 + [150] * 9 + [40_000]:
+        hist.record(us / 1_000_000)
+
+    summary = hist.summary()
+    print(f"✓ {summary}")
+
+    assert summary['p50_us'] == 5
+    assert summary['p95_us'] == 200
+    assert summary['p99_us'] == 200
+    assert abs(summary['max_us'] - 40_000) < 1e-6
+
+    assert create_gpio_backend({}).name == 'rpi'
+    assert create_gpio_backend({'gpio_backend': 'gpiod'}).name == 'gpiod'
+
+
+if __name__ == "__main__":
+    test_read_decodes_signed_values()
+    test_read_timing_histogram()
+    test_continuous_and_power_down()
+    test_histogram_and_factory()
+    print("\n✅ All HX710B GPIO backend tests passed")
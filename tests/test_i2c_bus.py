@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test I²C Bus Manager (arbiter dùng chung MAX30102 + MLX90614)
+==============================================================
+
+Bus giả lập phát hiện giao dịch chồng nhau; kiểm tra serialize, slot
+(transaction batching), retry không sleep, thống kê utilisation/error và
+MLX90614Sensor + MAX30102Hardware cùng chạy trên một bus.
+
+Usage:
+    python3 tests/test_i2c_bus.py
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.i2c_bus import get_i2c_bus_stats, open_i2c_bus
+from src.sensors.max30102_sensor import MAX30102Hardware
+from src.sensors.mlx90614_sensor import MLX90614Sensor
+from src.sensors.replay import ReplaySMBus
+
+
+MLX_ADDRESS = 0x5A
+MAX30102_ADDRESS = 0x57
+
+
+class SharedBusSim:
+    """
+    Bus I²C giả: route theo address (MAX30102 → ReplaySMBus, MLX90614 →
+    register cố định), ghi log giao dịch và đếm lần chồng nhau
+    """
+
+    def __init__(self, max_bus=None, op_time_s=0.0002, fail_first=0):
+        self.max_bus = max_bus
+        self.op_time_s = op_time_s
+        self.fail_first = fail_first
+        self.words = {0x06: int((25.0 + 273.15) / 0.02), 0x07: int((36.5 + 273.15) / 0.02)}
+        self.log = []
+        self.overlaps = 0
+        self.closed = False
+        self._active = 0
+        self._guard = threading.Lock()
+
+    def _enter(self, address, register):
+        with self._guard:
+            self._active += 1
+            if self._active > 1:
+                self.overlaps += 1
+            self.log.append((threading.current_thread().name, address, register))
+        time.sleep(self.op_time_s)  # Thời gian giao dịch trên dây
+
+    def _leave(self):
+        with self._guard:
+            self._active -= 1
+
+    def read_word_data(self, address, register):
+        self._enter(address, register)
+        try:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                raise OSError(121, "Remote I/O error")
+            return self.words[register]
+        finally:
+            self._leave()
+
+    def read_byte_data(self, address, register):
+        self._enter(address, register)
+        try:
+            return self.max_bus.read_byte_data(address, register)
+        finally:
+            self._leave()
+
+    def read_i2c_block_data(self, address, register, length):
+        self._enter(address, register)
+        try:
+            return self.max_bus.read_i2c_block_data(address, register, length)
+        finally:
+            self._leave()
+
+    def write_i2c_block_data(self, address, register, data):
+        self._enter(address, register)
+        try:
+            return self.max_bus.write_i2c_block_data(address, register, data)
+        finally:
+            self._leave()
+
+    def close(self):
+        self.closed = True
+
+
+def test_serialised_slots_and_stats():
+    """Test 1: Hai thread trên một bus: không chồng giao dịch, slot liền mạch"""
+    print("\n" + "="*60)
+    print("TEST 1: Serialised transactions + coalesced slots")
+    print("="*60)
+
+    sim = SharedBusSim()
+    mlx = open_i2c_bus(40, owner="MLX", raw_bus=sim)
+    other = open_i2c_bus(40, owner="OTHER")
+
+    def mlx_worker():
+        for _ in range(50):
+            assert mlx.read_words(MLX_ADDRESS, (0x06, 0x07)) == [sim.words[0x06], sim.words[0x07]]
+
+    def other_worker():
+        for _ in range(100):
+            other.read_word_data(MLX_ADDRESS, 0x06)
+
+    threads = [threading.Thread(target=mlx_worker, name="mlx"), threading.Thread(target=other_worker, name="other")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = get_i2c_bus_stats()[40]
+    print(f"✓ slots={stats['slots']}, transactions={stats['transactions']}, "
+          f"utilisation={stats['utilisation']:.2f}, wait p95={stats['lock_wait']['p95_us']:.0f} µs")
+
+    assert sim.overlaps == 0
+    # Ambient (0x06) + object (0x07) của MLX luôn liền nhau trong log
+    for index, (thread, _, register) in enumerate(sim.log):
+        if thread == "mlx" and register == 0x06:
+            assert sim.log[index + 1][0] == "mlx" and sim.log[index + 1][2] == 0x07
+    assert stats['transactions'] == 200
+    assert stats['slots'] == 150                    # 50 slot MLX (2 giao dịch) + 100 đơn
+    assert stats['per_owner']['MLX']['transactions'] == 100
+    assert 0.0 < stats['utilisation'] <= 1.0
+    assert stats['owners'] == ["MLX", "OTHER"]
+
+    mlx.close()
+    assert not sim.closed                           # Còn handle OTHER
+    other.close()
+    assert sim.closed and 40 not in get_i2c_bus_stats()
+
+
+def test_retry_without_sleep():
+    """Test 2: OSError được retry ngay, đếm vào error rate; hết retry → raise"""
+    print("\n" + "="*60)
+    print("TEST 2: Immediate retries + error accounting")
+    print("="*60)
+
+    sim = SharedBusSim(op_time_s=0.0, fail_first=2)
+    bus = open_i2c_bus(41, owner="MLX", retries=2, raw_bus=sim)
+
+    started = time.perf_counter()
+    assert bus.read_word_data(MLX_ADDRESS, 0x07) == sim.words[0x07]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    sim.fail_first = 5
+    try:
+        bus.read_word_data(MLX_ADDRESS, 0x07)
+        raised = False
+    except OSError:
+        raised = True
+
+    stats = bus.get_stats()
+    print(f"✓ errors={stats['errors']}, retries={stats['retries']}, "
+          f"error_rate={stats['error_rate']:.2f}, first read {elapsed_ms:.2f} ms")
+
+    assert raised
+    assert elapsed_ms < 5.0                         # Không còn retry sleep 50 ms
+    assert stats['errors'] == 5 and stats['retries'] == 4
+    assert not hasattr(bus, 'i2c_rdwr')             # Bus giả không hỗ trợ → handle cũng không
+    bus.close()
+
+
+def test_mlx_and_max30102_share_bus():
+    """Test 3: MLX90614Sensor + MAX30102Hardware đọc song song trên cùng bus"""
+    print("\n" + "="*60)
+    print("TEST 3: MLX90614 + MAX30102 on one arbitrated bus")
+    print("="*60)
+
+    ir = np.arange(1000, 1400, dtype=np.uint32)
+    sim = SharedBusSim(max_bus=ReplaySMBus(ir, ir, sample_rate=400.0, speed=1.0))
+    hw = MAX30102Hardware(channel=42, bus=open_i2c_bus(42, owner="MAX30102", raw_bus=sim))
+    hw.setup(sample_rate=400, sample_average=1)
+
+    mlx = MLX90614Sensor({'i2c_bus': 42, 'sample_rate': 50})
+    assert mlx.initialize()
+
+    samples = []
+    stop = threading.Event()
+
+    def max_worker():
+        while not stop.is_set():
+            samples.extend(hw.read_sample_arrays(32)[1].tolist())
+            time.sleep(0.01)
+
+    worker = threading.Thread(target=max_worker, name="max30102")
+    worker.start()
+
+    durations = []
+    readings = []
+    for _ in range(40):
+        started = time.perf_counter()
+        readings.append(mlx.read_raw_data())
+        durations.append(time.perf_counter() - started)
+        time.sleep(0.005)
+    stop.set()
+    worker.join()
+
+    stats = get_i2c_bus_stats()[42]
+    print(f"✓ MLX read max {max(durations) * 1000:.2f} ms, MAX30102 samples={len(samples)}")
+    print(f"✓ per_owner={stats['per_owner']}")
+
+    assert sim.overlaps == 0
+    assert all(abs(r['object_temp'] - 36.5) < 0.05 for r in readings)
+    assert max(durations) < 0.01                   # Trước đây ≥ 20 ms (2 × sleep 10 ms)
+    assert samples == list(range(1000, 1000 + len(samples)))  # Không mất / lặp mẫu
+    assert set(stats['per_owner']) == {"MAX30102", "MLX90614"}
+
+    mlx.cleanup()
+    hw.close()
+    assert sim.closed
+
+
+if __name__ == "__main__":
+    test_serialised_slots_and_stats()
+    test_retry_without_sleep()
+    test_mlx_and_max30102_share_bus()
+    print("\n✅ All I²C bus manager tests passed")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test MAX30102 MeasurementWindow (ring buffer)
+==============================================
+
+So sánh MeasurementWindow (ContiguousRingBuffer) với cách tính cũ
+dựa trên deque/sorted() để đảm bảo kết quả không đổi.
+
+Usage:
+    python3 tests/test_measurement_window.py
+"""
+
+import sys
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.max30102_sensor import MeasurementWindow
+from src.sensors.sample_buffer import ContiguousRingBuffer
+
+
+def test_contiguous_ring_views():
+    """Test 1: View luôn liên tục, đúng thứ tự, không copy"""
+    print("\n" + "="*60)
+    print("TEST 1: ContiguousRingBuffer views")
+    print("="*60)
+
+    ring = ContiguousRingBuffer(capacity=5, channels=2)
+    reference = deque(maxlen=5)
+
+    for batch in ([1, 2, 3], [4, 5, 6, 7], list(range(8, 20)), [20]):
+        arr = np.array(batch, dtype=np.float64)
+        ring.extend(arr, -arr)
+        reference.extend(batch)
+
+        view = ring.view(channel=0)
+        assert view.tolist() == list(reference)
+        assert ring.view(channel=1).tolist() == [-v for v in reference]
+        assert np.shares_memory(view, ring._data)
+        assert not view.flags.writeable
+
+    print(f"✓ Last 3: {ring.view(3).tolist()}, stride 2: {ring.strided_view(2).tolist()}")
+    assert ring.view(3).tolist() == [18.0, 19.0, 20.0]
+    assert ring.strided_view(2).tolist() == [16.0, 18.0, 20.0]
+
+
+def test_window_matches_deque_reference():
+    """Test 2: recent_array / estimate_quality / resample giống bản deque"""
+    print("\n" + "="*60)
+    print("TEST 2: MeasurementWindow vs deque reference")
+    print("="*60)
+
+    window = MeasurementWindow(sample_rate=100, window_seconds=4.0, min_seconds=2.0)
+    ir_ref = deque(maxlen=window.max_samples)
+
+    t = np.arange(0, 7.0, 0.01)
+    ir = (100000 + 600 * np.sin(2 * np.pi * 1.2 * t)).astype(np.uint32)
+    red = (80000 + 300 * np.sin(2 * np.pi * 1.2 * t)).astype(np.uint32)
+
+    for i in range(0, t.size, 24):
+        window.add_samples(ir[i:i + 24], red[i:i + 24])
+        ir_ref.extend(ir[i:i + 24].tolist())
+
+        arr_sorted = sorted(ir_ref)
+        n = len(arr_sorted)
+        p5, p95 = window.running_percentiles("ir")
+        assert p5 == arr_sorted[max(0, int(0.05 * n))]
+        assert p95 == arr_sorted[min(n - 1, int(0.95 * n))]
+
+    recent = window.recent_array(1.2, "ir")
+    ir_ds, _ = window.resample(50, 110)
+    expected_ds = np.array(ir_ref, dtype=np.float64)[::2][-110:]
+    print(f"✓ quality={window.estimate_quality('ir'):.1f}, recent={recent.size}, resampled={ir_ds.size}")
+
+    assert np.array_equal(recent, np.array(list(ir_ref)[-120:], dtype=np.float64))
+    assert np.array_equal(ir_ds, expected_ds)
+    assert len(window.ir) == window.max_samples
+
+
+if __name__ == "__main__":
+    test_contiguous_ring_views()
+    test_window_matches_deque_reference()
+    print("\n✅ All measurement window tests passed")
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Sensor Pipeline Benchmarks (latency / allocations / throughput budgets)
+========================================================================
+
+Benchmark các hot path của sensor pipeline trên tín hiệu giả lập hoặc trace
+đã ghi (offline, không cần phần cứng):
+
+    1. HRCalculator.calc_hr_and_spo2       (window path, 5s @ 50 Hz)
+    2. StreamingHRCalculator.update         (MAX30102 tick, 24 mẫu @ 100 Hz)
+    3. MeasurementWindow add + quality      (MAX30102 tick)
+    4. MAX30102Sensor._detect_finger        (MAX30102 tick, thống kê trượt 1.2s)
+    5. OscillometricProcessor.process_deflate_data (1 lần đo BP)
+    6. VitalsPayload.from_sensor_data       (mỗi lần publish)
+    7. MAX30102 payload (PPGReading)        (mỗi tick, giữ trong queue subscriber)
+
+Mỗi stage báo median/p95 latency, số bytes cấp phát (tracemalloc) và
+samples/s, rồi so với budget. Budget đặt cho CPU lớp Raspberry Pi 4
+(Cortex-A72 @ 1.5 GHz); máy dev nhanh hơn nhiều nên vượt budget = regression
+thật. Trên CPU chậm hơn (Pi 3/Zero 2) tăng BENCH_BUDGET_SCALE.
+
+Environment:
+    BENCH_BUDGET_SCALE  Nhân toàn bộ budget (default 1.0)
+    BENCH_ROUNDS        Số vòng đo mỗi stage (default 50)
+    BENCH_P95_MARGIN    Hệ số dự phòng cho p95 latency (default 1.5, jitter máy CI)
+    BENCH_LATENCY       'enforce' (default) | 'report': chỉ in p95, không assert
+                        (runner CI chậm / chia sẻ); allocation vẫn assert
+
+Usage:
+    python3 -m pytest -q tests/test_pipeline_benchmarks.py
+    python3 tests/test_pipeline_benchmarks.py [--trace traces/ppg.npz] [--bp-trace traces/bp_cuff.npz]
+
+Author: IoT Health Monitor Team
+Date: 2026-10-16
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.max30102_sensor import (
+    HRCalculator,
+    MAX30102Sensor,
+    MeasurementWindow,
+    StreamingHRCalculator,
+)
+from src.sensors.blood_pressure_sensor import OscillometricProcessor
+from src.sensors.readings import SensorReading
+from src.sensors.replay import load_trace, trace_times
+
+try:
+    from src.communication.mqtt_payloads import VitalsPayload
+except ImportError:  # src.communication kéo theo paho-mqtt
+    VitalsPayload = None
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+# ==================== BUDGETS ====================
+
+# stage: (p95 latency ms, max bytes allocated per call)
+BUDGETS: Dict[str, Dict[str, float]] = {
+    'calc_hr_and_spo2':      {'p95_ms': 15.0, 'alloc_bytes': 512 * 1024},
+    'streaming_hr_tick':     {'p95_ms': 6.0,  'alloc_bytes': 64 * 1024},
+    'measurement_window':    {'p95_ms': 1.0,  'alloc_bytes': 16 * 1024},
+    'detect_finger':         {'p95_ms': 0.5,  'alloc_bytes': 8 * 1024},
+    'process_deflate_data':  {'p95_ms': 60.0, 'alloc_bytes': 2 * 1024 * 1024},
+    'vitals_payload':        {'p95_ms': 0.5,  'alloc_bytes': 32 * 1024},
+    'ppg_payload':           {'p95_ms': 2.0,  'alloc_bytes': 96 * 1024},
+}
+
+BUDGET_SCALE = float(os.environ.get('BENCH_BUDGET_SCALE', '1.0'))
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', '50'))
+# Wall-clock p95 dao động theo tải máy: margin riêng, có thể tắt assert
+P95_MARGIN = float(os.environ.get('BENCH_P95_MARGIN', '1.5'))
+ENFORCE_LATENCY = os.environ.get('BENCH_LATENCY', 'enforce').lower() != 'report'
+
+# Trace đã ghi (đặt qua CLI --trace/--bp-trace), None → tín hiệu giả lập
+PPG_TRACE: Optional[str] = os.environ.get('BENCH_PPG_TRACE')
+BP_TRACE: Optional[str] = os.environ.get('BENCH_BP_TRACE')
+
+
+# ==================== HARNESS ====================
+
+@dataclass
+class BenchResult:
+    """Kết quả benchmark một stage"""
+    name: str
+    rounds: int
+    median_ms: float
+    p95_ms: float
+    alloc_bytes: int
+    samples_per_call: int
+
+    @property
+    def samples_per_second(self) -> float:
+        return self.samples_per_call / (self.median_ms / 1000.0) if self.median_ms > 0 else float('inf')
+
+    def report(self) -> str:
+        return (
+            f"{self.name:<22} median={self.median_ms:8.3f} ms  p95={self.p95_ms:8.3f} ms  "
+            f"alloc={self.alloc_bytes / 1024:8.1f} KiB  {self.samples_per_second:12,.0f} samples/s"
+        )
+
+
+def run_benchmark(
+    name: str,
+    func: Callable[[], Any],
+    samples_per_call: int,
+    rounds: Optional[int] = None,
+    warmup: int = 3,
+    setup: Optional[Callable[[], None]] = None,
+) -> BenchResult:
+    """
+    Đo latency (perf_counter) và allocations (tracemalloc, một lượt riêng)
+
+    Args:
+        name: Tên stage (key trong BUDGETS)
+        func: Hàm được đo (không tham số)
+        samples_per_call: Số mẫu tín hiệu func xử lý mỗi lần gọi
+        rounds: Số lần đo (None → ROUNDS lúc gọi, theo --rounds / BENCH_ROUNDS)
+        warmup: Số lần chạy trước khi đo (cache, lazy init)
+        setup: Chạy trước mỗi lần gọi, không tính vào thời gian
+
+    Returns:
+        BenchResult
+    """
+    if rounds is None:
+        rounds = ROUNDS
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    timings = np.empty(rounds, dtype=np.float64)
+    for i in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+
+    # Allocations: đo riêng vì tracemalloc làm chậm đáng kể
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchResult(
+        name=name,
+        rounds=rounds,
+        median_ms=float(np.median(timings)) * 1000.0,
+        p95_ms=float(np.percentile(timings, 95)) * 1000.0,
+        alloc_bytes=int(peak),
+        samples_per_call=samples_per_call,
+    )
+
+
+def check_budget(result: BenchResult) -> None:
+    """In kết quả và assert theo BUDGETS (nhân BENCH_BUDGET_SCALE, p95 thêm P95_MARGIN)"""
+    print(result.report())
+    budget = BUDGETS[result.name]
+    p95_limit = budget['p95_ms'] * BUDGET_SCALE * P95_MARGIN
+    alloc_limit = budget['alloc_bytes'] * BUDGET_SCALE
+
+    if ENFORCE_LATENCY:
+        assert result.p95_ms <= p95_limit, (
+            f"{result.name}: p95 {result.p95_ms:.3f} ms > budget {p95_limit:.3f} ms"
+        )
+    elif result.p95_ms > p95_limit:
+        print(f"  ⚠️ {result.name}: p95 {result.p95_ms:.3f} ms > budget {p95_limit:.3f} ms (BENCH_LATENCY=report)")
+    assert result.alloc_bytes <= alloc_limit, (
+        f"{result.name}: {result.alloc_bytes} bytes allocated > budget {alloc_limit:.0f}"
+    )
+
+
+# ==================== SIGNALS ====================
+
+def ppg_signal(sample_rate: int = 100, seconds: float = 10.0):
+    """(ir, red) uint32 - trace đã ghi nếu có, không thì PPG giả lập 75 BPM"""
+    if PPG_TRACE:
+        trace = load_trace(PPG_TRACE)
+        count = int(sample_rate * seconds)
+        return (
+            np.asarray(trace['ir'][:count], dtype=np.uint32),
+            np.asarray(trace['red'][:count], dtype=np.uint32),
+        )
+
+    t = np.arange(0, seconds, 1.0 / sample_rate)
+    phase = (t * 75 / 60) % 1
+    pulse = np.where(phase < 0.3, np.sin(np.pi * phase / 0.6), np.cos(np.pi * (phase - 0.3) / 1.4))
+    noise = np.random.default_rng(0).normal(0, 10, t.size)
+    ir = (100000 + 800 * pulse + noise).astype(np.uint32)
+    red = (80000 + 400 * pulse + noise / 2).astype(np.uint32)
+    return ir, red
+
+
+def cuff_signal(sample_rate: float = 10.0):
+    """(pressures, timestamps) - trace BP đã ghi nếu có, không thì deflate giả lập"""
+    if BP_TRACE:
+        trace = load_trace(BP_TRACE)
+        pressures = np.asarray(trace['pressures'], dtype=np.float64)
+        return pressures, trace_times(trace, pressures.size, sample_rate)
+
+    t = np.arange(0.0, 45.0, 1.0 / sample_rate)
+    ramp = 165.0 - 3.0 * t
+    envelope = np.exp(-((ramp - 95.0) / 22.0) ** 2)
+    noise = np.random.default_rng(0).normal(0, 0.03, t.size)
+    return ramp + envelope * np.sin(2 * np.pi * 1.2 * t) + noise, t
+
+
+# ==================== BENCHMARKS ====================
+
+def test_bench_calc_hr_and_spo2():
+    """Stage 1: HR/SpO2 window path (5s @ 50 Hz sau resample)"""
+    ir, red = ppg_signal(sample_rate=50, seconds=5.0)
+    ir = ir.astype(np.float64)
+    red = red.astype(np.float64)
+
+    result = run_benchmark(
+        'calc_hr_and_spo2',
+        lambda: HRCalculator.calc_hr_and_spo2(ir, red, 50),
+        samples_per_call=ir.size,
+    )
+    check_budget(result)
+
+
+def test_bench_streaming_hr_tick():
+    """Stage 2: Streaming HR engine - một tick 24 mẫu @ 100 Hz"""
+    ir, red = ppg_signal(sample_rate=100, seconds=20.0)
+    engine = StreamingHRCalculator(input_rate=100, algorithm_rate=50)
+    chunk = 24
+    state = {'pos': 0}
+
+    def tick():
+        pos = state['pos']
+        if pos + chunk > ir.size:
+            pos = 0
+        engine.update(ir[pos:pos + chunk], red[pos:pos + chunk])
+        engine.result()
+        state['pos'] = pos + chunk
+
+    result = run_benchmark('streaming_hr_tick', tick, samples_per_call=chunk, rounds=max(ROUNDS, 200))
+    check_budget(result)
+
+
+def test_bench_measurement_window():
+    """Stage 3: MeasurementWindow add_samples + estimate_quality + recent_array"""
+    ir, red = ppg_signal(sample_rate=100, seconds=20.0)
+    window = MeasurementWindow(sample_rate=100, window_seconds=6.0, min_seconds=3.0)
+    window.add_samples(ir[:600], red[:600])
+    chunk = 24
+    state = {'pos': 600}
+
+    def tick():
+        pos = state['pos']
+        if pos + chunk > ir.size:
+            pos = 0
+        window.add_samples(ir[pos:pos + chunk], red[pos:pos + chunk])
+        window.estimate_quality('ir')
+        window.recent_array(1.2, 'ir')
+        state['pos'] = pos + chunk
+
+    result = run_benchmark('measurement_window', tick, samples_per_call=chunk, rounds=max(ROUNDS, 200))
+    check_budget(result)
+
+
+def test_bench_detect_finger():
+    """Stage 4: Finger detection mỗi tick (add 24 mẫu → thống kê 1.2s cập nhật + scoring)"""
+    ir, red = ppg_signal(sample_rate=100, seconds=10.0)
+    sensor = MAX30102Sensor({'hardware_sample_rate': 100})
+
+    # Baseline khởi tạo khi chưa có ngón tay, rồi mới đặt ngón tay
+    empty = np.full(20, 3000, dtype=np.uint32)
+    sensor.window.add_samples(empty, empty)
+    sensor._detect_finger()
+    sensor.window.add_samples(ir[:600], red[:600])
+    chunk = 24
+    state = {'pos': 600}
+
+    def tick():
+        pos = state['pos']
+        if pos + chunk > ir.size:
+            pos = 600
+        sensor.window.add_samples(ir[pos:pos + chunk], red[pos:pos + chunk])
+        sensor._detect_finger()
+        state['pos'] = pos + chunk
+
+    result = run_benchmark('detect_finger', tick, samples_per_call=chunk, rounds=max(ROUNDS, 200))
+    check_budget(result)
+    assert sensor.finger.detected
+
+
+def test_bench_process_deflate_data():
+    """Stage 5: Oscillometric batch analysis của một lần đo BP (45s @ 10 SPS)"""
+    pressures, timestamps = cuff_signal(10.0)
+    pressures_list = pressures.tolist()
+    timestamps_list = timestamps.tolist()
+    processor = OscillometricProcessor({'sample_rate': 10.0}, logging.getLogger("Bench"))
+
+    result = run_benchmark(
+        'process_deflate_data',
+        lambda: processor.process_deflate_data(pressures_list, timestamps_list),
+        samples_per_call=pressures.size,
+        rounds=max(10, ROUNDS // 5),
+    )
+    check_budget(result)
+
+
+def test_bench_vitals_payload():
+    """Stage 6: VitalsPayload.from_sensor_data + to_dict"""
+    if VitalsPayload is None:
+        pytest.skip("paho-mqtt not installed (src.communication unavailable)")
+
+    sensor_data = {
+        'heart_rate': 75.0,
+        'heart_rate_metadata': {'confidence': 0.9, 'ir_quality': 80.0, 'peak_count': 6},
+        'spo2': 97.5,
+        'spo2_metadata': {'confidence': 0.8, 'r_value': 0.52},
+        'temperature': 36.6,
+        'ambient_temperature': 27.1,
+        'blood_pressure_systolic': 118.0,
+        'blood_pressure_diastolic': 78.0,
+        'blood_pressure_map': 91.0,
+        'bp_metadata': {'valid': True, 'quality': 'good', 'confidence': 0.7},
+    }
+    context = {'battery_level': 90, 'wifi_rssi': -55}
+
+    def build():
+        VitalsPayload.from_sensor_data(
+            'rpi_bp_001', 'patient_001', sensor_data, 'session_1', 1, context
+        ).to_dict()
+
+    result = run_benchmark('vitals_payload', build, samples_per_call=1, rounds=max(ROUNDS, 200))
+    check_budget(result)
+
+
+def test_bench_ppg_payload():
+    """Stage 7: 256 payload MAX30102 giữ trong queue subscriber (record vs dict cũ)"""
+    sensor = MAX30102Sensor({'hardware_sample_rate': 100})
+    sensor.measurement.heart_rate = 75.0
+    sensor.measurement.spo2 = 97.5
+    depth = 256
+
+    def build_records():
+        queue = []
+        for _ in range(depth):
+            reading = sensor._build_payload(24)
+            reading.sensor = sensor.name            # BaseSensor.acquire_once
+            queue.append(reading)
+        return queue
+
+    def build_legacy_dicts():
+        # Payload trước đây: dict mới + timestamp ISO mỗi tick
+        queue = []
+        for _ in range(depth):
+            payload = dict(zip(fields, sensor._build_payload(24).values()))
+            payload['timestamp'] = datetime.now().isoformat()
+            payload['sensor'] = sensor.name
+            queue.append(payload)
+        return queue
+
+    fields = list(sensor._build_payload(0))
+    result = run_benchmark('ppg_payload', build_records, samples_per_call=depth, rounds=max(ROUNDS, 100))
+
+    tracemalloc.start()
+    try:
+        retained = build_legacy_dicts()
+        _, legacy_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del retained
+    print(f"{'  legacy dict payload':<22} alloc={legacy_peak / 1024:8.1f} KiB "
+          f"({legacy_peak / max(result.alloc_bytes, 1):.1f}x records)")
+
+    check_budget(result)
+    assert isinstance(build_records()[0], SensorReading)
+    assert result.alloc_bytes * 2 < legacy_peak
+
+
+# ==================== MAIN ====================
+
+BENCHMARKS = [
+    test_bench_calc_hr_and_spo2,
+    test_bench_streaming_hr_tick,
+    test_bench_measurement_window,
+    test_bench_detect_finger,
+    test_bench_process_deflate_data,
+    test_bench_vitals_payload,
+    test_bench_ppg_payload,
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sensor pipeline benchmarks")
+    parser.add_argument('--trace', help="PPG trace (npz/npy với red, ir) thay cho tín hiệu giả lập")
+    parser.add_argument('--bp-trace', help="BP trace (npz/npy với pressures [+timestamps])")
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--scale', type=float, default=BUDGET_SCALE, help="Hệ số nhân budget")
+    parser.add_argument('--p95-margin', type=float, default=P95_MARGIN, help="Hệ số dự phòng p95 latency")
+    parser.add_argument('--report-latency', action='store_true', help="Không assert p95 latency")
+    args = parser.parse_args()
+
+    PPG_TRACE = args.trace or PPG_TRACE
+    BP_TRACE = args.bp_trace or BP_TRACE
+    ROUNDS = args.rounds
+    BUDGET_SCALE = args.scale
+    P95_MARGIN = args.p95_margin
+    ENFORCE_LATENCY = ENFORCE_LATENCY and not args.report_latency
+
+    print("\n" + "="*60)
+    print(f"SENSOR PIPELINE BENCHMARKS (rounds={ROUNDS}, budget scale={BUDGET_SCALE})")
+    print("="*60)
+
+    failures = 0
+    for bench in BENCHMARKS:
+        try:
+            bench()
+        except pytest.skip.Exception as exc:
+            print(f"- {bench.__name__}: skipped ({exc})")
+        except AssertionError as exc:
+            failures += 1
+            print(f"❌ {exc}")
+
+    if failures:
+        print(f"\n❌ {failures} stage(s) over budget")
+        sys.exit(1)
+    print("\n✅ All stages within budget")
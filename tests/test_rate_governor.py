@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Test Rate Governor (idle rate / power-down theo trạng thái đo)
+===============================================================
+
+RateGovernor giảm sample rate khi sensor idle, power-down khi idle kéo dài,
+ramp lên ngay khi có hoạt động / wake(); thống kê duty cycle + CPU time.
+Chạy cả thread _reading_loop, AcquisitionScheduler và MAX30102 replay.
+
+Usage:
+    python3 tests/test_rate_governor.py
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.acquisition_scheduler import AcquisitionScheduler
+from src.sensors.base_sensor import BaseSensor
+from src.sensors.max30102_sensor import MAX30102Sensor
+from src.sensors.mlx90614_sensor import MLX90614Sensor
+from src.sensors.rate_governor import STATE_ACTIVE, STATE_IDLE, STATE_POWER_DOWN
+from src.sensors.replay import save_trace
+
+
+class PresenceSensor(BaseSensor):
+    """Sensor giả: idle khi present=False, đếm số lần đọc, power-down tùy chọn"""
+
+    def __init__(self, rate=100, governor=None):
+        super().__init__("Presence", {'sample_rate': rate, 'rate_governor': governor or {}})
+        self.present = True
+        self.allow_power_down = False
+        self.powered = True
+        self.power_events = []
+        self.reads = 0
+
+    def initialize(self):
+        return True
+
+    def cleanup(self):
+        pass
+
+    def read_raw_data(self):
+        self.reads += 1
+        # Chút CPU mỗi lần đọc (giống xử lý tín hiệu thật)
+        return sum(i * i for i in range(2000))
+
+    def process_data(self, raw_data):
+        return {'value': raw_data}
+
+    def is_idle(self):
+        return not self.present
+
+    def enter_low_power(self):
+        if not self.allow_power_down:
+            return False
+        self.powered = False
+        self.power_events.append("down")
+        return True
+
+    def exit_low_power(self):
+        self.powered = True
+        self.power_events.append("up")
+
+
+def reads_during(sensor, seconds):
+    before = sensor.reads
+    time.sleep(seconds)
+    return sensor.reads - before
+
+
+def test_idle_throttle_and_ramp_up():
+    """Test 1: Thread mode: idle → idle_rate sau hysteresis, hoạt động → full rate ngay"""
+    print("\n" + "="*60)
+    print("TEST 1: Idle throttling + immediate ramp-up")
+    print("="*60)
+
+    sensor = PresenceSensor(rate=100, governor={'enabled': True, 'idle_rate': 5.0, 'idle_after_s': 0.2})
+    assert sensor.start()
+
+    active_reads = reads_during(sensor, 0.5)
+    sensor.present = False
+    time.sleep(0.3)                                     # Hysteresis 0.2 s + chuyển trạng thái
+    idle_reads = reads_during(sensor, 0.6)
+    assert sensor.governor.state == STATE_IDLE and sensor.sample_rate == 5.0
+
+    sensor.present = True
+    time.sleep(0.3)                                     # ≤ 1 chu kỳ idle (0.2 s) để phát hiện
+    assert sensor.governor.state == STATE_ACTIVE and sensor.sample_rate == 100
+    ramp_reads = reads_during(sensor, 0.5)
+
+    stats = sensor.get_sensor_info()['governor']
+    sensor.stop()
+    print(f"✓ reads: active={active_reads}/0.5s idle={idle_reads}/0.6s ramp={ramp_reads}/0.5s")
+    print(f"✓ duty={stats['duty_cycle']:.2f}, cpu/read={stats['cpu_per_read_us']:.0f} µs, "
+          f"saved={stats['cpu_saved_s'] * 1000:.1f} ms, transitions={stats['transitions']}")
+
+    assert active_reads >= 35 and ramp_reads >= 35
+    assert idle_reads <= 5
+    assert stats['transitions'] == 2
+    assert 0.3 < stats['duty_cycle'] < 0.9
+    assert stats['reads'][STATE_IDLE] > 0 and stats['cpu_saved_s'] > 0.0
+
+
+def test_power_down_and_wake():
+    """Test 2: Power-down chỉ khi sensor cho phép; wake() bật lại + về full rate"""
+    print("\n" + "="*60)
+    print("TEST 2: Power-down + wake()")
+    print("="*60)
+
+    sensor = PresenceSensor(rate=50, governor={
+        'enabled': True, 'idle_rate': 10.0, 'idle_after_s': 0.1, 'power_down_after_s': 0.3,
+    })
+    assert sensor.start()
+    sensor.present = False
+    time.sleep(0.5)
+    assert sensor.governor.state == STATE_IDLE          # enter_low_power() từ chối → giữ IDLE
+
+    sensor.allow_power_down = True
+    time.sleep(0.3)
+    assert sensor.governor.state == STATE_POWER_DOWN and not sensor.powered
+
+    sensor.governor.wake()                              # Ví dụ: begin_measurement_session
+    stats = sensor.governor.get_stats()
+    print(f"✓ events={sensor.power_events}, time_s={ {k: round(v, 2) for k, v in stats['time_s'].items()} }")
+    assert sensor.governor.state == STATE_ACTIVE and sensor.powered
+    assert sensor.sample_rate == 50 and sensor.power_events == ["down", "up"]
+    assert stats['time_s'][STATE_POWER_DOWN] > 0.0
+
+    # stop() khi đang idle: lần start sau bắt đầu ở active rate
+    time.sleep(0.2)
+    assert sensor.governor.state == STATE_IDLE
+    sensor.stop()
+    assert sensor.sample_rate == 50 and sensor.governor.state == STATE_ACTIVE
+
+
+def test_governor_on_scheduler():
+    """Test 3: Sensor trong AcquisitionScheduler: rate task đổi theo governor"""
+    print("\n" + "="*60)
+    print("TEST 3: Governor + AcquisitionScheduler.set_rate")
+    print("="*60)
+
+    scheduler = AcquisitionScheduler("governor")
+    sensor = PresenceSensor(rate=100, governor={'enabled': True, 'idle_rate': 4.0, 'idle_after_s': 0.1})
+    sensor.set_scheduler(scheduler)
+    assert sensor.start()
+
+    sensor.present = False
+    time.sleep(0.3)
+    idle_rate = scheduler.get_metrics()['Presence']['rate_hz']
+    idle_reads = reads_during(sensor, 0.5)
+
+    before = sensor.reads
+    sensor.present = True
+    sensor.governor.wake()                              # Từ thread khác, task đang chờ trong heap
+    woke = time.monotonic()
+    while sensor.reads == before and time.monotonic() - woke < 0.5:
+        time.sleep(0.001)
+    first_read_s = time.monotonic() - woke
+    active_rate = scheduler.get_metrics()['Presence']['rate_hz']
+    active_reads = reads_during(sensor, 0.5)
+
+    sensor.stop()
+    scheduler.stop()
+    print(f"✓ rate idle={idle_rate:.1f} Hz → active={active_rate:.1f} Hz, first read after wake {first_read_s * 1000:.0f} ms")
+    print(f"✓ reads idle={idle_reads}/0.5s active={active_reads}/0.5s")
+
+    assert abs(idle_rate - 4.0) < 1e-6 and abs(active_rate - 100.0) < 1e-6
+    assert idle_reads <= 4 and active_reads >= 35
+    assert first_read_s < 0.1                           # Không chờ hết chu kỳ idle 250 ms
+
+
+def finger_ppg(sample_rate: float, seconds: float, bpm: float = 72.0):
+    """PPG có ngón tay (IR ~100k DC + xung) như khi đặt ngón tay lên cảm biến"""
+    t = np.arange(0.0, seconds, 1.0 / sample_rate)
+    pulse = np.sin(2 * np.pi * t * bpm / 60.0)
+    return (100000 + 800 * pulse).astype(np.uint32), (80000 + 400 * pulse).astype(np.uint32)
+
+
+def test_max30102_idle_without_finger():
+    """Test 4: MAX30102 không có ngón tay: idle → LED dòng thấp; đặt ngón tay → active (không cần session)"""
+    print("\n" + "="*60)
+    print("TEST 4: MAX30102 governor (low-current finger detection)")
+    print("="*60)
+
+    flat = np.full(int(100 * 2.5), 3000, dtype=np.uint32)   # 2.5 s không có ngón tay @ 100 SPS
+    ir, red = finger_ppg(100.0, 8.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = save_trace(Path(tmp) / "finger.npz", red=np.concatenate([flat, red]),
+                          ir=np.concatenate([flat, ir]), sample_rate=100.0)
+        sensor = MAX30102Sensor({
+            'sample_rate': 20,
+            'hardware_sample_rate': 100,
+            'replay': {'path': str(path), 'speed': 1.0},
+            'rate_governor': {'enabled': True, 'idle_rate': 5.0, 'idle_after_s': 0.2, 'power_down_after_s': 0.5},
+        })
+        assert sensor.start()
+
+        leds = []
+        hardware = sensor.hardware
+        set_led_amplitudes = hardware.set_led_amplitudes
+        hardware.set_led_amplitudes = lambda led1, led2: (leds.append((led1, led2)), set_led_amplitudes(led1, led2))
+        hardware.shutdown = lambda: leds.append("shutdown")
+
+        sensor.begin_measurement_session()
+        time.sleep(0.8)
+        in_session = sensor.governor.state               # Có session: không power-down
+        sensor.end_measurement_session()
+
+        deadline = time.time() + 2.0
+        while sensor.governor.state != STATE_POWER_DOWN and time.time() < deadline:
+            time.sleep(0.02)
+        powered_down = sensor.governor.state
+
+        # Ngón tay xuất hiện trong trace: proximity ở dòng LED thấp → ACTIVE, finger detection xác nhận
+        deadline = time.time() + 5.0
+        while not (sensor.finger.detected and sensor.governor.state == STATE_ACTIVE) and time.time() < deadline:
+            time.sleep(0.02)
+        woke, detected = sensor.governor.state, sensor.finger.detected
+        led_writes = list(leds)                           # Trước stop(): cleanup() shutdown là bình thường
+        sensor.stop()
+
+    print(f"✓ in session={in_session}, no finger={powered_down}, finger={woke} (detected={detected}), leds={led_writes}")
+    assert in_session == STATE_IDLE
+    assert powered_down == STATE_POWER_DOWN
+    assert woke == STATE_ACTIVE and detected and not sensor.session.active
+    assert "shutdown" not in led_writes
+    assert led_writes[:2] == [(0x08, 0x08), (sensor.pulse_amplitude_red, sensor.pulse_amplitude_ir)]
+
+
+def test_mlx90614_session_wakes_governor():
+    """Test 5: MLX90614 idle (không có người) → begin_measurement_session → active rate ngay"""
+    print("\n" + "="*60)
+    print("TEST 5: MLX90614 measurement session wake")
+    print("="*60)
+
+    sensor = MLX90614Sensor({'sample_rate': 2.0,
+                             'rate_governor': {'enabled': True, 'idle_rate': 0.5, 'idle_after_s': 1.0}})
+    now = time.monotonic()
+    sensor.governor.update(now)
+    assert sensor.governor.update(now + 1.5) == STATE_IDLE and sensor.sample_rate == 0.5
+
+    sensor.begin_measurement_session()
+    state, rate = sensor.governor.state, sensor.sample_rate
+    assert not sensor.is_idle() and sensor.governor.update(now + 10.0) == STATE_ACTIVE
+
+    sensor.end_measurement_session()
+    assert sensor.is_idle()
+    print(f"✓ session: {state} @ {rate} Hz")
+    assert state == STATE_ACTIVE and rate == 2.0
+
+
+if __name__ == "__main__":
+    test_idle_throttle_and_ramp_up()
+    test_power_down_and_wake()
+    test_governor_on_scheduler()
+    test_max30102_idle_without_finger()
+    test_mlx90614_session_wakes_governor()
+    print("\n✅ All rate governor tests passed")
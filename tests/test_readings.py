@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test Sensor Readings (record __slots__ thay cho dict payload)
+==============================================================
+
+PPGReading/PressureReading: tương thích Mapping với consumer cũ, không có
+__dict__, timestamp monotonic, to_dict() ở biên GUI/MQTT và tích hợp
+BaseSensor/SensorChannel.
+
+Usage:
+    python3 tests/test_readings.py
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.base_sensor import BaseSensor
+from src.sensors.max30102_sensor import MAX30102Sensor
+from src.sensors.readings import PPGReading, PressureReading, SensorReading
+
+
+class PressureSensor(BaseSensor):
+    """Sensor giả trả PressureReading như HX710BSensor"""
+
+    def __init__(self):
+        super().__init__("BP_ADC", {'sample_rate': 100})
+        self.counts = 1000
+
+    def initialize(self):
+        return True
+
+    def cleanup(self):
+        pass
+
+    def read_raw_data(self):
+        self.counts += 1
+        return self.counts
+
+    def process_data(self, raw_data):
+        return PressureReading(raw_data * 0.1, raw_data, raw_data - 1000)
+
+
+def test_mapping_compatibility():
+    """Test 1: data['x'], data.get(), dict(data), 'x' in data như dict cũ"""
+    print("\n" + "="*60)
+    print("TEST 1: Mapping compatibility")
+    print("="*60)
+
+    sensor = MAX30102Sensor({'hardware_sample_rate': 100})
+    sensor.measurement.heart_rate = 72.0
+    reading = sensor._build_payload(24)
+
+    assert isinstance(reading, PPGReading)
+    assert reading['heart_rate'] == 72.0 and reading.get('read_size') == 24
+    assert reading.get('buffer_fill', 0) == 0                    # Key không có → default
+    assert 'spo2_cv' in reading and 'buffer_fill' not in reading
+    assert len(reading) == len(PPGReading._fields) + 2
+    assert set(dict(reading)) == set(PPGReading._fields) | {'timestamp', 'sensor'}
+    assert not hasattr(reading, '__dict__')
+
+    try:
+        reading['heart_rate'] = 0
+        mutable = True
+    except TypeError:
+        mutable = False
+    assert not mutable
+    print(f"✓ {reading!r}"[:100] + "...")
+
+
+def test_timestamps_and_to_dict():
+    """Test 2: timestamp monotonic trên hot path, ISO wall clock ở to_dict()"""
+    print("\n" + "="*60)
+    print("TEST 2: Monotonic timestamp + to_dict()")
+    print("="*60)
+
+    before = time.monotonic()
+    reading = PressureReading(120.5, 123456, 110956)
+    assert before <= reading.timestamp <= time.monotonic()
+    assert abs(reading.wall_time() - time.time()) < 1.0
+
+    data = reading.to_dict()
+    print(f"✓ {data}")
+    assert type(data) is dict
+    assert data['pressure_mmhg'] == 120.5 and data['valid'] is True
+    parsed = datetime.fromisoformat(data['timestamp'])
+    assert abs(parsed.timestamp() - time.time()) < 1.0
+
+
+def test_base_sensor_publishes_records():
+    """Test 3: BaseSensor publish record không copy; get_latest_data() → dict"""
+    print("\n" + "="*60)
+    print("TEST 3: BaseSensor + SensorChannel with records")
+    print("="*60)
+
+    sensor = PressureSensor()
+    received = []
+    sensor.set_data_callback(lambda name, data: received.append(data))
+
+    assert sensor.acquire_once() and sensor.acquire_once()
+    snapshot = sensor.get_snapshot(0)
+    latest = sensor.get_latest_data()
+    print(f"✓ snapshot v{snapshot.version}: {snapshot.data!r}")
+
+    assert isinstance(snapshot.data, SensorReading)
+    assert snapshot.data is received[-1]                         # Cùng object, không copy
+    assert snapshot.data.sensor == "BP_ADC" and received[0].counts == 1001
+    assert type(latest) is dict and latest['sensor'] == "BP_ADC"
+    assert isinstance(latest['timestamp'], str) and latest['counts'] == 1002
+
+
+if __name__ == "__main__":
+    test_mapping_compatibility()
+    test_timestamps_and_to_dict()
+    test_base_sensor_publishes_records()
+    print("\n✅ All sensor reading tests passed")
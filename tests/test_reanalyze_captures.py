@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test Reanalyze Captures (batch re-analysis CLI cho capture đã lưu)
+===================================================================
+
+scripts/reanalyze_captures.py trên thư mục capture giả lập: trace NPZ/NPY,
+capture cũ pressures_<ts>.npy + timestamps_<ts>.npy, counts ADC qua
+calibration, file hỏng; process pool cho cùng kết quả với chạy tuần tự.
+
+Usage:
+    python3 tests/test_reanalyze_captures.py
+"""
+
+import csv
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.reanalyze_captures import COLUMNS, discover_captures, main, run_batch
+from src.sensors.replay import save_trace
+
+
+CALIBRATION = {'offset_counts': 1000000, 'slope_mmhg_per_count': 3.0e-05}
+SETTINGS = {
+    'algorithm': {'sample_rate': 10.0, 'sys_ratio': 0.55, 'dia_ratio': 0.8},
+    'calibration': CALIBRATION,
+    'ppg_sample_rate': 100.0,
+    'hr_algorithm_rate': 50,
+}
+
+
+def cuff_signal(sample_rate: float = 10.0, seed: int = 0):
+    """Pha xả 165 → 30 mmHg, envelope đỉnh quanh 95 mmHg"""
+    t = np.arange(0.0, 45.0, 1.0 / sample_rate)
+    ramp = 165.0 - 3.0 * t
+    envelope = np.exp(-((ramp - 95.0) / 22.0) ** 2)
+    noise = np.random.default_rng(seed).normal(0, 0.03, t.size)
+    return ramp + envelope * np.sin(2 * np.pi * 1.2 * t) + noise, t
+
+
+def ppg_signal(sample_rate: int = 100, seconds: float = 12.0):
+    """PPG giả lập 75 BPM"""
+    t = np.arange(0, seconds, 1.0 / sample_rate)
+    phase = (t * 75 / 60) % 1
+    pulse = np.where(phase < 0.3, np.sin(np.pi * phase / 0.6), np.cos(np.pi * (phase - 0.3) / 1.4))
+    noise = np.random.default_rng(0).normal(0, 10, t.size)
+    ir = (100000 + 800 * pulse + noise).astype(np.uint32)
+    red = (80000 + 400 * pulse + noise / 2).astype(np.uint32)
+    return ir, red
+
+
+def make_captures(root: Path) -> None:
+    pressures, times = cuff_signal()
+    save_trace(root / "bp_trace.npz", pressures=pressures, timestamps=times)
+    save_trace(root / "field" / "bp_counts.npy",
+               counts=(pressures / CALIBRATION['slope_mmhg_per_count'] + CALIBRATION['offset_counts']).astype(np.int64),
+               timestamps=times)
+
+    # Capture cũ từ capture_bp_data.py
+    np.save(root / "field" / "pressures_20260101_080000.npy", cuff_signal(seed=1)[0])
+    np.save(root / "field" / "timestamps_20260101_080000.npy", times + 1.7e9)
+
+    ir, red = ppg_signal()
+    save_trace(root / "ppg_trace.npy", ir=ir, red=red)
+
+    save_trace(root / "bp_short.npz", pressures=pressures[:20], sample_rate=10.0)
+    (root / "broken.npy").write_bytes(b"not a numpy file")
+
+
+def test_discover_and_analyze():
+    """Test 1: Discovery + kết quả BP/PPG, lỗi ghi vào status thay vì dừng batch"""
+    print("\n" + "="*60)
+    print("TEST 1: discover_captures + run_batch")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "field").mkdir()
+        make_captures(root)
+
+        jobs = discover_captures(root)
+        names = [Path(job['path']).name for job in jobs]
+        print(f"✓ jobs: {names}")
+        assert len(jobs) == 6 and not any(name.startswith('timestamps_') for name in names)
+
+        rows = {Path(row['file']).name: row for row in run_batch(jobs, SETTINGS, workers=1)}
+
+    for name in ("bp_trace.npz", "bp_counts.npy", "pressures_20260101_080000.npy"):
+        row = rows[name]
+        print(f"✓ {name}: {row['systolic']}/{row['diastolic']} MAP={row['map']} "
+              f"load={row['load_ms']:.2f} ms analyze={row['analyze_ms']:.2f} ms")
+        assert row['status'] == "ok" and row['kind'] == "bp"
+        assert 110 < row['systolic'] < 140 and 60 < row['diastolic'] < 95
+        assert row['n_samples'] == 450 and abs(row['sample_rate'] - 10.0) < 0.1
+        assert row['load_ms'] >= 0 and row['analyze_ms'] > 0
+
+    # Counts → mmHg qua calibration cho cùng kết quả với trace mmHg
+    assert abs(rows["bp_counts.npy"]['systolic'] - rows["bp_trace.npz"]['systolic']) < 0.5
+
+    ppg = rows["ppg_trace.npy"]
+    print(f"✓ ppg: HR={ppg['heart_rate']} SpO2={ppg['spo2']} windows={ppg['hr_valid_windows']}/{ppg['windows']}")
+    assert ppg['status'] == "ok" and ppg['kind'] == "ppg"
+    assert abs(ppg['heart_rate'] - 75) < 5 and ppg['windows'] == 6
+
+    assert rows["bp_short.npz"]['status'] == "failed"
+    assert rows["broken.npy"]['status'] == "error" and rows["broken.npy"]['error']
+
+
+def test_cli_process_pool_csv():
+    """Test 2: CLI với 2 workers → CSV cột cố định, khớp kết quả tuần tự"""
+    print("\n" + "="*60)
+    print("TEST 2: CLI + process pool + CSV")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "captures"
+        (root / "field").mkdir(parents=True)
+        make_captures(root)
+        sequential = run_batch(discover_captures(root), SETTINGS, workers=1)
+
+        output = Path(tmp) / "out" / "results.csv"
+        status = main([str(root), '-o', str(output), '--workers', '2',
+                       '--offset', str(CALIBRATION['offset_counts']),
+                       '--slope', str(CALIBRATION['slope_mmhg_per_count'])])
+        assert status == 0
+
+        with open(output, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames
+            rows = list(reader)
+
+    print(f"✓ {len(rows)} rows, columns={len(header)}")
+    assert header == COLUMNS and len(rows) == len(sequential)
+    for row, expected in zip(rows, sequential):
+        assert row['file'] == expected['file'] and row['status'] == expected['status']
+        if expected['systolic'] is not None:
+            assert float(row['systolic']) == expected['systolic']
+        assert row['analyze_ms'] != ""
+
+
+if __name__ == "__main__":
+    test_discover_and_analyze()
+    test_cli_process_pool_csv()
+    print("\n✅ All reanalyze captures tests passed")
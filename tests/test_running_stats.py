@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test Running Statistics (finger detection trên cửa sổ trượt)
+=============================================================
+
+SlidingWindowStats phải cho cùng kết quả với np.mean/np.percentile/np.median
+trên recent_array() ở mọi kích thước chunk, và _detect_finger giữ nguyên
+quyết định so với cách tính lại toàn cửa sổ.
+
+Usage:
+    python3 tests/test_running_stats.py
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.max30102_sensor import MAX30102Sensor, MeasurementWindow
+from src.sensors.running_stats import SlidingWindowStats
+
+
+def test_matches_numpy_on_sliding_window():
+    """Test 1: mean/std/quantile == numpy trên N mẫu cuối, mọi kiểu chunk"""
+    print("\n" + "="*60)
+    print("TEST 1: SlidingWindowStats vs numpy")
+    print("="*60)
+
+    rng = np.random.default_rng(7)
+    stream = rng.integers(40000, 140000, size=3000).astype(np.uint32)
+    stats = SlidingWindowStats(120, order_stats=True)
+
+    pos = 0
+    checks = 0
+    for chunk in [1, 5, 24, 119, 120, 250, 3, 24] * 10:
+        if pos + chunk > stream.size:
+            break
+        stats.push(stream[pos:pos + chunk])
+        pos += chunk
+
+        window = stream[max(0, pos - 120):pos].astype(np.float64)
+        assert stats.count == window.size
+        assert np.isclose(stats.mean, window.mean(), rtol=0, atol=1e-6)
+        assert np.isclose(stats.std, window.std(), rtol=1e-9, atol=1e-3)
+        for q in (0.05, 0.10, 0.5, 0.95):
+            assert np.isclose(stats.quantile(q), np.percentile(window, 100 * q), rtol=0, atol=1e-6)
+        assert stats.median() == stats.quantile(0.5)
+        checks += 1
+
+    print(f"✓ {checks} windows checked, final mean={stats.mean:.1f}, p95={stats.quantile(0.95):.1f}")
+
+    stats.reset()
+    assert stats.count == 0 and stats.mean == 0.0 and stats.quantile(0.5) == 0.0
+
+
+def test_window_tracks_recent_samples():
+    """Test 2: MeasurementWindow.recent_ir/red khớp recent_array(1.2s), reset theo window"""
+    print("\n" + "="*60)
+    print("TEST 2: MeasurementWindow recent stats")
+    print("="*60)
+
+    window = MeasurementWindow(sample_rate=100, window_seconds=6.0, min_seconds=3.0)
+    t = np.arange(1000) / 100.0
+    ir = 100000 + 800 * np.sin(2 * np.pi * 1.2 * t)
+    red = 80000 + 500 * np.sin(2 * np.pi * 1.2 * t)
+
+    for start in range(0, 1000, 24):
+        window.add_samples(ir[start:start + 24], red[start:start + 24])
+        recent = window.recent_array(1.2, 'ir')
+        assert window.recent_ir.count == recent.size
+        assert np.isclose(window.recent_ir.quantile(0.95), np.percentile(recent, 95))
+        assert np.isclose(window.recent_red.mean, np.mean(window.recent_array(1.2, 'red')))
+
+    print(f"✓ recent size={window.recent_ir.size}, median={window.recent_ir.median():.0f}")
+
+    # Kích thước IR/RED khác nhau: cả ring và stats chỉ lấy phần chung
+    window.add_samples(ir[:10], red[:7])
+    assert window.recent_ir.count == window.recent_red.count == window.recent_array(1.2, 'ir').size
+
+    window.reset()
+    assert window.recent_ir.count == 0 and window.recent_red.count == 0
+
+
+def test_detect_finger_incremental():
+    """Test 3: Phát hiện / nhả ngón tay; mỗi tick không cấp phát theo kích thước cửa sổ"""
+    print("\n" + "="*60)
+    print("TEST 3: _detect_finger on running statistics")
+    print("="*60)
+
+    sensor = MAX30102Sensor({'hardware_sample_rate': 100})
+    t = np.arange(1500) / 100.0
+    finger_ir = (120000 + 900 * np.sin(2 * np.pi * 1.2 * t)).astype(np.uint32)
+    finger_red = (100000 + 600 * np.sin(2 * np.pi * 1.2 * t)).astype(np.uint32)
+    empty = np.full(1500, 3000, dtype=np.uint32)
+
+    def feed(ir, red, seconds):
+        states = []
+        for start in range(0, int(seconds * 100), 24):
+            sensor.window.add_samples(ir[start:start + 24], red[start:start + 24])
+            states.append(sensor._detect_finger())
+        return states
+
+    assert not any(feed(empty, empty, 2.0))
+    detected = feed(finger_ir, finger_red, 5.0)
+    print(f"✓ detected after {detected.index(True)} ticks, score={sensor.finger.detection_score:.2f}")
+    assert detected[-1] and sensor.finger.signal_amplitude > 1000
+
+    # Steady state: cửa sổ 8s đã đầy (order statistics toàn cửa sổ không còn lớn thêm)
+    feed(finger_ir[500:], finger_red[500:], 4.0)
+    assert len(sensor.window) == sensor.window.max_samples
+
+    tracemalloc.start()
+    try:
+        feed(finger_ir[500:], finger_red[500:], 2.0)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"✓ peak alloc over 2s of ticks: {peak} bytes")
+    assert peak < 8 * 1024
+
+    released = feed(empty, empty, 3.0)
+    assert not released[-1] and sensor.finger.detection_score == 0.0
+
+
+if __name__ == "__main__":
+    test_matches_numpy_on_sliding_window()
+    test_window_tracks_recent_samples()
+    test_detect_finger_incremental()
+    print("\n✅ All running statistics tests passed")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test Sample Buffer + HX710B Lossless Stream
+============================================
+
+Kiểm tra TimestampedRingBuffer và continuous stream của HX710BDriver
+(không cần phần cứng - conversions được giả lập).
+
+Usage:
+    python3 tests/test_sample_buffer.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.sample_buffer import TimestampedRingBuffer
+from src.sensors.hx710b_driver import HX710BDriver, HX710Mode
+
+
+def test_ring_buffer_order_and_wrap():
+    """Test 1: Drain giữ đúng thứ tự kể cả khi wrap-around"""
+    print("\n" + "="*60)
+    print("TEST 1: Ring buffer order + wrap-around")
+    print("="*60)
+
+    ring = TimestampedRingBuffer(capacity=8, dtype=np.int32)
+
+    for i in range(6):
+        ring.push(i, i * 0.1)
+    values, _ = ring.drain(max_items=4)
+    assert values.tolist() == [0, 1, 2, 3]
+
+    for i in range(6, 12):
+        ring.push(i, i * 0.1)
+    values, timestamps = ring.drain()
+    print(f"✓ Drained after wrap: {values.tolist()}")
+
+    assert values.tolist() == [4, 5, 6, 7, 8, 9, 10, 11]
+    assert np.allclose(timestamps, np.arange(4, 12) * 0.1)
+    assert ring.get_stats()['dropped'] == 0
+
+
+def test_ring_buffer_overflow_counts_drops():
+    """Test 2: Overflow ghi đè mẫu cũ nhất và đếm dropped"""
+    print("\n" + "="*60)
+    print("TEST 2: Ring buffer overflow")
+    print("="*60)
+
+    ring = TimestampedRingBuffer(capacity=4)
+    for i in range(10):
+        ring.push(i, float(i))
+
+    values, _ = ring.drain()
+    stats = ring.get_stats()
+    print(f"✓ Kept: {values.tolist()}, stats: {stats}")
+
+    assert values.tolist() == [6, 7, 8, 9]
+    assert stats['dropped'] == 6
+    assert len(ring) == 0
+
+
+def test_driver_stream_duplicates_and_missed():
+    """Test 3: Continuous loop phân loại duplicate/missed theo timestamp conversion"""
+    print("\n" + "="*60)
+    print("TEST 3: HX710B stream counters")
+    print("="*60)
+
+    driver = HX710BDriver(gpio_dout=6, gpio_sck=5, mode=HX710Mode.DIFFERENTIAL_40SPS)
+
+    # 40 SPS → period 25ms: t=0.050 là duplicate, 0.100→0.175 bỏ lỡ 2 conversions
+    conversions = [(100, 0.000), (101, 0.025), (102, 0.050), (102, 0.055), (103, 0.100), (104, 0.175)]
+
+    def fake_read_with_timestamp(timeout_ms=None):
+        if not conversions:
+            driver._stop_continuous.set()
+            return None
+        value, timestamp = conversions.pop(0)
+        driver._last_value = value
+        return value, timestamp
+
+    driver.read_with_timestamp = fake_read_with_timestamp
+    driver._continuous_read_loop()
+
+    counts, timestamps = driver.drain()
+    stats = driver.get_stats()
+    print(f"✓ Counts: {counts.tolist()}, stats: {stats}")
+
+    assert counts.tolist() == [100, 101, 102, 103, 104]
+    assert np.allclose(timestamps, [0.000, 0.025, 0.050, 0.100, 0.175])
+    assert stats['stream_duplicates'] == 1
+    assert stats['stream_missed'] == 3
+    assert stats['stream_dropped'] == 0
+
+
+if __name__ == "__main__":
+    test_ring_buffer_order_and_wrap()
+    test_ring_buffer_overflow_counts_drops()
+    test_driver_stream_duplicates_and_missed()
+    print("\n✅ All sample buffer tests passed")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test Sensor Channel (publish/subscribe trên BaseSensor)
+========================================================
+
+Snapshot có version (reader bỏ qua data không đổi), queue giới hạn theo
+subscriber với drop-oldest + back-pressure stats, và tích hợp BaseSensor.
+
+Usage:
+    python3 tests/test_sensor_channel.py
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.base_sensor import BaseSensor
+from src.sensors.sensor_channel import SensorChannel
+
+
+class CounterSensor(BaseSensor):
+    """Sensor giả: mỗi lần đọc trả về số đếm tăng dần"""
+
+    def __init__(self, rate=200):
+        super().__init__("Counter", {'sample_rate': rate})
+        self.count = 0
+
+    def initialize(self):
+        return True
+
+    def cleanup(self):
+        pass
+
+    def read_raw_data(self):
+        self.count += 1
+        return self.count
+
+    def process_data(self, raw_data):
+        return {'value': raw_data}
+
+
+def test_versioned_snapshots():
+    """Test 1: read_if_newer chỉ trả snapshot mới; data read-only, không copy"""
+    print("\n" + "="*60)
+    print("TEST 1: Versioned snapshots")
+    print("="*60)
+
+    channel = SensorChannel("test")
+    assert channel.latest() is None and channel.read_if_newer(0) is None
+
+    first = channel.publish({'value': 1})
+    assert channel.read_if_newer(0) is first
+    assert channel.read_if_newer(first.version) is None     # Không đổi → bỏ qua
+
+    second = channel.publish({'value': 2})
+    assert second.version == first.version + 1
+    assert channel.read_if_newer(first.version).data['value'] == 2
+    assert channel.latest() is second                        # Cùng object, không copy
+
+    try:
+        second.data['value'] = 99
+        mutable = True
+    except TypeError:
+        mutable = False
+    assert not mutable
+    print(f"✓ version={channel.version}, data read-only")
+
+
+def test_bounded_fanout_and_backpressure():
+    """Test 2: Subscriber chậm chỉ mất mẫu cũ của chính nó"""
+    print("\n" + "="*60)
+    print("TEST 2: Bounded per-subscriber queues")
+    print("="*60)
+
+    channel = SensorChannel("test")
+    fast = channel.subscribe("gui", maxsize=4)
+    slow = channel.subscribe("db", maxsize=8)
+
+    seen = []
+    for value in range(1, 21):
+        channel.publish({'value': value})
+        seen.append(fast.get(timeout=0).data['value'])       # Consumer theo kịp
+
+    pending = [snap.data['value'] for snap in slow.drain()]
+    stats = channel.get_stats()['subscribers']
+    print(f"✓ gui={stats['gui']}")
+    print(f"✓ db={stats['db']}, kept {pending}")
+
+    assert seen == list(range(1, 21)) and stats['gui']['dropped'] == 0
+    assert pending == list(range(13, 21))                     # 8 mẫu mới nhất
+    assert stats['db']['dropped'] == 12 and stats['db']['max_depth'] == 8
+    assert stats['db']['delivered'] == 20 and stats['db']['consumed'] == 8
+
+    slow.close()
+    channel.publish({'value': 21})
+    assert slow.pending() == 0 and list(channel.get_stats()['subscribers']) == ["gui"]
+    assert fast.get(timeout=0.01).data['value'] == 21
+    assert fast.get(timeout=0.01) is None
+
+
+def test_base_sensor_publishes_to_subscribers():
+    """Test 3: BaseSensor reading loop → nhiều consumer, không poll"""
+    print("\n" + "="*60)
+    print("TEST 3: BaseSensor fan-out")
+    print("="*60)
+
+    sensor = CounterSensor(rate=200)
+    mqtt = sensor.subscribe("mqtt", maxsize=256)
+    gui = sensor.subscribe("gui", maxsize=1)                  # Chỉ cần giá trị mới nhất
+
+    received = []
+
+    def consumer():
+        while len(received) < 50:
+            snapshot = mqtt.get(timeout=1.0)
+            if snapshot is None:
+                break
+            received.append(snapshot.version)
+
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    assert sensor.start()
+    thread.join(timeout=3.0)
+    time.sleep(0.05)
+    sensor.stop()
+
+    info = sensor.get_sensor_info()['channel']
+    latest = sensor.get_latest_data()
+    latest['value'] = -1                                       # Bản copy: không ảnh hưởng snapshot
+    print(f"✓ mqtt received {len(received)} in order, gui stats={info['subscribers']['gui']}")
+
+    assert received == list(range(1, 51))
+    assert gui.pending() == 1 and info['subscribers']['gui']['dropped'] >= 40
+    assert gui.get(timeout=0).version == info['version']
+    assert sensor.get_snapshot(0).data['value'] == sensor.count
+    assert sensor.get_snapshot(info['version']) is None
+
+
+def test_callback_cannot_mutate_snapshot():
+    """Test 4: data_callback sửa dict của nó - snapshot / subscriber / latest_data không đổi"""
+    print("\n" + "="*60)
+    print("TEST 4: data_callback gets its own dict")
+    print("="*60)
+
+    sensor = CounterSensor()
+    sub = sensor.subscribe("db", maxsize=4)
+    seen = []
+
+    def callback(name, data):
+        seen.append(dict(data))
+        data['value'] = -1                                     # Consumer "tiện tay" sửa payload
+        data['tag'] = 'callback'
+
+    sensor.set_data_callback(callback)
+    assert sensor.acquire_once()
+
+    snapshot = sub.get(timeout=0)
+    print(f"✓ callback saw {seen[0]}, snapshot={dict(snapshot.data)}")
+
+    assert seen[0]['value'] == 1 and seen[0]['sensor'] == "Counter"
+    assert snapshot.data['value'] == 1 and 'tag' not in snapshot.data
+    assert sensor.get_snapshot(0) is not None and sensor.get_snapshot(0).data is snapshot.data
+    assert sensor.latest_data is snapshot.data
+    assert sensor.get_latest_data()['value'] == 1
+    assert not hasattr(sensor, 'data_lock')
+
+
+if __name__ == "__main__":
+    test_versioned_snapshots()
+    test_bounded_fanout_and_backpressure()
+    test_base_sensor_publishes_to_subscribers()
+    test_callback_cannot_mutate_snapshot()
+    print("\n✅ All sensor channel tests passed")
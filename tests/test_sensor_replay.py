@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Test Sensor Replay Backends
+============================
+
+Phát lại trace đã ghi qua ReplaySMBus (MAX30102) và ReplayHX710BDriver
+(HX710B) - chạy nguyên đường đọc FIFO / stream, không cần phần cứng -
+và cả một lần đo BloodPressureSensor (pump/valve giả lập) theo virtual time.
+
+Usage:
+    python3 tests/test_sensor_replay.py
+"""
+
+import sys
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.replay import ReplaySMBus, load_trace, save_trace
+from src.sensors.max30102_sensor import MAX30102Hardware
+from src.sensors.hx710b_sensor import HX710BSensor
+from src.sensors.blood_pressure_sensor import BloodPressureSensor
+
+logging.getLogger("BloodPressureSensor").setLevel(logging.WARNING)
+
+BP_CALIBRATION = {'offset_counts': 1000000, 'slope_mmhg_per_count': 3.0e-05}
+
+
+def bp_cuff_trace(sample_rate: float = 40.0, map_mmhg: float = 95.0, width: float = 22.0):
+    """
+    Một lần đo đầy đủ: 8 s ở 0 mmHg (pha initialize), bơm 0 → 170 mmHg
+    @ 15 mmHg/s, xả thụ động 170 → 20 mmHg @ 3 mmHg/s với dao động quanh
+    MAP, rồi 12 s ở 0 mmHg (van mở, cleanup)
+    """
+    inflate_end = 8.0 + 170.0 / 15.0
+    deflate_end = inflate_end + 50.0
+    t = np.arange(0.0, deflate_end + 12.0, 1.0 / sample_rate)
+    cuff = np.where(t < 8.0, 0.0, np.minimum(15.0 * (t - 8.0), 170.0))
+    deflating = (t >= inflate_end) & (t < deflate_end)
+    cuff[deflating] = 170.0 - 3.0 * (t[deflating] - inflate_end)
+    cuff[t >= deflate_end] = 0.0
+    envelope = np.where(deflating, np.exp(-((cuff - map_mmhg) / width) ** 2), 0.0)
+    noise = np.random.default_rng(0).normal(0, 0.03, t.size)
+    return cuff + envelope * np.sin(2 * np.pi * 1.2 * t) + noise, t
+
+
+def run_bp_replay(path: Path, speed: float, **config):
+    """Chạy start_measurement() trên replay trace → (sensor, result, wall seconds)"""
+    sensor = BloodPressureSensor("BloodPressure", {
+        'pump_gpio': 26,
+        'valve_gpio': 16,
+        'inflate_target_mmhg': 165.0,
+        'hx710b': {'mode': '40sps', 'calibration': dict(BP_CALIBRATION),
+                   'replay': {'path': str(path), 'speed': speed}},
+        'algorithm': {'sample_rate': 40.0},
+        **config,
+    })
+
+    done = threading.Event()
+    results = []
+    started = time.time()
+    assert sensor.start_measurement(lambda result: (results.append(result), done.set()))
+    sensor.measurement_thread.join(timeout=30.0)
+    wall = time.time() - started
+    sensor.adc_sensor.stop()
+
+    assert done.is_set(), "measurement did not complete"
+    return sensor, results[0], wall
+
+
+def test_max30102_replay_fifo():
+    """Test 1: MAX30102Hardware đọc lại đúng trace qua ReplaySMBus"""
+    print("\n" + "="*60)
+    print("TEST 1: MAX30102 replay (FIFO emulation)")
+    print("="*60)
+
+    rng = np.random.default_rng(3)
+    red = rng.integers(50000, 90000, 300).astype(np.uint32)
+    ir = rng.integers(90000, 120000, 300).astype(np.uint32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = save_trace(Path(tmp) / "ppg.npz", red=red, ir=ir, sample_rate=100.0)
+        trace = load_trace(path)
+        assert np.array_equal(trace['ir'], ir)
+
+    # speed=0: không giới hạn tốc độ → mọi mẫu đều "due" ngay
+    bus = ReplaySMBus(red, ir, sample_rate=100.0, speed=0)
+    hw = MAX30102Hardware(bus=bus)
+
+    got_red, got_ir = [], []
+    while not bus.is_finished():
+        r, i = hw.read_sample_arrays(32)
+        got_red.extend(r.tolist())
+        got_ir.extend(i.tolist())
+
+    print(f"✓ Replayed {len(got_ir)} samples, overflow={bus.overflow_count}")
+
+    # Unthrottled: FIFO luôn đầy nhưng không tràn → đọc đủ, đúng thứ tự
+    assert bus.overflow_count == 0
+    assert got_red == red.tolist() and got_ir == ir.tolist()
+
+
+def test_hx710b_replay_stream():
+    """Test 2: HX710BSensor stream lại áp suất với virtual timestamps"""
+    print("\n" + "="*60)
+    print("TEST 2: HX710B replay (pressures trace, 40 SPS, 20x)")
+    print("="*60)
+
+    t = np.arange(0, 4.0, 1 / 40.0)
+    pressures = 150.0 - 3.0 * t
+
+    calibration = {'offset_counts': 12000, 'slope_mmhg_per_count': 2e-4, 'adc_inverted': True}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = save_trace(Path(tmp) / "cuff.npz", pressures=pressures, timestamps=t)
+        sensor = HX710BSensor("BP_ADC", {
+            'mode': '40sps',
+            'calibration': calibration,
+            'replay': {'path': str(path), 'speed': 20.0},
+        })
+
+    assert sensor.initialize()
+    sensor.start_stream()
+
+    started = time.time()
+    while not sensor.driver.is_finished() and time.time() - started < 5.0:
+        time.sleep(0.02)
+    time.sleep(0.05)
+    sensor.stop_stream()
+
+    got, timestamps = sensor.drain_pressures()
+    elapsed = time.time() - started
+    rate = 3.0 * (timestamps[-1] - timestamps[0]) / max(got[0] - got[-1], 1e-9)
+
+    print(f"✓ {got.size} conversions in {elapsed:.2f}s wall, "
+          f"trace span {timestamps[-1] - timestamps[0]:.2f}s")
+
+    assert got.size == pressures.size
+    assert np.allclose(got, pressures, atol=2e-4)
+    assert np.allclose(np.diff(timestamps), 1 / 40.0)
+    assert abs(rate - 1.0) < 1e-6  # Tốc độ xả theo virtual time giữ nguyên
+    assert elapsed < 2.0
+
+    sensor.cleanup()
+
+
+def test_bp_measurement_replay_virtual_clock():
+    """Test 3: BloodPressureSensor đo trên replay 20x - timeout/thời lượng theo virtual time"""
+    print("\n" + "="*60)
+    print("TEST 3: BloodPressureSensor replay (full deflate, 20x)")
+    print("="*60)
+
+    pressures, t = bp_cuff_trace()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = save_trace(Path(tmp) / "bp_cuff.npz", pressures=pressures, timestamps=t)
+        sensor, result, wall = run_bp_replay(path, speed=20.0)
+
+    stats = sensor.last_deflate_stats
+    print(f"✓ {result.systolic:.1f}/{result.diastolic:.1f} mmHg (MAP {result.map_value:.1f}), "
+          f"deflate {stats['duration_s']}s virtual, whole measurement {wall:.1f}s wall")
+
+    # Xả 165 → 30 mmHg @ 3 mmHg/s ≈ 45 s + 2 s xả hết: theo trace time, không phải wall time
+    assert not stats['early_stopped']
+    assert 44.0 < stats['duration_s'] < 52.0
+    assert wall < 10.0
+    assert 100.0 < result.systolic < 125.0 and 75.0 < result.diastolic < 95.0
+    assert result.metadata['deflate']['duration_s'] == stats['duration_s']
+
+
+def test_bp_early_stop_replay():
+    """Test 4: deflate_mode='early_stop' dừng ngay dưới DIA, kết quả vẫn hợp lệ"""
+    print("\n" + "="*60)
+    print("TEST 4: BloodPressureSensor replay (early-stop deflate, 20x)")
+    print("="*60)
+
+    pressures, t = bp_cuff_trace()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = save_trace(Path(tmp) / "bp_cuff.npz", pressures=pressures, timestamps=t)
+        full, full_result, _ = run_bp_replay(path, speed=20.0)
+        early, result, _ = run_bp_replay(path, speed=20.0, deflate_mode='early_stop')
+
+    stats = early.last_deflate_stats
+    print(f"✓ early stop at {stats['stop_pressure']} mmHg (confidence {stats['confidence']}), "
+          f"deflate {stats['duration_s']}s vs {full.last_deflate_stats['duration_s']}s full, "
+          f"saved ~{stats['seconds_saved']}s")
+    print(f"✓ early {result.systolic:.1f}/{result.diastolic:.1f} vs "
+          f"full {full_result.systolic:.1f}/{full_result.diastolic:.1f} mmHg")
+
+    assert stats['early_stopped'] and early.early_stop_count == 1
+    assert stats['confidence'] >= early.early_stop_min_confidence
+    assert stats['stop_pressure'] > 50.0 and stats['seconds_saved'] > 5.0
+    assert stats['duration_s'] < full.last_deflate_stats['duration_s'] - 5.0
+    assert all(result.validation_flags.values())
+    assert abs(result.systolic - full_result.systolic) < 5.0
+    assert abs(result.diastolic - full_result.diastolic) < 5.0
+
+
+def test_bp_early_stop_low_dia_replay():
+    """Test 5: DIA thấp (cutoff ≤ 30 mmHg) → không arm early stop, không tính vào thống kê"""
+    print("\n" + "="*60)
+    print("TEST 5: BloodPressureSensor replay (early-stop, low DIA)")
+    print("="*60)
+
+    class Capture(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    pressures, t = bp_cuff_trace(map_mmhg=42.0, width=14.0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = save_trace(Path(tmp) / "bp_low_dia.npz", pressures=pressures, timestamps=t)
+        capture = Capture()
+        logger = logging.getLogger("Sensor.BloodPressure")
+        logger.addHandler(capture)
+        previous_level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            # min_confidence 0: chỉ quy tắc cutoff quyết định việc arm
+            sensor, result, _ = run_bp_replay(path, speed=20.0, deflate_mode='early_stop',
+                                              early_stop_min_confidence=0.0)
+        finally:
+            logger.removeHandler(capture)
+            logger.setLevel(previous_level)
+
+    stats = sensor.last_deflate_stats
+    live = result.metadata['live_estimate']
+    skipped = [m for m in capture.messages if m.startswith("Early stop skipped: cutoff")]
+    print(f"✓ live DIA≈{live['diastolic']} mmHg → {skipped[0] if skipped else 'not skipped'}")
+    print(f"✓ stats={stats}")
+
+    assert live['dia_confirmed'] and live['diastolic'] - sensor.early_stop_margin <= sensor.DEFLATE_END_PRESSURE_MMHG
+    assert skipped and not any(m.startswith("Early stop armed") for m in capture.messages)
+    assert not stats['early_stopped'] and stats['seconds_saved'] == 0.0
+    assert sensor.early_stop_count == 0 and sensor.total_seconds_saved == 0.0
+    assert stats['stop_pressure'] <= sensor.DEFLATE_END_PRESSURE_MMHG  # Deflate tới cutoff thường
+
+
+if __name__ == "__main__":
+    test_max30102_replay_fifo()
+    test_hx710b_replay_stream()
+    test_bp_measurement_replay_virtual_clock()
+    test_bp_early_stop_replay()
+    test_bp_early_stop_low_dia_replay()
+    print("\n✅ All sensor replay tests passed")
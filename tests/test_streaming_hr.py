@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test Streaming HR/SpO2 Engine
+==============================
+
+Kiểm tra StreamingHRCalculator (filter state + beats incremental)
+trên tín hiệu PPG giả lập - không cần phần cứng.
+
+Usage:
+    python3 tests/test_streaming_hr.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.max30102_sensor import StreamingHRCalculator
+
+
+def synthetic_ppg(sample_rate: float, bpm: float, seconds: float = 12.0, noise: float = 10.0):
+    """PPG giả lập: sườn lên nhanh, sườn xuống chậm. R = (400/80000)/(800/100000) = 0.625"""
+    rng = np.random.default_rng(0)
+    t = np.arange(0.0, seconds, 1.0 / sample_rate)
+    phase = (t * bpm / 60.0) % 1.0
+    pulse = np.where(phase < 0.3, np.sin(np.pi * phase / 0.6), np.cos(np.pi * (phase - 0.3) / 1.4))
+    ir = 100000 + 800 * pulse + rng.normal(0, noise, t.size) + 20 * t
+    red = 80000 + 400 * pulse + rng.normal(0, noise, t.size)
+    return ir.astype(np.uint32), red.astype(np.uint32)
+
+
+def test_streaming_hr_spo2_accuracy():
+    """Test 1: HR/SpO2 đúng trên dải 55-130 BPM"""
+    print("\n" + "="*60)
+    print("TEST 1: Streaming HR/SpO2 accuracy")
+    print("="*60)
+
+    expected_spo2 = 110.0 - 25.0 * 0.625
+
+    for bpm in (55, 72, 95, 130):
+        ir, red = synthetic_ppg(100.0, bpm)
+        engine = StreamingHRCalculator(input_rate=100.0, algorithm_rate=50)
+        for i in range(0, ir.size, 24):
+            engine.update(ir[i:i + 24], red[i:i + 24])
+
+        hr, hr_valid, spo2, spo2_valid, sqi, cv, peaks, ratios = engine.result()
+        print(f"✓ {bpm} BPM → HR={hr:.1f}, SpO2={spo2:.1f}%, SQI={sqi:.0f}, peaks={peaks}")
+
+        assert hr_valid and abs(hr - bpm) < 4.0
+        assert spo2_valid and abs(spo2 - expected_spo2) < 2.0
+        assert peaks >= 3 and ratios
+
+
+def test_batch_size_independent():
+    """Test 2: Kết quả không phụ thuộc cách chia batch (filter state + decimation phase)"""
+    print("\n" + "="*60)
+    print("TEST 2: Batch-size independence")
+    print("="*60)
+
+    ir, red = synthetic_ppg(100.0, 80)
+    results = []
+    for batch in (1, 7, 24, 1000):
+        engine = StreamingHRCalculator(input_rate=100.0, algorithm_rate=50)
+        for i in range(0, ir.size, batch):
+            engine.update(ir[i:i + batch], red[i:i + batch])
+        results.append(engine.result())
+
+    print(f"✓ HR per batch size: {[round(r[0], 2) for r in results]}")
+    assert all(r == results[0] for r in results[1:])
+
+
+if __name__ == "__main__":
+    test_streaming_hr_spo2_accuracy()
+    test_batch_size_independent()
+    print("\n✅ All streaming HR tests passed")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test Streaming Oscillometric Processor
+=======================================
+
+So sánh ước lượng trực tiếp (StreamingOscillometricProcessor, theo batch)
+với xử lý toàn bộ record (OscillometricProcessor.process_deflate_data)
+trên tín hiệu cuff giả lập.
+
+Usage:
+    python3 tests/test_streaming_oscillometric.py
+"""
+
+import sys
+import logging
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.sensors.blood_pressure_sensor import (
+    OscillometricProcessor,
+    StreamingOscillometricProcessor,
+)
+
+logger = logging.getLogger("StreamingOscillometricTest")
+
+
+def synthetic_deflate(sample_rate: float, map_mmhg: float = 95.0, width: float = 22.0,
+                      noise: float = 0.03, rr_jitter: float = 0.0, seed: int = 0):
+    """Deflate 165 → 30 mmHg @ 3 mmHg/s, envelope Gaussian quanh MAP, HR 72 BPM (± rr_jitter)"""
+    t = np.arange(0.0, 45.0, 1.0 / sample_rate)
+    ramp = 165.0 - 3.0 * t
+    envelope = np.exp(-((ramp - map_mmhg) / width) ** 2)
+    rng = np.random.default_rng(seed)
+    if rr_jitter > 0:
+        beats = np.cumsum(1 / 1.2 * (1 + rng.normal(0, rr_jitter, 100)))
+        phase = np.interp(t, np.concatenate(([0.0], beats)), np.arange(101))
+    else:
+        phase = 1.2 * t
+    pressures = ramp + envelope * np.sin(2 * np.pi * phase) + rng.normal(0, noise, t.size)
+    return pressures, t, ramp
+
+
+def confidence_at_dia(pressures, timestamps, sample_rate: float, batch: int = 4):
+    """Stream tới khi DIA được xác nhận → (estimate, confidence)"""
+    live = StreamingOscillometricProcessor({}, logger)
+    live.start(sample_rate=sample_rate)
+    for i in range(0, pressures.size, batch):
+        estimate = live.update(pressures[i:i + batch], timestamps[i:i + batch])
+        if estimate.dia_confirmed:
+            break
+    return estimate, live.estimate_confidence()
+
+
+def test_streaming_matches_batch():
+    """Test 1: SYS/MAP/DIA trực tiếp gần với kết quả batch"""
+    print("\n" + "="*60)
+    print("TEST 1: Streaming vs batch (10 SPS)")
+    print("="*60)
+
+    pressures, timestamps, _ = synthetic_deflate(10.0)
+
+    live = StreamingOscillometricProcessor({'sample_rate': 10.0}, logger)
+    for i in range(0, pressures.size, 4):
+        estimate = live.update(pressures[i:i + 4], timestamps[i:i + 4])
+
+    batch = OscillometricProcessor({'sample_rate': 10.0}, logger).process_deflate_data(
+        pressures.tolist(), timestamps.tolist()
+    )
+
+    print(f"✓ Live:  {estimate.to_dict()}")
+    print(f"✓ Batch: SYS={batch.systolic:.1f} DIA={batch.diastolic:.1f} MAP={batch.map_value:.1f}")
+
+    assert estimate.dia_confirmed
+    assert abs(estimate.systolic - batch.systolic) < 5.0
+    assert abs(estimate.diastolic - batch.diastolic) < 5.0
+    assert abs(estimate.map_value - batch.map_value) < 5.0
+    assert 65.0 < estimate.heart_rate < 80.0
+
+
+def test_dia_confirmed_before_end_of_deflate():
+    """Test 2: DIA được xác nhận ngay sau khi cuff xuống dưới điểm DIA"""
+    print("\n" + "="*60)
+    print("TEST 2: DIA confirmation time (40 SPS)")
+    print("="*60)
+
+    pressures, timestamps, ramp = synthetic_deflate(40.0)
+
+    live = StreamingOscillometricProcessor({}, logger)
+    live.start(sample_rate=40.0)
+
+    confirmed_pressure = None
+    for i in range(0, pressures.size, 8):
+        estimate = live.update(pressures[i:i + 8], timestamps[i:i + 8])
+        if estimate.dia_confirmed and confirmed_pressure is None:
+            confirmed_pressure = ramp[min(i + 7, ramp.size - 1)]
+
+    print(f"✓ DIA≈{estimate.diastolic:.1f} mmHg confirmed at cuff {confirmed_pressure:.1f} mmHg")
+
+    assert confirmed_pressure is not None
+    assert confirmed_pressure > 60.0  # Xa trước cutoff 30 mmHg
+    assert estimate.diastolic - confirmed_pressure < 15.0
+
+
+def test_early_stop_confidence():
+    """Test 3: Confidence cho early-stop chỉ > 0 khi đã có đủ SYS/MAP/DIA"""
+    print("\n" + "="*60)
+    print("TEST 3: Early-stop confidence")
+    print("="*60)
+
+    pressures, timestamps, ramp = synthetic_deflate(10.0)
+
+    live = StreamingOscillometricProcessor({}, logger)
+    live.start(sample_rate=10.0)
+
+    # Trước MAP: chưa có DIA → confidence = 0
+    above_map = ramp > 100.0
+    live.update(pressures[above_map], timestamps[above_map])
+    assert live.estimate_confidence() == 0.0
+
+    live.update(pressures[~above_map], timestamps[~above_map])
+    confidence = live.estimate_confidence()
+    print(f"✓ Confidence after DIA confirmed: {confidence:.2f}")
+
+    assert live.get_estimate().dia_confirmed
+    assert confidence >= 0.8  # Default early_stop_min_confidence = 0.6
+
+
+def test_confidence_is_graded():
+    """Test 4: Confidence liên tục - giảm dần theo nhiễu / nhịp không đều, DIA giả < ngưỡng"""
+    print("\n" + "="*60)
+    print("TEST 4: Graded confidence (40 SPS)")
+    print("="*60)
+
+    cases = [
+        ('clean', dict(noise=0.03)),
+        ('irregular', dict(noise=0.05, rr_jitter=0.15, seed=1)),
+        ('false_dia', dict(noise=0.15, rr_jitter=0.05, seed=1)),
+    ]
+    estimates, scores = {}, {}
+    for label, kwargs in cases:
+        pressures, timestamps, _ = synthetic_deflate(40.0, **kwargs)
+        estimates[label], scores[label] = confidence_at_dia(pressures, timestamps, 40.0)
+        print(f"✓ {label:9s}: SYS={estimates[label].systolic:.1f} DIA={estimates[label].diastolic:.1f} "
+              f"beats={estimates[label].beat_count} confidence={scores[label]:.2f}")
+
+    # clean > irregular (SYS/DIA vẫn đúng) > false_dia (DIA giả do nhiễu ở áp cao → không early stop)
+    assert scores['clean'] > 0.85
+    assert 0.6 <= scores['irregular'] < scores['clean']
+    assert estimates['false_dia'].diastolic > 120.0 and scores['false_dia'] < 0.4
+
+
+if __name__ == "__main__":
+    test_streaming_matches_batch()
+    test_dia_confirmed_before_end_of_deflate()
+    test_early_stop_confidence()
+    test_confidence_is_graded()
+    print("\n✅ All streaming oscillometric tests passed")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test Write-Behind Writer (group commit health record / alert)
+==============================================================
+
+DatabaseManager.submit_health_record / submit_alert trả Future ngay, writer
+thread gom các record đang chờ vào một transaction, cloud push chạy trên
+executor riêng; save_* đồng bộ vẫn trả ID như cũ.
+
+Usage:
+    python3 tests/test_write_behind.py
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.database import DatabaseManager
+from src.data.write_behind import WriteBehindWriter
+
+
+class SlowCloud:
+    """Cloud sync giả: mỗi push mất delay giây"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.sync_config = {'sync_health_records': True, 'sync_alerts': True}
+        self.pushed = []
+        self.threads = set()
+
+    def push_health_record(self, record_id: int) -> bool:
+        time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.pushed.append(('health_record', record_id))
+        return True
+
+    def push_alert(self, alert_id: int) -> bool:
+        time.sleep(self.delay)
+        self.pushed.append(('alert', alert_id))
+        return True
+
+    def disconnect_from_cloud(self):
+        pass
+
+
+def make_db(root: Path, **write_behind) -> DatabaseManager:
+    db = DatabaseManager({'database': {'path': str(root / "health.db"),
+                                       'storage': {'checkpoint_interval_s': 0},
+                                       'write_behind': write_behind}})
+    assert db.initialize()
+    return db
+
+
+def vitals(i: int, device_id: str = 'dev-wb'):
+    return {'patient_id': None, 'device_id': device_id, 'heart_rate': 60 + i % 40, 'spo2': 97.0}
+
+
+def test_group_commit_from_many_threads():
+    """Test 1: 8 thread × 50 record → ID duy nhất, ít transaction hơn record; lỗi không lan"""
+    print("\n" + "="*60)
+    print("TEST 1: Group commit + futures")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp), linger_ms=5)
+        futures, lock = [], threading.Lock()
+
+        def producer(offset: int):
+            for i in range(50):
+                future = db.submit_health_record(vitals(offset + i))
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=producer, args=(k * 50,)) for k in range(8)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        submit_ms = (time.perf_counter() - started) * 1000
+        ids = [future.result(timeout=10) for future in futures]
+        stats = db.write_behind.get_stats()
+
+        print(f"✓ 400 submits in {submit_ms:.0f} ms, {stats['batches']} transactions, "
+              f"largest batch {stats['largest_batch']}")
+        assert None not in ids and len(set(ids)) == 400
+        assert stats['batches'] < 400 and stats['largest_batch'] > 1
+        assert len(db.get_health_records(device_id='dev-wb')) == 400
+
+        # Batch có một alert hỏng: các record khác vẫn được ghi
+        good = db.submit_health_record(vitals(1, 'mixed'))
+        bad = db.submit_alert({'patient_id': None, 'device_id': 'mixed'})      # thiếu alert_type/severity/message
+        alert = db.submit_alert({'patient_id': None, 'device_id': 'mixed', 'health_record_id': good.result(),
+                                 'alert_type': 'high_heart_rate', 'severity': 'high', 'message': 'HR cao'})
+        assert good.result() and bad.result() is None and alert.result()
+
+        # API đồng bộ giữ nguyên hành vi
+        assert db.save_health_record(vitals(2, 'sync')) is not None
+        assert db.save_health_record({'device_id': 'sync'}) is None               # thiếu patient_id
+        assert db.submit_health_record({'device_id': 'sync'}).result() is None
+        assert len(db.get_active_alerts(device_id='mixed')) == 1
+        print(f"✓ mixed batch: record={good.result()} alert={alert.result()} bad=None")
+        db.close()
+
+
+def test_cloud_push_is_asynchronous():
+    """Test 2: Future resolve trước cloud push; save_* trong callback không deadlock"""
+    print("\n" + "="*60)
+    print("TEST 2: Async cloud sync hand-off")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = make_db(Path(tmp))
+        cloud = SlowCloud(delay=0.1)
+        db.cloud_sync_manager = cloud
+
+        started = time.perf_counter()
+        record_ids = [db.save_health_record(vitals(i)) for i in range(5)]
+        save_ms = (time.perf_counter() - started) * 1000
+        print(f"✓ 5 sync saves with 100 ms cloud push each: {save_ms:.0f} ms, pushed so far={len(cloud.pushed)}")
+        assert save_ms < 400 and len(cloud.pushed) < 5
+
+        # Callback trên writer thread gọi save_alert đồng bộ → ghi trực tiếp, không deadlock
+        linked = {}
+
+        def on_saved(future):
+            linked['alert'] = db.save_alert({'patient_id': None, 'device_id': 'dev-wb', 'health_record_id': future.result(),
+                                             'alert_type': 'low_spo2', 'severity': 'high', 'message': 'SpO2 thấp'})
+
+        db.submit_health_record(vitals(99)).add_done_callback(on_saved)
+        assert db.flush_writes(timeout=5)
+        assert linked['alert'] is not None
+
+        db.close()       # chờ các push còn lại
+        print(f"✓ pushed after close: {len(cloud.pushed)} on {cloud.threads}")
+        assert [i for kind, i in cloud.pushed if kind == 'health_record'][:5] == record_ids
+        assert ('alert', linked['alert']) in cloud.pushed and len(cloud.pushed) == 7
+        assert all(name.startswith("CloudPush") for name in cloud.threads)
+
+
+def test_bounded_queue_and_drain():
+    """Test 3: Queue đầy → ghi trên thread caller; stop() commit hết hàng đợi"""
+    print("\n" + "="*60)
+    print("TEST 3: Bounded queue + drain on stop")
+    print("="*60)
+
+    gate = threading.Event()
+    committed = []
+
+    def commit(items):
+        gate.wait(timeout=5)
+        committed.extend(data['n'] for _, data in items)
+        return [data['n'] for _, data in items]
+
+    writer = WriteBehindWriter(commit, max_queue=4, max_batch=1, enqueue_timeout_s=0.05)
+    writer.start()
+    futures = [writer.submit('health_record', {'n': n}) for n in range(3)]
+    assert not writer.flush(timeout=0.05)
+
+    # 1 đang commit + 4 trong queue → ít nhất một submit ghi trực tiếp trên thread này
+    threading.Timer(0.3, gate.set).start()
+    futures += [writer.submit('health_record', {'n': n}) for n in range(3, 6)]
+    writer.stop()
+    stats = writer.get_stats()
+    print(f"✓ stats: {stats}")
+    assert [future.result(timeout=1) for future in futures] == list(range(6))
+    assert sorted(committed) == list(range(6)) and stats['overflow_writes'] >= 1
+    assert stats['pending'] == 0 and stats['largest_batch'] == 1 and not stats['running']
+    assert writer.submit('alert', {'n': 6}).result() == 6        # sau stop: ghi trực tiếp
+
+
+if __name__ == "__main__":
+    test_group_commit_from_many_threads()
+    test_cloud_push_is_asynchronous()
+    test_bounded_queue_and_drain()
+    print("\n✅ All write-behind tests passed")